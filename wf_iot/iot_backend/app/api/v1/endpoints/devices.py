@@ -1,19 +1,28 @@
 """
 设备管理API端点
 """
-import json
+from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.db.async_session import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.crud.device import device_crud, device_data_crud, device_command_crud
+from app.crud.async_device import async_device_crud
+from app.crud.rollup import device_rollup_crud, RESOLUTIONS
 from app.schemas.user import User
 from app.core.dependencies import get_current_active_user, has_permission
+from app.core.pagination import paginate_or_400, set_page_headers
 from app.services.mqtt_service import mqtt_client
+from app.services.telemetry_export import TelemetryExporter, decode_export_cursor, telemetry_exporter
+from app.core.codec import json_codec
+from app.core.config import settings
 from app.schemas.device import (
     Device, DeviceCreate, DeviceUpdate,
-    DeviceDataCreate, DeviceData,
+    DeviceDataCreate, DeviceData, DeviceDataSeries, DeviceDataRollupPoint,
     DeviceCommand, DeviceCommandCreate
 )
 
@@ -22,19 +31,28 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Device])
 def read_devices(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
+    with_total: bool = Query(False, description="是否在响应头 X-Total-Count 返回近似总数"),
     product_id: Optional[str] = Query(None),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    """获取设备列表"""
-    if product_id:
-        devices = device_crud.get_by_product(db, product_id=product_id, skip=skip, limit=limit)
-    else:
-        # 非超级用户只能看到自己的设备
-        owner_id = None if current_user.is_superuser else current_user.id
-        devices = device_crud.get_multi(db, skip=skip, limit=limit, owner_id=owner_id)
+    """获取设备列表，默认游标分页；skip>0 时沿用偏移分页"""
+    # 非超级用户只能看到自己的设备
+    owner_id = None if product_id or current_user.is_superuser else current_user.id
+    if skip and not cursor:
+        if product_id:
+            return device_crud.get_by_product(db, product_id=product_id, skip=skip, limit=limit)
+        return device_crud.get_multi(db, skip=skip, limit=limit, owner_id=owner_id)
+
+    devices, next_cursor = paginate_or_400(
+        device_crud.get_page, db, limit=limit, cursor=cursor, owner_id=owner_id, product_id=product_id
+    )
+    total = device_crud.count(db, owner_id=owner_id, product_id=product_id) if with_total else None
+    set_page_headers(response, next_cursor, total)
     return devices
 
 
@@ -58,9 +76,50 @@ def create_device(
     return device
 
 
+@router.get("/data/export")
+def export_device_data(
+    *,
+    db: Session = Depends(get_read_db),
+    device_id: List[str] = Query(..., description="设备唯一标识，可重复指定"),
+    start_time: datetime = Query(..., description="起始时间"),
+    end_time: datetime = Query(..., description="结束时间"),
+    format: str = Query("ndjson", description="导出格式 ndjson/csv/parquet"),
+    cursor: Optional[str] = Query(None, description="断点续传：已收到的最后一行的 cursor"),
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    流式导出设备数据，按排序键 (timestamp, id) 升序分块输出
+
+    每行带有该行排序键的不透明游标 cursor，中断后以最后收到的一行的 cursor 重新请求即可续传；
+    续传只输出排序键大于游标的行，之后才写入且 timestamp 更早的数据不会补发
+    """
+    if format not in TelemetryExporter.supported_formats():
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    if start_time > end_time:
+        raise HTTPException(status_code=400, detail="起始时间必须早于结束时间")
+    after = paginate_or_400(decode_export_cursor, cursor) if cursor else None
+    if len(set(device_id)) > settings.TELEMETRY_EXPORT_MAX_DEVICES:
+        raise HTTPException(status_code=400, detail="导出设备数超出限制")
+
+    devices = {}
+    for device in device_crud.get_by_device_ids(db, device_id):
+        # 检查权限
+        if not current_user.is_superuser and device.owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="权限不足")
+        devices[device.id] = device.device_id
+    if len(devices) != len(set(device_id)):
+        raise HTTPException(status_code=404, detail="设备不存在")
+
+    return StreamingResponse(
+        telemetry_exporter.stream(format, devices, start_time, end_time, after),
+        media_type=TelemetryExporter.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="device_data.{format}"'},
+    )
+
+
 @router.get("/status/online", response_model=List[Device])
 def get_online_devices(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """获取所有在线设备"""
@@ -156,13 +215,15 @@ def create_device_data(
 @router.get("/{device_id}/data", response_model=List[DeviceData])
 def read_device_data(
     *,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     device_id: str,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    """获取设备数据列表"""
+    """获取设备数据列表，按时间倒序，默认游标分页；skip>0 时沿用偏移分页"""
     device = device_crud.get_by_device_id(db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="设备不存在")
@@ -171,10 +232,69 @@ def read_device_data(
     if not current_user.is_superuser and device.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="权限不足")
 
-    data = device_data_crud.get_device_data(db, device_id=device.id, skip=skip, limit=limit)
+    if skip and not cursor:
+        return device_data_crud.get_device_data(db, device_id=device.id, skip=skip, limit=limit)
+
+    data, next_cursor = paginate_or_400(
+        device_data_crud.get_data_page, db, device_id=device.id, limit=limit, cursor=cursor
+    )
+    set_page_headers(response, next_cursor)
     return data
 
 
+@router.get("/{device_id}/data/series", response_model=DeviceDataSeries)
+def read_device_data_series(
+    *,
+    db: Session = Depends(get_read_db),
+    device_id: str,
+    start_time: Optional[datetime] = Query(None, description="起始时间，默认为24小时前"),
+    end_time: Optional[datetime] = Query(None, description="结束时间，默认为当前时间"),
+    max_points: Optional[int] = Query(None, ge=1, le=10000, description="每个指标的最大数据点数"),
+    metric: Optional[List[str]] = Query(None, description="指标名，可重复指定"),
+    resolution: Optional[str] = Query(None, description="聚合分辨率 1m/1h/1d，默认按时间跨度自动选择"),
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """获取设备数据聚合曲线（min/max/avg/count/last），用于图表展示"""
+    device = device_crud.get_by_device_id(db, device_id=device_id)
+    if not device:
+        raise HTTPException(status_code=404, detail="设备不存在")
+
+    # 检查权限
+    if not current_user.is_superuser and device.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="权限不足")
+
+    end_time = end_time or datetime.utcnow()
+    start_time = start_time or end_time - timedelta(hours=24)
+    if start_time >= end_time:
+        raise HTTPException(status_code=400, detail="起始时间必须早于结束时间")
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="不支持的聚合分辨率")
+
+    resolution, buckets = device_rollup_crud.get_series(
+        db, device.id, start_time, end_time,
+        max_points=max_points, metrics=metric, resolution=resolution,
+    )
+    points = [
+        DeviceDataRollupPoint(
+            metric=bucket.metric,
+            timestamp=bucket.bucket_start,
+            count=bucket.sample_count,
+            min=bucket.value_min,
+            max=bucket.value_max,
+            avg=bucket.value_sum / bucket.sample_count if bucket.sample_count else None,
+            last=bucket.value_last,
+        )
+        for bucket in buckets
+    ]
+    return DeviceDataSeries(
+        device_id=device_id,
+        resolution=resolution,
+        start_time=start_time,
+        end_time=end_time,
+        points=points,
+    )
+
+
 @router.post("/{device_id}/commands", response_model=DeviceCommand, status_code=status.HTTP_201_CREATED)
 def send_device_command(
     *,
@@ -208,7 +328,7 @@ def send_device_command(
             "command_type": command.command_type,
             "command_data": command.command_data
         }
-        mqtt_client.publish(topic=topic, payload=json.dumps(payload))
+        mqtt_client.publish(topic=topic, payload=json_codec.dumps(payload))
 
         # 更新命令状态为已发送
         device_command_crud.update_status(db, command.id, "sent")
@@ -244,11 +364,11 @@ def get_device_commands(
 async def control_device(
     device_id: str,
     command: Dict[str, Any],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """发送控制指令到设备"""
-    device = device_crud.get_by_device_id(db, device_id=device_id)
+    device = await async_device_crud.get_by_device_id(db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="设备不存在")
 
@@ -258,6 +378,6 @@ async def control_device(
 
     # 发布控制指令到MQTT主题
     topic = f"device/{device_id}/control"
-    payload = json.dumps(command)
+    payload = json_codec.dumps(command)
     mqtt_client.publish(topic, payload)
     return {"message": f"控制指令已发送到设备 {device_id}"}
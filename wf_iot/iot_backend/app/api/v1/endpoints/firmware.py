@@ -1,18 +1,24 @@
 """
 固件管理API端点
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Any
 import hashlib
 import os
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.db.async_session import get_async_db
 from app.db.models.user import User
 from app.core.config import settings
 from app.crud.device import device_crud
 from app.crud.firmware import firmware_crud, firmware_upgrade_task_crud
+from app.crud.async_device import async_device_crud
+from app.crud.async_firmware import async_firmware_crud, async_firmware_upgrade_task_crud
 from app.core.dependencies import get_current_active_user, has_permission
+from app.core.pagination import paginate_or_400, set_page_headers
 from app.tasks.firmware_tasks import initiate_firmware_upgrade
 from app.schemas.firmware import Firmware, FirmwareCreate, FirmwareUpgradeTask, FirmwareUpgradeTaskCreate
 
@@ -24,17 +30,25 @@ router = APIRouter()
 
 @router.get("/tasks", response_model=List[FirmwareUpgradeTask])
 def get_upgrade_tasks(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
     device_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
-    """获取升级任务列表"""
-    return firmware_upgrade_task_crud.get_multi(
-        db, skip=skip, limit=limit, device_id=device_id, status=status
+    """获取升级任务列表，默认游标分页；skip>0 时沿用偏移分页"""
+    if skip and not cursor:
+        return firmware_upgrade_task_crud.get_multi(
+            db, skip=skip, limit=limit, device_id=device_id, status=status
+        )
+    tasks, next_cursor = paginate_or_400(
+        firmware_upgrade_task_crud.get_page, db, limit=limit, cursor=cursor, device_id=device_id, status=status
     )
+    set_page_headers(response, next_cursor)
+    return tasks
 
 
 @router.get("/tasks/{task_id}", response_model=FirmwareUpgradeTask)
@@ -53,30 +67,30 @@ def get_upgrade_task(
 @router.post("/tasks", response_model=FirmwareUpgradeTask, status_code=status.HTTP_202_ACCEPTED)
 async def create_upgrade_task(
     task_in: FirmwareUpgradeTaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """创建固件升级任务"""
     # 检查设备是否存在
-    device = device_crud.get(db, id=task_in.device_id)
+    device = await async_device_crud.get(db, id=task_in.device_id)
     if not device:
         raise HTTPException(status_code=404, detail="设备不存在")
 
     # 检查固件是否存在
-    firmware = firmware_crud.get(db, id=task_in.firmware_id)
+    firmware = await async_firmware_crud.get(db, id=task_in.firmware_id)
     if not firmware:
         raise HTTPException(status_code=404, detail="固件不存在")
 
     # 创建升级任务
-    task = firmware_upgrade_task_crud.create(db, obj_in=task_in, created_by=current_user.id)
+    task = await async_firmware_upgrade_task_crud.create(db, obj_in=task_in, created_by=current_user.id)
 
-    # 异步启动升级任务
+    # 异步启动升级任务（投递到 broker 是阻塞网络调用，放到线程池执行）
     try:
-        celery_task = initiate_firmware_upgrade.delay(task.id)
-        firmware_upgrade_task_crud.update_celery_task_id(db, task.id, celery_task.id)
+        celery_task = await run_in_threadpool(initiate_firmware_upgrade.delay, task.id)
+        task = await async_firmware_upgrade_task_crud.update_celery_task_id(db, task.id, celery_task.id)
     except Exception as e:
         # 如果 Celery 任务启动失败，更新状态
-        firmware_upgrade_task_crud.update_status(db, task.id, "failed", error_message=str(e))
+        task = await async_firmware_upgrade_task_crud.update_status(db, task.id, "failed", error_message=str(e))
 
     return task
 
@@ -119,14 +133,22 @@ def delete_upgrade_task(
 
 @router.get("/", response_model=List[Firmware])
 def get_firmwares(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
     product_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
-    """获取固件列表"""
-    return firmware_crud.get_multi(db, skip=skip, limit=limit, product_id=product_id)
+    """获取固件列表，默认游标分页；skip>0 时沿用偏移分页"""
+    if skip and not cursor:
+        return firmware_crud.get_multi(db, skip=skip, limit=limit, product_id=product_id)
+    firmwares, next_cursor = paginate_or_400(
+        firmware_crud.get_page, db, limit=limit, cursor=cursor, product_id=product_id
+    )
+    set_page_headers(response, next_cursor)
+    return firmwares
 
 
 @router.get("/{firmware_id}", response_model=Firmware)
@@ -148,28 +170,32 @@ async def upload_firmware(
     version: str,
     description: Optional[str] = None,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """上传固件文件"""
     # 检查版本是否已存在
-    existing = firmware_crud.get_by_version_and_product(db, version=version, product_id=product_id)
+    existing = await async_firmware_crud.get_by_version_and_product(db, version=version, product_id=product_id)
     if existing:
         raise HTTPException(status_code=400, detail="该产品的固件版本已存在")
 
     # 保存固件文件
     upload_dir = settings.FIRMWARE_UPLOAD_DIR
-    os.makedirs(upload_dir, exist_ok=True)
+    await run_in_threadpool(os.makedirs, upload_dir, exist_ok=True)
     file_location = os.path.join(upload_dir, file.filename)
 
     file_hash = hashlib.sha256()
     file_size = 0
 
-    with open(file_location, "wb") as f:
+    # 文件写入在线程池中执行，避免大文件上传阻塞事件循环
+    f = await run_in_threadpool(open, file_location, "wb")
+    try:
         while contents := await file.read(1024 * 1024):
-            f.write(contents)
+            await run_in_threadpool(f.write, contents)
             file_hash.update(contents)
             file_size += len(contents)
+    finally:
+        await run_in_threadpool(f.close)
 
     file_hash_str = file_hash.hexdigest()
 
@@ -182,7 +208,7 @@ async def upload_firmware(
         description=description
     )
 
-    return firmware_crud.create(
+    return await async_firmware_crud.create(
         db=db,
         obj_in=firmware_in,
         created_by=current_user.id,
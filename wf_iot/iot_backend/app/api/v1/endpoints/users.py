@@ -50,7 +50,13 @@ def update_user_me(
     current_user: User = Depends(get_current_active_user),
     ) -> Any:
     """Update own user."""
-    current_user_data = UserUpdate(**current_user.__dict__)
+    # current_user 为缓存的用户快照(CachedUser)，按字段构造而不是复制 __dict__
+    current_user_data = UserUpdate(
+        username=current_user.username,
+        email=current_user.email,
+        full_name=current_user.full_name,
+        is_active=current_user.is_active,
+    )
     if password is not None:
         current_user_data.password = password
     if full_name is not None:
@@ -78,7 +84,8 @@ def read_user_by_id(
         current_user: User = Depends(get_current_active_user),
     ):
     user = user_crud.get_user(db, user_id=user_id)
-    if user == current_user:
+    # current_user 为缓存快照而非 ORM 对象，按主键判断是否本人
+    if user is not None and user.id == current_user.id:
         return user
     if not user_crud.is_superuser(current_user):
         raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,165 @@
+# 作用：设备消息负载的 JSON 编解码（MQTT/CoAP/AMQP/Redis 共用）
+# - 可插拔后端: orjson / msgspec（已安装时使用）/ 标准库 json，PAYLOAD_JSON_CODEC=auto 时按此顺序选择
+# - 直接解码 bytes，不先 decode("utf-8") 成字符串；编码结果为 UTF-8 bytes（紧凑格式，不转义非 ASCII）
+# - 带类型解码: decode(data, Schema) 构造 pydantic 模型；标准库后端由 pydantic 直接解析 JSON bytes，
+#   orjson/msgspec 后端先解析为 dict 再校验（比 pydantic 自带的 JSON 解析快）
+# - 各后端的解析/校验错误统一抛出 PayloadDecodeError
+
+import json
+from typing import Any, Callable, Dict, Type, TypeVar, Union
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+T = TypeVar("T")
+
+Payload = Union[bytes, bytearray, memoryview, str]
+
+
+class PayloadDecodeError(ValueError):
+    """负载不是合法的 JSON 或不符合目标模型"""
+
+
+class JsonCodec:
+    """标准库 json 后端（始终可用）"""
+
+    name = "json"
+
+    def loads(self, data: Payload) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        try:
+            return json.loads(data)
+        except (ValueError, TypeError) as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.dumps_str(obj).encode("utf-8")
+
+    def dumps_str(self, obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def decode(self, data: Payload, schema: Type[T]) -> T:
+        """解码为指定模型（pydantic BaseModel 子类）"""
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        try:
+            return schema.model_validate_json(data)
+        except ValidationError as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def _validate(self, data: Payload, schema: Type[T]) -> T:
+        """先由后端解析再校验为模型"""
+        obj = self.loads(data)
+        try:
+            return schema.model_validate(obj)
+        except ValidationError as e:
+            raise PayloadDecodeError(str(e)) from e
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson 后端"""
+
+    name = "orjson"
+
+    def __init__(self):
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: Payload) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, option=self._option)
+
+    def dumps_str(self, obj: Any) -> str:
+        return orjson.dumps(obj, option=self._option).decode("utf-8")
+
+    def decode(self, data: Payload, schema: Type[T]) -> T:
+        return self._validate(data, schema)
+
+
+class MsgspecCodec(JsonCodec):
+    """msgspec 后端，decode 的目标为 msgspec.Struct 时由 msgspec 直接解码"""
+
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._typed_decoders: Dict[type, Any] = {}
+
+    def loads(self, data: Payload) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def dumps_str(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode("utf-8")
+
+    def decode(self, data: Payload, schema: Type[T]) -> T:
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            return self._validate(data, schema)
+        decoder = self._typed_decoders.get(schema)
+        if decoder is None:
+            decoder = self._typed_decoders.setdefault(schema, msgspec.json.Decoder(schema))
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise PayloadDecodeError(str(e)) from e
+
+
+# 后端名称 -> 构造函数（只包含已安装的后端），auto 按注册顺序选择第一个
+_codecs: Dict[str, Callable[[], JsonCodec]] = {}
+if ORJSON_AVAILABLE:
+    _codecs["orjson"] = OrjsonCodec
+if MSGSPEC_AVAILABLE:
+    _codecs["msgspec"] = MsgspecCodec
+_codecs["json"] = JsonCodec
+
+
+def register_codec(name: str, factory: Callable[[], JsonCodec]):
+    """注册自定义后端（插件扩展入口），同名后端被替换"""
+    _codecs[name] = factory
+
+
+def available_codecs() -> list:
+    return list(_codecs)
+
+
+def get_codec(name: str = "auto") -> JsonCodec:
+    """
+    按名称创建编解码器
+
+    Raises:
+        ValueError: 后端未知或未安装
+    """
+    if name == "auto":
+        name = next(iter(_codecs))
+    factory = _codecs.get(name)
+    if factory is None:
+        raise ValueError(f"Unsupported or unavailable JSON codec: {name} (available: {available_codecs()})")
+    return factory()
+
+
+# 全局负载编解码器实例
+json_codec = get_codec(settings.PAYLOAD_JSON_CODEC)
@@ -1,7 +1,7 @@
 # 作用：配置管理（数据库连接、Redis连接、MQTT配置等）
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -18,6 +18,32 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
 
+    # 异步数据库驱动: aiomysql / asyncmy
+    MYSQL_ASYNC_DRIVER: str = "aiomysql"
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"mysql+{self.MYSQL_ASYNC_DRIVER}://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
+
+    # 数据库连接池配置
+    DB_POOL_SIZE: int = 10  # 常驻连接数
+    DB_MAX_OVERFLOW: int = 20  # 超出常驻连接数后允许临时创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 连接耗尽时等待签出的最长秒数，超时抛出 TimeoutError
+    DB_POOL_RECYCLE: int = 300  # 连接最长使用秒数，超过后重建，应小于 MySQL wait_timeout
+    DB_POOL_PRE_PING: str = "idle"  # 签出时的连接检测: always / idle(只检测空闲过久的连接) / never
+    DB_POOL_PRE_PING_IDLE: float = 30.0  # idle 策略下空闲超过该秒数的连接签出时才执行 ping
+    DB_POOL_USE_LIFO: bool = False  # 优先复用最近归还的连接，使多余连接空闲后被回收
+
+    # 只读副本配置，未设置 MYSQL_REPLICA_HOST 时只读查询仍使用主库
+    MYSQL_REPLICA_HOST: Optional[str] = None
+    MYSQL_REPLICA_PORT: int = 3306
+
+    @property
+    def REPLICA_DATABASE_URL(self) -> Optional[str]:
+        if not self.MYSQL_REPLICA_HOST:
+            return None
+        return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_REPLICA_HOST}:{self.MYSQL_REPLICA_PORT}/{self.MYSQL_DATABASE}"
+
     # redis配置
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -32,6 +58,81 @@ class Settings(BaseSettings):
     MQTT_BROKER_PORT: int = 1883
     MQTT_USERNAME: Optional[str] = None
     MQTT_PASSWORD: Optional[str] = None
+    MQTT_PROTOCOL: str = "5"  # 协议版本: 5 / 3.1.1
+    MQTT_CLIENT_ID_PREFIX: str = "iot_backend_service"  # client ID 前缀，实际 client ID 为 前缀-实例标识
+    MQTT_INSTANCE_ID: Optional[str] = None  # 实例标识(如Pod名称)，为空时使用 主机名-进程号-随机后缀，多副本不会因 client ID 相同互相踢下线
+
+    # MQTT共享订阅配置 (多个实例以 $share/<group>/<topic> 订阅，同组实例分摊设备消息)
+    MQTT_SHARED_SUBSCRIPTION: bool = True  # 关闭后每个实例都收到全部消息，只能单实例运行
+    MQTT_SHARED_GROUP: str = "iot_backend"  # 默认共享组名
+    # 主题 -> 组名，组名为空字符串表示该主题不共享；心跳默认不共享，每个实例的在线状态跟踪器都能收到全部心跳，
+    # 启用 PRESENCE_REDIS_ENABLED 后可改为共享，如 {"device/+/heartbeat": "iot_presence"}
+    MQTT_SHARED_GROUPS: Dict[str, str] = {"device/+/heartbeat": ""}
+
+    # 设备消息负载编解码配置
+    PAYLOAD_JSON_CODEC: str = "auto"  # JSON 后端: auto(orjson > msgspec > json，按已安装的选择) / orjson / msgspec / json
+    # 二进制负载格式协商: 设备 device_metadata.payload_format > 产品默认 > 全局默认，可选 json / cbor / msgpack / protobuf
+    PAYLOAD_DEFAULT_FORMAT: str = "json"
+    PAYLOAD_FORMAT_BY_PRODUCT: Dict[str, str] = {}  # 产品ID -> 负载格式，如 {"battery_sensor_v2": "cbor"}
+    PAYLOAD_FORMAT_CACHE_MAXSIZE: int = 100000  # 设备负载格式缓存容量(设备数)
+    PAYLOAD_FORMAT_CACHE_TTL: float = 300.0  # 设备负载格式缓存有效期(秒)，设备元数据更新时立即失效
+
+    # MQTT消息分发配置 (网络线程只入队，处理在按设备ID分区的工作线程中执行)
+    MQTT_DISPATCH_WORKERS: int = 8  # 工作线程数，同一设备的消息始终由同一线程按序处理
+    MQTT_DISPATCH_QUEUE_SIZE: int = 10000  # 每个工作线程的队列容量
+    MQTT_DISPATCH_OVERFLOW: str = "block"  # 队列满时: block 阻塞网络线程(最长 MQTT_DISPATCH_BLOCK_TIMEOUT 秒后拒绝) / reject 拒绝新消息 / drop_oldest 丢弃最早消息
+    MQTT_DISPATCH_BLOCK_TIMEOUT: float = 0.5  # block 策略的最长阻塞秒数，须远小于 keepalive 间隔
+
+    # 遥测数据批量写入配置
+    TELEMETRY_BATCH_SIZE: int = 500  # 单次批量写入的最大条数
+    TELEMETRY_FLUSH_INTERVAL: float = 1.0  # 批量写入的最长等待时间(秒)
+    TELEMETRY_QUEUE_MAXSIZE: int = 50000  # 写入队列容量，超出后触发背压/丢弃
+    TELEMETRY_ENQUEUE_TIMEOUT: float = 0.0  # 队列满时生产者阻塞等待的秒数，0表示立即丢弃
+    TELEMETRY_RETRY_BACKOFF: float = 1.0  # 批量写入失败后的重试间隔(秒)
+    TELEMETRY_MAX_RETRIES: int = 5  # 同一批次连续写入失败的最多次数，超过后丢弃(无法定位原因的按二分隔离问题记录)
+    TELEMETRY_DRAIN_TIMEOUT: float = 10.0  # 关闭时排空写入队列的最长秒数，超时未写入的数据丢弃
+
+    # 遥测数据存储配置 (时间分区、压缩归档、保留期)
+    TELEMETRY_PARTITION_INTERVAL: str = "day"  # device_data 分区粒度: day / month，仅MySQL生效；未分区的表需先执行 scripts/partition_device_data.py 转换
+    TELEMETRY_PARTITIONS_AHEAD: int = 7  # 提前创建的未来分区个数
+    TELEMETRY_ARCHIVE_AFTER_DAYS: int = 0  # 超过该天数的原始数据压缩归档到 device_data_archive，0表示不归档
+    TELEMETRY_RETENTION_DAYS: int = 0  # 超过该天数的数据(含归档)删除，0表示永久保留
+
+    # 遥测数据聚合配置 (1m/1h/1d 分桶 min/max/avg/count/last)
+    ROLLUP_ENABLED: bool = True  # 写入设备数据时增量更新聚合
+    ROLLUP_MAX_POINTS: int = 1000  # 聚合查询默认的最大数据点数(每个指标)
+    ROLLUP_1M_RETENTION_DAYS: int = 7  # 1分钟聚合保留天数，0表示永久保留
+    ROLLUP_1H_RETENTION_DAYS: int = 180  # 1小时聚合保留天数，0表示永久保留
+
+    # 遥测数据导出配置
+    TELEMETRY_EXPORT_CHUNK_SIZE: int = 5000  # 导出时每次从数据库读取并编码的行数
+    TELEMETRY_EXPORT_MAX_DEVICES: int = 1000  # 单次导出的最大设备数
+
+    # 设备标识解析缓存配置 (device_id -> devices.id)
+    DEVICE_ID_CACHE_MAXSIZE: int = 100000
+    DEVICE_ID_CACHE_TTL: float = 300.0  # 缓存条目有效期(秒)
+    DEVICE_ID_CACHE_REDIS_ENABLED: bool = False  # 启用Redis二级缓存，多worker共享并广播失效
+
+    # 设备在线状态跟踪配置 (心跳合并写入)
+    PRESENCE_OFFLINE_TIMEOUT: float = 180.0  # 超过该秒数无心跳判定离线，应大于 PRESENCE_FLUSH_INTERVAL
+    PRESENCE_SWEEP_INTERVAL: float = 15.0  # 上线状态落库及离线扫描的周期(秒)
+    PRESENCE_FLUSH_INTERVAL: float = 60.0  # 在线设备 last_online_at 的粗粒度刷新周期(秒)
+    PRESENCE_REDIS_ENABLED: bool = False  # 使用Redis有序集合保存最后心跳时间，多实例共享；关闭时心跳主题不能共享订阅
+
+    # 用户权限缓存配置 (username -> 用户快照及有效权限集合)
+    PERMISSION_CACHE_MAXSIZE: int = 10000
+    PERMISSION_CACHE_TTL: float = 60.0  # 缓存条目有效期(秒)，0表示不缓存
+    PERMISSION_CACHE_REDIS_ENABLED: bool = False  # 通过Redis广播失效消息，多worker同步失效
+
+    # 密码哈希配置
+    PASSWORD_HASH_SCHEME: str = "argon2"  # 新哈希的算法: argon2(需安装 argon2-cffi，未安装时回退 bcrypt) / bcrypt；登录成功时旧格式哈希自动重算
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # bcrypt 成本因子，修改后旧哈希在下次登录时按新成本重算
+    PASSWORD_ARGON2_TIME_COST: int = 2  # argon2id 迭代次数
+    PASSWORD_ARGON2_MEMORY_COST: int = 19456  # argon2id 内存开销(KiB)
+    PASSWORD_ARGON2_PARALLELISM: int = 1  # argon2id 并行度
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # 哈希计算的执行池: thread / process
+    PASSWORD_HASH_WORKERS: int = 4  # 哈希计算的最大并发数
+    PASSWORD_HASH_MAX_QUEUE: int = 256  # 等待计算的请求上限，超出时直接拒绝(503)，避免登录洪峰占满请求线程
 
     # JWT配置
     SECRET_KEY: str = "your-secret-key-here"
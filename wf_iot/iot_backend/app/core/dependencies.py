@@ -8,6 +8,7 @@ from typing import List
 
 from app.db.session import get_db
 from app.crud.user import user_crud, role_crud
+from app.core.permission_cache import permission_cache
 from app.db.models.user import User
 from app.core.config import settings
 
@@ -15,8 +16,12 @@ from app.core.config import settings
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
 
-async def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-    """获取当前用户"""
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    """
+    获取当前用户（同步查询，由 FastAPI 放到线程池执行，不阻塞事件循环）
+
+    返回缓存的用户快照(CachedUser)，缓存命中时不访问数据库
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -30,10 +35,16 @@ async def get_current_user(db: Session = Depends(get_db), token: str = Depends(o
     except JWTError:
         raise credentials_exception
 
-    user = user_crud.get_user_by_username(db, username=username)
-    if user is None:
+    user = permission_cache.get(username)
+    if user is not None:
+        return user
+
+    # 先读取版本号，加载期间权限发生变化时不会缓存旧数据
+    version = permission_cache.version
+    db_user = user_crud.get_user_by_username(db, username=username)
+    if db_user is None:
         raise credentials_exception
-    return user
+    return permission_cache.set(db_user, user_crud.get_permission_codes(db, db_user.id), version)
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -55,20 +66,11 @@ async def get_current_active_superuser(current_user: User = Depends(get_current_
 
 def has_permission(permission_code: str):
     """权限检查依赖工厂函数"""
-    async def _has_permission(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
-    ) -> User:
-        # 超级管理员拥有所有权限
-        if current_user.is_superuser:
+    async def _has_permission(current_user: User = Depends(get_current_active_user)) -> User:
+        # 超级管理员拥有所有权限，其他用户检查缓存的有效权限集合
+        if current_user.has_permission(permission_code):
             return current_user
 
-        # 检查用户角色的权限
-        for role in current_user.roles:
-            for permission in role.permissions:
-                if permission.code == permission_code:
-                    return current_user
-
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Permission denied: {permission_code}"
@@ -78,20 +80,11 @@ def has_permission(permission_code: str):
 
 def has_any_permission(permission_codes: List[str]):
     """检查用户是否拥有任一权限"""
-    async def _has_any_permission(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
-    ) -> User:
-        # 超级管理员拥有所有权限
-        if current_user.is_superuser:
+    async def _has_any_permission(current_user: User = Depends(get_current_active_user)) -> User:
+        # 超级管理员拥有所有权限，其他用户检查缓存的有效权限集合
+        if current_user.has_any_permission(permission_codes):
             return current_user
 
-        # 检查用户角色的权限
-        for role in current_user.roles:
-            for permission in role.permissions:
-                if permission.code in permission_codes:
-                    return current_user
-
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Permission denied"
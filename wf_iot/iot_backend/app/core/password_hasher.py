@@ -0,0 +1,209 @@
+"""
+密码哈希执行池
+- bcrypt / argon2 计算为CPU密集操作，统一提交到有界的线程池或进程池执行，
+  并发数固定为 PASSWORD_HASH_WORKERS，排队超过 PASSWORD_HASH_MAX_QUEUE 时直接拒绝
+- 同步调用方阻塞等待结果，异步调用方 await 结果，不占用事件循环
+- 新哈希使用 PASSWORD_HASH_SCHEME，其他算法或成本参数不同的旧哈希由 needs_update 判定，
+  在登录验证成功后重新计算
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+try:
+    import argon2  # noqa: F401
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(RuntimeError):
+    """哈希请求排队已满"""
+
+
+def context_options(settings) -> Dict[str, Any]:
+    """根据配置生成 CryptContext 参数，首个 scheme 为新哈希使用的算法，其余算法的哈希均需重算"""
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme not in ("argon2", "bcrypt"):
+        raise ValueError(f"Unsupported PASSWORD_HASH_SCHEME: {scheme}")
+    if scheme == "argon2" and not ARGON2_AVAILABLE:
+        logger.warning("argon2-cffi not installed, falling back to bcrypt for password hashing")
+        scheme = "bcrypt"
+    options: Dict[str, Any] = {
+        "schemes": [scheme] + [s for s in ("argon2", "bcrypt") if s != scheme and (s != "argon2" or ARGON2_AVAILABLE)],
+        "deprecated": "auto",
+        "bcrypt__rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+    }
+    if ARGON2_AVAILABLE:
+        options.update({
+            "argon2__type": "ID",
+            "argon2__time_cost": settings.PASSWORD_ARGON2_TIME_COST,
+            "argon2__memory_cost": settings.PASSWORD_ARGON2_MEMORY_COST,
+            "argon2__parallelism": settings.PASSWORD_ARGON2_PARALLELISM,
+        })
+    return options
+
+
+# 执行池中使用的 CryptContext，由 initializer 在每个线程/进程中设置
+_worker_context: Optional[CryptContext] = None
+
+
+def _init_worker(options: Dict[str, Any]):
+    global _worker_context
+    _worker_context = CryptContext(**options)
+
+
+def _run(method: str, args: tuple) -> Tuple[Any, float, float]:
+    """在执行池中计算，返回 (结果, 开始时间, 结束时间)"""
+    started = time.monotonic()
+    result = getattr(_worker_context, method)(*args)
+    return result, started, time.monotonic()
+
+
+class PasswordHasher:
+    """有界的密码哈希执行池"""
+
+    def __init__(self, options: Dict[str, Any], workers: int = 4, max_queue: int = 256, executor: str = "thread"):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unsupported PASSWORD_HASH_EXECUTOR: {executor}")
+        self.options = options
+        self.context = CryptContext(**options)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor_type = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats: Dict[str, float] = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "errors": 0,
+            "rehashed": 0,
+            "queue_depth_max": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "hash_time_total": 0.0,
+        }
+
+    @property
+    def scheme(self) -> str:
+        return self.context.default_scheme()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self.options,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash",
+                    initializer=_init_worker, initargs=(self.options,)
+                )
+        return self._executor
+
+    def _submit(self, method: str, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.stats["rejected"] += 1
+                raise PasswordHasherBusyError("Password hashing queue is full")
+            self._in_flight += 1
+            self.stats["submitted"] += 1
+            self.stats["queue_depth_max"] = max(self.stats["queue_depth_max"], self._in_flight - self.workers)
+            executor = self._get_executor()
+        submitted_at = time.monotonic()
+        try:
+            future = executor.submit(_run, method, args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, submitted_at))
+        return future
+
+    def _on_done(self, future: Future, submitted_at: float):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.stats["errors"] += 1
+                return
+            _, started, finished = future.result()
+            wait = max(started - submitted_at, 0.0)
+            self.stats["completed"] += 1
+            self.stats["wait_time_total"] += wait
+            self.stats["wait_time_max"] = max(self.stats["wait_time_max"], wait)
+            self.stats["hash_time_total"] += finished - started
+
+    def hash(self, password: str) -> str:
+        """计算密码哈希（阻塞等待执行池结果）"""
+        return self._submit("hash", password).result()[0]
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """验证密码（阻塞等待执行池结果）"""
+        return self._submit("verify", password, hashed).result()[0]
+
+    async def ahash(self, password: str) -> str:
+        """计算密码哈希（异步等待）"""
+        return (await asyncio.wrap_future(self._submit("hash", password)))[0]
+
+    async def averify(self, password: str, hashed: str) -> bool:
+        """验证密码（异步等待）"""
+        return (await asyncio.wrap_future(self._submit("verify", password, hashed)))[0]
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """哈希的算法或成本参数与当前配置不一致，无法识别的哈希返回False"""
+        try:
+            return self.context.needs_update(hashed)
+        except (ValueError, TypeError):
+            return False
+
+    def record_rehash(self):
+        with self._lock:
+            self.stats["rehashed"] += 1
+
+    def shutdown(self):
+        """关闭执行池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """执行池指标：排队深度、等待及计算耗时、拒绝数"""
+        with self._lock:
+            stats = dict(self.stats)
+            in_flight = self._in_flight
+        completed = stats["completed"]
+        wait_total = stats.pop("wait_time_total")
+        hash_total = stats.pop("hash_time_total")
+        return {
+            "scheme": self.scheme,
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "queue_depth": max(in_flight - self.workers, 0),
+            "wait_ms_avg": round(wait_total / completed * 1000, 3) if completed else 0.0,
+            "wait_ms_max": round(stats.pop("wait_time_max") * 1000, 3),
+            "hash_ms_avg": round(hash_total / completed * 1000, 3) if completed else 0.0,
+            **{key: int(value) for key, value in stats.items()},
+        }
+
+
+# 全局密码哈希执行池实例
+password_hasher = PasswordHasher(
+    context_options(settings),
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+)
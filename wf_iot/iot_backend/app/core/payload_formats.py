@@ -0,0 +1,265 @@
+# 作用：设备上报负载的格式协商与解码（JSON / CBOR / MessagePack / Protobuf）
+# - 设备格式: device_metadata.payload_format > PAYLOAD_FORMAT_BY_PRODUCT[产品ID] > PAYLOAD_DEFAULT_FORMAT
+# - 各格式解码结果统一构造为 app/schemas/payload.py 中的模型，后续处理与 JSON 负载相同
+# - 以 "{" 开头的负载按 JSON 解码，不查询设备格式（JSON 设备无额外开销，二进制设备也可临时上报 JSON）
+# - cbor2 / msgpack 为可选依赖，未安装时对应格式不可用；Protobuf 使用 proto/telemetry.proto 生成的消息
+
+from typing import Any, Callable, Dict, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.cache import LocalTTLCache
+from app.core.codec import Payload, PayloadDecodeError, json_codec
+from app.core.config import settings
+from app.schemas.payload import CommandResponsePayload, FirmwareStatusPayload, StatusPayload, TelemetryPayload
+
+try:
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    from proto.generated import telemetry_pb2
+    from google.protobuf.message import DecodeError as ProtobufDecodeError
+    PROTOBUF_AVAILABLE = True
+except ImportError:
+    PROTOBUF_AVAILABLE = False
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class PayloadFormat:
+    """负载格式基类：loads 解析为 Python 对象，decode 构造负载模型"""
+
+    name = ""
+    content_type = ""
+    # 能否编解码任意对象（否则只能按负载模型 decode/encode）
+    schemaless = True
+
+    def loads(self, data: Payload) -> Any:
+        raise NotImplementedError
+
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: Payload, schema: Type[M]) -> M:
+        obj = self.loads(data)
+        try:
+            return schema.model_validate(obj)
+        except ValidationError as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def encode(self, payload: BaseModel) -> bytes:
+        """编码负载模型（设备模拟、测试及基准使用）"""
+        return self.dumps(payload.model_dump(exclude_none=True))
+
+
+class JsonFormat(PayloadFormat):
+    """JSON，由 json_codec 处理"""
+
+    name = "json"
+    content_type = "application/json"
+
+    def loads(self, data: Payload) -> Any:
+        return json_codec.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json_codec.dumps(obj)
+
+    def decode(self, data: Payload, schema: Type[M]) -> M:
+        return json_codec.decode(data, schema)
+
+
+class CborFormat(PayloadFormat):
+    """CBOR (RFC 8949)"""
+
+    name = "cbor"
+    content_type = "application/cbor"
+
+    def loads(self, data: Payload) -> Any:
+        try:
+            return cbor2.loads(data)
+        except (cbor2.CBORDecodeError, TypeError, ValueError) as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def dumps(self, obj: Any) -> bytes:
+        return cbor2.dumps(obj)
+
+
+class MsgpackFormat(PayloadFormat):
+    """MessagePack"""
+
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def loads(self, data: Payload) -> Any:
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except (msgpack.UnpackException, TypeError, ValueError) as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+
+def _telemetry_from_pb(msg) -> Dict[str, Any]:
+    data = dict(msg.metrics)
+    data.update(msg.attributes)
+    return {"type": msg.type or "telemetry", "data": data, "quality": msg.quality or "good"}
+
+
+def _telemetry_to_pb(payload: TelemetryPayload):
+    msg = telemetry_pb2.Telemetry(type=payload.type, quality=payload.quality)
+    for key, value in payload.data.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            msg.metrics[key] = value
+        else:
+            msg.attributes[key] = str(value)
+    return msg
+
+
+def _status_from_pb(msg) -> Dict[str, Any]:
+    return {**msg.attributes, "status": msg.status or "unknown"}
+
+
+def _status_to_pb(payload: StatusPayload):
+    extra = payload.model_dump(exclude={"status"})
+    return telemetry_pb2.Status(status=payload.status, attributes={k: str(v) for k, v in extra.items()})
+
+
+def _command_response_from_pb(msg) -> Dict[str, Any]:
+    return {
+        "command_id": msg.command_id or None,
+        "status": msg.status or "acknowledged",
+        "result": json_codec.loads(msg.result) if msg.result else None,
+    }
+
+
+def _command_response_to_pb(payload: CommandResponsePayload):
+    return telemetry_pb2.CommandResponse(
+        command_id=str(payload.command_id) if payload.command_id is not None else "",
+        status=payload.status,
+        result=json_codec.dumps(payload.result) if payload.result is not None else b"",
+    )
+
+
+def _firmware_status_from_pb(msg) -> Dict[str, Any]:
+    return {"task_id": msg.task_id, "status": msg.status or "unknown", "progress": msg.progress, "error": msg.error or None}
+
+
+def _firmware_status_to_pb(payload: FirmwareStatusPayload):
+    return telemetry_pb2.FirmwareStatus(
+        task_id=payload.task_id, status=payload.status, progress=payload.progress, error=payload.error or ""
+    )
+
+
+class ProtobufFormat(PayloadFormat):
+    """
+    Protobuf (proto/telemetry.proto)
+
+    消息类型由目标模型决定，没有模型时无法解析，loads/dumps 不可用
+    """
+
+    name = "protobuf"
+    content_type = "application/x-protobuf"
+    schemaless = False
+
+    def __init__(self):
+        # 负载模型 -> (消息类型, 消息 -> 模型字段, 模型 -> 消息)
+        self._schemas: Dict[type, tuple] = {
+            TelemetryPayload: (telemetry_pb2.Telemetry, _telemetry_from_pb, _telemetry_to_pb),
+            StatusPayload: (telemetry_pb2.Status, _status_from_pb, _status_to_pb),
+            CommandResponsePayload: (telemetry_pb2.CommandResponse, _command_response_from_pb, _command_response_to_pb),
+            FirmwareStatusPayload: (telemetry_pb2.FirmwareStatus, _firmware_status_from_pb, _firmware_status_to_pb),
+        }
+
+    def loads(self, data: Payload) -> Any:
+        raise PayloadDecodeError("Protobuf payload requires a schema")
+
+    def dumps(self, obj: Any) -> bytes:
+        raise ValueError("Protobuf payload requires a schema")
+
+    def decode(self, data: Payload, schema: Type[M]) -> M:
+        entry = self._schemas.get(schema)
+        if entry is None:
+            raise PayloadDecodeError(f"No protobuf message for {schema.__name__}")
+        message_type, from_pb, _ = entry
+        try:
+            msg = message_type.FromString(bytes(data))
+            return schema.model_validate(from_pb(msg))
+        except (ProtobufDecodeError, ValidationError) as e:
+            raise PayloadDecodeError(str(e)) from e
+
+    def encode(self, payload: BaseModel) -> bytes:
+        entry = self._schemas.get(type(payload))
+        if entry is None:
+            raise ValueError(f"No protobuf message for {type(payload).__name__}")
+        return entry[2](payload).SerializeToString()
+
+
+# 格式名称 -> 构造函数（只包含依赖已安装的格式）
+_formats: Dict[str, Callable[[], PayloadFormat]] = {"json": JsonFormat}
+if CBOR_AVAILABLE:
+    _formats["cbor"] = CborFormat
+if MSGPACK_AVAILABLE:
+    _formats["msgpack"] = MsgpackFormat
+if PROTOBUF_AVAILABLE:
+    _formats["protobuf"] = ProtobufFormat
+
+_instances: Dict[str, PayloadFormat] = {}
+
+
+def available_formats() -> list:
+    return list(_formats)
+
+
+def get_format(name: str) -> PayloadFormat:
+    """
+    按名称获取负载格式（同名格式共享同一实例）
+
+    Raises:
+        ValueError: 格式未知或依赖未安装
+    """
+    payload_format = _instances.get(name)
+    if payload_format is None:
+        factory = _formats.get(name)
+        if factory is None:
+            raise ValueError(f"Unsupported or unavailable payload format: {name} (available: {available_formats()})")
+        payload_format = _instances.setdefault(name, factory())
+    return payload_format
+
+
+def get_format_by_content_type(content_type: Optional[str]) -> Optional[PayloadFormat]:
+    """按媒体类型（如 CoAP Content-Format 对应的 application/cbor）获取负载格式，未知或不可用时返回 None"""
+    for name in _formats:
+        payload_format = get_format(name)
+        if payload_format.content_type == content_type:
+            return payload_format
+    return None
+
+
+def resolve_format_name(device_metadata: Optional[Dict[str, Any]], product_id: Optional[str] = None) -> str:
+    """按设备元数据及产品ID确定负载格式名称"""
+    name = (device_metadata or {}).get("payload_format")
+    if not name and product_id:
+        name = settings.PAYLOAD_FORMAT_BY_PRODUCT.get(product_id)
+    return (name or settings.PAYLOAD_DEFAULT_FORMAT).lower()
+
+
+def is_json(data: Payload) -> bool:
+    """负载是否为 JSON 对象（各二进制格式的映射/消息均不以 "{" 开头）"""
+    return data[:1] in (b"{", "{")
+
+
+# 设备负载格式缓存 device_id -> 格式名称（只使用进程内缓存，设备元数据更新时失效）
+payload_format_cache: LocalTTLCache[str] = LocalTTLCache(
+    maxsize=settings.PAYLOAD_FORMAT_CACHE_MAXSIZE,
+    ttl=settings.PAYLOAD_FORMAT_CACHE_TTL,
+)
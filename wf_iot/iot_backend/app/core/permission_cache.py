@@ -0,0 +1,195 @@
+# 作用：认证用户及有效权限缓存（username -> 用户快照 + 权限代码集合）
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 广播消息：全部失效
+INVALIDATE_ALL = "*"
+
+
+class CachedUser:
+    """
+    认证用户快照
+
+    复制 users 表的列属性及用户的有效权限代码集合，不绑定数据库会话，可在请求间复用。
+    权限检查为集合成员判断，不再遍历 roles -> permissions 关系。
+    """
+
+    def __init__(self, user: Any, permissions: Iterable[str]):
+        for column in user.__table__.columns:
+            setattr(self, column.key, getattr(user, column.key))
+        self.permissions: FrozenSet[str] = frozenset(permissions)
+
+    def has_permission(self, permission_code: str) -> bool:
+        return self.is_superuser or permission_code in self.permissions
+
+    def has_any_permission(self, permission_codes: Iterable[str]) -> bool:
+        return self.is_superuser or not self.permissions.isdisjoint(permission_codes)
+
+
+class PermissionCache:
+    """
+    用户权限缓存
+
+    - 进程内 LRU + TTL，按 username 缓存（与 JWT 的 sub 一致）
+    - 版本号失效：角色的权限、权限定义变化时影响的用户不确定，递增全局版本号使所有条目失效；
+      条目记录加载前的版本号，加载期间发生的变更不会被写入的旧数据覆盖
+    - 单用户失效：用户信息或用户角色变化时只删除该用户的条目
+    - Redis（可选）：通过 pub/sub 广播失效消息，多个 worker 同步失效
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 60.0,
+        redis_url: Optional[str] = None,
+        invalidation_channel: str = "permission.invalidate",
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.invalidation_channel = invalidation_channel
+        self.version = 0
+        self._entries: "OrderedDict[str, Tuple[CachedUser, int, float]]" = OrderedDict()
+        self._usernames: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._redis: Optional["redis.Redis"] = None
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "version_bumps": 0,
+        }
+        if redis_url and REDIS_AVAILABLE:
+            self._connect_redis(redis_url)
+
+    def _connect_redis(self, redis_url: str):
+        try:
+            self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            self._redis.ping()
+            listener = threading.Thread(target=self._listen_invalidations, daemon=True)
+            listener.start()
+            logger.info(f"Permission cache invalidation via Redis at {redis_url}")
+        except Exception as e:
+            self._redis = None
+            logger.warning(f"Permission cache Redis invalidation disabled: {e}")
+
+    def _listen_invalidations(self):
+        """订阅失效广播，消息为 "*" 或用户ID"""
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.invalidation_channel)
+            for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                if message["data"] == INVALIDATE_ALL:
+                    self._bump_local()
+                else:
+                    self._evict_local(int(message["data"]))
+        except Exception as e:
+            logger.error(f"Permission cache invalidation listener stopped: {e}")
+
+    def _publish(self, message: str):
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.invalidation_channel, message)
+            except Exception as e:
+                logger.warning(f"Permission cache invalidation broadcast failed: {e}")
+
+    def _bump_local(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._usernames.clear()
+            self.stats["version_bumps"] += 1
+
+    def _evict_local(self, user_id: int):
+        with self._lock:
+            username = self._usernames.pop(user_id, None)
+            if username is not None:
+                self._entries.pop(username, None)
+
+    def get(self, username: str) -> Optional[CachedUser]:
+        """查询缓存，未命中、过期或版本已变化时返回None"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            user, version, expires_at = entry
+            if version != self.version or expires_at <= time.monotonic():
+                del self._entries[username]
+                self._usernames.pop(user.id, None)
+                self.stats["stale"] += 1
+                return None
+            self._entries.move_to_end(username)
+            self.stats["hits"] += 1
+            return user
+
+    def set(self, user: Any, permissions: Iterable[str], version: int) -> CachedUser:
+        """
+        写入用户快照
+
+        version 为加载前读取的 self.version，加载期间版本已变化时只返回快照不写入缓存
+        """
+        cached = CachedUser(user, permissions)
+        with self._lock:
+            if version != self.version:
+                return cached
+            self._entries[cached.username] = (cached, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(cached.username)
+            self._usernames[cached.id] = cached.username
+            while len(self._entries) > self.maxsize:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._usernames.pop(evicted.id, None)
+                self.stats["evictions"] += 1
+        return cached
+
+    def invalidate_user(self, user_id: int):
+        """使单个用户的条目失效（用户信息、用户角色变化时调用）"""
+        self._evict_local(user_id)
+        self.stats["invalidations"] += 1
+        self._publish(str(user_id))
+
+    def bump_version(self):
+        """使所有条目失效（角色权限、权限定义、角色删除时调用）"""
+        self._bump_local()
+        self._publish(INVALIDATE_ALL)
+
+    def clear(self):
+        """清空本进程缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._usernames.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中/失效计数"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.stats)
+            stats["size"] = len(self._entries)
+            stats["version"] = self.version
+        stats["maxsize"] = self.maxsize
+        stats["redis_enabled"] = self._redis is not None
+        return stats
+
+
+# 全局权限缓存实例
+permission_cache = PermissionCache(
+    maxsize=settings.PERMISSION_CACHE_MAXSIZE,
+    ttl=settings.PERMISSION_CACHE_TTL,
+    redis_url=settings.REDIS_URL if settings.PERMISSION_CACHE_REDIS_ENABLED else None,
+)
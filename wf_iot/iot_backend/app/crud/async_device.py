@@ -0,0 +1,232 @@
+"""
+设备异步CRUD操作
+与 app/crud/device.py 语义一致，基于 AsyncSession，供 async 端点及协议服务使用
+- 设备缓存启用 Redis 二级缓存时，缓存访问在线程池中执行，不阻塞事件循环
+- 设备数据查询通过 run_sync 复用同步CRUD的查询（原始数据不足时从归档中接续）
+"""
+from typing import List, Optional, Dict, Any, Iterable
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, insert, select, update
+from datetime import datetime
+
+from app.core.cache import DeviceIdCache, device_id_cache
+from app.core.config import settings
+from app.core.payload_formats import payload_format_cache
+from app.crud.device import device_data_crud
+from app.crud.rollup import device_rollup_crud
+from app.db.models.device import Device, DeviceData, DeviceCommand
+from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceDataCreate, DeviceCommandCreate
+
+
+async def _cache_call(cache: DeviceIdCache, method: str, *args):
+    """调用缓存方法；带 Redis 二级缓存时在线程池中执行，只有进程内缓存时直接调用"""
+    call = getattr(cache, method)
+    if cache.redis_enabled:
+        return await run_in_threadpool(call, *args)
+    return call(*args)
+
+
+class AsyncCRUDDevice:
+    """设备异步CRUD操作类"""
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[Device]:
+        return await db.get(Device, id)
+
+    async def get_by_device_id(self, db: AsyncSession, device_id: str) -> Optional[Device]:
+        result = await db.execute(select(Device).where(Device.device_id == device_id))
+        return result.scalars().first()
+
+    async def resolve_id(self, db: AsyncSession, device_id: str) -> Optional[int]:
+        """将设备唯一标识解析为数据库主键，与同步CRUD共用缓存"""
+        pk = await _cache_call(device_id_cache, "get", device_id)
+        if pk is None:
+            pk = (await db.execute(select(Device.id).where(Device.device_id == device_id))).scalar()
+            if pk is None:
+                return None
+            await _cache_call(device_id_cache, "set", device_id, pk)
+        return pk
+
+    async def resolve_ids(self, db: AsyncSession, device_ids: Iterable[str]) -> Dict[str, int]:
+        """批量解析设备主键，缓存未命中的部分合并为一次查询"""
+        device_ids = set(device_ids)
+        id_map = await _cache_call(device_id_cache, "get_many", device_ids)
+        missing = device_ids - id_map.keys()
+        if missing:
+            rows = await db.execute(select(Device.device_id, Device.id).where(Device.device_id.in_(missing)))
+            found = dict(rows.all())
+            await _cache_call(device_id_cache, "set_many", found)
+            id_map.update(found)
+        return id_map
+
+    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100,
+                        owner_id: Optional[int] = None) -> List[Device]:
+        query = select(Device)
+        if owner_id:
+            query = query.where(Device.owner_id == owner_id)
+        return list((await db.execute(query.offset(skip).limit(limit))).scalars().all())
+
+    async def create(self, db: AsyncSession, obj_in: DeviceCreate) -> Device:
+        db_obj = Device(**obj_in.model_dump())
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        await _cache_call(device_id_cache, "invalidate", db_obj.device_id)
+        return db_obj
+
+    async def update(self, db: AsyncSession, db_obj: Device, obj_in: DeviceUpdate) -> Device:
+        update_data = obj_in.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        payload_format_cache.invalidate(db_obj.device_id)
+        return db_obj
+
+    async def delete(self, db: AsyncSession, id: int) -> Optional[Device]:
+        obj = await db.get(Device, id)
+        if obj:
+            await db.delete(obj)
+            await db.commit()
+            await _cache_call(device_id_cache, "invalidate", obj.device_id)
+            payload_format_cache.invalidate(obj.device_id)
+        return obj
+
+    async def update_status(self, db: AsyncSession, device_id: str, status: str) -> Optional[Device]:
+        device = await self.get_by_device_id(db, device_id)
+        if device:
+            device.status = status
+            if status == "online":
+                device.last_online_at = datetime.utcnow()
+            db.add(device)
+            await db.commit()
+            await db.refresh(device)
+        return device
+
+    async def batch_update_status(self, db: AsyncSession, device_ids: List[str], status: str,
+                                  last_online_at: Optional[datetime] = None) -> int:
+        """批量更新设备状态，单条UPDATE，返回影响行数"""
+        if not device_ids:
+            return 0
+        values = {"status": status}
+        if status == "online":
+            values["last_online_at"] = last_online_at or datetime.utcnow()
+        result = await db.execute(
+            update(Device).where(Device.device_id.in_(device_ids)).values(**values).execution_options(
+                synchronize_session=False
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+
+class AsyncCRUDDeviceData:
+    """设备数据异步CRUD操作类"""
+
+    async def create(self, db: AsyncSession, obj_in: DeviceDataCreate) -> Optional[DeviceData]:
+        device_pk = await async_device_crud.resolve_id(db, obj_in.device_id)
+        if device_pk is None:
+            return None
+        db_obj = DeviceData(
+            device_id=device_pk,
+            data_type=getattr(obj_in, "data_type", "telemetry"),
+            data=obj_in.data,
+            quality=getattr(obj_in, "quality", "good"),
+            timestamp=datetime.utcnow()
+        )
+        db.add(db_obj)
+        if settings.ROLLUP_ENABLED:
+            await db.run_sync(lambda session: device_rollup_crud.accumulate(
+                session, [{"device_id": device_pk, "timestamp": db_obj.timestamp, "data": db_obj.data}]
+            ))
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def create_many(self, db: AsyncSession, objs_in: List[Dict[str, Any]]) -> int:
+        """批量写入设备数据，语义同 CRUDDeviceData.create_many"""
+        if not objs_in:
+            return 0
+        id_map = await async_device_crud.resolve_ids(db, (obj["device_id"] for obj in objs_in))
+        now = datetime.utcnow()
+        rows = [
+            {
+                "device_id": id_map[obj["device_id"]],
+                "timestamp": obj.get("timestamp") or now,
+                "data_type": obj.get("data_type", "telemetry"),
+                "data": obj.get("data", {}),
+                "quality": obj.get("quality", "good"),
+                "created_at": now,
+            }
+            for obj in objs_in
+            if obj["device_id"] in id_map
+        ]
+        if rows:
+            await db.execute(insert(DeviceData).values(rows))
+            if settings.ROLLUP_ENABLED:
+                await db.run_sync(lambda session: device_rollup_crud.accumulate(session, rows))
+            await db.commit()
+        return len(rows)
+
+    async def get_device_data(self, db: AsyncSession, device_id: int, skip: int = 0,
+                              limit: int = 100) -> List[DeviceData]:
+        return await db.run_sync(lambda session: device_data_crud.get_device_data(session, device_id, skip, limit))
+
+    async def get_latest_data(self, db: AsyncSession, device_id: int) -> Optional[DeviceData]:
+        return await db.run_sync(lambda session: device_data_crud.get_latest_data(session, device_id))
+
+
+class AsyncCRUDDeviceCommand:
+    """设备命令异步CRUD操作类"""
+
+    async def create(self, db: AsyncSession, obj_in: DeviceCommandCreate,
+                     created_by: Optional[int] = None) -> Optional[DeviceCommand]:
+        # DeviceCommandCreate.device_id 可能是设备主键或设备唯一标识
+        device_pk = obj_in.device_id
+        if not isinstance(device_pk, int):
+            device_pk = await async_device_crud.resolve_id(db, device_pk)
+            if device_pk is None:
+                return None
+        db_obj = DeviceCommand(
+            device_id=device_pk,
+            command_type=obj_in.command_type,
+            command_data=obj_in.command_data,
+            created_by=created_by
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def update_status(self, db: AsyncSession, command_id: int, status: str,
+                            response_data: Optional[Dict[str, Any]] = None) -> Optional[DeviceCommand]:
+        command = await db.get(DeviceCommand, command_id)
+        if command:
+            command.status = status
+            if status == "sent":
+                command.sent_at = datetime.utcnow()
+            elif status == "acknowledged":
+                command.acknowledged_at = datetime.utcnow()
+            if response_data:
+                command.response_data = response_data
+            db.add(command)
+            await db.commit()
+            await db.refresh(command)
+        return command
+
+    async def get_pending_commands(self, db: AsyncSession, device_id: str) -> List[DeviceCommand]:
+        device_pk = await async_device_crud.resolve_id(db, device_id)
+        if device_pk is None:
+            return []
+        result = await db.execute(select(DeviceCommand).where(and_(
+            DeviceCommand.device_id == device_pk,
+            DeviceCommand.status == "pending"
+        )))
+        return list(result.scalars().all())
+
+
+# 实例化异步CRUD对象
+async_device_crud = AsyncCRUDDevice()
+async_device_data_crud = AsyncCRUDDeviceData()
+async_device_command_crud = AsyncCRUDDeviceCommand()
@@ -0,0 +1,141 @@
+"""
+固件异步CRUD操作
+与 app/crud/firmware.py 语义一致，基于 AsyncSession
+"""
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, select
+from datetime import datetime
+
+from app.db.models.firmware import Firmware, FirmwareUpgradeTask
+from app.schemas.firmware import FirmwareCreate, FirmwareUpgradeTaskCreate
+
+
+class AsyncCRUDFirmware:
+    """固件异步CRUD操作类"""
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[Firmware]:
+        """根据ID获取固件"""
+        return await db.get(Firmware, id)
+
+    async def get_by_version_and_product(
+        self, db: AsyncSession, version: str, product_id: str
+    ) -> Optional[Firmware]:
+        """根据版本号和产品ID获取固件"""
+        result = await db.execute(select(Firmware).where(
+            and_(Firmware.version == version, Firmware.product_id == product_id)
+        ))
+        return result.scalars().first()
+
+    async def get_multi(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100, product_id: Optional[str] = None
+    ) -> List[Firmware]:
+        """获取固件列表"""
+        query = select(Firmware)
+        if product_id:
+            query = query.where(Firmware.product_id == product_id)
+        result = await db.execute(query.order_by(desc(Firmware.created_at)).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_latest_firmware(self, db: AsyncSession, product_id: str) -> Optional[Firmware]:
+        """获取产品的最新固件"""
+        result = await db.execute(select(Firmware).where(
+            and_(Firmware.product_id == product_id, Firmware.is_active == True)
+        ).order_by(desc(Firmware.created_at)).limit(1))
+        return result.scalars().first()
+
+    async def create(
+        self, db: AsyncSession, obj_in: FirmwareCreate, created_by: Optional[int] = None,
+        file_name: str = "", file_path: str = "", file_size: int = 0
+    ) -> Firmware:
+        """创建固件"""
+        db_obj = Firmware(
+            version=obj_in.version,
+            product_id=obj_in.product_id,
+            file_url=str(obj_in.file_url),
+            file_hash=obj_in.file_hash,
+            description=obj_in.description,
+            file_name=file_name,
+            file_path=file_path,
+            file_size=file_size,
+            is_active=True,
+            is_beta=False,
+            create_by=created_by
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+
+class AsyncCRUDFirmwareUpgradeTask:
+    """固件升级任务异步CRUD操作类"""
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[FirmwareUpgradeTask]:
+        """根据ID获取升级任务"""
+        return await db.get(FirmwareUpgradeTask, id)
+
+    async def get_multi(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100,
+        device_id: Optional[int] = None, status: Optional[str] = None
+    ) -> List[FirmwareUpgradeTask]:
+        """获取升级任务列表"""
+        query = select(FirmwareUpgradeTask)
+        if device_id:
+            query = query.where(FirmwareUpgradeTask.device_id == device_id)
+        if status:
+            query = query.where(FirmwareUpgradeTask.status == status)
+        result = await db.execute(query.order_by(desc(FirmwareUpgradeTask.created_at)).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def create(
+        self, db: AsyncSession, obj_in: FirmwareUpgradeTaskCreate, created_by: Optional[int] = None
+    ) -> FirmwareUpgradeTask:
+        """创建升级任务"""
+        db_obj = FirmwareUpgradeTask(
+            device_id=obj_in.device_id,
+            firmware_id=obj_in.firmware_id,
+            status="pending",
+            progress=0,
+            created_by=created_by
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def update_status(
+        self, db: AsyncSession, id: int, status: str,
+        progress: Optional[int] = None, error_message: Optional[str] = None
+    ) -> Optional[FirmwareUpgradeTask]:
+        """更新升级任务状态"""
+        task = await self.get(db, id)
+        if task:
+            task.status = status
+            if progress is not None:
+                task.progress = progress
+            if error_message:
+                task.error_message = error_message
+            if status in ["success", "failed", "cancelled"]:
+                task.end_time = datetime.utcnow()
+            db.add(task)
+            await db.commit()
+            await db.refresh(task)
+        return task
+
+    async def update_celery_task_id(
+        self, db: AsyncSession, id: int, celery_task_id: str
+    ) -> Optional[FirmwareUpgradeTask]:
+        """更新Celery任务ID"""
+        task = await self.get(db, id)
+        if task:
+            task.celery_task_id = celery_task_id
+            db.add(task)
+            await db.commit()
+            await db.refresh(task)
+        return task
+
+
+# 实例化异步CRUD对象
+async_firmware_crud = AsyncCRUDFirmware()
+async_firmware_upgrade_task_crud = AsyncCRUDFirmwareUpgradeTask()
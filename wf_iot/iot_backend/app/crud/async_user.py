@@ -0,0 +1,61 @@
+"""
+用户异步CRUD操作
+与 app/crud/user.py 语义一致，基于 AsyncSession；密码哈希为CPU密集操作，提交到密码哈希执行池并异步等待
+"""
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.db.models.user import User
+from app.schemas.user import UserCreate
+from app.core.password_hasher import password_hasher
+
+
+class AsyncCRUDUser:
+    """用户异步CRUD操作类"""
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[User]:
+        return await db.get(User, id)
+
+    async def get_by_username(self, db: AsyncSession, username: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
+
+    async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+        result = await db.execute(select(User).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def create(self, db: AsyncSession, obj_in: UserCreate) -> User:
+        hashed_password = await password_hasher.ahash(obj_in.password)
+        db_obj = User(
+            username=obj_in.username,
+            email=obj_in.email,
+            hashed_password=hashed_password,
+            full_name=obj_in.full_name,
+            is_superuser=obj_in.is_superuser
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def authenticate(self, db: AsyncSession, username: str, password: str) -> Optional[User]:
+        user = await self.get_by_username(db, username=username)
+        if not user:
+            return None
+        if not await password_hasher.averify(password, user.hashed_password):
+            return None
+        if password_hasher.needs_rehash(user.hashed_password):
+            # 登录成功时透明升级为当前算法及成本参数的哈希
+            user.hashed_password = await password_hasher.ahash(password)
+            await db.commit()
+            password_hasher.record_rehash()
+        return user
+
+
+# 实例化异步CRUD对象
+async_user_crud = AsyncCRUDUser()
@@ -1,8 +1,15 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, insert, func
 from datetime import datetime, timedelta
-from app.db.models.device import Device, DeviceData, DeviceCommand
+from app.core.cache import device_id_cache
+from app.core.config import settings
+from app.core.pagination import approximate_count, keyset_paginate, keyset_filter, decode_cursor, encode_cursor
+from app.core.payload_formats import payload_format_cache, resolve_format_name
+from app.db.models.device import Device, DeviceData, DeviceDataArchive, DeviceCommand
+from app.db.partitioning import TelemetryPartitionManager, floor_boundary, next_boundary
+from app.db.telemetry_codec import TelemetryRecord, encode_block, decode_block
+from app.crud.rollup import device_rollup_crud
 from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceDataCreate,DeviceCommandCreate
 
 
@@ -13,6 +20,42 @@ class CRUDDevice:
     def get_by_device_id(self, db: Session, device_id: str) -> Optional[Device]:
         return db.query(Device).filter(Device.device_id == device_id).first()
 
+    def get_by_device_ids(self, db: Session, device_ids: Iterable[str]) -> List[Device]:
+        return db.query(Device).filter(Device.device_id.in_(set(device_ids))).all()
+
+    def resolve_id(self, db: Session, device_id: str) -> Optional[int]:
+        """将设备唯一标识解析为数据库主键，优先走缓存"""
+        pk = device_id_cache.get(device_id)
+        if pk is None:
+            row = db.query(Device.id).filter(Device.device_id == device_id).first()
+            if row is None:
+                return None
+            pk = row[0]
+            device_id_cache.set(device_id, pk)
+        return pk
+
+    def resolve_ids(self, db: Session, device_ids: Iterable[str]) -> Dict[str, int]:
+        """批量解析设备主键，缓存未命中的部分合并为一次查询"""
+        device_ids = set(device_ids)
+        id_map = device_id_cache.get_many(device_ids)
+        missing = device_ids - id_map.keys()
+        if missing:
+            found = dict(db.query(Device.device_id, Device.id).filter(Device.device_id.in_(missing)).all())
+            device_id_cache.set_many(found)
+            id_map.update(found)
+        return id_map
+
+    def resolve_payload_format(self, db: Session, device_id: str) -> str:
+        """解析设备协商的负载格式名称，优先走缓存；设备不存在时为默认格式且不缓存"""
+        name = payload_format_cache.get(device_id)
+        if name is None:
+            row = db.query(Device.product_id, Device.device_metadata).filter(Device.device_id == device_id).first()
+            if row is None:
+                return resolve_format_name(None)
+            name = resolve_format_name(row.device_metadata, row.product_id)
+            payload_format_cache.set(device_id, name)
+        return name
+
     def get_multi(self, db: Session, skip: int = 0, limit: int = 100, owner_id:
         Optional[int] = None) -> List[Device]:
         query = db.query(Device)
@@ -23,11 +66,30 @@ class CRUDDevice:
     def get_by_product(self, db: Session, product_id: str, skip: int = 0,limit: int = 100) -> List[Device]:
         return db.query(Device).filter(Device.product_id == product_id).offset(skip).limit(limit).all()
 
+    def get_page(self, db: Session, limit: int = 100, cursor: Optional[str] = None,
+                 owner_id: Optional[int] = None, product_id: Optional[str] = None) -> Tuple[List[Device], Optional[str]]:
+        """按主键游标分页获取设备列表，返回 (设备列表, 下一页游标)"""
+        return keyset_paginate(self._filtered(db, owner_id, product_id), [(Device.id, False)], cursor, limit)
+
+    def count(self, db: Session, owner_id: Optional[int] = None, product_id: Optional[str] = None) -> int:
+        """设备数量（近似值）"""
+        return approximate_count(db, self._filtered(db, owner_id, product_id))
+
+    @staticmethod
+    def _filtered(db: Session, owner_id: Optional[int] = None, product_id: Optional[str] = None):
+        query = db.query(Device)
+        if owner_id:
+            query = query.filter(Device.owner_id == owner_id)
+        if product_id:
+            query = query.filter(Device.product_id == product_id)
+        return query
+
     def create(self, db: Session, obj_in: DeviceCreate) -> Device:
         db_obj = Device(**obj_in.model_dump())
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        device_id_cache.invalidate(db_obj.device_id)
         return db_obj
 
     def update(self, db: Session, db_obj: Device, obj_in: DeviceUpdate) -> Device:
@@ -37,6 +99,7 @@ class CRUDDevice:
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        payload_format_cache.invalidate(db_obj.device_id)
         return db_obj
 
     def delete(self, db: Session, id: int) -> Device:
@@ -44,6 +107,8 @@ class CRUDDevice:
         if obj:
             db.delete(obj)
             db.commit()
+            device_id_cache.invalidate(obj.device_id)
+            payload_format_cache.invalidate(obj.device_id)
         return obj
 
     def update_status(self, db: Session, device_id: str, status: str) -> Optional[Device]:
@@ -57,6 +122,24 @@ class CRUDDevice:
             db.refresh(device)
         return device
 
+    def batch_update_status(self, db: Session, device_ids: List[str], status: str,
+                            last_online_at: Optional[datetime] = None) -> int:
+        """批量更新设备状态，单条UPDATE，返回影响行数"""
+        if not device_ids:
+            return 0
+        update_data = {"status": status}
+        if status == "online":
+            update_data["last_online_at"] = last_online_at or datetime.utcnow()
+        result = db.query(Device).filter(Device.device_id.in_(device_ids)).update(
+            update_data, synchronize_session=False
+        )
+        db.commit()
+        return result
+
+    def get_online_device_ids(self, db: Session) -> List[tuple]:
+        """获取在线设备的 (device_id, last_online_at)，只查询所需列"""
+        return db.query(Device.device_id, Device.last_online_at).filter(Device.status == "online").all()
+
     def get_online_devices(self, db: Session) -> List[Device]:
         return db.query(Device).filter(Device.status == "online").all()
 
@@ -73,40 +156,300 @@ class CRUDDevice:
 
 class CRUDDeviceData:
     def create(self, db: Session, obj_in: DeviceDataCreate) -> Optional[DeviceData]:
-        # 首先获取设备
-        device = device_crud.get_by_device_id(db, obj_in.device_id)
-        if not device:
+        # 首先解析设备主键
+        device_pk = device_crud.resolve_id(db, obj_in.device_id)
+        if device_pk is None:
             return None
         db_obj = DeviceData(
-        device_id=device.id,
+        device_id=device_pk,
         data_type=obj_in.data_type,
         data=obj_in.data,
-        quality=obj_in.quality
+        quality=obj_in.quality,
+        timestamp=datetime.utcnow()
         )
         db.add(db_obj)
+        if settings.ROLLUP_ENABLED:
+            device_rollup_crud.accumulate(db, [{"device_id": device_pk, "timestamp": db_obj.timestamp, "data": db_obj.data}])
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
+    def create_many(self, db: Session, objs_in: List[Dict[str, Any]]) -> int:
+        """
+        批量写入设备数据
+
+        批量解析本批次所有设备的主键（缓存未命中时一次查询），再以单条多行INSERT写入，
+        未注册设备的数据会被跳过。返回实际写入的条数。
+        """
+        if not objs_in:
+            return 0
+        id_map = device_crud.resolve_ids(db, (obj["device_id"] for obj in objs_in))
+        now = datetime.utcnow()
+        rows = [
+            {
+                "device_id": id_map[obj["device_id"]],
+                "timestamp": obj.get("timestamp") or now,
+                "data_type": obj.get("data_type", "telemetry"),
+                "data": obj.get("data", {}),
+                "quality": obj.get("quality", "good"),
+                "created_at": now,
+            }
+            for obj in objs_in
+            if obj["device_id"] in id_map
+        ]
+        if rows:
+            db.execute(insert(DeviceData).values(rows))
+            if settings.ROLLUP_ENABLED:
+                device_rollup_crud.accumulate(db, rows)
+            db.commit()
+        return len(rows)
+
     def get_device_data(self, db: Session, device_id: int, skip: int = 0,limit: int = 100) -> List[DeviceData]:
-        return db.query(DeviceData).filter(DeviceData.device_id == device_id).order_by(
+        rows = db.query(DeviceData).filter(DeviceData.device_id == device_id).order_by(
             desc(DeviceData.timestamp)
             ).offset(skip).limit(limit).all()
+        if len(rows) >= limit:
+            return rows
+
+        # 原始数据不足一页时，从归档中接续（归档数据均早于未归档的原始数据）
+        if rows:
+            archive_skip = 0
+        else:
+            archive_skip = max(skip - db.query(func.count(DeviceData.id)).filter(DeviceData.device_id == device_id).scalar(), 0)
+        remaining = limit - len(rows)
+        blocks = db.query(DeviceDataArchive).filter(DeviceDataArchive.device_id == device_id).order_by(
+            desc(DeviceDataArchive.end_time)
+        )
+        for block in blocks.yield_per(10):
+            if archive_skip >= block.count:
+                archive_skip -= block.count
+                continue
+            records = self.decode_archive(block)[::-1][archive_skip:archive_skip + remaining]
+            archive_skip = 0
+            rows.extend(records)
+            remaining -= len(records)
+            if remaining <= 0:
+                break
+        return rows
+
+    def get_data_page(self, db: Session, device_id: int, limit: int = 100,
+                      cursor: Optional[str] = None) -> Tuple[List[DeviceData], Optional[str]]:
+        """
+        按 (timestamp, id) 倒序游标分页获取设备数据，返回 (数据列表, 下一页游标)
+
+        原始数据取完后从归档中继续，游标格式不变
+        """
+        columns = [(DeviceData.timestamp, True), (DeviceData.id, True)]
+        query = db.query(DeviceData).filter(DeviceData.device_id == device_id)
+        rows, next_cursor = keyset_paginate(query, columns, cursor, limit)
+        if next_cursor is not None:
+            return rows, next_cursor
+
+        if rows:
+            position = (rows[-1].timestamp, rows[-1].id)
+        elif cursor:
+            position = tuple(decode_cursor(cursor, len(columns)))
+        else:
+            position = None
+        remaining = limit - len(rows)
+        archived = self._archived_before(db, device_id, position, remaining + 1)
+        if not archived:
+            return rows, None
+        rows.extend(archived[:remaining])
+        if len(archived) <= remaining:
+            return rows, None
+        return rows, encode_cursor([rows[-1].timestamp, rows[-1].id])
+
+    def _archived_before(self, db: Session, device_id: int, position: Optional[tuple], count: int) -> List[DeviceData]:
+        """按 (timestamp, id) 倒序取位于 position 之后的至多 count 条归档数据"""
+        query = db.query(DeviceDataArchive).filter(DeviceDataArchive.device_id == device_id)
+        if position is not None:
+            query = query.filter(DeviceDataArchive.start_time <= position[0])
+        records: List[DeviceData] = []
+        for block in query.order_by(desc(DeviceDataArchive.end_time)).yield_per(10):
+            # 不同数据类型的块时间段可能重叠，直到后续块不可能更新结果时才停止
+            if len(records) >= count and block.end_time < records[count - 1].timestamp:
+                break
+            records.extend(
+                record for record in self.decode_archive(block)
+                if position is None or (record.timestamp, record.id) < position
+            )
+            records.sort(key=lambda record: (record.timestamp, record.id), reverse=True)
+        return records[:count]
 
     def get_latest_data(self, db: Session, device_id: int) -> Optional[DeviceData]:
-        return db.query(DeviceData).filter(DeviceData.device_id == device_id).order_by(desc(DeviceData.timestamp)).first()
+        latest = db.query(DeviceData).filter(DeviceData.device_id == device_id).order_by(desc(DeviceData.timestamp)).first()
+        if latest is not None:
+            return latest
+        block = db.query(DeviceDataArchive).filter(DeviceDataArchive.device_id == device_id).order_by(
+            desc(DeviceDataArchive.end_time)
+        ).first()
+        return self.decode_archive(block)[-1] if block else None
 
     def get_data_by_time_range(self, db: Session, device_id: int, start_time:datetime, end_time: datetime) -> List[DeviceData]:
-        return db.query(DeviceData).filter(and_(DeviceData.device_id == device_id,DeviceData.timestamp >= start_time,DeviceData.timestamp <= end_time)).order_by(DeviceData.timestamp).all()
+        rows = db.query(DeviceData).filter(and_(DeviceData.device_id == device_id,DeviceData.timestamp >= start_time,DeviceData.timestamp <= end_time)).order_by(DeviceData.timestamp).all()
+        blocks = db.query(DeviceDataArchive).filter(and_(
+            DeviceDataArchive.device_id == device_id,
+            DeviceDataArchive.start_time <= end_time,
+            DeviceDataArchive.end_time >= start_time,
+        )).all()
+        if not blocks:
+            return rows
+        archived = [
+            record for block in blocks for record in self.decode_archive(block)
+            if start_time <= record.timestamp <= end_time
+        ]
+        return sorted(archived + rows, key=lambda record: record.timestamp)
+
+    @staticmethod
+    def decode_archive(block: DeviceDataArchive) -> List[DeviceData]:
+        """将归档块解码为游离(未加入Session)的 DeviceData 对象"""
+        return [
+            DeviceData(
+                id=record.id,
+                device_id=block.device_id,
+                timestamp=record.timestamp,
+                data_type=block.data_type,
+                data=record.data,
+                quality=record.quality,
+                created_at=block.created_at,
+            )
+            for record in decode_block(block.payload)
+        ]
+
+    def archive_before(self, db: Session, before: datetime, interval: str = "day", batch_size: int = 10000) -> int:
+        """
+        将早于 before 的原始数据按 设备/数据类型/时间段 编码为压缩块写入归档表，并删除原始数据
+
+        每个 设备/时间段 的归档块写入与原始数据删除在同一事务中提交，
+        中途失败不会留下重复的归档块，内存中也只保留一个时间段的数据。
+        before 应对齐到分区边界：全部归档后，分区表上已清空的过期分区被整体删除。
+        返回归档的记录数。
+        """
+        archived = 0
+        device_pks = [
+            row[0] for row in
+            db.query(DeviceData.device_id).filter(DeviceData.timestamp < before).distinct().all()
+        ]
+        for device_pk in device_pks:
+            while True:
+                earliest = db.query(func.min(DeviceData.timestamp)).filter(and_(
+                    DeviceData.device_id == device_pk,
+                    DeviceData.timestamp < before,
+                )).scalar()
+                if earliest is None:
+                    break
+                archived += self._archive_bucket(db, device_pk, earliest, before, interval, batch_size)
+
+        manager = TelemetryPartitionManager(DeviceData.__tablename__, interval)
+        manager.drop_expired(db.connection(), before)
+        db.commit()
+        return archived
+
+    def _archive_bucket(self, db: Session, device_pk: int, earliest: datetime, before: datetime,
+                        interval: str, batch_size: int) -> int:
+        """在一个事务中归档并删除设备在 earliest 所在时间段内早于 before 的原始数据"""
+        start = floor_boundary(earliest, interval)
+        end = min(next_boundary(earliest, interval), before)
+        rows = db.query(
+            DeviceData.id, DeviceData.timestamp, DeviceData.data_type, DeviceData.data, DeviceData.quality
+        ).filter(and_(
+            DeviceData.device_id == device_pk,
+            DeviceData.timestamp >= start,
+            DeviceData.timestamp < end,
+        )).order_by(DeviceData.timestamp).all()
+
+        by_type: Dict[Optional[str], List[TelemetryRecord]] = {}
+        for id_, timestamp, data_type, data, quality in rows:
+            by_type.setdefault(data_type, []).append(TelemetryRecord(id_, timestamp, data, quality))
+
+        now = datetime.utcnow()
+        try:
+            for data_type, records in by_type.items():
+                db.add(DeviceDataArchive(
+                    device_id=device_pk,
+                    data_type=data_type,
+                    start_time=records[0].timestamp,
+                    end_time=records[-1].timestamp,
+                    count=len(records),
+                    payload=encode_block(records),
+                    created_at=now,
+                ))
+            # 只删除已编码的行，归档期间新写入的迟到数据留待下一轮
+            ids = [row[0] for row in rows]
+            for offset in range(0, len(ids), batch_size):
+                db.query(DeviceData).filter(
+                    DeviceData.id.in_(ids[offset:offset + batch_size])
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(rows)
+
+    def delete_before(self, db: Session, before: datetime, interval: str = "day") -> int:
+        """删除早于 before 的原始数据：先整体删除过期分区，再删除剩余行"""
+        manager = TelemetryPartitionManager(DeviceData.__tablename__, interval)
+        manager.drop_expired(db.connection(), before)
+        deleted = db.query(DeviceData).filter(DeviceData.timestamp < before).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def delete_archive_before(self, db: Session, before: datetime) -> int:
+        """删除最晚记录早于 before 的归档块"""
+        deleted = db.query(DeviceDataArchive).filter(DeviceDataArchive.end_time < before).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def partition_storage(self, db: Session, now: Optional[datetime] = None) -> bool:
+        """
+        将未分区的 device_data 转换为按时间分区（一次性迁移，见 scripts/partition_device_data.py）
+
+        会重建整张表并删除 device_id 外键，只应在维护窗口中由管理员显式执行。
+        返回是否执行了转换（已分区或非MySQL时为 False）。
+        """
+        now = now or datetime.utcnow()
+        manager = TelemetryPartitionManager(DeviceData.__tablename__, settings.TELEMETRY_PARTITION_INTERVAL)
+        converted = manager.partition_table(db.connection(), now, settings.TELEMETRY_PARTITIONS_AHEAD)
+        db.commit()
+        return converted
+
+    def maintain_storage(self, db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        遥测存储维护：滚动创建分区、归档旧数据、按保留期删除原始数据及聚合
+
+        只维护已分区表的分区，不会转换未分区的表（见 partition_storage）
+        """
+        now = now or datetime.utcnow()
+        interval = settings.TELEMETRY_PARTITION_INTERVAL
+        manager = TelemetryPartitionManager(DeviceData.__tablename__, interval)
+        conn = db.connection()
+        result: Dict[str, Any] = {"partitions_created": [], "archived": 0, "deleted": 0, "archive_deleted": 0}
+
+        if manager.is_supported(conn):
+            result["partitions_created"] = manager.ensure_partitions(conn, now, settings.TELEMETRY_PARTITIONS_AHEAD)
+            db.commit()
+
+        if settings.TELEMETRY_RETENTION_DAYS > 0:
+            cutoff = floor_boundary(now - timedelta(days=settings.TELEMETRY_RETENTION_DAYS), interval)
+            result["deleted"] = self.delete_before(db, cutoff, interval)
+            result["archive_deleted"] = self.delete_archive_before(db, cutoff)
+
+        if settings.TELEMETRY_ARCHIVE_AFTER_DAYS > 0:
+            cutoff = floor_boundary(now - timedelta(days=settings.TELEMETRY_ARCHIVE_AFTER_DAYS), interval)
+            result["archived"] = self.archive_before(db, cutoff, interval)
+
+        result["rollups_deleted"] = device_rollup_crud.delete_expired(db, now)
+        return result
 
 
 class CRUDDeviceCommand:
     def create(self, db: Session, obj_in: DeviceCommandCreate, created_by: int) -> Optional[DeviceCommand]:
-        device = device_crud.get_by_device_id(db, obj_in.device_id)
-        if not device:
+        device_pk = device_crud.resolve_id(db, obj_in.device_id)
+        if device_pk is None:
             return None
         db_obj = DeviceCommand(
-            device_id=device.id,
+            device_id=device_pk,
             command_type=obj_in.command_type,
             command_data=obj_in.command_data,
             created_by=created_by
@@ -132,12 +475,12 @@ class CRUDDeviceCommand:
         return command
 
     def get_pending_commands(self, db: Session, device_id: str) -> List[DeviceCommand]:
-        device = device_crud.get_by_device_id(db, device_id)
-        if not device:
+        device_pk = device_crud.resolve_id(db, device_id)
+        if device_pk is None:
             return []
         return db.query(DeviceCommand).filter(
             and_(
-            DeviceCommand.device_id == device.id,
+            DeviceCommand.device_id == device_pk,
             DeviceCommand.status == "pending"
             )
         ).all()
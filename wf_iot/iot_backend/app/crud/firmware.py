@@ -1,11 +1,13 @@
 """
 固件管理CRUD操作
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc
 from datetime import datetime
 
+from app.core.pagination import keyset_paginate
+
 from app.db.models.firmware import Firmware, FirmwareUpgradeTask
 from app.schemas.firmware import FirmwareCreate, FirmwareUpgradeTaskCreate
 
@@ -38,6 +40,15 @@ class CRUDFirmware:
             query = query.filter(Firmware.product_id == product_id)
         return query.order_by(desc(Firmware.created_at)).offset(skip).limit(limit).all()
 
+    def get_page(
+        self, db: Session, limit: int = 100, cursor: Optional[str] = None, product_id: Optional[str] = None
+    ) -> Tuple[List[Firmware], Optional[str]]:
+        """按 (created_at, id) 倒序游标分页获取固件列表，返回 (固件列表, 下一页游标)"""
+        query = db.query(Firmware)
+        if product_id:
+            query = query.filter(Firmware.product_id == product_id)
+        return keyset_paginate(query, [(Firmware.created_at, True), (Firmware.id, True)], cursor, limit)
+
     def get_active_firmware(self, db: Session, product_id: str) -> List[Firmware]:
         """获取产品的活跃固件"""
         return db.query(Firmware).filter(
@@ -141,6 +152,20 @@ class CRUDFirmwareUpgradeTask:
             query = query.filter(FirmwareUpgradeTask.status == status)
         return query.order_by(desc(FirmwareUpgradeTask.created_at)).offset(skip).limit(limit).all()
 
+    def get_page(
+        self, db: Session, limit: int = 100, cursor: Optional[str] = None,
+        device_id: Optional[int] = None, status: Optional[str] = None
+    ) -> Tuple[List[FirmwareUpgradeTask], Optional[str]]:
+        """按 (created_at, id) 倒序游标分页获取升级任务列表，返回 (任务列表, 下一页游标)"""
+        query = db.query(FirmwareUpgradeTask)
+        if device_id:
+            query = query.filter(FirmwareUpgradeTask.device_id == device_id)
+        if status:
+            query = query.filter(FirmwareUpgradeTask.status == status)
+        return keyset_paginate(
+            query, [(FirmwareUpgradeTask.created_at, True), (FirmwareUpgradeTask.id, True)], cursor, limit
+        )
+
     def get_device_tasks(self, db: Session, device_id: int) -> List[FirmwareUpgradeTask]:
         """获取设备的所有升级任务"""
         return db.query(FirmwareUpgradeTask).filter(
@@ -2,6 +2,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.db.models.user import Permission
 from app.schemas.permission import PermissionCreate, PermissionUpdate
+from app.core.permission_cache import permission_cache
 
 
 class CRUDPermission:
@@ -52,6 +53,8 @@ class CRUDPermission:
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        # 权限代码可能变化，所有缓存的权限集合失效
+        permission_cache.bump_version()
         return db_obj
 
     def delete(self, db: Session, *, permission_id: int) -> Permission:
@@ -59,6 +62,7 @@ class CRUDPermission:
         obj = db.query(Permission).get(permission_id)
         db.delete(obj)
         db.commit()
+        permission_cache.bump_version()
         return obj
 
 
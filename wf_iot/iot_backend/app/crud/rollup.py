@@ -0,0 +1,213 @@
+"""
+设备数据聚合CRUD操作
+按 1m/1h/1d 分桶维护每个设备每个数值指标的 count/sum/min/max/last，
+写入数据时增量合并，查询时按时间跨度和数据点预算自动选择分辨率
+"""
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.db.models.device import DeviceDataRollup
+
+# 分辨率及其桶宽，按从细到粗排列
+RESOLUTIONS: Dict[str, timedelta] = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+_CONFLICT_KEYS = ["device_id", "resolution", "metric", "bucket_start"]
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """取 ts 所在桶的起始时间"""
+    if resolution == "1m":
+        return ts.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == "1d":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unsupported rollup resolution: {resolution}")
+
+
+def _retention(resolution: str) -> Optional[timedelta]:
+    days = {
+        "1m": settings.ROLLUP_1M_RETENTION_DAYS,
+        "1h": settings.ROLLUP_1H_RETENTION_DAYS,
+    }.get(resolution, 0)
+    return timedelta(days=days) if days > 0 else None
+
+
+def choose_resolution(start_time: datetime, end_time: datetime, max_points: int,
+                      now: Optional[datetime] = None) -> str:
+    """
+    选择满足数据点预算的最细分辨率：桶数不超过 max_points，
+    且该分辨率的保留期覆盖查询起点；都不满足时使用 1d
+    """
+    now = now or datetime.utcnow()
+    span = end_time - start_time
+    for resolution, width in RESOLUTIONS.items():
+        retention = _retention(resolution)
+        if retention is not None and start_time < now - retention:
+            continue
+        if span / width <= max_points:
+            return resolution
+    return "1d"
+
+
+def _is_metric(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class CRUDDeviceRollup:
+    """设备数据聚合CRUD操作类"""
+
+    def aggregate(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        将一批设备数据行在内存中预聚合为聚合增量
+
+        rows 的 device_id 为设备主键，需包含 timestamp 与 data
+        """
+        buckets: Dict[Tuple, Dict[str, Any]] = {}
+        for row in rows:
+            timestamp = row["timestamp"]
+            for metric, value in (row.get("data") or {}).items():
+                if not _is_metric(value):
+                    continue
+                value = float(value)
+                for resolution in RESOLUTIONS:
+                    key = (row["device_id"], resolution, metric, bucket_start(timestamp, resolution))
+                    bucket = buckets.get(key)
+                    if bucket is None:
+                        buckets[key] = {
+                            "device_id": key[0],
+                            "resolution": resolution,
+                            "metric": metric,
+                            "bucket_start": key[3],
+                            "sample_count": 1,
+                            "value_sum": value,
+                            "value_min": value,
+                            "value_max": value,
+                            "value_last": value,
+                            "last_time": timestamp,
+                        }
+                        continue
+                    bucket["sample_count"] += 1
+                    bucket["value_sum"] += value
+                    bucket["value_min"] = min(bucket["value_min"], value)
+                    bucket["value_max"] = max(bucket["value_max"], value)
+                    if timestamp >= bucket["last_time"]:
+                        bucket["value_last"] = value
+                        bucket["last_time"] = timestamp
+        return list(buckets.values())
+
+    def accumulate(self, db: Session, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        将一批设备数据合并进聚合表（不提交事务，由调用方与数据写入一同提交）
+
+        返回更新的聚合桶数
+        """
+        deltas = self.aggregate(rows)
+        if deltas:
+            self._upsert(db, deltas)
+        return len(deltas)
+
+    def _upsert(self, db: Session, deltas: List[Dict[str, Any]]):
+        dialect = db.get_bind().dialect.name
+        table = DeviceDataRollup.__table__
+        if dialect == "mysql":
+            stmt = mysql.insert(table).values(deltas)
+            new = stmt.inserted
+            # MySQL 按顺序求值赋值表达式，value_last 必须在 last_time 之前更新
+            stmt = stmt.on_duplicate_key_update([
+                ("sample_count", table.c.sample_count + new.sample_count),
+                ("value_sum", table.c.value_sum + new.value_sum),
+                ("value_min", func.least(table.c.value_min, new.value_min)),
+                ("value_max", func.greatest(table.c.value_max, new.value_max)),
+                ("value_last", case((new.last_time >= table.c.last_time, new.value_last), else_=table.c.value_last)),
+                ("last_time", func.greatest(table.c.last_time, new.last_time)),
+            ])
+            db.execute(stmt)
+        elif dialect in ("sqlite", "postgresql"):
+            dialect_module = sqlite if dialect == "sqlite" else postgresql
+            least, greatest = (func.min, func.max) if dialect == "sqlite" else (func.least, func.greatest)
+            stmt = dialect_module.insert(table).values(deltas)
+            new = stmt.excluded
+            stmt = stmt.on_conflict_do_update(index_elements=_CONFLICT_KEYS, set_={
+                "sample_count": table.c.sample_count + new.sample_count,
+                "value_sum": table.c.value_sum + new.value_sum,
+                "value_min": least(table.c.value_min, new.value_min),
+                "value_max": greatest(table.c.value_max, new.value_max),
+                "value_last": case((new.last_time >= table.c.last_time, new.value_last), else_=table.c.value_last),
+                "last_time": greatest(table.c.last_time, new.last_time),
+            })
+            db.execute(stmt)
+        else:
+            for delta in deltas:
+                self._merge_one(db, delta)
+
+    def _merge_one(self, db: Session, delta: Dict[str, Any]):
+        """不支持原生 upsert 的数据库逐桶合并"""
+        bucket = db.query(DeviceDataRollup).filter(and_(
+            *(getattr(DeviceDataRollup, key) == delta[key] for key in _CONFLICT_KEYS)
+        )).with_for_update().first()
+        if bucket is None:
+            db.add(DeviceDataRollup(**delta))
+            return
+        bucket.sample_count += delta["sample_count"]
+        bucket.value_sum += delta["value_sum"]
+        bucket.value_min = min(bucket.value_min, delta["value_min"])
+        bucket.value_max = max(bucket.value_max, delta["value_max"])
+        if delta["last_time"] >= bucket.last_time:
+            bucket.value_last = delta["value_last"]
+            bucket.last_time = delta["last_time"]
+
+    def get_series(
+        self,
+        db: Session,
+        device_id: int,
+        start_time: datetime,
+        end_time: datetime,
+        max_points: Optional[int] = None,
+        metrics: Optional[List[str]] = None,
+        resolution: Optional[str] = None,
+    ) -> Tuple[str, List[DeviceDataRollup]]:
+        """
+        查询时间段内的聚合数据，未指定分辨率时自动选择
+
+        返回 (分辨率, 按指标及时间排序的聚合桶)
+        """
+        if resolution is None:
+            resolution = choose_resolution(start_time, end_time, max_points or settings.ROLLUP_MAX_POINTS)
+        elif resolution not in RESOLUTIONS:
+            raise ValueError(f"Unsupported rollup resolution: {resolution}")
+        query = db.query(DeviceDataRollup).filter(and_(
+            DeviceDataRollup.device_id == device_id,
+            DeviceDataRollup.resolution == resolution,
+            DeviceDataRollup.bucket_start >= bucket_start(start_time, resolution),
+            DeviceDataRollup.bucket_start <= end_time,
+        ))
+        if metrics:
+            query = query.filter(DeviceDataRollup.metric.in_(metrics))
+        return resolution, query.order_by(DeviceDataRollup.metric, DeviceDataRollup.bucket_start).all()
+
+    def delete_expired(self, db: Session, now: Optional[datetime] = None) -> int:
+        """按各分辨率的保留期删除过期聚合"""
+        now = now or datetime.utcnow()
+        deleted = 0
+        for resolution in RESOLUTIONS:
+            retention = _retention(resolution)
+            if retention is None:
+                continue
+            deleted += db.query(DeviceDataRollup).filter(and_(
+                DeviceDataRollup.resolution == resolution,
+                DeviceDataRollup.bucket_start < now - retention,
+            )).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+device_rollup_crud = CRUDDeviceRollup()
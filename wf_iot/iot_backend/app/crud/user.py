@@ -1,10 +1,12 @@
-from typing import List, Optional  # Optional[X] 是 Union[X, None] 的简写，表示值可以是类型X或None
+from typing import List, Optional, Set  # Optional[X] 是 Union[X, None] 的简写，表示值可以是类型X或None
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from app.db.models.user import User, Role, Permission, UserRole, RolePermission
 from app.schemas.user import UserCreate, UserUpdate, RoleCreate,PermissionCreate
-from app.core.security import get_password_hash, verify_password
+from app.core.password_hasher import password_hasher
+from app.core.security import get_password_hash, verify_password, password_needs_rehash
+from app.core.permission_cache import permission_cache
 
 
 class CRUDUser:
@@ -61,6 +63,7 @@ class CRUDUser:
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        permission_cache.invalidate_user(db_obj.id)
         return db_obj
 
     def delete(self, db: Session, id: int) -> User:
@@ -68,6 +71,7 @@ class CRUDUser:
         if obj:
             db.delete(obj)
             db.commit()
+            permission_cache.invalidate_user(id)
         return obj
 
     def authenticate(self, db: Session, username: str, password: str) -> Optional[User]:
@@ -76,6 +80,12 @@ class CRUDUser:
             return None
         if not verify_password(password, user.hashed_password):
             return None
+        if password_needs_rehash(user.hashed_password):
+            # 登录成功时透明升级为当前算法及成本参数的哈希
+            user.hashed_password = get_password_hash(password)
+            db.add(user)
+            db.commit()
+            password_hasher.record_rehash()
         return user
 
     def is_active(self, user: User) -> bool:
@@ -95,6 +105,7 @@ class CRUDUser:
         db.add(user_role)
         db.commit()
         db.refresh(user_role)
+        permission_cache.invalidate_user(user_id)
         return user_role
 
     def remove_role(self, db: Session, user_id: int, role_id: int) -> bool:
@@ -104,6 +115,7 @@ class CRUDUser:
         if user_role:
             db.delete(user_role)
             db.commit()
+            permission_cache.invalidate_user(user_id)
             return True
         return False
 
@@ -114,6 +126,15 @@ class CRUDUser:
             ).distinct().all()
         return permissions
 
+    def get_permission_codes(self, db: Session, user_id: int) -> Set[str]:
+        """获取用户的有效权限代码集合（单次联表查询）"""
+        rows = db.query(Permission.code).join(
+            RolePermission, RolePermission.permission_id == Permission.id
+        ).join(
+            UserRole, UserRole.role_id == RolePermission.role_id
+        ).filter(UserRole.user_id == user_id).distinct().all()
+        return {row[0] for row in rows}
+
     def has_permission(self, db: Session, user_id: int, resource: str, action:str) -> bool:
         """检查用户是否有特定权限"""
         permission = db.query(Permission).join(RolePermission).join(Role).join(UserRole).filter(
@@ -166,6 +187,7 @@ class CRUDRole:
             # 删除角色
             db.delete(obj)
             db.commit()
+            permission_cache.bump_version()
         return obj
 
     def assign_permission(self, db: Session, role_id: int, permission_id: int) -> RolePermission:
@@ -179,6 +201,7 @@ class CRUDRole:
         db.add(role_permission)
         db.commit()
         db.refresh(role_permission)
+        permission_cache.bump_version()
         return role_permission
 
     def remove_permission(self, db: Session, role_id: int, permission_id: int) -> bool:
@@ -190,6 +213,7 @@ class CRUDRole:
         if role_permission:
             db.delete(role_permission)
             db.commit()
+            permission_cache.bump_version()
             return True
         return False
 
@@ -0,0 +1,20 @@
+# 作用：异步数据库会话（供 async 端点及协议服务使用，避免在事件循环中执行阻塞的数据库调用）
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.db.pool import instrument_engine, pool_options
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    echo=settings.DEBUG,
+    **pool_options(settings, is_async=True)
+)
+instrument_engine(async_engine, "primary_async", settings.DB_POOL_PRE_PING, settings.DB_POOL_PRE_PING_IDLE)
+
+# expire_on_commit=False: 提交后仍可直接读取对象属性，避免在异步上下文中触发隐式加载
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -5,6 +5,6 @@ Base = declarative_base()
 # 这些导入必须在 Base 定义之后，以避免循环导入
 def import_models():
     from app.db.models.user import User, Role, Permission, UserRole, RolePermission
-    from app.db.models.device import Device, DeviceData
+    from app.db.models.device import Device, DeviceData, DeviceDataArchive, DeviceDataRollup
     from app.db.models.firmware import Firmware, FirmwareUpgradeTask
-    return User, Role, Permission, UserRole, RolePermission, Device, DeviceData, Firmware, FirmwareUpgradeTask
\ No newline at end of file
+    return User, Role, Permission, UserRole, RolePermission, Device, DeviceData, DeviceDataArchive, DeviceDataRollup, Firmware, FirmwareUpgradeTask
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey,JSON, Float, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey,JSON, Float, Text, Index, LargeBinary, UniqueConstraint
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -26,13 +27,19 @@ class Device(Base):
     owner = relationship("User", back_populates="devices")
     data_records = relationship("DeviceData", back_populates="device",cascade="all,delete-orphan")
     upgrade_tasks = relationship("FirmwareUpgradeTask",back_populates="device", cascade="all,delete-orphan")
+    archive_blocks = relationship("DeviceDataArchive", cascade="all,delete-orphan")
+    rollups = relationship("DeviceDataRollup", cascade="all,delete-orphan")
 
 
 class DeviceData(Base):
     __tablename__ = "device_data"
+    # 按设备查询时间范围的复合索引，同时覆盖按 device_id 的单列查询
+    __table_args__ = (
+        Index("ix_device_data_device_id_timestamp", "device_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     data_type = Column(String(50), nullable=True) # telemetry, event, alarm, etc
     data = Column(JSON, nullable=False) # 存储传感器数据，如 {"temperature": 25.5,"humidity": 60}
@@ -43,6 +50,43 @@ class DeviceData(Base):
     device = relationship("Device", back_populates="data_records")
 
 
+class DeviceDataArchive(Base):
+    """已压缩归档的历史设备数据，每行为同一设备一个时间段内的列式压缩块"""
+    __tablename__ = "device_data_archive"
+    __table_args__ = (
+        Index("ix_device_data_archive_device_id_start_time", "device_id", "start_time"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
+    data_type = Column(String(50), nullable=True)
+    start_time = Column(DateTime, nullable=False) # 块内最早记录时间
+    end_time = Column(DateTime, nullable=False) # 块内最晚记录时间
+    count = Column(Integer, nullable=False) # 块内记录数
+    payload = Column(LargeBinary().with_variant(LONGBLOB(), "mysql"), nullable=False) # 见 app/db/telemetry_codec.py
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DeviceDataRollup(Base):
+    """设备数值指标的分桶聚合 (1m/1h/1d)，随数据写入增量更新"""
+    __tablename__ = "device_data_rollups"
+    __table_args__ = (
+        UniqueConstraint("device_id", "resolution", "metric", "bucket_start", name="uq_device_data_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
+    resolution = Column(String(8), nullable=False) # 1m, 1h, 1d
+    metric = Column(String(100), nullable=False) # data 中的数值字段名
+    bucket_start = Column(DateTime, nullable=False)
+    sample_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_min = Column(Float, nullable=True)
+    value_max = Column(Float, nullable=True)
+    value_last = Column(Float, nullable=True)
+    last_time = Column(DateTime, nullable=True) # value_last 对应的数据时间
+
+
 class DeviceCommand(Base):
     __tablename__ = "device_commands"
 
@@ -49,7 +49,7 @@ class FirmwareUpgradeTask(Base):
     retry_count = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # 游标分页排序键
     updated_at = Column(DateTime, default=datetime.utcnow,onupdate=datetime.utcnow)
 
     # 关系
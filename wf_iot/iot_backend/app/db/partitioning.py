@@ -0,0 +1,166 @@
+"""
+遥测数据表时间分区管理
+device_data 按 timestamp 做 RANGE COLUMNS 分区（按天或按月），
+提供初次分区、提前创建未来分区、按保留期删除旧分区等操作。
+仅 MySQL 支持分区，其他数据库(如测试用的SQLite)上所有操作为空操作。
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+MAX_PARTITION = "pmax"
+INTERVALS = ("day", "month")
+
+
+def floor_boundary(ts: datetime, interval: str) -> datetime:
+    """取 ts 所在分区的起始时间"""
+    if interval == "day":
+        return datetime(ts.year, ts.month, ts.day)
+    if interval == "month":
+        return datetime(ts.year, ts.month, 1)
+    raise ValueError(f"Unsupported partition interval: {interval}")
+
+
+def next_boundary(ts: datetime, interval: str) -> datetime:
+    """取 ts 所在分区的结束时间(下一分区起始时间)"""
+    start = floor_boundary(ts, interval)
+    if interval == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year, start.month + 1, 1)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    """分区命名：按天 p20240101，按月 p202401"""
+    return start.strftime("p%Y%m%d" if interval == "day" else "p%Y%m")
+
+
+def partition_range(start: datetime, end: datetime, interval: str) -> List[Tuple[str, datetime]]:
+    """生成覆盖 [start, end) 的分区列表，元素为 (分区名, 上界)"""
+    partitions = []
+    current = floor_boundary(start, interval)
+    while current < end:
+        upper = next_boundary(current, interval)
+        partitions.append((partition_name(current, interval), upper))
+        current = upper
+    return partitions
+
+
+def _partition_clause(name: str, upper: datetime) -> str:
+    return f"PARTITION {name} VALUES LESS THAN ('{upper:%Y-%m-%d %H:%M:%S}')"
+
+
+class TelemetryPartitionManager:
+    """device_data 时间分区管理器"""
+
+    def __init__(self, table_name: str = "device_data", interval: str = "day"):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported partition interval: {interval}")
+        self.table_name = table_name
+        self.interval = interval
+
+    @staticmethod
+    def is_supported(conn: Connection) -> bool:
+        return conn.dialect.name == "mysql"
+
+    def list_partitions(self, conn: Connection) -> List[Tuple[str, Optional[str]]]:
+        """列出现有分区 (分区名, 上界描述)，按分区顺序排列"""
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"table": self.table_name}).all()
+        return [(row[0], row[1]) for row in rows]
+
+    def partition_table(self, conn: Connection, start: datetime, ahead: int) -> bool:
+        """
+        将未分区的表转换为按时间分区
+
+        InnoDB 分区表要求主键包含分区列且不支持外键，
+        因此会将主键改为 (id, timestamp) 并删除 device_id 外键（ORM关系不受影响）。
+        """
+        if not self.is_supported(conn) or self.list_partitions(conn):
+            return False
+
+        foreign_keys = conn.execute(text(
+            "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+            "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {"table": self.table_name}).scalars().all()
+        for name in foreign_keys:
+            conn.execute(text(f"ALTER TABLE {self.table_name} DROP FOREIGN KEY {name}"))
+
+        conn.execute(text(
+            f"ALTER TABLE {self.table_name} "
+            f"MODIFY timestamp DATETIME NOT NULL, "
+            f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)"
+        ))
+
+        end = start
+        for _ in range(ahead + 1):
+            end = next_boundary(end, self.interval)
+        clauses = [_partition_clause(name, upper) for name, upper in partition_range(start, end, self.interval)]
+        clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        conn.execute(text(
+            f"ALTER TABLE {self.table_name} PARTITION BY RANGE COLUMNS(timestamp) ({', '.join(clauses)})"
+        ))
+        logger.info(f"Partitioned {self.table_name} by {self.interval} ({len(clauses) - 1} partitions)")
+        return True
+
+    def ensure_partitions(self, conn: Connection, now: datetime, ahead: int) -> List[str]:
+        """确保当前及未来 ahead 个周期的分区存在，从 pmax 中拆分出来，返回新建分区名"""
+        if not self.is_supported(conn):
+            return []
+        existing = {name for name, _ in self.list_partitions(conn)}
+        if not existing:
+            return []
+
+        end = now
+        for _ in range(ahead + 1):
+            end = next_boundary(end, self.interval)
+        missing = [
+            (name, upper) for name, upper in partition_range(now, end, self.interval)
+            if name not in existing
+        ]
+        if not missing:
+            return []
+
+        clauses = [_partition_clause(name, upper) for name, upper in missing]
+        clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        conn.execute(text(
+            f"ALTER TABLE {self.table_name} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(clauses)})"
+        ))
+        created = [name for name, _ in missing]
+        logger.info(f"Created partitions on {self.table_name}: {created}")
+        return created
+
+    def expired_partitions(self, conn: Connection, cutoff: datetime) -> List[str]:
+        """上界不晚于 cutoff 的分区（整个分区的数据都早于 cutoff）"""
+        expired = []
+        for name, description in self.list_partitions(conn):
+            if name == MAX_PARTITION or not description:
+                continue
+            upper = datetime.fromisoformat(description.strip("'"))
+            if upper <= cutoff:
+                expired.append(name)
+        return expired
+
+    def drop_partitions(self, conn: Connection, names: List[str]):
+        """删除分区（瞬时完成，不产生逐行删除的开销）"""
+        if names:
+            conn.execute(text(f"ALTER TABLE {self.table_name} DROP PARTITION {', '.join(names)}"))
+            logger.info(f"Dropped partitions on {self.table_name}: {names}")
+
+    def drop_expired(self, conn: Connection, cutoff: datetime) -> List[str]:
+        """删除所有早于 cutoff 的分区，返回删除的分区名"""
+        if not self.is_supported(conn):
+            return []
+        expired = self.expired_partitions(conn, cutoff)
+        self.drop_partitions(conn, expired)
+        return expired
@@ -0,0 +1,202 @@
+"""
+数据库连接池配置与监控
+- 连接池大小、溢出、超时、回收周期及连接检测策略均可通过 Settings 配置
+- 连接检测策略 (DB_POOL_PRE_PING):
+    always: 每次签出都执行 ping（SQLAlchemy pool_pre_ping，每次签出多一次往返）
+    idle:   只对空闲超过 DB_POOL_PRE_PING_IDLE 秒的连接执行 ping，活跃连接直接复用
+    never:  不检测，依赖 pool_recycle 及断线后的自动失效重连
+- 统计签出耗时、排队等待时间、使用中连接数、溢出及超时次数，供 /health 输出
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+class PoolMetrics:
+    """单个连接池的统计数据"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Optional[QueuePool] = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "checkouts": 0,
+            "checkout_time_total": 0.0,
+            "checkout_time_max": 0.0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "overflow_checkouts": 0,
+            "timeouts": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "pings": 0,
+            "ping_failures": 0,
+        }
+
+    def incr(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def record_wait(self, elapsed: float, overflow: bool = False):
+        with self._lock:
+            self.stats["waits"] += 1
+            self.stats["wait_time_total"] += elapsed
+            self.stats["wait_time_max"] = max(self.stats["wait_time_max"], elapsed)
+            if overflow:
+                self.stats["overflow_checkouts"] += 1
+
+    def record_checkout(self, elapsed: float):
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["checkout_time_total"] += elapsed
+            self.stats["checkout_time_max"] = max(self.stats["checkout_time_max"], elapsed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        checkouts = stats.pop("checkouts")
+        checkout_total = stats.pop("checkout_time_total")
+        waits = stats.pop("waits")
+        wait_total = stats.pop("wait_time_total")
+        result: Dict[str, Any] = {
+            "checkouts": checkouts,
+            "checkout_ms_avg": round(checkout_total / checkouts * 1000, 3) if checkouts else 0.0,
+            "checkout_ms_max": round(stats.pop("checkout_time_max") * 1000, 3),
+            "wait_ms_avg": round(wait_total / waits * 1000, 3) if waits else 0.0,
+            "wait_ms_max": round(stats.pop("wait_time_max") * 1000, 3),
+            **{key: int(value) for key, value in stats.items()},
+        }
+        if self.pool is not None:
+            result.update({
+                "pool_size": self.pool.size(),
+                "in_use": self.pool.checkedout(),
+                "idle": self.pool.checkedin(),
+                "overflow": max(self.pool.overflow(), 0),
+            })
+        return result
+
+
+class _InstrumentedPoolMixin:
+    """在连接池签出路径上计时，metrics 在 engine 创建后由 instrument_engine 设置"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        metrics = self.metrics
+        if metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - started)
+            metrics.incr("timeouts")
+            raise
+        metrics.record_wait(time.perf_counter() - started, self.overflow() > 0)
+        return record
+
+    def connect(self):
+        metrics = self.metrics
+        if metrics is None:
+            return super().connect()
+        started = time.perf_counter()
+        connection = super().connect()
+        # 包含排队等待及连接检测(ping)的总耗时
+        metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，统计对象需要随之转移
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """带统计的同步连接池"""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """带统计的异步连接池 (create_async_engine 使用)"""
+
+
+def pool_options(settings, is_async: bool = False) -> Dict[str, Any]:
+    """根据配置生成 create_engine 的连接池参数"""
+    strategy = settings.DB_POOL_PRE_PING
+    if strategy not in PRE_PING_STRATEGIES:
+        raise ValueError(f"Unsupported DB_POOL_PRE_PING: {strategy}")
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": strategy == "always",
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
+
+_registry: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(engine: Any, name: str, pre_ping: str = "never", idle_threshold: float = 30.0) -> PoolMetrics:
+    """
+    为 engine 的连接池挂载统计，并按需注册空闲连接检测
+
+    engine 可以是 Engine 或 AsyncEngine
+    """
+    sync_engine: Engine = getattr(engine, "sync_engine", engine)
+    metrics = PoolMetrics(name)
+    pool = sync_engine.pool
+    if isinstance(pool, _InstrumentedPoolMixin):
+        pool.metrics = metrics
+        metrics.pool = pool
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
+
+    if pre_ping == "idle":
+        dialect = sync_engine.dialect
+
+        @event.listens_for(sync_engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            connection_record.info["checkin_at"] = time.monotonic()
+
+        @event.listens_for(sync_engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            checkin_at = connection_record.info.get("checkin_at")
+            if checkin_at is None or time.monotonic() - checkin_at < idle_threshold:
+                return
+            metrics.incr("pings")
+            try:
+                dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                metrics.incr("ping_failures")
+                # 抛出 DisconnectionError 后连接池会丢弃该连接并重新建立
+                raise exc.DisconnectionError(f"Idle connection ping failed: {e}")
+
+    _registry[name] = metrics
+    return metrics
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """所有已挂载统计的连接池指标，键为连接池名称"""
+    return {name: metrics.get_stats() for name, metrics in _registry.items()}
@@ -2,16 +2,31 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import instrument_engine, pool_options
 
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **pool_options(settings)
 )
+instrument_engine(engine, "primary", settings.DB_POOL_PRE_PING, settings.DB_POOL_PRE_PING_IDLE)
+
+# 只读副本：未配置时与主库共用同一个 engine
+if settings.REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        settings.REPLICA_DATABASE_URL,
+        echo=settings.DEBUG,
+        **pool_options(settings)
+    )
+    instrument_engine(replica_engine, "replica", settings.DB_POOL_PRE_PING, settings.DB_POOL_PRE_PING_IDLE)
+else:
+    replica_engine = engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 只读查询会话（列表、遥测数据、聚合、导出），副本存在复制延迟，写后立即读的场景应使用 SessionLocal
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -19,4 +34,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
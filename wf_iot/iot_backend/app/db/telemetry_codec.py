@@ -0,0 +1,156 @@
+"""
+遥测数据列式压缩编码
+将同一设备一段时间内的多条遥测记录编码为一个压缩块：
+- 时间戳(微秒)、记录ID 以差分整数数组存储
+- 数值型指标按列存为 float64 数组（缺失值为 NaN）
+- 非数值字段按行保留在块头的 JSON 中
+整个块再经过 zlib 压缩
+"""
+
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+BLOCK_VERSION = 1
+_EPOCH = datetime(1970, 1, 1)
+_INT_LIMIT = 2 ** 53  # 超出该范围的整数无法用 float64 精确表示，按非数值字段保存
+_SWAP_BYTES = sys.byteorder != "little"  # 块内数组统一使用小端序
+
+
+class TelemetryRecord(NamedTuple):
+    """编码/解码使用的单条遥测记录"""
+    id: int
+    timestamp: datetime
+    data: Dict[str, Any]
+    quality: Optional[str] = "good"
+
+
+def _is_metric(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -_INT_LIMIT < value < _INT_LIMIT
+    return isinstance(value, float)
+
+
+def _to_us(ts: datetime) -> int:
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+def _delta_encode(values: List[int]) -> array:
+    deltas = array("q")
+    previous = 0
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+
+def _column_bytes(column: array) -> bytes:
+    if _SWAP_BYTES:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _delta_decode(deltas: array) -> List[int]:
+    values = []
+    current = 0
+    for delta in deltas:
+        current += delta
+        values.append(current)
+    return values
+
+
+def encode_block(records: List[TelemetryRecord]) -> bytes:
+    """将按时间排序的记录编码为压缩块"""
+    n = len(records)
+    metrics: Dict[str, array] = {}
+    int_metrics = set()
+    non_int_metrics = set()
+    extras: List[Optional[Dict[str, Any]]] = []
+
+    for row, record in enumerate(records):
+        extra = {}
+        for key, value in (record.data or {}).items():
+            if _is_metric(value):
+                column = metrics.get(key)
+                if column is None:
+                    column = metrics[key] = array("d", [math.nan] * n)
+                column[row] = float(value)
+                (int_metrics if isinstance(value, int) else non_int_metrics).add(key)
+            else:
+                extra[key] = value
+        extras.append(extra or None)
+
+    qualities = [record.quality for record in records]
+    names = sorted(metrics)
+    header = {
+        "v": BLOCK_VERSION,
+        "n": n,
+        "metrics": names,
+        "int_metrics": sorted(int_metrics - non_int_metrics),
+        "extras": extras if any(extras) else None,
+        # 质量字段绝大多数相同，只在不同时逐行保存
+        "quality": qualities[0] if len(set(qualities)) <= 1 and n else qualities,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    body = bytearray(struct.pack("<I", len(header_bytes)))
+    body += header_bytes
+    body += _column_bytes(_delta_encode([_to_us(record.timestamp) for record in records]))
+    body += _column_bytes(_delta_encode([record.id for record in records]))
+    for name in names:
+        body += _column_bytes(metrics[name])
+    return zlib.compress(bytes(body), 6)
+
+
+def decode_block(blob: bytes) -> List[TelemetryRecord]:
+    """解码压缩块为记录列表"""
+    body = zlib.decompress(blob)
+    (header_len,) = struct.unpack_from("<I", body, 0)
+    offset = 4 + header_len
+    header = json.loads(body[4:offset].decode("utf-8"))
+    if header.get("v") != BLOCK_VERSION:
+        raise ValueError(f"Unsupported telemetry block version: {header.get('v')}")
+
+    n = header["n"]
+
+    def take(typecode: str) -> array:
+        nonlocal offset
+        column = array(typecode)
+        size = column.itemsize * n
+        column.frombytes(body[offset:offset + size])
+        if _SWAP_BYTES:
+            column.byteswap()
+        offset += size
+        return column
+
+    timestamps = _delta_decode(take("q"))
+    ids = _delta_decode(take("q"))
+    int_metrics = set(header["int_metrics"])
+    columns = {name: take("d") for name in header["metrics"]}
+    extras = header.get("extras") or [None] * n
+    quality = header.get("quality")
+
+    records = []
+    for row in range(n):
+        data: Dict[str, Any] = {}
+        for name, column in columns.items():
+            value = column[row]
+            if not math.isnan(value):
+                data[name] = int(value) if name in int_metrics else value
+        if extras[row]:
+            data.update(extras[row])
+        records.append(TelemetryRecord(
+            id=ids[row],
+            timestamp=_EPOCH + timedelta(microseconds=timestamps[row]),
+            data=data,
+            quality=quality[row] if isinstance(quality, list) else quality,
+        ))
+    return records
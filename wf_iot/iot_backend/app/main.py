@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from app.api.v1.api import api_router
 from app.core.config import settings
 from app.services.protocol_manager import protocol_manager
+from app.services.telemetry_ingest import telemetry_pipeline
+from app.services.message_dispatcher import mqtt_dispatcher
+from app.core.cache import device_id_cache
+from app.services.presence_tracker import presence_tracker
+from app.db.pool import get_pool_stats
+from app.core.permission_cache import permission_cache
+from app.core.password_hasher import PasswordHasherBusyError, password_hasher
 
 
 @asynccontextmanager
@@ -36,6 +44,9 @@ async def lifespan(app: FastAPI):
         status = "✓" if success else "✗"
         print(f"{status} {protocol.upper()} service: {'Stopped' if success else 'Failed'}")
 
+    # 关闭密码哈希执行池
+    password_hasher.shutdown()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
@@ -55,6 +66,13 @@ app.add_middleware(
 # 包含API路由
 app.include_router(api_router,prefix=settings.API_V1_STR) # prefix="/api/v1"
 
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    """密码哈希排队已满（如Token集中过期后的登录洪峰），提示客户端稍后重试"""
+    return JSONResponse(status_code=503, content={"detail": "服务繁忙，请稍后重试"}, headers={"Retry-After": "1"})
+
+
 @app.get("/")
 async def root():
     return {
@@ -98,6 +116,27 @@ async def health_check():
     # 添加总体连接状态
     response["all_protocols_connected"] = all_connected
 
+    # MQTT消息分发器指标 (队列深度、处理耗时、拒绝数)
+    response["mqtt_dispatcher"] = mqtt_dispatcher.get_stats()
+
+    # 遥测批量写入管道指标 (队列深度、丢弃数等)
+    response["telemetry_ingest"] = telemetry_pipeline.get_stats()
+
+    # 设备标识解析缓存指标 (命中/未命中/淘汰)
+    response["device_id_cache"] = device_id_cache.get_stats()
+
+    # 设备在线状态跟踪指标
+    response["presence"] = presence_tracker.get_stats()
+
+    # 用户权限缓存指标
+    response["permission_cache"] = permission_cache.get_stats()
+
+    # 数据库连接池指标 (签出耗时、等待时间、使用中连接数、溢出/超时次数)
+    response["db_pool"] = get_pool_stats()
+
+    # 密码哈希执行池指标 (排队深度、等待耗时、拒绝数)
+    response["password_hasher"] = password_hasher.get_stats()
+
     return response
 
 if __name__ == "__main__":
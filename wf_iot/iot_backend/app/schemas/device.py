@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
@@ -50,6 +50,26 @@ class DeviceData(BaseModel):
         from_attributes = True
 
 
+class DeviceDataRollupPoint(BaseModel):
+    """单个指标单个时间桶的聚合值"""
+    metric: str
+    timestamp: datetime # 桶起始时间
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    avg: Optional[float] = None
+    last: Optional[float] = None
+
+
+class DeviceDataSeries(BaseModel):
+    """设备数据聚合查询响应模型"""
+    device_id: str
+    resolution: str # 1m, 1h, 1d
+    start_time: datetime
+    end_time: datetime
+    points: List[DeviceDataRollupPoint]
+
+
 class DeviceCommandCreate(BaseModel):
     """创建设备命令的请求模型"""
     device_id: int
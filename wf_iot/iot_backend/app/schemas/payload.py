@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, Union
+
+
+# 设备上报消息负载（MQTT/CoAP/AMQP），由 json_codec.decode 直接从 JSON bytes 构造
+
+class TelemetryPayload(BaseModel):
+    """设备数据上报 device/{device_id}/data"""
+    type: str = Field("telemetry", max_length=50)  # 与 device_data.data_type 列长度一致
+    data: Dict[str, Any] = {}
+    quality: str = Field("good", max_length=50)
+
+
+class StatusPayload(BaseModel):
+    """设备状态上报 device/{device_id}/status，保留设备附带的其他字段"""
+    status: str = "unknown"
+    class Config:
+        extra = "allow"
+
+
+class CommandResponsePayload(BaseModel):
+    """命令响应 device/{device_id}/command/response"""
+    command_id: Optional[Union[int, str]] = None  # 后端下发的命令ID为整数，设备原样回传
+    status: str = "acknowledged"
+    result: Optional[Any] = None
+
+
+class FirmwareStatusPayload(BaseModel):
+    """固件升级状态 device/{device_id}/firmware/status"""
+    task_id: str = ""
+    status: str = "unknown"
+    progress: int = 0
+    error: Optional[str] = None
+    class Config:
+        extra = "allow"
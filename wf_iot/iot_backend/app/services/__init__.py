@@ -8,6 +8,9 @@ from .protocol_registry import protocol_registry
 from .protocol_manager import protocol_manager
 from .mqtt_service import mqtt_service, mqtt_client
 from .device_command_service import device_command_service
+from .telemetry_ingest import telemetry_pipeline, TelemetryIngestPipeline
+from .presence_tracker import presence_tracker, PresenceTracker
+from .telemetry_export import telemetry_exporter, TelemetryExporter
 
 __all__ = [
     "ProtocolService",
@@ -16,4 +19,10 @@ __all__ = [
     "mqtt_service",
     "mqtt_client",
     "device_command_service",
+    "telemetry_pipeline",
+    "TelemetryIngestPipeline",
+    "presence_tracker",
+    "PresenceTracker",
+    "telemetry_exporter",
+    "TelemetryExporter",
 ]
@@ -3,11 +3,12 @@ AMQP协议服务实现
 用于企业级IoT消息传递
 """
 
-import json
 import asyncio
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from app.core.codec import json_codec
+from app.core.payload_formats import get_format, get_format_by_content_type
 from .protocol_base import ProtocolService
 
 try:
@@ -172,9 +173,11 @@ class AMQPService(ProtocolService):
             body: 消息体
         """
         try:
-            # 解析消息
-            data_str = body.decode('utf-8')
-            data = json.loads(data_str)
+            # 解析消息（直接解码 bytes），按消息的 content_type 选择格式（JSON / CBOR / MessagePack），未设置时按 JSON
+            payload_format = get_format_by_content_type(getattr(properties, "content_type", None))
+            if payload_format is None or not payload_format.schemaless:
+                payload_format = get_format("json")
+            data = payload_format.loads(body)
 
             # 更新设备状态
             if device_id in self.devices:
@@ -185,7 +188,7 @@ class AMQPService(ProtocolService):
 
             self._log_message(
                 "DEBUG",
-                f"Received AMQP message: {data_str[:100]}",
+                f"Received AMQP message: {body[:100]!r}",
                 device_id
             )
 
@@ -261,7 +264,7 @@ class AMQPService(ProtocolService):
             properties = command.get("properties", {})
 
             # 序列化负载
-            body = json.dumps(payload).encode('utf-8')
+            body = json_codec.dumps(payload)
 
             # 设置消息属性
             msg_properties = pika.BasicProperties(
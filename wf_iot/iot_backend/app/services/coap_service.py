@@ -4,10 +4,11 @@ CoAP协议服务实现
 """
 
 import asyncio
-import json
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+from app.core.codec import PayloadDecodeError
+from app.core.payload_formats import get_format, get_format_by_content_type, resolve_format_name
 from .protocol_base import ProtocolService
 
 try:
@@ -24,10 +25,11 @@ except ImportError:
 class CoAPDevice:
     """CoAP设备连接管理"""
 
-    def __init__(self, device_id: str, endpoint: str, resources: Dict[str, str]):
+    def __init__(self, device_id: str, endpoint: str, resources: Dict[str, str], content_format: str = "application/json"):
         self.device_id = device_id
         self.endpoint = endpoint
         self.resources = resources
+        self.content_format = content_format  # 命令未指定内容格式时使用的格式
         self.last_seen = datetime.now()
         self.status = "online"
 
@@ -72,7 +74,8 @@ class CoAPService(ProtocolService):
             device = CoAPDevice(
                 device_id=device_id,
                 endpoint=endpoint,
-                resources=resources
+                resources=resources,
+                content_format=self._negotiate_content_format(device_id, device_config)
             )
 
             # 测试连接 (发送GET请求到心跳资源)
@@ -92,6 +95,16 @@ class CoAPService(ProtocolService):
             self._log_message("ERROR", f"Connection failed: {e}", device_id)
             return False
 
+    def _negotiate_content_format(self, device_id: str, device_config: Dict[str, Any]) -> str:
+        """按设备元数据协商命令负载格式，格式不可用或只能按模型编码(Protobuf)时使用 JSON"""
+        name = resolve_format_name(device_config, device_config.get("product_id"))
+        try:
+            payload_format = get_format(name)
+        except ValueError as e:
+            self._log_message("WARNING", f"{e}, falling back to JSON", device_id)
+            return "application/json"
+        return payload_format.content_type if payload_format.schemaless else "application/json"
+
     async def disconnect_device(self, device_id: str) -> bool:
         """
         断开CoAP设备连接
@@ -120,7 +133,7 @@ class CoAPService(ProtocolService):
                 "resource": str,  # 资源路径
                 "method": str,    # HTTP方法 (GET/POST/PUT/DELETE)
                 "payload": dict,  # 可选，数据负载
-                "content_format": str  # 可选，内容格式 (如: application/json)
+                "content_format": str  # 可选，内容格式 (如: application/json、application/cbor)，默认为设备协商的格式
             }
 
         Returns:
@@ -135,7 +148,7 @@ class CoAPService(ProtocolService):
             resource_path = command.get("resource")
             method = command.get("method", "GET").upper()
             payload = command.get("payload")
-            content_format = command.get("content_format", "application/json")
+            content_format = command.get("content_format") or device.content_format
 
             if not resource_path:
                 self._log_message("ERROR", "Command resource path not specified", device_id)
@@ -230,36 +243,43 @@ class CoAPService(ProtocolService):
             uri = resource_path
             message = Message(code=method, uri=uri)
 
-            # 添加负载
+            # 添加负载，按内容格式编码（JSON / CBOR / MessagePack）
             if payload:
-                if content_format == "application/json":
-                    message.payload = json.dumps(payload).encode('utf-8')
+                payload_format = get_format_by_content_type(content_format)
+                if payload_format is not None:
+                    message.payload = payload_format.dumps(payload)
                 else:
                     message.payload = str(payload).encode('utf-8')
 
-                # 设置内容格式选项
-                if content_format == "application/json":
-                    message.opt.content_format = aiocoap.media_types.codes['application/json']
+                # 设置内容格式选项（只设置已注册 CoAP Content-Format 编号的类型）
+                try:
+                    message.opt.content_format = aiocoap.ContentFormat.by_media_type(content_format)
+                except KeyError:
+                    pass
 
             # 发送请求
             request = self.context.request(message)
             response = await request.response
 
-            # 解析响应
+            # 解析响应，按响应的 Content-Format 选择负载格式，未设置时按 JSON 解析
             if response:
                 try:
-                    response_data = json.loads(response.payload.decode('utf-8'))
+                    response_format = response.opt.content_format
+                    payload_format = None
+                    if response_format is not None and response_format.is_known():
+                        payload_format = get_format_by_content_type(response_format.media_type)
+                    response_data = (payload_format or get_format("json")).loads(response.payload)
                     return {
                         "status": "success",
                         "code": str(response.code),
                         "payload": response_data,
                         "timestamp": datetime.now().isoformat()
                     }
-                except json.JSONDecodeError:
+                except PayloadDecodeError:
                     return {
                         "status": "success",
                         "code": str(response.code),
-                        "payload": response.payload.decode('utf-8'),
+                        "payload": response.payload.decode('utf-8', errors='replace'),
                         "timestamp": datetime.now().isoformat()
                     }
             else:
@@ -7,8 +7,8 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 
-from app.db.session import SessionLocal
-from app.crud.device import device_command_crud
+from app.db.async_session import AsyncSessionLocal
+from app.crud.async_device import async_device_crud, async_device_command_crud
 from app.schemas.device import DeviceCommandCreate
 from .protocol_manager import protocol_manager
 
@@ -50,11 +50,10 @@ class DeviceCommandService:
         Returns:
             Optional[int]: 创建的命令记录ID，失败返回None
         """
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             # 获取设备信息
-            from app.crud.device import device_crud
-            device = device_crud.get(db, device_id)
+            device = await async_device_crud.get(db, device_id)
 
             if not device:
                 logger.error(f"Device not found: {device_id}")
@@ -96,11 +95,11 @@ class DeviceCommandService:
                 command_data=protocol_command
             )
 
-            db_command = device_command_crud.create(db, obj_in=device_command)
+            db_command = await async_device_command_crud.create(db, obj_in=device_command)
 
             # 更新命令状态
             if success:
-                device_command_crud.update_status(
+                await async_device_command_crud.update_status(
                     db,
                     db_command.id,
                     "sent",
@@ -110,7 +109,7 @@ class DeviceCommandService:
                     f"Command sent successfully: {device.device_id} - {command_type}"
                 )
             else:
-                device_command_crud.update_status(
+                await async_device_command_crud.update_status(
                     db,
                     db_command.id,
                     "failed",
@@ -127,7 +126,7 @@ class DeviceCommandService:
             return None
 
         finally:
-            db.close()
+            await db.close()
 
     def _prepare_protocol_command(
         self,
@@ -223,11 +222,11 @@ class DeviceCommandService:
 
         method = method_map.get(command_type, "POST")
 
+        # 未指定 content_format，由 CoAP 服务按设备协商的负载格式编码
         return {
             "resource": resource,
             "method": method,
-            "payload": command_data.get("data", {}),
-            "content_format": "application/json"
+            "payload": command_data.get("data", {})
         }
 
     def _prepare_amqp_command(
@@ -292,10 +291,10 @@ class DeviceCommandService:
                 logger.warning(f"No command_id in response from {device_id}")
                 return False
 
-            db = SessionLocal()
+            db = AsyncSessionLocal()
             try:
                 # 更新命令状态
-                device_command_crud.update_status(
+                await async_device_command_crud.update_status(
                     db,
                     command_id,
                     status,
@@ -311,7 +310,7 @@ class DeviceCommandService:
                 return True
 
             finally:
-                db.close()
+                await db.close()
 
         except Exception as e:
             logger.error(f"Error handling command response: {e}")
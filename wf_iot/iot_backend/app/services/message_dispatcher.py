@@ -0,0 +1,213 @@
+"""
+按分区键分发的消息处理线程池
+MQTT 网络线程只负责按设备ID入队，消息解析、写库等处理在工作线程中执行，
+同一设备的消息始终进入同一工作线程的队列，保持处理顺序
+"""
+
+import logging
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "reject", "drop_oldest")
+
+# (处理函数, 参数, 入队时间)
+_Task = Tuple[Callable[..., Any], tuple, float]
+
+
+class PartitionedDispatcher:
+    """
+    分区消息分发器
+
+    特性:
+    - workers 个工作线程，各自有容量为 queue_size 的有界队列，分区键经 CRC32 取模选择队列
+    - 队列满时按 overflow 处理: block 阻塞调用方至多 block_timeout 秒后拒绝 /
+      reject 立即拒绝新消息 / drop_oldest 丢弃该队列中最早的消息
+    - 处理函数的异常只记录日志并计数，不影响后续消息
+    - 统计队列深度、排队及处理耗时、拒绝与丢弃数
+    """
+
+    def __init__(
+        self,
+        name: str = "dispatcher",
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        overflow: Optional[str] = None,
+        block_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.workers = max(workers or settings.MQTT_DISPATCH_WORKERS, 1)
+        self.queue_size = queue_size or settings.MQTT_DISPATCH_QUEUE_SIZE
+        self.overflow = overflow or settings.MQTT_DISPATCH_OVERFLOW
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported MQTT_DISPATCH_OVERFLOW: {self.overflow}")
+        self.block_timeout = block_timeout if block_timeout is not None else settings.MQTT_DISPATCH_BLOCK_TIMEOUT
+
+        self._queues: List["queue.Queue[Optional[_Task]]"] = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)
+        ]
+        self._threads: List[threading.Thread] = []
+        # 已发送结束标记但仍有工作线程未退出（stop 超时）
+        self._stopping = False
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "submitted": 0,       # 成功入队条数
+            "rejected": 0,        # 队列满被拒绝条数
+            "dropped": 0,         # drop_oldest 策略下被丢弃的排队消息数
+            "completed": 0,       # 处理完成条数
+            "errors": 0,          # 处理函数抛出异常条数
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "handle_time_total": 0.0,
+            "handle_time_max": 0.0,
+            "queue_depth_max": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _incr(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def partition(self, key: str) -> int:
+        """分区键对应的工作线程序号，同一进程及不同进程间稳定"""
+        return zlib.crc32(key.encode("utf-8")) % self.workers
+
+    def submit(self, key: str, handler: Callable[..., Any], *args: Any) -> bool:
+        """
+        提交一条消息，由 key 对应的工作线程调用 handler(*args)
+
+        Returns:
+            bool: 是否成功入队，False表示因队列满被拒绝
+        """
+        target = self._queues[self.partition(key)]
+        task = (handler, args, time.monotonic())
+        try:
+            if self.overflow == "block":
+                target.put(task, timeout=self.block_timeout)
+            elif self.overflow == "reject":
+                target.put_nowait(task)
+            else:
+                self._put_drop_oldest(target, task)
+        except queue.Full:
+            self._incr("rejected")
+            logger.warning(f"{self.name} queue full, rejected message for {key}")
+            return False
+
+        depth = target.qsize()
+        with self._stats_lock:
+            self.stats["submitted"] += 1
+            if depth > self.stats["queue_depth_max"]:
+                self.stats["queue_depth_max"] = depth
+        return True
+
+    def _put_drop_oldest(self, target: "queue.Queue", task: _Task):
+        while True:
+            try:
+                target.put_nowait(task)
+                return
+            except queue.Full:
+                try:
+                    target.get_nowait()
+                    self._incr("dropped")
+                except queue.Empty:
+                    pass
+
+    def start(self):
+        """启动工作线程"""
+        if self._stopping:
+            # 上次 stop 超时，旧工作线程仍在处理剩余消息，等其退出后再启动，同一队列不会有两个线程消费（保持按设备的顺序）
+            logger.warning(f"{self.name} workers from the previous stop are still draining, waiting for them to exit")
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+            self._stopping = False
+        if self.running:
+            return
+        self._threads = [
+            threading.Thread(target=self._run, args=(q,), name=f"{self.name}-{i}", daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"{self.name} started (workers={self.workers}, queue_size={self.queue_size}, overflow={self.overflow})")
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止工作线程，已入队的消息处理完后退出"""
+        if not self._threads:
+            return
+        if not self._stopping:
+            self._stopping = True
+            for q in self._queues:
+                # 结束标记不受容量限制，确保排在已入队消息之后
+                with q.mutex:
+                    q.queue.append(None)
+                    q.unfinished_tasks += 1
+                    q.not_empty.notify()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            # 保留仍在运行的线程，start 会等它们退出
+            logger.warning(f"{self.name} stop timed out, {len(self._threads)} workers still draining")
+            return
+        self._stopping = False
+        logger.info(f"{self.name} stopped, stats: {self.get_stats()}")
+
+    def _run(self, tasks: "queue.Queue[Optional[_Task]]"):
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            handler, args, enqueued_at = task
+            started = time.monotonic()
+            try:
+                handler(*args)
+            except Exception as e:
+                self._incr("errors")
+                logger.error(f"Error in {self.name} handler: {e}")
+            finished = time.monotonic()
+            wait, elapsed = started - enqueued_at, finished - started
+            with self._stats_lock:
+                self.stats["completed"] += 1
+                self.stats["wait_time_total"] += wait
+                self.stats["wait_time_max"] = max(self.stats["wait_time_max"], wait)
+                self.stats["handle_time_total"] += elapsed
+                self.stats["handle_time_max"] = max(self.stats["handle_time_max"], elapsed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分发器运行指标"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        completed = stats["completed"]
+        depths = [q.qsize() for q in self._queues]
+        return {
+            "workers": self.workers,
+            "overflow": self.overflow,
+            "submitted": int(stats["submitted"]),
+            "completed": int(completed),
+            "rejected": int(stats["rejected"]),
+            "dropped": int(stats["dropped"]),
+            "errors": int(stats["errors"]),
+            "queue_depth": sum(depths),
+            "queue_depth_max": int(stats["queue_depth_max"]),
+            "queue_capacity": self.queue_size * self.workers,
+            "busiest_queue_depth": max(depths),
+            "wait_ms_avg": round(stats["wait_time_total"] / completed * 1000, 3) if completed else 0.0,
+            "wait_ms_max": round(stats["wait_time_max"] * 1000, 3),
+            "handle_ms_avg": round(stats["handle_time_total"] / completed * 1000, 3) if completed else 0.0,
+            "handle_ms_max": round(stats["handle_time_max"] * 1000, 3),
+        }
+
+
+# 全局MQTT消息分发器实例
+mqtt_dispatcher = PartitionedDispatcher(name="mqtt-dispatcher")
@@ -1,139 +1,162 @@
-import json
 import logging
 import paho.mqtt.client as mqtt
 
 from typing import Optional
 from datetime import datetime
 
+from app.core.codec import PayloadDecodeError, json_codec
+from app.core.payload_formats import get_format, is_json, payload_format_cache
 from app.core.config import settings
 from app.db.session import SessionLocal
 from app.crud.device import device_crud, device_data_crud, device_command_crud
 from app.schemas.device import DeviceDataCreate, DeviceUpdate
+from app.schemas.payload import CommandResponsePayload, FirmwareStatusPayload, StatusPayload, TelemetryPayload
+from app.services.telemetry_ingest import telemetry_pipeline
+from app.services.presence_tracker import presence_tracker
+from app.services.message_dispatcher import mqtt_dispatcher
+from app.services.mqtt_subscriptions import build_client_id, create_client, subscription_plan
+from app.services.topic_router import Route, TopicRouter
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_TOPIC = "device/+/heartbeat"
+
+# 订阅的设备相关主题及 QoS
+DEVICE_TOPICS = [
+    ("device/+/data", 0),  # 设备数据上报
+    ("device/+/status", 0),  # 设备状态上报
+    ("device/+/command/response", 0),  # 命令响应
+    (HEARTBEAT_TOPIC, 0),  # 设备心跳
+    ("device/+/firmware/status", 0)  # 固件升级状态
+]
+
+
 class MQTTService:
     def __init__(self):
         self.client: Optional[mqtt.Client] = None
         self.connected = False
+        self.client_id: Optional[str] = None
+        # 设备主题路由，处理函数调用方式为 handler(device_id, payload)，payload 为原始 bytes
+        self.router = TopicRouter()
+        self.router.add("device/{device_id}/data", self._handle_device_data, "data")
+        self.router.add("device/{device_id}/status", self._handle_device_status, "status")
+        self.router.add("device/{device_id}/heartbeat", self._handle_device_hearbeat, "heartbeat")
+        self.router.add("device/{device_id}/command/response", self._handle_command_response, "command_response")
+        self.router.add("device/{device_id}/firmware/status", self._handle_firmware_status, "firmware_status")
+
+    def register_handler(self, pattern: str, handler, name: Optional[str] = None) -> Route:
+        """
+        注册设备消息处理函数（插件扩展入口），已有模式的处理函数会被替换
+
+        handler 的调用方式为 handler(*通配符参数, payload)，payload 为原始 bytes，模式需以 device/{device_id}/ 开头，
+        且须在订阅的主题范围内才能收到消息
+        """
+        return self.router.add(pattern, handler, name)
 
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             self.connected = True
-            logger.info("Connected to MQTT broker")
-
-            # 订阅设备相关主题
-            topics = [
-                "device/+/data",  # 设备数据上报
-                "device/+/status",  # 设备状态上报
-                "device/+/command/response",  # 命令响应
-                "device/+/heartbeat",  # 设备心跳
-                "device/+/firmware/status"  # 固件升级状态
-            ]
-            for topic in topics:
-                client.subscribe(topic)
+            logger.info(f"Connected to MQTT broker as {self.client_id}")
+
+            # 订阅设备相关主题（启用共享订阅时同组实例分摊消息）
+            for topic, qos in subscription_plan(
+                DEVICE_TOPICS,
+                settings.MQTT_SHARED_SUBSCRIPTION,
+                settings.MQTT_SHARED_GROUP,
+                settings.MQTT_SHARED_GROUPS,
+            ):
+                client.subscribe(topic, qos)
                 logger.info(f"Subscribed to topic: {topic}")
         else:
             self.connected = False
             logger.error("Failed to connect to MQTT broker, return code{rc}")
 
-    def on_disconnect(self, client, userdata, rc):
+    def on_disconnect(self, client, userdata, rc, properties=None):
         self.connected = False
         logger.warning(f"Disconnected from MQTT broker, return code{rc}")
 
     def on_message(self, client, userdata, msg):
+        """网络线程中只查找路由并按设备ID分发，处理在分发器的工作线程中执行"""
+        result = self.router.match(msg.topic)
+        if result is None:
+            logger.warning(f"No handler for topic:{msg.topic}")
+            return
+        route, params = result
+        mqtt_dispatcher.submit(params[0] if params else msg.topic, self._process_message, route, params, msg.payload)
+
+    def _process_message(self, route: Route, params: tuple, payload: bytes):
         try:
-            topic = msg.topic
-            payload = msg.payload.decode("utf-8")
-            logger.info(f"Received message on topic: {topic} -> payload: {payload}")
-
-            # 解析主题
-            topic_parts = topic.split("/")
-            if len(topic_parts) < 3:
-                logger.warning(f"Invalid topic format:{topic}")
-                return
-            device_id = topic_parts[1]
-            message_type = topic_parts[2]
-
-            # 处理不同类型的消息
-            if message_type == "data":
-                self._handle_device_data(device_id,payload)
-            elif message_type == "status":
-                self._handle_device_status(device_id,payload)
-            elif message_type == "heartbeat":
-                self._handle_device_hearbeat(device_id,payload)
-            elif message_type == "command" and len(topic_parts) > 3 and topic_parts[3] == "response":
-                self._handle_command_response(device_id, payload)
-            elif message_type == "firmware" and len(topic_parts) > 3 and topic_parts[3] == "status":
-                self._handle_firmware_status(device_id, payload)
-            else:
-                logger.warning(f"Unknown message type: {message_type}")
+            logger.debug(f"Received {route.name} message: {params}")
+            route.handler(*params, payload)
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
 
-    def _handle_device_data(self, device_id, payload:str):
-        """处理设备数据上报"""
-        try:
-            data = json.loads(payload)
+    def _decode_payload(self, device_id: str, payload: bytes, schema):
+        """按设备协商的负载格式解码为负载模型，JSON 负载不查询设备格式"""
+        if is_json(payload):
+            return json_codec.decode(payload, schema)
+        name = payload_format_cache.get(device_id)
+        if name is None:
             db = SessionLocal()
             try:
-                device_data = DeviceDataCreate(
-                    device_id=device_id,
-                    data_type=data.get("type","telemetry"),
-                    data=data.get("data",{}),
-                    quality=data.get("quality","good")
-                )
-                device_data_crud.create(db, obj_in=device_data)
-                logger.info(f"Saved device data: {device_id}")
+                name = device_crud.resolve_payload_format(db, device_id)
             finally:
                 db.close()
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in device data: {payload}")
+        return get_format(name).decode(payload, schema)
+
+    def _handle_device_data(self, device_id, payload:bytes):
+        """处理设备数据上报，放入批量写入管道"""
+        try:
+            data = self._decode_payload(device_id, payload, TelemetryPayload)
+            accepted = telemetry_pipeline.submit(
+                device_id=device_id,
+                data_type=data.type,
+                data=data.data,
+                quality=data.quality
+            )
+            if accepted:
+                logger.debug(f"Queued device data: {device_id}")
+        except PayloadDecodeError:
+            logger.error(f"Invalid payload in device data: {payload}")
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
 
-    def _handle_device_status(self, device_id, payload:str):
+    def _handle_device_status(self, device_id, payload:bytes):
         """处理设备状态上报"""
         try:
-            status_data = json.loads(payload)
-            status = status_data.get("status", "unknown")
+            status = self._decode_payload(device_id, payload, StatusPayload).status
             db = SessionLocal()
             try:
                 device = device_crud.update_status(db, device_id, status)
                 if device:
+                    presence_tracker.observe_status(device_id, status)
                     logger.info(f"Updated status for device {device_id}:{status}")
                 else:
                     logger.warning(f"Device not found: {device_id}")
             finally:
                 db.close()
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in device status: {payload}")
+        except PayloadDecodeError:
+            logger.error(f"Invalid payload in device status: {payload}")
         except Exception as e:
             logger.error(f"Error handling device status: {e}")
 
-    def _handle_device_hearbeat(self, device_id:str, payload:str):
+    def _handle_device_hearbeat(self, device_id:str, payload:bytes):
+        """处理设备心跳，只更新在线跟踪器，由跟踪器合并写库"""
         try:
-            db = SessionLocal()
-            try:
-                device = device_crud.update_status(db, device_id, "online")
-                if device:
-                    logger.debug(f"Heartbeat received from device {device_id}")
-                else:
-                    logger.warning(f"Device not found: {device_id}")
-            finally:
-                db.close()
+            presence_tracker.touch(device_id)
+            logger.debug(f"Heartbeat received from device {device_id}")
         except Exception as e:
             logger.error(f"Error handling device heartbeat: {e}")
 
-    def _handle_command_response(self, device_id, payload:str):
+    def _handle_command_response(self, device_id, payload:bytes):
         """处理命令响应"""
         try:
-            response_data = json.loads(payload)
-            command_id = response_data.get("command_id")
-            status = response_data.get("status", "acknowledged")
-            result = response_data.get("result")
+            response_data = self._decode_payload(device_id, payload, CommandResponsePayload)
+            command_id = response_data.command_id
+            status = response_data.status
+            result = response_data.result
             if command_id:
                 db = SessionLocal()
                 try:
@@ -143,30 +166,58 @@ class MQTTService:
                     logger.info(f"Updated command {command_id} status:{status}")
                 finally:
                     db.close()
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in command response: {payload}")
+        except PayloadDecodeError:
+            logger.error(f"Invalid payload in command response: {payload}")
         except Exception as e:
             logger.error(f"Error handling command response: {e}")
 
-    def _handle_firmware_status(self, device_id, payload:str):
+    def _handle_firmware_status(self, device_id, payload:bytes):
         """处理固件升级状态"""
         try:
-            status_data = json.loads(payload)
+            status_data = self._decode_payload(device_id, payload, FirmwareStatusPayload)
             # 这里可以更新固件升级任务的状态
             # 具体实现依赖于固件升级模块
             logger.info(f"Firmware status from device {device_id}:{status_data}")
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in firmware status: {payload}")
+        except PayloadDecodeError:
+            logger.error(f"Invalid payload in firmware status: {payload}")
         except Exception as e:
             logger.error(f"Error handling firmware status: {e}")
 
+    @staticmethod
+    def _check_presence_config():
+        """心跳共享订阅时各实例只收到部分心跳，本地在线状态会误判离线，须使用Redis共享最后心跳时间"""
+        if settings.PRESENCE_REDIS_ENABLED:
+            return
+        plan = subscription_plan(
+            [(HEARTBEAT_TOPIC, 0)],
+            settings.MQTT_SHARED_SUBSCRIPTION,
+            settings.MQTT_SHARED_GROUP,
+            settings.MQTT_SHARED_GROUPS,
+        )
+        if plan[0][0] != HEARTBEAT_TOPIC:
+            raise ValueError(
+                f"{HEARTBEAT_TOPIC} uses a shared subscription but PRESENCE_REDIS_ENABLED is off: "
+                f"set MQTT_SHARED_GROUPS['{HEARTBEAT_TOPIC}'] to \"\" or enable PRESENCE_REDIS_ENABLED"
+            )
+
     def start(self):
-        """启动MQTT客户端"""
+        """
+        启动MQTT客户端
+
+        Raises:
+            ValueError: 心跳主题共享订阅但未启用 PRESENCE_REDIS_ENABLED（配置错误时拒绝启动，而不是只记录日志）
+        """
+        self._check_presence_config()
         try:
-            self.client = mqtt.Client(client_id="iot_backend_service")
+            self.client_id = build_client_id(settings.MQTT_CLIENT_ID_PREFIX, settings.MQTT_INSTANCE_ID)
+            self.client = create_client(self.client_id, settings.MQTT_PROTOCOL)
             self.client.on_connect = self.on_connect
             self.client.on_disconnect = self.on_disconnect
             self.client.on_message = self.on_message
+            # 启动遥测批量写入管道、在线状态跟踪器和消息分发器
+            telemetry_pipeline.start()
+            presence_tracker.start()
+            mqtt_dispatcher.start()
             # 设置认证信息
             if settings.MQTT_USERNAME and settings.MQTT_PASSWORD:
                 self.client.username_pw_set(settings.MQTT_USERNAME,settings.MQTT_PASSWORD)
@@ -183,6 +234,10 @@ class MQTTService:
         if self.client:
             self.client.loop_stop()
             self.client.disconnect()
+            # 网络循环停止后依次排空分发队列和写入管道，各自限时，数据库不可用时不会阻塞关闭
+            mqtt_dispatcher.stop(timeout=10)
+            telemetry_pipeline.stop(timeout=settings.TELEMETRY_DRAIN_TIMEOUT)
+            presence_tracker.stop()
             logger.info("MQTT service stopped")
 
     def publish(self, topic: str, payload: str, qos: int = 1):
@@ -0,0 +1,80 @@
+"""
+MQTT 客户端标识与共享订阅
+- 每个实例使用唯一的 client ID（前缀 + 实例标识），多个副本同时连接时不会互相踢下线
+- 设备主题以 $share/<group>/<topic> 形式订阅，同组的多个实例由 broker 分摊消息，每条消息只投递给组内一个实例；
+  可按主题配置不同的组，组名为空字符串时该主题按普通订阅处理（每个实例都收到）
+- 共享订阅不保证同一设备的消息总是投递到同一实例，需要设备级顺序时应在 broker 侧
+  使用按主题/客户端哈希的分配策略（如 EMQX shared_subscription_strategy = hash_topic）
+"""
+
+import os
+import socket
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+SHARE_PREFIX = "$share/"
+
+PROTOCOLS = {
+    "5": mqtt.MQTTv5,
+    "3.1.1": mqtt.MQTTv311,
+}
+
+
+def build_client_id(prefix: str, instance_id: Optional[str] = None) -> str:
+    """
+    生成实例唯一的 client ID
+
+    指定 instance_id（如 Pod 名称）时结果固定，便于在 broker 侧定位；
+    未指定时使用 主机名-进程号-随机后缀，同一主机上的多个进程或重启后的进程也不会重复
+    """
+    if not instance_id:
+        instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    return f"{prefix}-{instance_id}"
+
+
+def shared_topic(topic: str, group: str) -> str:
+    """普通主题过滤器 -> $share/<group>/<topic>"""
+    if not group or any(ch in group for ch in "/+#"):
+        raise ValueError(f"Invalid shared subscription group: {group!r}")
+    return f"{SHARE_PREFIX}{group}/{topic}"
+
+
+def strip_share(topic_filter: str) -> str:
+    """$share/<group>/<topic> -> <topic>，普通主题过滤器原样返回"""
+    if topic_filter.startswith(SHARE_PREFIX):
+        return topic_filter.split("/", 2)[2]
+    return topic_filter
+
+
+def subscription_plan(
+    topics: Iterable[Tuple[str, int]],
+    shared: bool,
+    default_group: str,
+    groups: Optional[Dict[str, str]] = None,
+) -> List[Tuple[str, int]]:
+    """
+    生成实际订阅的 (主题过滤器, QoS) 列表
+
+    Args:
+        topics: 需要订阅的设备主题及 QoS
+        shared: 是否启用共享订阅，关闭时原样返回
+        default_group: 未在 groups 中配置的主题使用的组
+        groups: 主题 -> 组名，组名为空字符串表示该主题不共享
+    """
+    groups = groups or {}
+    plan = []
+    for topic, qos in topics:
+        group = groups.get(topic, default_group) if shared else ""
+        plan.append((shared_topic(topic, group) if group else topic, qos))
+    return plan
+
+
+def create_client(client_id: str, protocol: str = "5") -> mqtt.Client:
+    """按协议版本创建 paho 客户端（MQTT 5 不使用 clean_session 参数）"""
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"Unsupported MQTT protocol version: {protocol}")
+    if PROTOCOLS[protocol] == mqtt.MQTTv5:
+        return mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv5)
+    return mqtt.Client(client_id=client_id, clean_session=True, protocol=PROTOCOLS[protocol])
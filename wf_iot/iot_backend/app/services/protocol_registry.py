@@ -4,8 +4,9 @@
 """
 
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from .protocol_base import ProtocolService
+from .topic_router import Route, TopicRouter
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +14,12 @@ logger = logging.getLogger(__name__)
 class ProtocolRegistry:
     """
     协议注册器 - 单例模式
-    管理所有已注册的协议服务实例
+    管理所有已注册的协议服务实例，并按消息地址（如 coap/{device_id}/...）在协议间路由
     """
 
     _instance = None
     _services: Dict[str, ProtocolService] = {}
+    _router: TopicRouter = TopicRouter()
     _initialized = False
 
     def __new__(cls):
@@ -30,6 +32,7 @@ class ProtocolRegistry:
         """初始化注册器 (只执行一次)"""
         if not self._initialized:
             self._services = {}
+            self._router = TopicRouter()
             self._initialized = True
             logger.info("ProtocolRegistry initialized")
 
@@ -50,9 +53,15 @@ class ProtocolRegistry:
             logger.warning(f"Protocol {protocol_name} already registered, replacing...")
 
         instance._services[protocol_name] = service
+        # 默认路由: <protocol>/<device_id>/... 交给该协议处理
+        instance._router.add(cls._default_route(protocol_name), protocol_name, protocol_name)
         logger.info(f"Registered protocol service: {protocol_name}")
         return True
 
+    @staticmethod
+    def _default_route(protocol_name: str) -> str:
+        return f"{protocol_name}/{{device_id}}/#"
+
     @classmethod
     def get_service(cls, protocol_name: str) -> Optional[ProtocolService]:
         """
@@ -108,6 +117,9 @@ class ProtocolRegistry:
         instance = cls()
         if protocol_name in instance._services:
             service = instance._services.pop(protocol_name)
+            for route in instance._router.routes():
+                if route.handler == protocol_name:
+                    instance._router.remove(route.pattern)
             logger.info(f"Unregistered protocol service: {protocol_name}")
             return True
         else:
@@ -178,6 +190,71 @@ class ProtocolRegistry:
         logger.debug(f"Handling {protocol} message from device: {device_id}")
         return await service.handle_message(device_id, data)
 
+    @classmethod
+    def add_route(cls, pattern: str, protocol_name: str) -> Route:
+        """
+        注册跨协议路由
+
+        Args:
+            pattern: 消息地址模式，需包含 {device_id} 参数，如 sensors/{device_id}/temperature
+            protocol_name: 处理匹配消息的协议名称（路由时须已注册）
+
+        Returns:
+            Route: 已注册的路由
+
+        Raises:
+            ValueError: 模式不合法或不包含 {device_id}
+        """
+        instance = cls()
+        if "device_id" not in instance._router.parse_pattern(pattern):
+            raise ValueError(f"Route pattern must contain {{device_id}}: {pattern}")
+        route = instance._router.add(pattern, protocol_name, protocol_name)
+        logger.info(f"Added route {pattern} -> {protocol_name}")
+        return route
+
+    @classmethod
+    def remove_route(cls, pattern: str) -> bool:
+        """注销跨协议路由"""
+        instance = cls()
+        return instance._router.remove(pattern)
+
+    @classmethod
+    def resolve(cls, address: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        查找消息地址对应的协议
+
+        Args:
+            address: 消息地址，如 coap/device001/sensors/temp
+
+        Returns:
+            Optional[Tuple]: (协议名称, 命名参数)，未匹配时返回None
+        """
+        instance = cls()
+        result = instance._router.match(address)
+        if result is None:
+            return None
+        route, params = result
+        return route.handler, route.params_dict(params)
+
+    @classmethod
+    async def route_message(cls, address: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        按消息地址路由到对应协议服务处理
+
+        Args:
+            address: 消息地址
+            data: 消息数据
+
+        Returns:
+            Optional[Dict]: 标准化后的数据，地址无匹配路由时返回None
+        """
+        resolved = cls.resolve(address)
+        if resolved is None:
+            logger.warning(f"No route for address: {address}")
+            return None
+        protocol, params = resolved
+        return await cls.handle_device_message(protocol, params["device_id"], data)
+
     @classmethod
     def is_protocol_supported(cls, protocol_name: str) -> bool:
         """
@@ -0,0 +1,270 @@
+"""
+遥测数据流式导出服务
+以服务端游标分块读取设备数据（含已压缩归档的数据），按排序键 (timestamp, id) 升序
+逐块编码为 NDJSON / CSV / Parquet 输出，内存占用与导出总量无关
+每行附带该行排序键的不透明游标 (app/core/pagination.py)，中断后以最后收到的游标续传
+"""
+
+import csv
+import heapq
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_filter
+from app.crud.device import device_data_crud
+from app.db.models.device import DeviceData, DeviceDataArchive
+from app.db.session import ReadSessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ["device_id", "timestamp", "id", "data_type", "quality", "data", "cursor"]
+
+# (timestamp, id, 设备标识, data_type, quality, data)
+ExportRow = Tuple[datetime, int, str, Optional[str], Optional[str], Dict[str, Any]]
+
+
+def decode_export_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析导出续传游标为排序键 (timestamp, id)
+
+    Raises:
+        InvalidCursorError: 游标无法解析或不是导出行的排序键
+    """
+    timestamp, id_ = decode_cursor(cursor, 2)
+    if not isinstance(timestamp, datetime) or not isinstance(id_, int) or isinstance(id_, bool):
+        raise InvalidCursorError("Invalid cursor: key mismatch")
+    return timestamp, id_
+
+
+class TelemetryExporter:
+    """
+    遥测数据流式导出
+
+    - 原始数据通过 stream_results + yield_per 的服务端游标读取，每次只缓存一块
+    - 归档数据按块解码，按时间多路归并，只保留时间上重叠的块
+    - 续传位置为最后一行的排序键 (timestamp, id)，严格大于该位置的数据才会输出；
+      续传后才写入且 timestamp 早于该位置的迟到数据不会包含在续传结果中
+    """
+
+    MEDIA_TYPES = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+        "parquet": "application/vnd.apache.parquet",
+    }
+
+    def __init__(self, chunk_size: Optional[int] = None, session_factory: Callable = ReadSessionLocal):
+        self.chunk_size = chunk_size or settings.TELEMETRY_EXPORT_CHUNK_SIZE
+        self.session_factory = session_factory
+
+    @classmethod
+    def supported_formats(cls) -> List[str]:
+        return [fmt for fmt in cls.MEDIA_TYPES if fmt != "parquet" or PARQUET_AVAILABLE]
+
+    def iter_rows(
+        self,
+        db: Session,
+        devices: Dict[int, str],
+        start_time: datetime,
+        end_time: datetime,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Iterator[ExportRow]:
+        """按 (timestamp, id) 升序遍历导出行，devices 为 设备主键 -> 设备标识"""
+        # 归档数据均早于未归档的原始数据，先输出归档再输出原始数据即保持整体有序
+        yield from self._iter_archive(db, devices, start_time, end_time, after)
+
+        query = db.query(
+            DeviceData.timestamp, DeviceData.id, DeviceData.device_id,
+            DeviceData.data_type, DeviceData.quality, DeviceData.data,
+        ).filter(and_(
+            DeviceData.device_id.in_(list(devices)),
+            DeviceData.timestamp >= start_time,
+            DeviceData.timestamp <= end_time,
+        ))
+        if after is not None:
+            query = query.filter(keyset_filter([(DeviceData.timestamp, False), (DeviceData.id, False)], after))
+        query = query.order_by(DeviceData.timestamp, DeviceData.id)
+        for timestamp, id_, device_pk, data_type, quality, data in query.execution_options(
+            stream_results=True
+        ).yield_per(self.chunk_size):
+            yield timestamp, id_, devices[device_pk], data_type, quality, data
+
+    def _iter_archive(
+        self,
+        db: Session,
+        devices: Dict[int, str],
+        start_time: datetime,
+        end_time: datetime,
+        after: Optional[Tuple[datetime, int]],
+    ) -> Iterator[ExportRow]:
+        lower = max(start_time, after[0]) if after else start_time
+        # 只读取块的元数据，载荷按需逐块加载
+        blocks = db.query(
+            DeviceDataArchive.id, DeviceDataArchive.start_time
+        ).filter(and_(
+            DeviceDataArchive.device_id.in_(list(devices)),
+            DeviceDataArchive.end_time >= lower,
+            DeviceDataArchive.start_time <= end_time,
+        )).order_by(DeviceDataArchive.start_time, DeviceDataArchive.id).all()
+
+        heap: List[ExportRow] = []
+        index = 0
+        while index < len(blocks) or heap:
+            # 加载所有可能包含比当前堆顶更早记录的块
+            while index < len(blocks) and (not heap or blocks[index].start_time <= heap[0][0]):
+                block = db.query(DeviceDataArchive).get(blocks[index].id)
+                index += 1
+                for record in device_data_crud.decode_archive(block):
+                    key = (record.timestamp, record.id)
+                    if not start_time <= record.timestamp <= end_time or (after and key <= after):
+                        continue
+                    heapq.heappush(heap, (
+                        record.timestamp, record.id, devices[block.device_id],
+                        record.data_type, record.quality, record.data,
+                    ))
+                db.expunge(block)
+            if heap:
+                yield heapq.heappop(heap)
+
+    def _chunks(self, rows: Iterator[ExportRow]) -> Iterator[List[ExportRow]]:
+        chunk: List[ExportRow] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _encode_ndjson(chunk: List[ExportRow]) -> bytes:
+        lines = []
+        for timestamp, id_, device_id, data_type, quality, data in chunk:
+            lines.append(json.dumps({
+                "device_id": device_id,
+                "timestamp": timestamp.isoformat(),
+                "id": id_,
+                "data_type": data_type,
+                "quality": quality,
+                "data": data,
+                "cursor": encode_cursor([timestamp, id_]),
+            }, ensure_ascii=False, separators=(",", ":")))
+        lines.append("")
+        return "\n".join(lines).encode("utf-8")
+
+    @staticmethod
+    def _encode_csv(chunk: List[ExportRow], header: bool) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(EXPORT_FIELDS)
+        for timestamp, id_, device_id, data_type, quality, data in chunk:
+            writer.writerow([
+                device_id, timestamp.isoformat(), id_, data_type, quality,
+                json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+                encode_cursor([timestamp, id_]),
+            ])
+        return buffer.getvalue().encode("utf-8")
+
+    def _iter_parquet(self, chunks: Iterator[List[ExportRow]]) -> Iterator[bytes]:
+        """每块写为一个 row group，写完即把已生成的字节交给调用方"""
+        sink = _DrainableSink()
+        schema = pa.schema([
+            ("device_id", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+            ("id", pa.int64()),
+            ("data_type", pa.string()),
+            ("quality", pa.string()),
+            ("data", pa.string()),
+            ("cursor", pa.string()),
+        ])
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        try:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pydict({
+                    "device_id": [row[2] for row in chunk],
+                    "timestamp": [row[0] for row in chunk],
+                    "id": [row[1] for row in chunk],
+                    "data_type": [row[3] for row in chunk],
+                    "quality": [row[4] for row in chunk],
+                    "data": [json.dumps(row[5], ensure_ascii=False, separators=(",", ":")) for row in chunk],
+                    "cursor": [encode_cursor([row[0], row[1]]) for row in chunk],
+                }, schema=schema))
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def stream(
+        self,
+        fmt: str,
+        devices: Dict[int, str],
+        start_time: datetime,
+        end_time: datetime,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Iterator[bytes]:
+        """生成导出文件的字节块，使用独立的数据库会话，随生成器结束关闭"""
+        if fmt not in self.supported_formats():
+            raise ValueError(f"Unsupported export format: {fmt}")
+        db = self.session_factory()
+        exported = 0
+        try:
+            chunks = self._chunks(self.iter_rows(db, devices, start_time, end_time, after))
+            if fmt == "parquet":
+                for data in self._iter_parquet(chunks):
+                    yield data
+                return
+            for index, chunk in enumerate(chunks):
+                exported += len(chunk)
+                yield self._encode_ndjson(chunk) if fmt == "ndjson" else self._encode_csv(chunk, index == 0)
+            if fmt == "csv" and exported == 0:
+                yield self._encode_csv([], True)
+        except Exception as e:
+            logger.error(f"Telemetry export failed after {exported} rows: {e}")
+            raise
+        finally:
+            db.close()
+
+
+class _DrainableSink(io.RawIOBase):
+    """只追加的内存输出流，已写出的字节可随时取走，供 ParquetWriter 增量输出"""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+# 全局导出服务实例
+telemetry_exporter = TelemetryExporter()
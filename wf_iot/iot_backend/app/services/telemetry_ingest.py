@@ -0,0 +1,292 @@
+"""
+遥测数据批量写入管道
+MQTT回调线程只负责入队，后台线程按批量大小/时间窗口合并写入数据库
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import (
+    DataError,
+    DBAPIError,
+    DisconnectionError,
+    IntegrityError,
+    InterfaceError,
+    OperationalError,
+    StatementError,
+    TimeoutError as PoolTimeoutError,
+)
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.crud.device import device_data_crud
+
+logger = logging.getLogger(__name__)
+
+# 数据库不可用（断连、连接池耗尽等）：整批重试，逐条定位没有意义
+_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError)
+
+
+def _is_record_error(error: Exception) -> bool:
+    """是否为记录本身导致的错误（数据超长、约束冲突、参数无法绑定等），重试不会成功"""
+    if isinstance(error, (DataError, IntegrityError)):
+        return True
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+class TelemetryIngestPipeline:
+    """
+    遥测数据批量写入管道
+
+    特性:
+    - 有界队列，队列满时按配置阻塞生产者(背压)或直接丢弃并计数
+    - 后台线程按 batch_size / flush_interval 聚合，每批一条多行INSERT
+    - 记录本身导致的写入失败按二分定位，只丢弃有问题的记录，同批其余记录正常写入
+    - 其他写入失败的批次保留重试，连续失败 max_retries 次后丢弃（无法定位的按二分隔离）
+    - stop() 时在 drain_timeout 内排空队列，超时未写入的数据丢弃并计数
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue_size: Optional[int] = None,
+        enqueue_timeout: Optional[float] = None,
+        retry_backoff: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        drain_timeout: Optional[float] = None,
+        session_factory: Callable = SessionLocal,
+    ):
+        self.batch_size = batch_size or settings.TELEMETRY_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.TELEMETRY_FLUSH_INTERVAL
+        self.enqueue_timeout = enqueue_timeout if enqueue_timeout is not None else settings.TELEMETRY_ENQUEUE_TIMEOUT
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.TELEMETRY_RETRY_BACKOFF
+        self.max_retries = max_retries or settings.TELEMETRY_MAX_RETRIES
+        self.drain_timeout = drain_timeout if drain_timeout is not None else settings.TELEMETRY_DRAIN_TIMEOUT
+        self.session_factory = session_factory
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(
+            maxsize=max_queue_size or settings.TELEMETRY_QUEUE_MAXSIZE
+        )
+        self._retry_batch: List[Dict[str, Any]] = []  # 上次写入失败、待重试的批次
+        self._retry_attempts = 0  # 待重试批次已连续失败的次数
+        self._drain_deadline = 0.0  # 关闭时排空队列的截止时间(monotonic)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "enqueued": 0,        # 成功入队条数
+            "dropped": 0,         # 队列满被丢弃条数
+            "written": 0,         # 成功写入条数
+            "skipped": 0,         # 设备未注册被跳过条数
+            "flushes": 0,         # 成功写入批次数
+            "flush_errors": 0,    # 写入失败批次数
+            "rejected": 0,        # 记录本身有问题被丢弃条数
+            "failed": 0,          # 重试耗尽或关闭超时未写入、被丢弃条数
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _incr(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def submit(
+        self,
+        device_id: str,
+        data: Dict[str, Any],
+        data_type: str = "telemetry",
+        quality: str = "good",
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """
+        提交一条遥测数据
+
+        Returns:
+            bool: 是否成功入队，False表示因背压被丢弃
+        """
+        record = {
+            "device_id": device_id,
+            "data_type": data_type,
+            "data": data,
+            "quality": quality,
+            "timestamp": timestamp or datetime.utcnow(),
+        }
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(record, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self._incr("dropped")
+            logger.warning(f"Telemetry queue full, dropped data from device {device_id}")
+            return False
+        self._incr("enqueued")
+        return True
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._thread is not None and self._stop_event.is_set():
+            # 上次 stop 超时，旧线程仍在写入剩余数据，等其退出后再启动，队列不会被两个线程同时消费
+            logger.warning("Telemetry ingest thread from the previous stop is still flushing, waiting for it to exit")
+            self._thread.join()
+            self._thread = None
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-ingest", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Telemetry ingest pipeline started (batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval}s)"
+        )
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止写入线程，并在超时前将队列中剩余数据写入
+
+        Args:
+            timeout: 排空队列的最长秒数，默认 drain_timeout；超时后剩余数据丢弃并计入 failed
+        """
+        if not self._thread:
+            return
+        timeout = timeout if timeout is not None else self.drain_timeout
+        self._drain_deadline = time.monotonic() + timeout
+        self._stop_event.set()
+        # 多等一个退避间隔，正在进行的写入可以结束
+        self._thread.join(timeout=timeout + self.retry_backoff)
+        if self._thread.is_alive():
+            # 保留线程引用，start 会等它退出，避免启动第二个写入线程
+            logger.warning(f"Telemetry ingest thread still flushing after {timeout}s, stats: {self.get_stats()}")
+            return
+        self._thread = None
+        logger.info(f"Telemetry ingest pipeline stopped, stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取管道运行指标"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["pending_retry"] = len(self._retry_batch)
+        return stats
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch and not self._flush(batch):
+                self._stop_event.wait(self.retry_backoff)
+        self._drain()
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        """聚合一个批次：达到 batch_size 或 flush_interval 超时即返回"""
+        batch, self._retry_batch = self._retry_batch, []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, records: List[Dict[str, Any]]) -> Optional[Exception]:
+        """写入一组记录，成功返回 None，失败回滚并返回异常"""
+        db = self.session_factory()
+        try:
+            written = device_data_crud.create_many(db, records)
+            self._incr("written", written)
+            self._incr("skipped", len(records) - written)
+            self._incr("flushes")
+            logger.debug(f"Flushed {written}/{len(records)} telemetry records")
+            return None
+        except Exception as e:
+            db.rollback()
+            return e
+        finally:
+            db.close()
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> bool:
+        """写入一个批次，失败时保留批次等待重试，重试耗尽或记录本身有问题时隔离/丢弃"""
+        error = self._write(batch)
+        if error is None:
+            self._retry_attempts = 0
+            return True
+
+        self._incr("flush_errors")
+        if _is_record_error(error):
+            logger.warning(f"Failed to flush {len(batch)} telemetry records, isolating bad records: {error}")
+            return self._isolate(batch)
+
+        self._retry_attempts += 1
+        if self._retry_attempts < self.max_retries:
+            self._retry_batch = batch + self._retry_batch
+            logger.error(
+                f"Failed to flush {len(batch)} telemetry records "
+                f"(attempt {self._retry_attempts}/{self.max_retries}): {error}"
+            )
+            return False
+
+        self._retry_attempts = 0
+        if isinstance(error, _UNAVAILABLE_ERRORS):
+            self._incr("failed", len(batch))
+            logger.error(f"Dropped {len(batch)} telemetry records after {self.max_retries} failed attempts: {error}")
+            return False
+        logger.error(f"Failed to flush {len(batch)} telemetry records {self.max_retries} times, isolating bad records: {error}")
+        return self._isolate(batch)
+
+    def _isolate(self, batch: List[Dict[str, Any]]) -> bool:
+        """二分定位写入失败的记录：其余记录正常写入，单条仍写入失败的记录丢弃并计数"""
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            error = self._write(part)
+            if error is None:
+                continue
+            if isinstance(error, _UNAVAILABLE_ERRORS):
+                # 定位过程中数据库不可用，剩余记录整批保留重试
+                self._retry_batch = part + [record for rest in reversed(parts) for record in rest] + self._retry_batch
+                self._retry_attempts = 1
+                logger.error(f"Database unavailable while isolating bad telemetry records: {error}")
+                return False
+            if len(part) == 1:
+                self._incr("rejected")
+                logger.error(f"Rejected telemetry record from device {part[0]['device_id']}: {error}")
+                continue
+            middle = len(part) // 2
+            parts.append(part[middle:])
+            parts.append(part[:middle])
+        return True
+
+    def _drain(self):
+        """关闭时排空队列，写入失败时按退避重试，超过截止时间后丢弃剩余数据"""
+        while True:
+            if time.monotonic() >= self._drain_deadline:
+                lost = len(self._retry_batch) + self._queue.qsize()
+                self._retry_batch = []
+                if lost:
+                    self._incr("failed", lost)
+                    logger.error(f"Telemetry drain timed out, dropped {lost} unwritten records")
+                return
+            batch, self._retry_batch = self._retry_batch, []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            if not self._flush(batch):
+                time.sleep(max(0.0, min(self.retry_backoff, self._drain_deadline - time.monotonic())))
+
+
+# 全局遥测写入管道实例
+telemetry_pipeline = TelemetryIngestPipeline()
@@ -0,0 +1,212 @@
+"""
+主题路由器
+按主题层级构建前缀树，注册时预编译路由模式，消息到达时沿树查找处理函数并提取通配符参数：
+- 模式层级为字面量、单层通配符（"+" 或命名参数 "{device_id}"）或多层通配符（"#"，只能位于末尾）
+- 匹配优先级: 字面量 > 单层通配符 > 多层通配符，与注册顺序无关
+- 查找耗时只与主题层级数有关，与已注册的路由数无关
+- 分隔符及通配符可配置，MQTT 主题("/"、"+"、"#")与 AMQP 路由键(".", "*", "#")均可使用
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Route:
+    """已注册的路由"""
+
+    __slots__ = ("pattern", "handler", "name", "param_names")
+
+    def __init__(self, pattern: str, handler: Callable[..., Any], name: Optional[str], param_names: Tuple[Optional[str], ...]):
+        self.pattern = pattern
+        self.handler = handler
+        self.name = name
+        # 每个通配符层级的参数名，匿名通配符为 None
+        self.param_names = param_names
+
+    def params_dict(self, params: tuple) -> Dict[str, str]:
+        """命名参数 -> 值（匿名通配符不包含在内）"""
+        return {name: value for name, value in zip(self.param_names, params) if name}
+
+    def __repr__(self) -> str:
+        return f"Route({self.pattern!r}, name={self.name!r})"
+
+
+class _Node:
+    __slots__ = ("literal", "single", "multi", "route")
+
+    def __init__(self):
+        self.literal: Dict[str, "_Node"] = {}
+        self.single: Optional["_Node"] = None
+        self.multi: Optional[Route] = None
+        self.route: Optional[Route] = None
+
+
+class TopicRouter:
+    """
+    前缀树主题路由器
+
+    路由的增删加锁并替换整棵树，查找不加锁（读取的始终是完整的树），
+    适合注册少、查找多的场景
+    """
+
+    def __init__(self, separator: str = "/", single_wildcard: str = "+", multi_wildcard: str = "#"):
+        self.separator = separator
+        self.single_wildcard = single_wildcard
+        self.multi_wildcard = multi_wildcard
+        self._routes: Dict[str, Route] = {}
+        self._root = _Node()
+        self._lock = threading.Lock()
+        self.unmatched = 0
+
+    def add(self, pattern: str, handler: Callable[..., Any], name: Optional[str] = None) -> Route:
+        """
+        注册路由，相同模式重复注册时替换原处理函数
+
+        Args:
+            pattern: 路由模式，如 device/{device_id}/data、device/+/firmware/#
+            handler: 处理函数，调用方式为 handler(*参数, *dispatch 的附加参数)
+            name: 路由名称（如消息类型），供调用方区分路由
+
+        Raises:
+            ValueError: 模式不合法（多层通配符不在末尾、层级中混用通配符等）
+        """
+        param_names = self.parse_pattern(pattern)
+        route = Route(pattern, handler, name, param_names)
+        with self._lock:
+            if pattern in self._routes:
+                logger.warning(f"Topic route {pattern} already registered, replacing...")
+            routes = dict(self._routes)
+            routes[pattern] = route
+            self._root = self._build(routes.values())
+            self._routes = routes
+        return route
+
+    def remove(self, pattern: str) -> bool:
+        """注销路由，返回是否存在"""
+        with self._lock:
+            if pattern not in self._routes:
+                return False
+            routes = dict(self._routes)
+            del routes[pattern]
+            self._root = self._build(routes.values())
+            self._routes = routes
+        return True
+
+    def route(self, pattern: str, name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """装饰器形式的注册，供插件按消息类型注册处理函数"""
+
+        def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+            self.add(pattern, handler, name)
+            return handler
+
+        return decorator
+
+    def routes(self) -> List[Route]:
+        return list(self._routes.values())
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def _is_single(self, level: str) -> bool:
+        return level == self.single_wildcard or (len(level) > 2 and level[0] == "{" and level[-1] == "}")
+
+    def parse_pattern(self, pattern: str) -> Tuple[Optional[str], ...]:
+        """校验路由模式，返回各通配符层级的参数名（匿名通配符为 None）"""
+        levels = pattern.split(self.separator)
+        param_names = []
+        for i, level in enumerate(levels):
+            if level == self.multi_wildcard:
+                if i != len(levels) - 1:
+                    raise ValueError(f"Multi-level wildcard must be the last level: {pattern}")
+                param_names.append(None)
+            elif self._is_single(level):
+                param_names.append(level[1:-1] if level != self.single_wildcard else None)
+            elif self.single_wildcard in level or self.multi_wildcard in level:
+                raise ValueError(f"Wildcard must occupy an entire level: {pattern}")
+        return tuple(param_names)
+
+    def _build(self, routes) -> _Node:
+        root = _Node()
+        for route in routes:
+            node = root
+            for level in route.pattern.split(self.separator):
+                if level == self.multi_wildcard:
+                    node.multi = route
+                    break
+                if self._is_single(level):
+                    if node.single is None:
+                        node.single = _Node()
+                    node = node.single
+                else:
+                    node = node.literal.setdefault(level, _Node())
+            else:
+                node.route = route
+        return root
+
+    def match(self, topic: str) -> Optional[Tuple[Route, tuple]]:
+        """
+        查找主题对应的路由
+
+        沿树逐层查找，优先字面量分支；只有同一节点同时存在字面量和通配符分支时才记录回溯点，
+        常见的无歧义主题只分配 split 结果和参数元组
+
+        Returns:
+            (路由, 通配符参数元组)，未匹配时返回 None；多层通配符的参数为剩余层级原样拼接的字符串
+        """
+        levels = topic.split(self.separator)
+        count = len(levels)
+        # $ 开头的系统主题不匹配首层通配符（MQTT 规范）
+        system = topic[:1] == "$"
+        node = self._root
+        params: tuple = ()
+        i = 0
+        # 0: 从字面量分支开始 / 1: 跳过字面量分支 / 2: 只尝试多层通配符
+        stage = 0
+        pending = None
+        while True:
+            if i == count:
+                if node.route is not None:
+                    return node.route, params
+                if node.multi is not None:
+                    # "a/#" 同时匹配 "a"
+                    return node.multi, params + ("",)
+            else:
+                if stage == 0:
+                    child = node.literal.get(levels[i])
+                    if child is not None:
+                        if node.single is not None or node.multi is not None:
+                            if pending is None:
+                                pending = []
+                            pending.append((node, i, params, 1))
+                        node = child
+                        i += 1
+                        continue
+                if i or not system:
+                    if stage < 2 and node.single is not None:
+                        if node.multi is not None:
+                            if pending is None:
+                                pending = []
+                            pending.append((node, i, params, 2))
+                        params += (levels[i],)
+                        node = node.single
+                        i += 1
+                        stage = 0
+                        continue
+                    if node.multi is not None:
+                        return node.multi, params + (self.separator.join(levels[i:]),)
+            if not pending:
+                self.unmatched += 1
+                return None
+            node, i, params, stage = pending.pop()
+
+    def dispatch(self, topic: str, *args: Any) -> bool:
+        """查找路由并调用 handler(*参数, *args)，返回是否匹配"""
+        result = self.match(topic)
+        if result is None:
+            return False
+        route, params = result
+        route.handler(*params, *args)
+        return True
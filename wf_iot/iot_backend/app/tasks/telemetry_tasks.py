@@ -0,0 +1,15 @@
+"""
+遥测数据存储维护任务模块
+
+从 celery_worker.py 导入 Celery 应用和任务，避免代码重复。
+"""
+
+from celery_worker import (
+    celery_app,
+    maintain_telemetry_storage,
+)
+
+__all__ = [
+    "celery_app",
+    "maintain_telemetry_storage",
+]
@@ -9,7 +9,7 @@ from celery.utils.log import get_task_logger
 
 from app.core.config import settings
 from app.db.session import SessionLocal
-from app.crud.device import device_crud
+from app.crud.device import device_crud, device_data_crud
 from app.crud.firmware import firmware_crud
 from app.services.mqtt_service import mqtt_service
 
@@ -19,7 +19,7 @@ celery_app = Celery(
     "firmware_tasks",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.firmware_tasks"]
+    include=["app.tasks.firmware_tasks", "app.tasks.telemetry_tasks"]
 )
 
 # Celery配置
@@ -34,6 +34,13 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60, # 25分钟软超时
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    beat_schedule={
+        # 遥测存储维护：滚动创建分区、归档及清理过期数据
+        "maintain-telemetry-storage": {
+            "task": "telemetry_tasks.maintain_telemetry_storage",
+            "schedule": 60 * 60,
+        },
+    },
 )
 
 logger = get_task_logger(__name__)
@@ -172,6 +179,21 @@ def check_device_firmware_updates():
     finally:
         db.close()
 
+@celery_app.task(name="telemetry_tasks.maintain_telemetry_storage")
+def maintain_telemetry_storage():
+    """遥测存储维护：创建未来分区、压缩归档旧数据、删除超过保留期的数据"""
+    db = SessionLocal()
+    try:
+        result = device_data_crud.maintain_storage(db)
+        logger.info(f"Telemetry storage maintenance finished: {result}")
+        return result
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error maintaining telemetry storage: {e}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
 def _validate_firmware_file(firmware) -> bool:
     """验证固件文件的完整性"""
     try:
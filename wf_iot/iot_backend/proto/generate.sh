@@ -41,6 +41,12 @@ python3 -m grpc_tools.protoc \
     --grpc_python_out="$OUTPUT_DIR" \
     "$PROTO_DIR/firmware.proto"
 
+# 设备二进制负载（仅消息定义，不生成gRPC代码）
+python3 -m grpc_tools.protoc \
+    -I"$PROTO_DIR" \
+    --python_out="$OUTPUT_DIR" \
+    "$PROTO_DIR/telemetry.proto"
+
 # 创建__init__.py
 touch "$OUTPUT_DIR/__init__.py"
 
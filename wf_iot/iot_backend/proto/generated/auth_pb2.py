@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nauth.proto\x12\x04\x61uth\"%\n\x14ValidateTokenRequest\x12\r\n\x05token\x18\x01 \x01(\t\"K\n\x16\x43heckPermissionRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x10\n\x08resource\x18\x02 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x03 \x01(\t\"%\n\x12GetUserByIdRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\",\n\x19GetUserPermissionsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\">\n\x18VerifyCredentialsRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x10\n\x08password\x18\x02 \x01(\t\"`\n\x15ValidateTokenResponse\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x0f\n\x07user_id\x18\x02 \x01(\x05\x12\x10\n\x08username\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\":\n\x17\x43heckPermissionResponse\x12\x0f\n\x07\x61llowed\x18\x01 \x01(\x08\x12\x0e\n\x06reason\x18\x02 \x01(\t\"\xaa\x01\n\x0cUserResponse\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x10\n\x08username\x18\x02 \x01(\t\x12\r\n\x05\x65mail\x18\x03 \x01(\t\x12\x11\n\tfull_name\x18\x04 \x01(\t\x12\x11\n\tis_active\x18\x05 \x01(\x08\x12\x14\n\x0cis_superuser\x18\x06 \x01(\x08\x12\x12\n\ncreated_at\x18\x07 \x01(\t\x12\x1d\n\x05roles\x18\x08 \x03(\x0b\x32\x0e.auth.RoleInfo\"9\n\x08RoleInfo\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\"a\n\x0ePermissionInfo\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x10\n\x08resource\x18\x03 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x04 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x05 \x01(\t\"C\n\x16PermissionListResponse\x12)\n\x0bpermissions\x18\x01 \x03(\x0b\x32\x14.auth.PermissionInfo\"~\n\x19VerifyCredentialsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07user_id\x18\x02 \x01(\x05\x12\x14\n\x0c\x61\x63\x63\x65ss_token\x18\x03 \x01(\t\x12\x12\n\ntoken_type\x18\x04 \x01(\t\x12\x15\n\rerror_message\x18\x05 \x01(\t2\x8f\x03\n\x0b\x41uthService\x12H\n\rValidateToken\x12\x1a.auth.ValidateTokenRequest\x1a\x1b.auth.ValidateTokenResponse\x12N\n\x0f\x43heckPermission\x12\x1c.auth.CheckPermissionRequest\x1a\x1d.auth.CheckPermissionResponse\x12;\n\x0bGetUserById\x12\x18.auth.GetUserByIdRequest\x1a\x12.auth.UserResponse\x12S\n\x12GetUserPermissions\x12\x1f.auth.GetUserPermissionsRequest\x1a\x1c.auth.PermissionListResponse\x12T\n\x11VerifyCredentials\x12\x1e.auth.VerifyCredentialsRequest\x1a\x1f.auth.VerifyCredentialsResponseB\x0cZ\nproto/authb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nauth.proto\x12\x04\x61uth\"%\n\x14ValidateTokenRequest\x12\r\n\x05token\x18\x01 \x01(\t\"K\n\x16\x43heckPermissionRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x10\n\x08resource\x18\x02 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x03 \x01(\t\"%\n\x12GetUserByIdRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\",\n\x19GetUserPermissionsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\">\n\x18VerifyCredentialsRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x10\n\x08password\x18\x02 \x01(\t\"C\n\x10\x41uthorizeRequest\x12\r\n\x05token\x18\x01 \x01(\t\x12\x10\n\x08resource\x18\x02 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x03 \x01(\t\"A\n\x15\x42\x61tchAuthorizeRequest\x12(\n\x08requests\x18\x01 \x03(\x0b\x32\x16.auth.AuthorizeRequest\"\x17\n\x15GetSigningKeysRequest\"`\n\x15ValidateTokenResponse\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x0f\n\x07user_id\x18\x02 \x01(\x05\x12\x10\n\x08username\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\":\n\x17\x43heckPermissionResponse\x12\x0f\n\x07\x61llowed\x18\x01 \x01(\x08\x12\x0e\n\x06reason\x18\x02 \x01(\t\"\xaa\x01\n\x0cUserResponse\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x10\n\x08username\x18\x02 \x01(\t\x12\r\n\x05\x65mail\x18\x03 \x01(\t\x12\x11\n\tfull_name\x18\x04 \x01(\t\x12\x11\n\tis_active\x18\x05 \x01(\x08\x12\x14\n\x0cis_superuser\x18\x06 \x01(\x08\x12\x12\n\ncreated_at\x18\x07 \x01(\t\x12\x1d\n\x05roles\x18\x08 \x03(\x0b\x32\x0e.auth.RoleInfo\"9\n\x08RoleInfo\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\"a\n\x0ePermissionInfo\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x10\n\x08resource\x18\x03 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x04 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x05 \x01(\t\"C\n\x16PermissionListResponse\x12)\n\x0bpermissions\x18\x01 \x03(\x0b\x32\x14.auth.PermissionInfo\"~\n\x19VerifyCredentialsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07user_id\x18\x02 \x01(\x05\x12\x14\n\x0c\x61\x63\x63\x65ss_token\x18\x03 \x01(\t\x12\x12\n\ntoken_type\x18\x04 \x01(\t\x12\x15\n\rerror_message\x18\x05 \x01(\t\"\xac\x01\n\x11\x41uthorizeResponse\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x0f\n\x07\x61llowed\x18\x02 \x01(\x08\x12\x0f\n\x07user_id\x18\x03 \x01(\x05\x12\x10\n\x08username\x18\x04 \x01(\t\x12\x14\n\x0cis_superuser\x18\x05 \x01(\x08\x12\x13\n\x0bpermissions\x18\x06 \x03(\t\x12\x12\n\nexpires_at\x18\x07 \x01(\x03\x12\x15\n\rerror_message\x18\x08 \x01(\t\"D\n\x16\x42\x61tchAuthorizeResponse\x12*\n\tresponses\x18\x01 \x03(\x0b\x32\x17.auth.AuthorizeResponse\"@\n\nSigningKey\x12\x0b\n\x03kid\x18\x01 \x01(\t\x12\x11\n\talgorithm\x18\x02 \x01(\t\x12\x12\n\npublic_key\x18\x03 \x01(\t\"[\n\x13SigningKeysResponse\x12\x1e\n\x04keys\x18\x01 \x03(\x0b\x32\x10.auth.SigningKey\x12\x13\n\x0b\x63urrent_kid\x18\x02 \x01(\t\x12\x0f\n\x07max_age\x18\x03 \x01(\x05\x32\xe4\x04\n\x0b\x41uthService\x12H\n\rValidateToken\x12\x1a.auth.ValidateTokenRequest\x1a\x1b.auth.ValidateTokenResponse\x12N\n\x0f\x43heckPermission\x12\x1c.auth.CheckPermissionRequest\x1a\x1d.auth.CheckPermissionResponse\x12;\n\x0bGetUserById\x12\x18.auth.GetUserByIdRequest\x1a\x12.auth.UserResponse\x12S\n\x12GetUserPermissions\x12\x1f.auth.GetUserPermissionsRequest\x1a\x1c.auth.PermissionListResponse\x12T\n\x11VerifyCredentials\x12\x1e.auth.VerifyCredentialsRequest\x1a\x1f.auth.VerifyCredentialsResponse\x12<\n\tAuthorize\x12\x16.auth.AuthorizeRequest\x1a\x17.auth.AuthorizeResponse\x12K\n\x0e\x42\x61tchAuthorize\x12\x1b.auth.BatchAuthorizeRequest\x1a\x1c.auth.BatchAuthorizeResponse\x12H\n\x0eGetSigningKeys\x12\x1b.auth.GetSigningKeysRequest\x1a\x19.auth.SigningKeysResponseB\x0cZ\nproto/authb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -42,20 +42,34 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_GETUSERPERMISSIONSREQUEST']._serialized_end=219
   _globals['_VERIFYCREDENTIALSREQUEST']._serialized_start=221
   _globals['_VERIFYCREDENTIALSREQUEST']._serialized_end=283
-  _globals['_VALIDATETOKENRESPONSE']._serialized_start=285
-  _globals['_VALIDATETOKENRESPONSE']._serialized_end=381
-  _globals['_CHECKPERMISSIONRESPONSE']._serialized_start=383
-  _globals['_CHECKPERMISSIONRESPONSE']._serialized_end=441
-  _globals['_USERRESPONSE']._serialized_start=444
-  _globals['_USERRESPONSE']._serialized_end=614
-  _globals['_ROLEINFO']._serialized_start=616
-  _globals['_ROLEINFO']._serialized_end=673
-  _globals['_PERMISSIONINFO']._serialized_start=675
-  _globals['_PERMISSIONINFO']._serialized_end=772
-  _globals['_PERMISSIONLISTRESPONSE']._serialized_start=774
-  _globals['_PERMISSIONLISTRESPONSE']._serialized_end=841
-  _globals['_VERIFYCREDENTIALSRESPONSE']._serialized_start=843
-  _globals['_VERIFYCREDENTIALSRESPONSE']._serialized_end=969
-  _globals['_AUTHSERVICE']._serialized_start=972
-  _globals['_AUTHSERVICE']._serialized_end=1371
+  _globals['_AUTHORIZEREQUEST']._serialized_start=285
+  _globals['_AUTHORIZEREQUEST']._serialized_end=352
+  _globals['_BATCHAUTHORIZEREQUEST']._serialized_start=354
+  _globals['_BATCHAUTHORIZEREQUEST']._serialized_end=419
+  _globals['_GETSIGNINGKEYSREQUEST']._serialized_start=421
+  _globals['_GETSIGNINGKEYSREQUEST']._serialized_end=444
+  _globals['_VALIDATETOKENRESPONSE']._serialized_start=446
+  _globals['_VALIDATETOKENRESPONSE']._serialized_end=542
+  _globals['_CHECKPERMISSIONRESPONSE']._serialized_start=544
+  _globals['_CHECKPERMISSIONRESPONSE']._serialized_end=602
+  _globals['_USERRESPONSE']._serialized_start=605
+  _globals['_USERRESPONSE']._serialized_end=775
+  _globals['_ROLEINFO']._serialized_start=777
+  _globals['_ROLEINFO']._serialized_end=834
+  _globals['_PERMISSIONINFO']._serialized_start=836
+  _globals['_PERMISSIONINFO']._serialized_end=933
+  _globals['_PERMISSIONLISTRESPONSE']._serialized_start=935
+  _globals['_PERMISSIONLISTRESPONSE']._serialized_end=1002
+  _globals['_VERIFYCREDENTIALSRESPONSE']._serialized_start=1004
+  _globals['_VERIFYCREDENTIALSRESPONSE']._serialized_end=1130
+  _globals['_AUTHORIZERESPONSE']._serialized_start=1133
+  _globals['_AUTHORIZERESPONSE']._serialized_end=1305
+  _globals['_BATCHAUTHORIZERESPONSE']._serialized_start=1307
+  _globals['_BATCHAUTHORIZERESPONSE']._serialized_end=1375
+  _globals['_SIGNINGKEY']._serialized_start=1377
+  _globals['_SIGNINGKEY']._serialized_end=1441
+  _globals['_SIGNINGKEYSRESPONSE']._serialized_start=1443
+  _globals['_SIGNINGKEYSRESPONSE']._serialized_end=1534
+  _globals['_AUTHSERVICE']._serialized_start=1537
+  _globals['_AUTHSERVICE']._serialized_end=2149
 # @@protoc_insertion_point(module_scope)
@@ -60,6 +60,21 @@ class AuthServiceStub(object):
                 request_serializer=auth__pb2.VerifyCredentialsRequest.SerializeToString,
                 response_deserializer=auth__pb2.VerifyCredentialsResponse.FromString,
                 _registered_method=True)
+        self.Authorize = channel.unary_unary(
+                '/auth.AuthService/Authorize',
+                request_serializer=auth__pb2.AuthorizeRequest.SerializeToString,
+                response_deserializer=auth__pb2.AuthorizeResponse.FromString,
+                _registered_method=True)
+        self.BatchAuthorize = channel.unary_unary(
+                '/auth.AuthService/BatchAuthorize',
+                request_serializer=auth__pb2.BatchAuthorizeRequest.SerializeToString,
+                response_deserializer=auth__pb2.BatchAuthorizeResponse.FromString,
+                _registered_method=True)
+        self.GetSigningKeys = channel.unary_unary(
+                '/auth.AuthService/GetSigningKeys',
+                request_serializer=auth__pb2.GetSigningKeysRequest.SerializeToString,
+                response_deserializer=auth__pb2.SigningKeysResponse.FromString,
+                _registered_method=True)
 
 
 class AuthServiceServicer(object):
@@ -101,6 +116,27 @@ class AuthServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Authorize(self, request, context):
+        """验证Token并检查权限（一次往返完成认证与授权，返回权限集合供客户端缓存）
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchAuthorize(self, request, context):
+        """批量验证Token并检查权限
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetSigningKeys(self, request, context):
+        """获取JWT验证公钥（JWKS风格），供其他服务在本地验证Token
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_AuthServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -129,6 +165,21 @@ def add_AuthServiceServicer_to_server(servicer, server):
                     request_deserializer=auth__pb2.VerifyCredentialsRequest.FromString,
                     response_serializer=auth__pb2.VerifyCredentialsResponse.SerializeToString,
             ),
+            'Authorize': grpc.unary_unary_rpc_method_handler(
+                    servicer.Authorize,
+                    request_deserializer=auth__pb2.AuthorizeRequest.FromString,
+                    response_serializer=auth__pb2.AuthorizeResponse.SerializeToString,
+            ),
+            'BatchAuthorize': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchAuthorize,
+                    request_deserializer=auth__pb2.BatchAuthorizeRequest.FromString,
+                    response_serializer=auth__pb2.BatchAuthorizeResponse.SerializeToString,
+            ),
+            'GetSigningKeys': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetSigningKeys,
+                    request_deserializer=auth__pb2.GetSigningKeysRequest.FromString,
+                    response_serializer=auth__pb2.SigningKeysResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'auth.AuthService', rpc_method_handlers)
@@ -275,3 +326,84 @@ class AuthService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def Authorize(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/auth.AuthService/Authorize',
+            auth__pb2.AuthorizeRequest.SerializeToString,
+            auth__pb2.AuthorizeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def BatchAuthorize(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/auth.AuthService/BatchAuthorize',
+            auth__pb2.BatchAuthorizeRequest.SerializeToString,
+            auth__pb2.BatchAuthorizeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetSigningKeys(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/auth.AuthService/GetSigningKeys',
+            auth__pb2.GetSigningKeysRequest.SerializeToString,
+            auth__pb2.SigningKeysResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
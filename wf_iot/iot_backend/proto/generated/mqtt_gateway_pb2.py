@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12mqtt_gateway.proto\x12\x0cmqtt_gateway\x1a\x1cgoogle/protobuf/struct.proto\"T\n\x15PublishMessageRequest\x12\r\n\x05topic\x18\x01 \x01(\t\x12\x0f\n\x07payload\x18\x02 \x01(\x0c\x12\x0b\n\x03qos\x18\x03 \x01(\x05\x12\x0e\n\x06retain\x18\x04 \x01(\x08\"M\n\x0fPublishResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"L\n\x13\x42\x61tchPublishRequest\x12\x35\n\x08messages\x18\x01 \x03(\x0b\x32#.mqtt_gateway.PublishMessageRequest\"\x84\x01\n\x14\x42\x61tchPublishResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x17\n\x0fpublished_count\x18\x02 \x01(\x05\x12\x14\n\x0c\x66\x61iled_count\x18\x03 \x01(\x05\x12\x15\n\rfailed_topics\x18\x04 \x03(\t\x12\x15\n\rerror_message\x18\x05 \x01(\t\"3\n\x15SubscribeTopicRequest\x12\r\n\x05topic\x18\x01 \x01(\t\x12\x0b\n\x03qos\x18\x02 \x01(\x05\";\n\x11SubscribeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rerror_message\x18\x02 \x01(\t\"(\n\x17UnsubscribeTopicRequest\x12\r\n\x05topic\x18\x01 \x01(\t\"=\n\x13UnsubscribeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rerror_message\x18\x02 \x01(\t\"\x98\x01\n\x18SendDeviceCommandRequest\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x14\n\x0c\x63ommand_type\x18\x02 \x01(\t\x12-\n\x0c\x63ommand_data\x18\x03 \x01(\x0b\x32\x17.google.protobuf.Struct\x12\x17\n\x0ftimeout_seconds\x18\x04 \x01(\x05\x12\x0b\n\x03qos\x18\x05 \x01(\x05\"Q\n\x13SendCommandResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\ncommand_id\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"\x92\x01\n\x1aSendFirmwareUpgradeRequest\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x18\n\x10\x66irmware_version\x18\x02 \x01(\t\x12\x14\n\x0c\x66irmware_url\x18\x03 \x01(\t\x12\x11\n\tfile_hash\x18\x04 \x01(\t\x12\x11\n\tfile_size\x18\x05 \x01(\x03\x12\x0b\n\x03qos\x18\x06 \x01(\x05\"Q\n\x13SendUpgradeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\nupgrade_id\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"\x1c\n\x1aGetConnectionStatusRequest\"\xbf\x01\n\x18\x43onnectionStatusResponse\x12\x11\n\tconnected\x18\x01 \x01(\x08\x12\x16\n\x0e\x62roker_address\x18\x02 \x01(\t\x12\x11\n\tclient_id\x18\x03 \x01(\t\x12\x17\n\x0f\x63onnected_since\x18\x04 \x01(\x03\x12\x1a\n\x12messages_published\x18\x05 \x01(\x03\x12\x19\n\x11messages_received\x18\x06 \x01(\x03\x12\x15\n\rerror_message\x18\x07 \x01(\t\"2\n\x1cGetDeviceOnlineStatusRequest\x12\x12\n\ndevice_ids\x18\x01 \x03(\t\"J\n\x12\x44\x65viceOnlineStatus\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x0e\n\x06online\x18\x02 \x01(\x08\x12\x11\n\tlast_seen\x18\x03 \x01(\t\"x\n\x1a\x44\x65viceOnlineStatusResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x32\n\x08statuses\x18\x02 \x03(\x0b\x32 .mqtt_gateway.DeviceOnlineStatus\x12\x15\n\rerror_message\x18\x03 \x01(\t2\x9a\x06\n\x12MqttGatewayService\x12T\n\x0ePublishMessage\x12#.mqtt_gateway.PublishMessageRequest\x1a\x1d.mqtt_gateway.PublishResponse\x12\\\n\x13\x42\x61tchPublishMessage\x12!.mqtt_gateway.BatchPublishRequest\x1a\".mqtt_gateway.BatchPublishResponse\x12V\n\x0eSubscribeTopic\x12#.mqtt_gateway.SubscribeTopicRequest\x1a\x1f.mqtt_gateway.SubscribeResponse\x12\\\n\x10UnsubscribeTopic\x12%.mqtt_gateway.UnsubscribeTopicRequest\x1a!.mqtt_gateway.UnsubscribeResponse\x12^\n\x11SendDeviceCommand\x12&.mqtt_gateway.SendDeviceCommandRequest\x1a!.mqtt_gateway.SendCommandResponse\x12\x62\n\x13SendFirmwareUpgrade\x12(.mqtt_gateway.SendFirmwareUpgradeRequest\x1a!.mqtt_gateway.SendUpgradeResponse\x12g\n\x13GetConnectionStatus\x12(.mqtt_gateway.GetConnectionStatusRequest\x1a&.mqtt_gateway.ConnectionStatusResponse\x12m\n\x15GetDeviceOnlineStatus\x12*.mqtt_gateway.GetDeviceOnlineStatusRequest\x1a(.mqtt_gateway.DeviceOnlineStatusResponseB\x14Z\x12proto/mqtt_gatewayb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12mqtt_gateway.proto\x12\x0cmqtt_gateway\x1a\x1cgoogle/protobuf/struct.proto\"T\n\x15PublishMessageRequest\x12\r\n\x05topic\x18\x01 \x01(\t\x12\x0f\n\x07payload\x18\x02 \x01(\x0c\x12\x0b\n\x03qos\x18\x03 \x01(\x05\x12\x0e\n\x06retain\x18\x04 \x01(\x08\"M\n\x0fPublishResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"L\n\x13\x42\x61tchPublishRequest\x12\x35\n\x08messages\x18\x01 \x03(\x0b\x32#.mqtt_gateway.PublishMessageRequest\"\x84\x01\n\x14\x42\x61tchPublishResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x17\n\x0fpublished_count\x18\x02 \x01(\x05\x12\x14\n\x0c\x66\x61iled_count\x18\x03 \x01(\x05\x12\x15\n\rfailed_topics\x18\x04 \x03(\t\x12\x15\n\rerror_message\x18\x05 \x01(\t\"^\n\x14StreamPublishRequest\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12\x34\n\x07message\x18\x02 \x01(\x0b\x32#.mqtt_gateway.PublishMessageRequest\"Z\n\nPublishAck\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x12\n\nmessage_id\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\"3\n\x15SubscribeTopicRequest\x12\r\n\x05topic\x18\x01 \x01(\t\x12\x0b\n\x03qos\x18\x02 \x01(\x05\";\n\x11SubscribeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rerror_message\x18\x02 \x01(\t\"(\n\x17UnsubscribeTopicRequest\x12\r\n\x05topic\x18\x01 \x01(\t\"=\n\x13UnsubscribeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rerror_message\x18\x02 \x01(\t\"\x98\x01\n\x18SendDeviceCommandRequest\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x14\n\x0c\x63ommand_type\x18\x02 \x01(\t\x12-\n\x0c\x63ommand_data\x18\x03 \x01(\x0b\x32\x17.google.protobuf.Struct\x12\x17\n\x0ftimeout_seconds\x18\x04 \x01(\x05\x12\x0b\n\x03qos\x18\x05 \x01(\x05\"Q\n\x13SendCommandResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\ncommand_id\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"\x92\x01\n\x1aSendFirmwareUpgradeRequest\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x18\n\x10\x66irmware_version\x18\x02 \x01(\t\x12\x14\n\x0c\x66irmware_url\x18\x03 \x01(\t\x12\x11\n\tfile_hash\x18\x04 \x01(\t\x12\x11\n\tfile_size\x18\x05 \x01(\x03\x12\x0b\n\x03qos\x18\x06 \x01(\x05\"Q\n\x13SendUpgradeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\nupgrade_id\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"\x1c\n\x1aGetConnectionStatusRequest\"\xbf\x01\n\x18\x43onnectionStatusResponse\x12\x11\n\tconnected\x18\x01 \x01(\x08\x12\x16\n\x0e\x62roker_address\x18\x02 \x01(\t\x12\x11\n\tclient_id\x18\x03 \x01(\t\x12\x17\n\x0f\x63onnected_since\x18\x04 \x01(\x03\x12\x1a\n\x12messages_published\x18\x05 \x01(\x03\x12\x19\n\x11messages_received\x18\x06 \x01(\x03\x12\x15\n\rerror_message\x18\x07 \x01(\t\"2\n\x1cGetDeviceOnlineStatusRequest\x12\x12\n\ndevice_ids\x18\x01 \x03(\t\"J\n\x12\x44\x65viceOnlineStatus\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x0e\n\x06online\x18\x02 \x01(\x08\x12\x11\n\tlast_seen\x18\x03 \x01(\t\"x\n\x1a\x44\x65viceOnlineStatusResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x32\n\x08statuses\x18\x02 \x03(\x0b\x32 .mqtt_gateway.DeviceOnlineStatus\x12\x15\n\rerror_message\x18\x03 \x01(\t\"t\n\x1cSubscribeDeviceEventsRequest\x12\x12\n\ndevice_ids\x18\x01 \x03(\t\x12\x16\n\x0etopic_patterns\x18\x02 \x03(\t\x12\x13\n\x0b\x65vent_types\x18\x03 \x03(\t\x12\x13\n\x0b\x62uffer_size\x18\x04 \x01(\x05\"j\n\x0b\x44\x65viceEvent\x12\x12\n\nevent_type\x18\x01 \x01(\t\x12\x11\n\tdevice_id\x18\x02 \x01(\t\x12\r\n\x05topic\x18\x03 \x01(\t\x12\x0f\n\x07payload\x18\x04 \x01(\x0c\x12\x14\n\x0ctimestamp_ms\x18\x05 \x01(\x03\x32\xcf\x07\n\x12MqttGatewayService\x12T\n\x0ePublishMessage\x12#.mqtt_gateway.PublishMessageRequest\x1a\x1d.mqtt_gateway.PublishResponse\x12\\\n\x13\x42\x61tchPublishMessage\x12!.mqtt_gateway.BatchPublishRequest\x1a\".mqtt_gateway.BatchPublishResponse\x12Q\n\rStreamPublish\x12\".mqtt_gateway.StreamPublishRequest\x1a\x18.mqtt_gateway.PublishAck(\x01\x30\x01\x12V\n\x0eSubscribeTopic\x12#.mqtt_gateway.SubscribeTopicRequest\x1a\x1f.mqtt_gateway.SubscribeResponse\x12\\\n\x10UnsubscribeTopic\x12%.mqtt_gateway.UnsubscribeTopicRequest\x1a!.mqtt_gateway.UnsubscribeResponse\x12^\n\x11SendDeviceCommand\x12&.mqtt_gateway.SendDeviceCommandRequest\x1a!.mqtt_gateway.SendCommandResponse\x12\x62\n\x13SendFirmwareUpgrade\x12(.mqtt_gateway.SendFirmwareUpgradeRequest\x1a!.mqtt_gateway.SendUpgradeResponse\x12g\n\x13GetConnectionStatus\x12(.mqtt_gateway.GetConnectionStatusRequest\x1a&.mqtt_gateway.ConnectionStatusResponse\x12m\n\x15GetDeviceOnlineStatus\x12*.mqtt_gateway.GetDeviceOnlineStatusRequest\x1a(.mqtt_gateway.DeviceOnlineStatusResponse\x12`\n\x15SubscribeDeviceEvents\x12*.mqtt_gateway.SubscribeDeviceEventsRequest\x1a\x19.mqtt_gateway.DeviceEvent0\x01\x42\x14Z\x12proto/mqtt_gatewayb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -41,32 +41,40 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_BATCHPUBLISHREQUEST']._serialized_end=307
   _globals['_BATCHPUBLISHRESPONSE']._serialized_start=310
   _globals['_BATCHPUBLISHRESPONSE']._serialized_end=442
-  _globals['_SUBSCRIBETOPICREQUEST']._serialized_start=444
-  _globals['_SUBSCRIBETOPICREQUEST']._serialized_end=495
-  _globals['_SUBSCRIBERESPONSE']._serialized_start=497
-  _globals['_SUBSCRIBERESPONSE']._serialized_end=556
-  _globals['_UNSUBSCRIBETOPICREQUEST']._serialized_start=558
-  _globals['_UNSUBSCRIBETOPICREQUEST']._serialized_end=598
-  _globals['_UNSUBSCRIBERESPONSE']._serialized_start=600
-  _globals['_UNSUBSCRIBERESPONSE']._serialized_end=661
-  _globals['_SENDDEVICECOMMANDREQUEST']._serialized_start=664
-  _globals['_SENDDEVICECOMMANDREQUEST']._serialized_end=816
-  _globals['_SENDCOMMANDRESPONSE']._serialized_start=818
-  _globals['_SENDCOMMANDRESPONSE']._serialized_end=899
-  _globals['_SENDFIRMWAREUPGRADEREQUEST']._serialized_start=902
-  _globals['_SENDFIRMWAREUPGRADEREQUEST']._serialized_end=1048
-  _globals['_SENDUPGRADERESPONSE']._serialized_start=1050
-  _globals['_SENDUPGRADERESPONSE']._serialized_end=1131
-  _globals['_GETCONNECTIONSTATUSREQUEST']._serialized_start=1133
-  _globals['_GETCONNECTIONSTATUSREQUEST']._serialized_end=1161
-  _globals['_CONNECTIONSTATUSRESPONSE']._serialized_start=1164
-  _globals['_CONNECTIONSTATUSRESPONSE']._serialized_end=1355
-  _globals['_GETDEVICEONLINESTATUSREQUEST']._serialized_start=1357
-  _globals['_GETDEVICEONLINESTATUSREQUEST']._serialized_end=1407
-  _globals['_DEVICEONLINESTATUS']._serialized_start=1409
-  _globals['_DEVICEONLINESTATUS']._serialized_end=1483
-  _globals['_DEVICEONLINESTATUSRESPONSE']._serialized_start=1485
-  _globals['_DEVICEONLINESTATUSRESPONSE']._serialized_end=1605
-  _globals['_MQTTGATEWAYSERVICE']._serialized_start=1608
-  _globals['_MQTTGATEWAYSERVICE']._serialized_end=2402
+  _globals['_STREAMPUBLISHREQUEST']._serialized_start=444
+  _globals['_STREAMPUBLISHREQUEST']._serialized_end=538
+  _globals['_PUBLISHACK']._serialized_start=540
+  _globals['_PUBLISHACK']._serialized_end=630
+  _globals['_SUBSCRIBETOPICREQUEST']._serialized_start=632
+  _globals['_SUBSCRIBETOPICREQUEST']._serialized_end=683
+  _globals['_SUBSCRIBERESPONSE']._serialized_start=685
+  _globals['_SUBSCRIBERESPONSE']._serialized_end=744
+  _globals['_UNSUBSCRIBETOPICREQUEST']._serialized_start=746
+  _globals['_UNSUBSCRIBETOPICREQUEST']._serialized_end=786
+  _globals['_UNSUBSCRIBERESPONSE']._serialized_start=788
+  _globals['_UNSUBSCRIBERESPONSE']._serialized_end=849
+  _globals['_SENDDEVICECOMMANDREQUEST']._serialized_start=852
+  _globals['_SENDDEVICECOMMANDREQUEST']._serialized_end=1004
+  _globals['_SENDCOMMANDRESPONSE']._serialized_start=1006
+  _globals['_SENDCOMMANDRESPONSE']._serialized_end=1087
+  _globals['_SENDFIRMWAREUPGRADEREQUEST']._serialized_start=1090
+  _globals['_SENDFIRMWAREUPGRADEREQUEST']._serialized_end=1236
+  _globals['_SENDUPGRADERESPONSE']._serialized_start=1238
+  _globals['_SENDUPGRADERESPONSE']._serialized_end=1319
+  _globals['_GETCONNECTIONSTATUSREQUEST']._serialized_start=1321
+  _globals['_GETCONNECTIONSTATUSREQUEST']._serialized_end=1349
+  _globals['_CONNECTIONSTATUSRESPONSE']._serialized_start=1352
+  _globals['_CONNECTIONSTATUSRESPONSE']._serialized_end=1543
+  _globals['_GETDEVICEONLINESTATUSREQUEST']._serialized_start=1545
+  _globals['_GETDEVICEONLINESTATUSREQUEST']._serialized_end=1595
+  _globals['_DEVICEONLINESTATUS']._serialized_start=1597
+  _globals['_DEVICEONLINESTATUS']._serialized_end=1671
+  _globals['_DEVICEONLINESTATUSRESPONSE']._serialized_start=1673
+  _globals['_DEVICEONLINESTATUSRESPONSE']._serialized_end=1793
+  _globals['_SUBSCRIBEDEVICEEVENTSREQUEST']._serialized_start=1795
+  _globals['_SUBSCRIBEDEVICEEVENTSREQUEST']._serialized_end=1911
+  _globals['_DEVICEEVENT']._serialized_start=1913
+  _globals['_DEVICEEVENT']._serialized_end=2019
+  _globals['_MQTTGATEWAYSERVICE']._serialized_start=2022
+  _globals['_MQTTGATEWAYSERVICE']._serialized_end=2997
 # @@protoc_insertion_point(module_scope)
@@ -45,6 +45,11 @@ class MqttGatewayServiceStub(object):
                 request_serializer=mqtt__gateway__pb2.BatchPublishRequest.SerializeToString,
                 response_deserializer=mqtt__gateway__pb2.BatchPublishResponse.FromString,
                 _registered_method=True)
+        self.StreamPublish = channel.stream_stream(
+                '/mqtt_gateway.MqttGatewayService/StreamPublish',
+                request_serializer=mqtt__gateway__pb2.StreamPublishRequest.SerializeToString,
+                response_deserializer=mqtt__gateway__pb2.PublishAck.FromString,
+                _registered_method=True)
         self.SubscribeTopic = channel.unary_unary(
                 '/mqtt_gateway.MqttGatewayService/SubscribeTopic',
                 request_serializer=mqtt__gateway__pb2.SubscribeTopicRequest.SerializeToString,
@@ -75,6 +80,11 @@ class MqttGatewayServiceStub(object):
                 request_serializer=mqtt__gateway__pb2.GetDeviceOnlineStatusRequest.SerializeToString,
                 response_deserializer=mqtt__gateway__pb2.DeviceOnlineStatusResponse.FromString,
                 _registered_method=True)
+        self.SubscribeDeviceEvents = channel.unary_stream(
+                '/mqtt_gateway.MqttGatewayService/SubscribeDeviceEvents',
+                request_serializer=mqtt__gateway__pb2.SubscribeDeviceEventsRequest.SerializeToString,
+                response_deserializer=mqtt__gateway__pb2.DeviceEvent.FromString,
+                _registered_method=True)
 
 
 class MqttGatewayServiceServicer(object):
@@ -95,6 +105,14 @@ class MqttGatewayServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamPublish(self, request_iterator, context):
+        """流式发布：客户端持续发送消息，服务端逐条返回确认（按 sequence 对应，顺序不保证）
+        服务端最多同时处理 STREAM_PUBLISH_WINDOW 条未确认消息，窗口占满时暂停读取，由HTTP/2流控反压客户端
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def SubscribeTopic(self, request, context):
         """订阅主题（用于服务内部）
         """
@@ -137,6 +155,14 @@ class MqttGatewayServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SubscribeDeviceEvents(self, request, context):
+        """订阅设备事件（服务端流）：在网关内按设备/主题/事件类型过滤后直接推送，不经过Redis
+        订阅者缓冲区满时被断开，流以 RESOURCE_EXHAUSTED 结束
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MqttGatewayServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -150,6 +176,11 @@ def add_MqttGatewayServiceServicer_to_server(servicer, server):
                     request_deserializer=mqtt__gateway__pb2.BatchPublishRequest.FromString,
                     response_serializer=mqtt__gateway__pb2.BatchPublishResponse.SerializeToString,
             ),
+            'StreamPublish': grpc.stream_stream_rpc_method_handler(
+                    servicer.StreamPublish,
+                    request_deserializer=mqtt__gateway__pb2.StreamPublishRequest.FromString,
+                    response_serializer=mqtt__gateway__pb2.PublishAck.SerializeToString,
+            ),
             'SubscribeTopic': grpc.unary_unary_rpc_method_handler(
                     servicer.SubscribeTopic,
                     request_deserializer=mqtt__gateway__pb2.SubscribeTopicRequest.FromString,
@@ -180,6 +211,11 @@ def add_MqttGatewayServiceServicer_to_server(servicer, server):
                     request_deserializer=mqtt__gateway__pb2.GetDeviceOnlineStatusRequest.FromString,
                     response_serializer=mqtt__gateway__pb2.DeviceOnlineStatusResponse.SerializeToString,
             ),
+            'SubscribeDeviceEvents': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribeDeviceEvents,
+                    request_deserializer=mqtt__gateway__pb2.SubscribeDeviceEventsRequest.FromString,
+                    response_serializer=mqtt__gateway__pb2.DeviceEvent.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'mqtt_gateway.MqttGatewayService', rpc_method_handlers)
@@ -246,6 +282,33 @@ class MqttGatewayService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def StreamPublish(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/mqtt_gateway.MqttGatewayService/StreamPublish',
+            mqtt__gateway__pb2.StreamPublishRequest.SerializeToString,
+            mqtt__gateway__pb2.PublishAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def SubscribeTopic(request,
             target,
@@ -407,3 +470,30 @@ class MqttGatewayService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SubscribeDeviceEvents(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/mqtt_gateway.MqttGatewayService/SubscribeDeviceEvents',
+            mqtt__gateway__pb2.SubscribeDeviceEventsRequest.SerializeToString,
+            mqtt__gateway__pb2.DeviceEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
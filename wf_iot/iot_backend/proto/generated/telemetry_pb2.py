@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: telemetry.proto
+# Protobuf Python Version: 6.31.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    6,
+    31,
+    1,
+    '',
+    'telemetry.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0ftelemetry.proto\x12\ttelemetry\"\xfb\x01\n\tTelemetry\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x32\n\x07metrics\x18\x02 \x03(\x0b\x32!.telemetry.Telemetry.MetricsEntry\x12\x38\n\nattributes\x18\x03 \x03(\x0b\x32$.telemetry.Telemetry.AttributesEntry\x12\x0f\n\x07quality\x18\x04 \x01(\t\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\x1a\x31\n\x0f\x41ttributesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x82\x01\n\x06Status\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x35\n\nattributes\x18\x02 \x03(\x0b\x32!.telemetry.Status.AttributesEntry\x1a\x31\n\x0f\x41ttributesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"E\n\x0f\x43ommandResponse\x12\x12\n\ncommand_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0e\n\x06result\x18\x03 \x01(\x0c\"R\n\x0e\x46irmwareStatus\x12\x0f\n\x07task_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x10\n\x08progress\x18\x03 \x01(\x05\x12\r\n\x05\x65rror\x18\x04 \x01(\tB\x11Z\x0fproto/telemetryb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'telemetry_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  _globals['DESCRIPTOR']._loaded_options = None
+  _globals['DESCRIPTOR']._serialized_options = b'Z\017proto/telemetry'
+  _globals['_TELEMETRY_METRICSENTRY']._loaded_options = None
+  _globals['_TELEMETRY_METRICSENTRY']._serialized_options = b'8\001'
+  _globals['_TELEMETRY_ATTRIBUTESENTRY']._loaded_options = None
+  _globals['_TELEMETRY_ATTRIBUTESENTRY']._serialized_options = b'8\001'
+  _globals['_STATUS_ATTRIBUTESENTRY']._loaded_options = None
+  _globals['_STATUS_ATTRIBUTESENTRY']._serialized_options = b'8\001'
+  _globals['_TELEMETRY']._serialized_start=31
+  _globals['_TELEMETRY']._serialized_end=282
+  _globals['_TELEMETRY_METRICSENTRY']._serialized_start=185
+  _globals['_TELEMETRY_METRICSENTRY']._serialized_end=231
+  _globals['_TELEMETRY_ATTRIBUTESENTRY']._serialized_start=233
+  _globals['_TELEMETRY_ATTRIBUTESENTRY']._serialized_end=282
+  _globals['_STATUS']._serialized_start=285
+  _globals['_STATUS']._serialized_end=415
+  _globals['_STATUS_ATTRIBUTESENTRY']._serialized_start=233
+  _globals['_STATUS_ATTRIBUTESENTRY']._serialized_end=282
+  _globals['_COMMANDRESPONSE']._serialized_start=417
+  _globals['_COMMANDRESPONSE']._serialized_end=486
+  _globals['_FIRMWARESTATUS']._serialized_start=488
+  _globals['_FIRMWARESTATUS']._serialized_end=570
+# @@protoc_insertion_point(module_scope)
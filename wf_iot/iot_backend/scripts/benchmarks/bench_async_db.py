@@ -0,0 +1,115 @@
+"""
+同步/异步数据库访问并发基准
+
+模拟 async 端点在并发请求下查询设备：
+- sync:  在 async 函数中直接调用同步 CRUD（改造前的 control_device 等端点），数据库调用阻塞事件循环
+- async: 使用 AsyncSession + 异步 CRUD（改造后），等待数据库时事件循环可以处理其他请求
+
+同时运行一个 10ms 周期的心跳任务，以其最大延迟衡量事件循环被阻塞的程度。
+默认使用 SQLite 文件库，可通过 --sync-url/--async-url 指向 MySQL 以得到贴近生产的数据。
+
+用法（在 iot_backend 目录下）:
+    PYTHONPATH=. python scripts/benchmarks/bench_async_db.py --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.async_device import async_device_crud
+from app.crud.device import device_crud
+from app.db.base import Base, import_models
+from app.db.models.device import Device
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list):
+    interval = 0.01
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def _run(handler, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    lags: list = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+
+    async def one(i: int):
+        async with semaphore:
+            await handler(f"bench-{i % 100:03d}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+    return {
+        "elapsed": elapsed,
+        "rps": requests / elapsed,
+        "max_loop_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步/异步数据库访问并发基准")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--sync-url", default=None)
+    parser.add_argument("--async-url", default=None)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    sync_url = args.sync_url or f"sqlite:///{path}"
+    async_url = args.async_url or f"sqlite+aiosqlite:///{path}"
+
+    import_models()
+    engine = create_engine(sync_url, pool_size=args.concurrency) if not sync_url.startswith("sqlite") \
+        else create_engine(sync_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        if not db.query(Device).filter(Device.device_id.like("bench-%")).first():
+            db.add_all(Device(device_id=f"bench-{i:03d}", device_name="bench", product_id="bench") for i in range(100))
+            db.commit()
+
+    async_engine = create_async_engine(async_url)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def sync_handler(device_id: str):
+        db = SessionLocal()
+        try:
+            device_crud.get_by_device_id(db, device_id=device_id)
+        finally:
+            db.close()
+
+    async def async_handler(device_id: str):
+        async with AsyncSessionLocal() as db:
+            await async_device_crud.get_by_device_id(db, device_id=device_id)
+
+    async def bench():
+        results = {
+            "sync": await _run(sync_handler, args.requests, args.concurrency),
+            "async": await _run(async_handler, args.requests, args.concurrency),
+        }
+        await async_engine.dispose()
+        return results
+
+    results = asyncio.run(bench())
+    print(f"requests={args.requests} concurrency={args.concurrency} url={sync_url}")
+    for name, result in results.items():
+        print(
+            f"{name:>5}: {result['elapsed']:.2f}s  {result['rps']:.0f} req/s  "
+            f"max loop lag {result['max_loop_lag_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
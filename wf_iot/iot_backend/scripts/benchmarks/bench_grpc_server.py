@@ -0,0 +1,145 @@
+"""
+gRPC 服务端并发吞吐基准（mqtt-gateway）
+
+对比三种服务端在不同客户端并发度下的吞吐与延迟：
+- thread:    grpc.server + ThreadPoolExecutor(max_workers=--workers)
+- aio:       grpc.aio 服务端（serve_grpc_aio），阻塞调用在 --workers 个线程中执行，
+             状态查询直接在事件循环中处理
+- thread-10: grpc.server + ThreadPoolExecutor(max_workers=10)（改造前的 serve_grpc，--legacy-workers 0 时不测）
+
+thread 与 aio 使用相同的线程数（默认 GRPC_BLOCKING_WORKERS），两者的差异只来自服务端模型：
+PublishMessage 在两种模式下都占用一个线程，吞吐上限都约为 线程数 / 发布延迟。
+实测（单核，默认参数）相同线程数下 aio 的吞吐与 thread 持平或略低（事件循环与线程间切换的开销），
+相对改造前 serve_grpc 的吞吐提升完全来自线程池由 10 增大到 32，thread 模式调大 GRPC_BLOCKING_WORKERS 可获得同样提升。
+aio 的收益不在吞吐：超过 GRPC_MAX_CONCURRENT_RPCS 时快速拒绝而不是无限排队，状态查询不占用线程，
+StreamPublish 有按流的背压窗口。
+
+MQTT 发布以固定延迟模拟（--latency-ms，模拟 broker 背压/网络写阻塞），
+PublishMessage 与 GetConnectionStatus 按 --status-ratio 混合。
+客户端与服务端运行在同一进程，CPU 核数较少时延迟过小会使两者都受 CPU 限制，结果体现不出差异。
+
+用法（在 iot_backend 目录下）:
+    python scripts/benchmarks/bench_grpc_server.py --requests 4000 --concurrency 1,10,50,200
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+from concurrent import futures
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "services", "mqtt-gateway"))
+sys.path.insert(0, os.path.join(ROOT, "proto", "generated"))
+
+import grpc
+
+import mqtt_gateway_pb2
+import mqtt_gateway_pb2_grpc
+from app.core.config import settings
+from app.grpc.server import SERVER_OPTIONS, MqttGatewayServicer, serve_grpc_aio
+from app.mqtt.client import mqtt_client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _simulate_broker(latency: float):
+    def publish(topic, payload, qos=1, retain=False):
+        time.sleep(latency)
+        mqtt_client.messages_published += 1
+        return True, "bench"
+
+    mqtt_client.publish = publish
+    mqtt_client.connected = True
+
+
+def _thread_server(workers: int):
+    port = _free_port()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers), options=SERVER_OPTIONS)
+    mqtt_gateway_pb2_grpc.add_MqttGatewayServiceServicer_to_server(MqttGatewayServicer(), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    return server, port
+
+
+async def _load(port: int, requests: int, concurrency: int, status_ratio: float) -> dict:
+    latencies = []
+    async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = mqtt_gateway_pb2_grpc.MqttGatewayServiceStub(channel)
+        publish = mqtt_gateway_pb2.PublishMessageRequest(topic="bench/topic", payload=b"{}", qos=1)
+        status = mqtt_gateway_pb2.GetConnectionStatusRequest()
+        status_every = int(1 / status_ratio) if status_ratio > 0 else 0
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                if status_every and i % status_every == 0:
+                    await stub.GetConnectionStatus(status, timeout=30)
+                else:
+                    await stub.PublishMessage(publish, timeout=30)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gRPC 服务端并发吞吐基准")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", default="1,10,50,200")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--status-ratio", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=settings.GRPC_BLOCKING_WORKERS,
+                        help="thread 与 aio 服务端共同使用的线程数")
+    parser.add_argument("--legacy-workers", type=int, default=10,
+                        help="改造前 serve_grpc 的线程数，0 表示不测")
+    args = parser.parse_args()
+    _simulate_broker(args.latency_ms / 1000)
+
+    thread_server, thread_port = _thread_server(args.workers)
+    servers = [("thread", thread_port)]
+
+    settings.GRPC_BLOCKING_WORKERS = args.workers
+    aio_port = _free_port()
+    aio_server = serve_grpc_aio(port=aio_port)
+    servers.append(("aio", aio_port))
+
+    legacy_server = None
+    if args.legacy_workers:
+        legacy_server, legacy_port = _thread_server(args.legacy_workers)
+        servers.append((f"thread-{args.legacy_workers}", legacy_port))
+
+    print(
+        f"requests={args.requests} publish_latency={args.latency_ms}ms status_ratio={args.status_ratio} "
+        f"workers={args.workers}"
+    )
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            for name, port in servers:
+                result = asyncio.run(_load(port, args.requests, concurrency, args.status_ratio))
+                print(
+                    f"concurrency={concurrency:>4} {name:>9}: {result['rps']:8.0f} rpc/s  "
+                    f"p50 {result['p50_ms']:7.2f}ms  p99 {result['p99_ms']:7.2f}ms"
+                )
+    finally:
+        thread_server.stop(None)
+        if legacy_server:
+            legacy_server.stop(None)
+        aio_server.stop(grace=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+设备上报负载格式基准
+
+对比已可用的负载格式（json / cbor / msgpack / protobuf）编码同一条负载的大小，
+以及解码为内部负载模型（app/schemas/payload.py）的耗时：
+- size:   编码后的字节数（受限设备关心的上行帧大小）
+- encode: 负载模型 -> bytes（设备侧/模拟器）
+- decode: bytes -> 负载模型（MQTTService 处理函数中的解码）
+
+cbor2 / msgpack 未安装时对应格式不参与对比。
+
+用法（在 iot_backend 目录下）:
+    python scripts/benchmarks/bench_payload_formats.py --iterations 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from app.core.payload_formats import available_formats, get_format
+from app.schemas.payload import CommandResponsePayload, StatusPayload, TelemetryPayload
+
+PAYLOADS = {
+    # 电池供电传感器的典型上报：少量数值读数
+    "telemetry_small": TelemetryPayload(data={"temperature": 23.71, "humidity": 48.2, "battery": 3.297}),
+    # 同样的读数按定点整数上报（温度 x100 等），CBOR/MessagePack 的整数编码比浮点紧凑
+    "telemetry_scaled": TelemetryPayload(data={"t": 2371, "h": 482, "b": 3297}),
+    "telemetry_large": TelemetryPayload(
+        type="telemetry",
+        data={
+            **{f"ch{i}": round(0.1 * i + 0.013, 3) for i in range(24)},
+            "rssi": -67,
+            "firmware": "1.4.2",
+            "name": "车间A-温湿度传感器",
+        },
+    ),
+    "status": StatusPayload(status="online", firmware="1.4.2", uptime="86400"),
+    "command_response": CommandResponsePayload(
+        command_id="5f0c6a1e-8d2b-4c1a-9f3e-7b6d2a4c8e10", status="completed", result={"ok": True, "code": 0}
+    ),
+}
+
+
+def bench(fn, iterations):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--formats", nargs="+", default=available_formats())
+    args = parser.parse_args()
+
+    missing = [name for name in ("json", "cbor", "msgpack", "protobuf") if name not in available_formats()]
+    if missing:
+        print(f"unavailable formats (not installed): {', '.join(missing)}")
+
+    for payload_name, payload in PAYLOADS.items():
+        schema = type(payload)
+        json_size = len(get_format("json").encode(payload))
+        print(f"{payload_name}")
+        for name in args.formats:
+            payload_format = get_format(name)
+            raw = payload_format.encode(payload)
+            encode_us = bench(lambda: payload_format.encode(payload), args.iterations)
+            decode_us = bench(lambda: payload_format.decode(raw, schema), args.iterations)
+            print(
+                f"  {name:<9} size={len(raw):>4} B ({len(raw) / json_size:>4.0%} of json)  "
+                f"encode={encode_us:>6.2f} us  decode={decode_us:>6.2f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
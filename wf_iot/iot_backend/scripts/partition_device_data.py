@@ -0,0 +1,45 @@
+"""
+将 device_data 转换为按时间分区（一次性迁移）
+
+转换会重建整张表（期间写入被阻塞，耗时与数据量成正比），
+并将主键改为 (id, timestamp)、删除 device_id 外键（InnoDB 分区表的要求）。
+应在维护窗口中执行；转换完成后，定时任务 maintain_telemetry_storage 负责滚动创建和删除分区。
+仅 MySQL 生效，表已分区时不做任何操作。
+
+用法（在 iot_backend 目录下）:
+    python scripts/partition_device_data.py --yes
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.core.config import settings
+from app.crud.device import device_data_crud
+from app.db.session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--yes", action="store_true", help="确认执行转换")
+    args = parser.parse_args()
+
+    if not args.yes:
+        parser.error("converting device_data rebuilds the table; re-run with --yes to confirm")
+
+    db = SessionLocal()
+    try:
+        converted = device_data_crud.partition_storage(db)
+    finally:
+        db.close()
+    if converted:
+        print(f"device_data partitioned by {settings.TELEMETRY_PARTITION_INTERVAL}")
+    else:
+        print("device_data is already partitioned or the database does not support partitioning")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,6 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 
 from app.core import security
 from app.core.config import settings
@@ -28,14 +27,13 @@ def get_current_user(
         detail="无法验证凭证",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+    payload = security.decode_token(token)
+    if payload is None:
         raise credentials_exception
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    token_data = TokenData(username=username)
 
     user = user_crud.get_by_username(db, username=token_data.username)
     if user is None:
@@ -75,7 +73,7 @@ def login_for_access_token(
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
+            data=user_crud.get_token_claims(db, user), expires_delta=access_token_expires
         ),
         "token_type": "bearer",
     }
@@ -88,12 +86,15 @@ def test_token(current_user: User = Depends(get_current_active_user)) -> Any:
 
 
 @router.post("/refresh-token", response_model=Token)
-def refresh_token(current_user: User = Depends(get_current_active_user)) -> Any:
+def refresh_token(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
     """刷新访问令牌"""
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
-            data={"sub": current_user.username}, expires_delta=access_token_expires
+            data=user_crud.get_token_claims(db, current_user), expires_delta=access_token_expires
         ),
         "token_type": "bearer",
     }
@@ -1,7 +1,7 @@
 # 配置管理（auth-service专用）
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -12,6 +12,10 @@ class Settings(BaseSettings):
     SERVICE_HOST: str = "0.0.0.0"
     HTTP_PORT: int = 8101
     GRPC_PORT: int = 50051
+    GRPC_MIN_PING_INTERVAL_MS: int = 30000  # 允许客户端 keepalive ping 的最小间隔(毫秒)
+    GRPC_SERVER_MODE: str = "aio"  # aio: grpc.aio 服务端(独立事件循环线程) / thread: 线程池服务端
+    GRPC_MAX_CONCURRENT_RPCS: int = 1000  # 同时处理的RPC上限，超出时立即返回 RESOURCE_EXHAUSTED
+    GRPC_BLOCKING_WORKERS: int = 24  # 执行数据库访问的线程数(thread 模式下为服务端线程数)，不宜超过 DB_POOL_SIZE + DB_MAX_OVERFLOW
     DEBUG: bool = False
 
     # 数据库配置（auth专用数据库）
@@ -25,6 +29,15 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
 
+    # 数据库连接池配置，环境变量为 AUTH_DB_POOL_* / AUTH_DB_MAX_OVERFLOW
+    DB_POOL_SIZE: int = 10  # 常驻连接数
+    DB_MAX_OVERFLOW: int = 20  # 超出常驻连接数后允许临时创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 连接耗尽时等待签出的最长秒数
+    DB_POOL_RECYCLE: int = 300  # 连接最长使用秒数，应小于 MySQL wait_timeout
+    DB_POOL_PRE_PING: str = "idle"  # 签出时的连接检测: always / idle(只检测空闲过久的连接) / never
+    DB_POOL_PRE_PING_IDLE: float = 30.0  # idle 策略下空闲超过该秒数的连接签出时才执行 ping
+    DB_POOL_USE_LIFO: bool = False  # 优先复用最近归还的连接
+
     # Redis配置
     REDIS_HOST: str = "redis_cache"
     REDIS_PORT: int = 6379
@@ -34,10 +47,24 @@ class Settings(BaseSettings):
     def REDIS_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    # 密码哈希配置，环境变量为 AUTH_PASSWORD_*
+    PASSWORD_HASH_SCHEME: str = "argon2"  # 新哈希的算法: argon2(需安装 argon2-cffi，未安装时回退 bcrypt) / bcrypt；登录成功时旧格式哈希自动重算
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # bcrypt 成本因子，修改后旧哈希在下次登录时按新成本重算
+    PASSWORD_ARGON2_TIME_COST: int = 2  # argon2id 迭代次数
+    PASSWORD_ARGON2_MEMORY_COST: int = 19456  # argon2id 内存开销(KiB)
+    PASSWORD_ARGON2_PARALLELISM: int = 1  # argon2id 并行度
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # 哈希计算的执行池: thread / process
+    PASSWORD_HASH_WORKERS: int = 4  # 哈希计算的最大并发数
+    PASSWORD_HASH_MAX_QUEUE: int = 256  # 等待计算的请求上限，超出时直接拒绝，避免登录洪峰占满请求线程
+
     # JWT配置
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"  # HS256 使用 SECRET_KEY；RS256 / ES256 使用 JWT_PRIVATE_KEY_FILE，公钥通过 GetSigningKeys 分发
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None  # RS256 / ES256 签名私钥(PEM)路径
+    JWT_KEY_ID: str = "default"  # 当前签名密钥的 kid，轮换密钥时更换
+    JWT_RETIRED_PUBLIC_KEYS: Dict[str, str] = {}  # 轮换期内仍需接受的旧公钥 kid -> PEM，JSON格式环境变量
+    JWT_KEYS_MAX_AGE: int = 300  # 其他服务缓存公钥的建议秒数
 
     # Consul配置（服务发现）
     CONSUL_HOST: str = "consul"
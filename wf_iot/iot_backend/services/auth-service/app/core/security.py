@@ -1,22 +1,60 @@
 # 认证与授权(JWT)
 
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Dict, Optional
+from jose import JWTError, jwk, jwt
 from app.core.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.password_hasher import password_hasher
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """验证密码（在密码哈希执行池中计算）"""
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """生成密码哈希"""
-    return pwd_context.hash(password)
+    """生成密码哈希（在密码哈希执行池中计算）"""
+    return password_hasher.hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """哈希算法或成本参数已过时，应在验证成功后重算"""
+    return password_hasher.needs_rehash(hashed_password)
+
+
+def is_asymmetric() -> bool:
+    """是否使用非对称签名（公钥可分发给其他服务本地验证）"""
+    return not settings.ALGORITHM.startswith("HS")
+
+
+@lru_cache()
+def _private_key() -> str:
+    if not settings.JWT_PRIVATE_KEY_FILE:
+        raise RuntimeError(f"AUTH_JWT_PRIVATE_KEY_FILE is required for {settings.ALGORITHM}")
+    with open(settings.JWT_PRIVATE_KEY_FILE) as f:
+        return f.read()
+
+
+@lru_cache()
+def get_public_keys() -> Dict[str, str]:
+    """验证公钥 kid -> PEM，包含当前签名密钥及轮换期内保留的旧公钥；HS256 时为空"""
+    if not is_asymmetric():
+        return {}
+    keys = dict(settings.JWT_RETIRED_PUBLIC_KEYS)
+    public_key = jwk.construct(_private_key(), settings.ALGORITHM).public_key().to_pem()
+    keys[settings.JWT_KEY_ID] = public_key.decode("ascii") if isinstance(public_key, bytes) else public_key
+    return keys
+
+
+def _decode(token: str) -> dict:
+    if not is_asymmetric():
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    kid = jwt.get_unverified_header(token).get("kid", settings.JWT_KEY_ID)
+    key = get_public_keys().get(kid)
+    if key is None:
+        raise JWTError(f"Unknown signing key: {kid}")
+    return jwt.decode(token, key, algorithms=[settings.ALGORITHM])
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -27,14 +65,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    if not is_asymmetric():
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return jwt.encode(to_encode, _private_key(), algorithm=settings.ALGORITHM, headers={"kid": settings.JWT_KEY_ID})
 
 
 def decode_token(token: str) -> Optional[dict]:
     """解码JWT令牌"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decode(token)
         return payload
     except JWTError:
         return None
@@ -46,7 +85,7 @@ def validate_token(token: str) -> tuple[bool, Optional[str], Optional[str]]:
     返回: (是否有效, 用户名, 错误信息)
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decode(token)
         username: str = payload.get("sub")
         if username is None:
             return False, None, "Token中缺少用户信息"
@@ -1,12 +1,13 @@
 # 用户、角色、权限CRUD操作
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from app.db.models.user import User, Role, Permission, UserRole, RolePermission
 from app.schemas.user import UserCreate, UserUpdate, RoleCreate, PermissionCreate
-from app.core.security import get_password_hash, verify_password
+from app.core.password_hasher import password_hasher
+from app.core.security import get_password_hash, verify_password, password_needs_rehash
 
 
 class CRUDUser:
@@ -73,6 +74,12 @@ class CRUDUser:
             return None
         if not verify_password(password, user.hashed_password):
             return None
+        if password_needs_rehash(user.hashed_password):
+            # 登录成功时透明升级为当前算法及成本参数的哈希
+            user.hashed_password = get_password_hash(password)
+            db.add(user)
+            db.commit()
+            password_hasher.record_rehash()
         return user
 
     def is_active(self, user: User) -> bool:
@@ -121,6 +128,27 @@ class CRUDUser:
         ).distinct().all()
         return permissions
 
+    def get_permission_codes(self, db: Session, user_id: int) -> Set[str]:
+        """获取用户的有效权限集合（单次联表查询），元素格式为 resource:action"""
+        rows = db.query(Permission.resource, Permission.action).join(
+            RolePermission, RolePermission.permission_id == Permission.id
+        ).join(
+            UserRole, UserRole.role_id == RolePermission.role_id
+        ).filter(UserRole.user_id == user_id).distinct().all()
+        return {f"{resource}:{action}" for resource, action in rows}
+
+    def get_token_claims(self, db: Session, user: User) -> Dict[str, Any]:
+        """
+        访问令牌声明：用户标识及签发时的有效权限
+        资源服务本地验证Token后直接据此鉴权，权限变更在Token刷新后生效
+        """
+        return {
+            "sub": user.username,
+            "uid": user.id,
+            "su": bool(user.is_supperuser),
+            "perms": sorted(self.get_permission_codes(db, user.id)),
+        }
+
     def has_permission(self, db: Session, user_id: int, resource: str, action: str) -> bool:
         """检查用户是否有特定权限"""
         # 先检查是否为超级用户
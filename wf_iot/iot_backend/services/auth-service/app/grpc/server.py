@@ -10,14 +10,17 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../../proto/ge
 
 from auth_pb2 import (
     ValidateTokenResponse, CheckPermissionResponse, UserResponse,
-    PermissionListResponse, VerifyCredentialsResponse, RoleInfo, PermissionInfo
+    PermissionListResponse, VerifyCredentialsResponse, RoleInfo, PermissionInfo,
+    AuthorizeResponse, BatchAuthorizeResponse, SigningKey, SigningKeysResponse
 )
 import auth_pb2_grpc
 
 from app.db.session import SessionLocal
 from app.crud.user import user_crud, role_crud, permission_crud
-from app.core.security import validate_token, create_access_token, verify_password
+from app.core.security import validate_token, decode_token, create_access_token, verify_password, get_public_keys
 from app.core.config import settings
+from app.core.password_hasher import PasswordHasherBusyError
+from app.grpc.aio_server import AioServerThread, BlockingOffload
 
 
 class AuthServicer(auth_pb2_grpc.AuthServiceServicer):
@@ -161,7 +164,10 @@ class AuthServicer(auth_pb2_grpc.AuthServiceServicer):
 
         db = SessionLocal()
         try:
-            user = user_crud.authenticate(db, username, password)
+            try:
+                user = user_crud.authenticate(db, username, password)
+            except PasswordHasherBusyError:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "密码验证繁忙，请稍后重试")
             if not user:
                 return VerifyCredentialsResponse(
                     success=False,
@@ -175,7 +181,7 @@ class AuthServicer(auth_pb2_grpc.AuthServiceServicer):
                 )
 
             # 创建访问令牌
-            access_token = create_access_token(data={"sub": user.username})
+            access_token = create_access_token(data=user_crud.get_token_claims(db, user))
 
             return VerifyCredentialsResponse(
                 success=True,
@@ -186,12 +192,139 @@ class AuthServicer(auth_pb2_grpc.AuthServiceServicer):
         finally:
             db.close()
 
+    def _load_principal(self, db, token: str) -> tuple:
+        """
+        验证Token并加载用户及其有效权限
+        返回: (错误信息, 用户, 权限集合, 过期时间)
+        """
+        payload = decode_token(token)
+        if not payload or not payload.get("sub"):
+            return "Token无效", None, None, 0
+        user = user_crud.get_by_username(db, payload["sub"])
+        if not user:
+            return "用户不存在", None, None, 0
+        if not user.is_active:
+            return "用户已被禁用", None, None, 0
+        return None, user, user_crud.get_permission_codes(db, user.id), int(payload.get("exp", 0))
+
+    @staticmethod
+    def _authorize_response(principal: tuple, resource: str, action: str) -> AuthorizeResponse:
+        error, user, permissions, expires_at = principal
+        if error:
+            return AuthorizeResponse(valid=False, allowed=False, error_message=error)
+        allowed = not resource or user.is_supperuser or f"{resource}:{action}" in permissions
+        return AuthorizeResponse(
+            valid=True,
+            allowed=allowed,
+            user_id=user.id,
+            username=user.username,
+            is_superuser=bool(user.is_supperuser),
+            permissions=sorted(permissions),
+            expires_at=expires_at,
+            error_message="" if allowed else f"缺少权限: {resource}:{action}"
+        )
+
+    def Authorize(self, request, context):
+        """验证Token并检查权限，替代 ValidateToken + CheckPermission 两次调用"""
+        db = SessionLocal()
+        try:
+            principal = self._load_principal(db, request.token)
+            return self._authorize_response(principal, request.resource, request.action)
+        finally:
+            db.close()
+
+    def BatchAuthorize(self, request, context):
+        """批量验证Token并检查权限，相同Token只加载一次"""
+        db = SessionLocal()
+        try:
+            principals = {}
+            responses = []
+            for item in request.requests:
+                if item.token not in principals:
+                    principals[item.token] = self._load_principal(db, item.token)
+                responses.append(self._authorize_response(principals[item.token], item.resource, item.action))
+            return BatchAuthorizeResponse(responses=responses)
+        finally:
+            db.close()
+
+    def GetSigningKeys(self, request, context):
+        """获取JWT验证公钥，HS256 时返回空列表"""
+        keys = [
+            SigningKey(kid=kid, algorithm=settings.ALGORITHM, public_key=public_key)
+            for kid, public_key in get_public_keys().items()
+        ]
+        return SigningKeysResponse(
+            keys=keys,
+            current_kid=settings.JWT_KEY_ID if keys else "",
+            max_age=settings.JWT_KEYS_MAX_AGE
+        )
+
+
+class AsyncAuthServicer(auth_pb2_grpc.AuthServiceServicer):
+    """AuthServicer 的 grpc.aio 版本，数据库访问及密码验证在线程池执行"""
+
+    def __init__(self, offload: BlockingOffload):
+        self._servicer = AuthServicer()
+        self._offload = offload
+
+    async def ValidateToken(self, request, context):
+        return await self._offload(self._servicer.ValidateToken, request, context)
+
+    async def CheckPermission(self, request, context):
+        return await self._offload(self._servicer.CheckPermission, request, context)
+
+    async def GetUserById(self, request, context):
+        return await self._offload(self._servicer.GetUserById, request, context)
+
+    async def GetUserPermissions(self, request, context):
+        return await self._offload(self._servicer.GetUserPermissions, request, context)
+
+    async def VerifyCredentials(self, request, context):
+        return await self._offload(self._servicer.VerifyCredentials, request, context)
+
+    async def Authorize(self, request, context):
+        return await self._offload(self._servicer.Authorize, request, context)
+
+    async def BatchAuthorize(self, request, context):
+        return await self._offload(self._servicer.BatchAuthorize, request, context)
+
+    async def GetSigningKeys(self, request, context):
+        return self._servicer.GetSigningKeys(request, context)
+
+
+# 允许客户端在空闲连接上按 keepalive 周期发送 ping（默认最小间隔为5分钟，更频繁会被断开）
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_recv_ping_interval_without_data_ms", settings.GRPC_MIN_PING_INTERVAL_MS),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
 
 def serve_grpc():
-    """启动gRPC服务"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    """启动gRPC服务，GRPC_SERVER_MODE 为 aio 时使用 grpc.aio 服务端"""
+    if settings.GRPC_SERVER_MODE == "aio":
+        return serve_grpc_aio()
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=settings.GRPC_BLOCKING_WORKERS),
+        options=SERVER_OPTIONS,
+        maximum_concurrent_rpcs=settings.GRPC_MAX_CONCURRENT_RPCS
+    )
     auth_pb2_grpc.add_AuthServiceServicer_to_server(AuthServicer(), server)
     server.add_insecure_port(f'[::]:{settings.GRPC_PORT}')
     server.start()
     print(f"Auth Service gRPC服务启动在端口 {settings.GRPC_PORT}")
     return server
+
+
+def serve_grpc_aio(port: int = None) -> AioServerThread:
+    """在独立事件循环线程中启动 grpc.aio 服务，超过 GRPC_MAX_CONCURRENT_RPCS 的请求返回 RESOURCE_EXHAUSTED"""
+    offload = BlockingOffload(settings.GRPC_BLOCKING_WORKERS)
+    address = f'[::]:{settings.GRPC_PORT if port is None else port}'
+
+    async def build(server):
+        auth_pb2_grpc.add_AuthServiceServicer_to_server(AsyncAuthServicer(offload), server)
+        server.add_insecure_port(address)
+
+    runner = AioServerThread(build, SERVER_OPTIONS, settings.GRPC_MAX_CONCURRENT_RPCS, offload).start()
+    print(f"Auth Service gRPC(aio)服务启动在 {address}")
+    return runner
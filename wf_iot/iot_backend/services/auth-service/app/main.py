@@ -2,10 +2,13 @@
 
 import threading
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
+from app.db.pool import get_pool_stats
+from app.core.password_hasher import PasswordHasherBusyError, password_hasher
 from app.api.v1.api import api_router
 from app.grpc.server import serve_grpc
 
@@ -21,6 +24,7 @@ async def lifespan(app: FastAPI):
 
     # 关闭时：停止gRPC服务
     grpc_server.stop(grace=5)
+    password_hasher.shutdown()
     print("Auth Service 已关闭")
 
 
@@ -47,6 +51,12 @@ app.add_middleware(
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    """密码哈希排队已满，提示客户端稍后重试"""
+    return JSONResponse(status_code=503, content={"detail": "服务繁忙，请稍后重试"}, headers={"Retry-After": "1"})
+
+
 @app.get("/health")
 def health_check():
     """健康检查端点"""
@@ -54,7 +64,9 @@ def health_check():
         "status": "healthy",
         "service": settings.SERVICE_NAME,
         "http_port": settings.HTTP_PORT,
-        "grpc_port": settings.GRPC_PORT
+        "grpc_port": settings.GRPC_PORT,
+        "db_pool": get_pool_stats(),
+        "password_hasher": password_hasher.get_stats()
     }
 
 
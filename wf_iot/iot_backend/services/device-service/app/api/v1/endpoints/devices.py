@@ -1,11 +1,14 @@
 # 设备管理API端点
 
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response
 from sqlalchemy.orm import Session
 
 from app.crud.device import device_crud, device_data_crud, device_command_crud
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.config import settings
+from app.core.jwt_verifier import local_jwt_verifier
+from app.core.pagination import paginate_or_400, set_page_headers
 from app.schemas.device import (
     Device, DeviceCreate, DeviceUpdate, DeviceListResponse,
     DeviceData, DeviceDataCreate,
@@ -18,49 +21,95 @@ router = APIRouter()
 
 
 def verify_token(authorization: str = Header(None)) -> dict:
-    """验证JWT Token"""
+    """验证JWT Token（本地验证签名，需要时经auth-service确认）"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="缺少认证信息")
 
     token = authorization.split(" ")[1]
-    valid, user_id, username, error = auth_grpc_client.validate_token(token)
-
-    if not valid:
-        raise HTTPException(status_code=401, detail=error or "Token无效")
-
-    return {"user_id": user_id, "username": username}
-
-
-def check_permission(user_id: int, resource: str, action: str):
-    """检查用户权限"""
-    allowed, reason = auth_grpc_client.check_permission(user_id, resource, action)
-    if not allowed:
-        raise HTTPException(status_code=403, detail=reason or "权限不足")
+    # 优先本地验证签名，无法判断时回退到 auth-service
+    result = local_jwt_verifier.verify(token)
+    if result is None:
+        result = auth_grpc_client.authorize(token)
+    elif result.valid and settings.JWT_REVOCATION_CHECK:
+        # 吊销检查（用户被禁用或删除），结果按Token缓存，之后的权限检查由缓存在本地判断；
+        # auth-service 不可用时以本地验证结果及Token内的权限声明为准
+        checked = auth_grpc_client.authorize(token)
+        if not checked.unavailable:
+            result = checked
+
+    if not result.valid:
+        raise HTTPException(status_code=401, detail=result.error or "Token无效")
+
+    return {
+        "user_id": result.user_id,
+        "username": result.username,
+        "token": token,
+        "permissions": result.permissions,
+        "is_superuser": result.is_superuser,
+    }
+
+
+def check_permission(current_user: dict, resource: str, action: str):
+    """
+    检查用户权限
+
+    本地验证的Token含权限声明且未经吊销检查时直接在本地判断，不依赖 auth-service
+    （关闭 JWT_REVOCATION_CHECK 时权限变更及禁用在Token过期后生效）；
+    否则经 auth-service 鉴权（同时确认用户未被禁用或删除），权限集合按Token缓存，缓存有效期内不发起RPC
+    """
+    permissions = current_user.get("permissions")
+    if permissions is not None:
+        if not (current_user.get("is_superuser") or f"{resource}:{action}" in permissions):
+            raise HTTPException(status_code=403, detail=f"缺少权限: {resource}:{action}")
+        return
+
+    result = auth_grpc_client.authorize(current_user["token"], resource, action)
+    if result.unavailable:
+        raise HTTPException(status_code=503, detail="认证服务不可用")
+    if not result.valid:
+        raise HTTPException(status_code=401, detail=result.error or "Token无效")
+    if not result.allowed:
+        raise HTTPException(status_code=403, detail=result.error or "权限不足")
 
 
 @router.get("/", response_model=DeviceListResponse)
 def list_devices(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页的 next_cursor"),
+    with_total: bool = Query(False, description="是否返回近似总数"),
     status: Optional[str] = None,
     product_id: Optional[str] = None,
     owner_id: Optional[int] = None,
     current_user: dict = Depends(verify_token),
 ) -> Any:
-    """获取设备列表"""
-    check_permission(current_user["user_id"], "device", "read")
-
-    skip = (page - 1) * page_size
-    devices, total = device_crud.get_multi(
-        db, skip=skip, limit=page_size,
-        owner_id=owner_id, status=status, product_id=product_id
+    """获取设备列表，默认游标分页；page>1 且未传游标时沿用偏移分页"""
+    check_permission(current_user, "device", "read")
+
+    if page > 1 and not cursor:
+        skip = (page - 1) * page_size
+        devices, total = device_crud.get_multi(
+            db, skip=skip, limit=page_size,
+            owner_id=owner_id, status=status, product_id=product_id
+        )
+        return DeviceListResponse(
+            devices=devices,
+            total=total,
+            page=page,
+            page_size=page_size
+        )
+
+    devices, next_cursor, total = paginate_or_400(
+        device_crud.get_page, db, limit=page_size, cursor=cursor,
+        owner_id=owner_id, status=status, product_id=product_id, with_total=with_total
     )
     return DeviceListResponse(
         devices=devices,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
@@ -72,7 +121,7 @@ def create_device(
     current_user: dict = Depends(verify_token),
 ) -> Any:
     """创建新设备"""
-    check_permission(current_user["user_id"], "device", "write")
+    check_permission(current_user, "device", "write")
 
     # 检查设备ID是否已存在
     existing = device_crud.get_by_device_id(db, device_in.device_id)
@@ -90,7 +139,7 @@ def get_device(
     current_user: dict = Depends(verify_token),
 ) -> Any:
     """获取设备详情"""
-    check_permission(current_user["user_id"], "device", "read")
+    check_permission(current_user, "device", "read")
 
     device = device_crud.get_by_device_id(db, device_id)
     if not device:
@@ -107,7 +156,7 @@ def update_device(
     current_user: dict = Depends(verify_token),
 ) -> Any:
     """更新设备信息"""
-    check_permission(current_user["user_id"], "device", "write")
+    check_permission(current_user, "device", "write")
 
     device = device_crud.get_by_device_id(db, device_id)
     if not device:
@@ -124,7 +173,7 @@ def delete_device(
     current_user: dict = Depends(verify_token),
 ) -> Any:
     """删除设备"""
-    check_permission(current_user["user_id"], "device", "delete")
+    check_permission(current_user, "device", "delete")
 
     device = device_crud.get_by_device_id(db, device_id)
     if not device:
@@ -137,19 +186,24 @@ def delete_device(
 @router.get("/{device_id}/data", response_model=List[DeviceData])
 def get_device_data(
     device_id: str,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
     data_type: Optional[str] = None,
     current_user: dict = Depends(verify_token),
 ) -> Any:
-    """获取设备数据"""
-    check_permission(current_user["user_id"], "device", "read")
+    """获取设备数据，按时间倒序游标分页"""
+    check_permission(current_user, "device", "read")
 
     device = device_crud.get_by_device_id(db, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="设备不存在")
 
-    data = device_data_crud.get_device_data(db, device.id, data_type=data_type, limit=limit)
+    data, next_cursor = paginate_or_400(
+        device_data_crud.get_data_page, db, device.id, data_type=data_type, limit=limit, cursor=cursor
+    )
+    set_page_headers(response, next_cursor)
     return data
 
 
@@ -162,7 +216,7 @@ def send_device_command(
     current_user: dict = Depends(verify_token),
 ) -> Any:
     """发送设备命令"""
-    check_permission(current_user["user_id"], "device", "write")
+    check_permission(current_user, "device", "write")
 
     device = device_crud.get_by_device_id(db, device_id)
     if not device:
@@ -194,13 +248,18 @@ def send_device_command(
 @router.get("/{device_id}/commands", response_model=List[DeviceCommand])
 def get_device_commands(
     device_id: str,
+    response: Response,
     db: Session = Depends(get_db),
     status: Optional[str] = None,
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
     current_user: dict = Depends(verify_token),
 ) -> Any:
-    """获取设备命令历史"""
-    check_permission(current_user["user_id"], "device", "read")
+    """获取设备命令历史，按创建时间倒序游标分页"""
+    check_permission(current_user, "device", "read")
 
-    commands = device_command_crud.get_device_commands(db, device_id, status=status, limit=limit)
+    commands, next_cursor = paginate_or_400(
+        device_command_crud.get_commands_page, db, device_id, status=status, limit=limit, cursor=cursor
+    )
+    set_page_headers(response, next_cursor)
     return commands
@@ -0,0 +1,213 @@
+# 作用：设备标识解析缓存（device_id -> devices.id）
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceIdCache:
+    """
+    设备标识解析缓存
+
+    - 一级缓存：进程内 LRU + TTL，容量超限时淘汰最久未使用的条目
+    - 二级缓存（可选）：Redis，多个 worker 共享，并通过 pub/sub 广播失效消息，
+      使各进程的一级缓存在设备删除/重建后保持一致
+    - 只缓存命中结果，不缓存"设备不存在"，避免新设备注册后被误判
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100000,
+        ttl: float = 300.0,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "device_pk:",
+        invalidation_channel: str = "device_pk.invalidate",
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.invalidation_channel = invalidation_channel
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis: Optional["redis.Redis"] = None
+        self._listener: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "redis_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+        if redis_url and REDIS_AVAILABLE:
+            self._connect_redis(redis_url)
+
+    def _connect_redis(self, redis_url: str):
+        try:
+            self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            self._redis.ping()
+            self._listener = threading.Thread(target=self._listen_invalidations, daemon=True)
+            self._listener.start()
+            logger.info(f"Device id cache using Redis tier at {redis_url}")
+        except Exception as e:
+            self._redis = None
+            logger.warning(f"Device id cache Redis tier disabled: {e}")
+
+    def _listen_invalidations(self):
+        """订阅失效广播，删除本进程一级缓存中的对应条目"""
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.invalidation_channel)
+            for message in pubsub.listen():
+                if message.get("type") == "message":
+                    self._evict_local(message["data"])
+        except Exception as e:
+            logger.error(f"Device id cache invalidation listener stopped: {e}")
+
+    def _evict_local(self, device_id: str):
+        with self._lock:
+            self._entries.pop(device_id, None)
+
+    def _set_local(self, device_id: str, pk: int):
+        with self._lock:
+            self._entries[device_id] = (pk, time.monotonic() + self.ttl)
+            self._entries.move_to_end(device_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    @property
+    def redis_enabled(self) -> bool:
+        """是否启用了 Redis 二级缓存（启用时 get/set/invalidate 可能阻塞于网络往返）"""
+        return self._redis is not None
+
+    def _get_local(self, device_id: str) -> Optional[int]:
+        """查询一级缓存，未命中或已过期返回None"""
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None:
+                pk, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(device_id)
+                    self.stats["hits"] += 1
+                    return pk
+                del self._entries[device_id]
+                self.stats["expirations"] += 1
+        return None
+
+    def get(self, device_id: str) -> Optional[int]:
+        """查询缓存，未命中返回None"""
+        pk = self._get_local(device_id)
+        if pk is not None:
+            return pk
+
+        if self._redis is not None:
+            try:
+                value = self._redis.get(self.key_prefix + device_id)
+            except Exception as e:
+                logger.warning(f"Device id cache Redis get failed: {e}")
+                value = None
+            if value is not None:
+                self.stats["redis_hits"] += 1
+                self._set_local(device_id, int(value))
+                return int(value)
+
+        self.stats["misses"] += 1
+        return None
+
+    def get_many(self, device_ids: Iterable[str]) -> Dict[str, int]:
+        """批量查询缓存，仅返回命中的条目；一级缓存未命中的部分以一次 MGET 查询Redis"""
+        result = {}
+        missing = []
+        for device_id in device_ids:
+            pk = self._get_local(device_id)
+            if pk is None:
+                missing.append(device_id)
+            else:
+                result[device_id] = pk
+
+        redis_hits = 0
+        if missing and self._redis is not None:
+            try:
+                values = self._redis.mget([self.key_prefix + device_id for device_id in missing])
+            except Exception as e:
+                logger.warning(f"Device id cache Redis mget failed: {e}")
+                values = [None] * len(missing)
+            for device_id, value in zip(missing, values):
+                if value is not None:
+                    redis_hits += 1
+                    self._set_local(device_id, int(value))
+                    result[device_id] = int(value)
+
+        self.stats["redis_hits"] += redis_hits
+        self.stats["misses"] += len(missing) - redis_hits
+        return result
+
+    def set(self, device_id: str, pk: int):
+        """写入缓存"""
+        self._set_local(device_id, pk)
+        if self._redis is not None:
+            try:
+                self._redis.set(self.key_prefix + device_id, pk, ex=int(self.ttl))
+            except Exception as e:
+                logger.warning(f"Device id cache Redis set failed: {e}")
+
+    def set_many(self, mapping: Dict[str, int]):
+        """批量写入缓存，Redis 二级缓存以一次 pipeline 写入"""
+        for device_id, pk in mapping.items():
+            self._set_local(device_id, pk)
+        if mapping and self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for device_id, pk in mapping.items():
+                    pipe.set(self.key_prefix + device_id, pk, ex=int(self.ttl))
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Device id cache Redis pipelined set failed: {e}")
+
+    def invalidate(self, device_id: str):
+        """使指定设备的缓存失效（设备创建/删除时调用）"""
+        self._evict_local(device_id)
+        self.stats["invalidations"] += 1
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                pipe.delete(self.key_prefix + device_id)
+                pipe.publish(self.invalidation_channel, device_id)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Device id cache Redis invalidation failed: {e}")
+
+    def clear(self):
+        """清空本进程一级缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存命中/未命中/淘汰计数"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        stats["maxsize"] = self.maxsize
+        stats["redis_enabled"] = self.redis_enabled
+        return stats
+
+
+# 全局设备标识缓存实例
+device_id_cache = DeviceIdCache(
+    maxsize=settings.DEVICE_ID_CACHE_MAXSIZE,
+    ttl=settings.DEVICE_ID_CACHE_TTL,
+    redis_url=settings.REDIS_URL if settings.DEVICE_ID_CACHE_REDIS_ENABLED else None,
+)
@@ -1,5 +1,6 @@
 # 配置管理（device-service专用）
 
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -25,6 +26,25 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
 
+    # 数据库连接池配置，环境变量为 DEVICE_DB_POOL_* / DEVICE_DB_MAX_OVERFLOW
+    DB_POOL_SIZE: int = 10  # 常驻连接数
+    DB_MAX_OVERFLOW: int = 20  # 超出常驻连接数后允许临时创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 连接耗尽时等待签出的最长秒数
+    DB_POOL_RECYCLE: int = 300  # 连接最长使用秒数，应小于 MySQL wait_timeout
+    DB_POOL_PRE_PING: str = "idle"  # 签出时的连接检测: always / idle(只检测空闲过久的连接) / never
+    DB_POOL_PRE_PING_IDLE: float = 30.0  # idle 策略下空闲超过该秒数的连接签出时才执行 ping
+    DB_POOL_USE_LIFO: bool = False  # 优先复用最近归还的连接
+
+    # 只读副本配置，未设置 MYSQL_REPLICA_HOST 时只读查询仍使用主库
+    MYSQL_REPLICA_HOST: Optional[str] = None
+    MYSQL_REPLICA_PORT: int = 3306
+
+    @property
+    def REPLICA_DATABASE_URL(self) -> Optional[str]:
+        if not self.MYSQL_REPLICA_HOST:
+            return None
+        return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_REPLICA_HOST}:{self.MYSQL_REPLICA_PORT}/{self.MYSQL_DATABASE}"
+
     # Redis配置（事件订阅）
     REDIS_HOST: str = "redis_cache"
     REDIS_PORT: int = 6379
@@ -34,16 +54,63 @@ class Settings(BaseSettings):
     def REDIS_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
-    # gRPC服务地址
+    # gRPC服务地址，多个副本以逗号分隔，调用在副本间轮询
     AUTH_SERVICE_GRPC: str = "auth-service:50051"
     MQTT_GATEWAY_GRPC: str = "mqtt-gateway:50054"
 
-    # 事件通道配置
+    # gRPC客户端通道配置，环境变量为 DEVICE_GRPC_*
+    GRPC_KEEPALIVE_TIME: float = 60.0  # 连接空闲时发送 keepalive ping 的间隔(秒)，不得小于服务端允许的最小间隔
+    GRPC_KEEPALIVE_TIMEOUT: float = 20.0  # ping 无响应超过该秒数判定连接失效
+    GRPC_DEFAULT_TIMEOUT: float = 5.0  # 未指定 timeout 的调用的默认 deadline(秒)
+    GRPC_STREAM_TIMEOUT: float = 3600.0  # 流式调用(StreamPublish、SubscribeDeviceEvents)的 deadline(秒)
+    GRPC_RETRY_MAX_ATTEMPTS: int = 3  # 返回 UNAVAILABLE 时的最大尝试次数(含首次)，1表示不重试
+    GRPC_CHANNELS_PER_TARGET: int = 1  # 每个副本的通道(HTTP/2连接)数，单连接并发流不足时增加
+
+    # Token验证结果缓存配置，环境变量为 DEVICE_AUTH_CACHE_*
+    AUTH_CACHE_MAXSIZE: int = 10000
+    AUTH_CACHE_TTL: float = 60.0  # 缓存有效期(秒)，同时不超过Token本身的过期时间；权限变更最迟在该时间后生效
+
+    # JWT本地验证配置，环境变量为 DEVICE_JWT_*
+    JWT_LOCAL_VERIFY: bool = False  # 在本服务验证Token签名及有效期，不再逐请求调用 auth-service；关闭吊销检查时按Token内的权限声明鉴权
+    JWT_ALGORITHM: str = "HS256"  # 须与 auth-service 的 AUTH_ALGORITHM 一致，RS256 / ES256 的公钥通过 GetSigningKeys 获取
+    JWT_SECRET_KEY: Optional[str] = None  # HS256 共享密钥，须与 AUTH_SECRET_KEY 一致
+    JWT_KEYS_REFRESH_INTERVAL: float = 300.0  # 公钥刷新周期(秒)，遇到未知 kid 时提前刷新
+    JWT_REVOCATION_CHECK: bool = True  # 本地验证通过后经 auth-service(带缓存)确认用户未被禁用，auth-service 不可用时以本地结果为准
+
+    # 事件总线配置，环境变量为 DEVICE_EVENT_BUS_*
+    EVENT_BUS_MODE: str = "streams"  # streams: 以消费组读取 Redis Streams / pubsub: 订阅发布订阅通道；须与 mqtt-gateway 的 MQTT_EVENT_BUS_MODE 对应
+    EVENT_BUS_GROUP: str = "device-service"  # 消费组名，同组的多个实例分担事件，每条事件只由其中一个实例处理
+    EVENT_BUS_CONSUMER: Optional[str] = None  # 消费者名，默认 主机名-进程号；名称固定时重启后先处理自己未确认的事件
+    EVENT_BUS_BLOCK_MS: int = 1000  # XREADGROUP 无新事件时的阻塞等待(毫秒)
+    EVENT_BUS_CLAIM_IDLE_MS: int = 60000  # 已投递但超过该毫秒数未确认的事件(实例崩溃或处理失败)由其他消费者接管
+    EVENT_BUS_CLAIM_INTERVAL: float = 30.0  # 检查并接管超时未确认事件的周期(秒)
+    EVENT_BUS_MAX_DELIVERIES: int = 5  # 投递次数超过该值的事件转入死信流 <流名>.dead 并确认，不再重试
+
+    # 事件通道配置（streams 模式下同时为流的键名）
     EVENT_CHANNEL_DEVICE_DATA: str = "device.data.received"
     EVENT_CHANNEL_DEVICE_STATUS: str = "device.status.changed"
     EVENT_CHANNEL_DEVICE_HEARTBEAT: str = "device.heartbeat"
     EVENT_CHANNEL_COMMAND_RESPONSE: str = "device.command.response"
 
+    # 设备标识解析缓存配置 (device_id -> devices.id)，配置名及环境变量与单体服务相同，为 DEVICE_ID_CACHE_*(不加 DEVICE_ 前缀)
+    DEVICE_ID_CACHE_MAXSIZE: int = Field(100000, validation_alias="DEVICE_ID_CACHE_MAXSIZE")
+    DEVICE_ID_CACHE_TTL: float = Field(300.0, validation_alias="DEVICE_ID_CACHE_TTL")  # 缓存条目有效期(秒)
+    DEVICE_ID_CACHE_REDIS_ENABLED: bool = Field(False, validation_alias="DEVICE_ID_CACHE_REDIS_ENABLED")  # 启用Redis二级缓存，多worker共享并广播失效
+
+    # 设备在线状态跟踪配置 (心跳合并写入)，环境变量为 DEVICE_PRESENCE_*
+    PRESENCE_OFFLINE_TIMEOUT: float = 180.0  # 超过该秒数无心跳判定离线，应大于 PRESENCE_FLUSH_INTERVAL
+    PRESENCE_SWEEP_INTERVAL: float = 15.0  # 上线状态落库及离线扫描的周期(秒)
+    PRESENCE_FLUSH_INTERVAL: float = 60.0  # 在线设备 last_online_at 的粗粒度刷新周期(秒)
+    PRESENCE_REDIS_ENABLED: bool = False  # 使用Redis有序集合保存最后心跳时间，多实例共享；关闭时每个实例独立读取全部心跳事件(不经消费组)
+
+    # 负载编解码配置，环境变量为 DEVICE_JSON_CODEC
+    JSON_CODEC: str = "auto"  # JSON 后端: auto(orjson > msgspec > json，按已安装的选择) / orjson / msgspec / json
+
+    # 事件批量消费配置
+    EVENT_BATCH_ENABLED: bool = True  # 开启后按窗口批量写库，关闭则逐条处理
+    EVENT_BATCH_MAX_SIZE: int = 1000  # 单个窗口最多聚合的消息数
+    EVENT_BATCH_WINDOW: float = 0.2  # 单个窗口最长聚合时间(秒)
+
     # Consul配置（服务发现）
     CONSUL_HOST: str = "consul"
     CONSUL_PORT: int = 8500
@@ -0,0 +1,143 @@
+# 作用：JWT本地验证
+# HS256 使用与 auth-service 相同的共享密钥；RS256 / ES256 使用 auth-service GetSigningKeys 分发的公钥，
+# 公钥按 max_age 定期刷新，遇到未知 kid 时提前刷新（密钥轮换）。刷新失败时继续使用已有公钥，
+# auth-service 不可用时已签发的Token仍可验证。
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.grpc.clients.auth_client import AuthResult, auth_grpc_client
+
+try:
+    from jose import ExpiredSignatureError, JWTError, jwt
+    JOSE_AVAILABLE = True
+except ImportError:
+    JOSE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 两次因未知 kid 触发的刷新之间的最短间隔(秒)，防止伪造 kid 的请求打满 auth-service
+MIN_FORCED_REFRESH_INTERVAL = 10.0
+
+
+class LocalJwtVerifier:
+    """
+    JWT本地验证
+
+    verify 返回:
+    - AuthResult(valid=True):  签名及有效期验证通过，Token含权限声明(perms/su)时一并返回，可在本地鉴权
+    - AuthResult(valid=False): 签名错误、已过期等确定无效的Token
+    - None: 未启用或无法在本地判断（未知 kid、Token中缺少 uid），由调用方回退到 gRPC 验证
+
+    本地验证不检查用户是否已被禁用或删除（吊销），需要时由调用方通过 auth-service 检查
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        algorithm: str = "HS256",
+        secret_key: Optional[str] = None,
+        refresh_interval: float = 300.0,
+        key_fetcher: Optional[Callable[[], Optional[Tuple[Dict[str, str], int]]]] = None,
+    ):
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.refresh_interval = refresh_interval
+        self.key_fetcher = key_fetcher
+        self.enabled = enabled and JOSE_AVAILABLE
+        if enabled and not JOSE_AVAILABLE:
+            logger.warning("python-jose not installed, local JWT verification disabled")
+        if self.enabled and self.symmetric and not secret_key:
+            logger.warning(f"JWT secret key not configured for {algorithm}, local JWT verification disabled")
+            self.enabled = False
+        self._keys: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._max_age = refresh_interval
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"verified": 0, "rejected": 0, "fallbacks": 0, "key_refreshes": 0}
+
+    @property
+    def symmetric(self) -> bool:
+        return self.algorithm.startswith("HS")
+
+    def _refresh_keys(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            age = now - self._fetched_at
+            if force and age < MIN_FORCED_REFRESH_INTERVAL:
+                return
+            if not force and self._keys and age < min(self._max_age, self.refresh_interval):
+                return
+            # 先更新时间戳，并发请求不会同时发起刷新
+            self._fetched_at = now
+        fetched = self.key_fetcher() if self.key_fetcher else None
+        if fetched is None:
+            return
+        keys, max_age = fetched
+        with self._lock:
+            self._keys = keys
+            self._max_age = max_age or self.refresh_interval
+            self.stats["key_refreshes"] += 1
+        logger.info(f"Loaded JWT signing keys: {sorted(keys)}")
+
+    def _key_for(self, token: str) -> Optional[str]:
+        if self.symmetric:
+            return self.secret_key
+        kid = jwt.get_unverified_header(token).get("kid", "default")
+        self._refresh_keys()
+        key = self._keys.get(kid)
+        if key is None:
+            self._refresh_keys(force=True)
+            key = self._keys.get(kid)
+        return key
+
+    def verify(self, token: str) -> Optional[AuthResult]:
+        """在本地验证Token签名及有效期"""
+        if not self.enabled:
+            return None
+        try:
+            key = self._key_for(token)
+            if key is None:
+                self.stats["fallbacks"] += 1
+                return None
+            # 只接受配置的算法，防止算法混淆
+            payload = jwt.decode(token, key, algorithms=[self.algorithm])
+        except ExpiredSignatureError:
+            self.stats["rejected"] += 1
+            return AuthResult(False, False, 0, "", "Token已过期")
+        except JWTError as e:
+            self.stats["rejected"] += 1
+            return AuthResult(False, False, 0, "", f"Token无效: {e}")
+
+        user_id, username = payload.get("uid"), payload.get("sub")
+        if user_id is None or not username:
+            # 旧版本签发的Token不含 uid
+            self.stats["fallbacks"] += 1
+            return None
+        self.stats["verified"] += 1
+        permissions = payload.get("perms")
+        return AuthResult(
+            True, True, int(user_id), username, "",
+            permissions=frozenset(permissions) if isinstance(permissions, list) else None,
+            is_superuser=bool(payload.get("su")),
+        )
+
+    def get_stats(self) -> Dict[str, object]:
+        stats: Dict[str, object] = dict(self.stats)
+        stats["enabled"] = self.enabled
+        stats["algorithm"] = self.algorithm
+        stats["keys"] = sorted(self._keys)
+        return stats
+
+
+# 全局JWT本地验证实例
+local_jwt_verifier = LocalJwtVerifier(
+    enabled=settings.JWT_LOCAL_VERIFY,
+    algorithm=settings.JWT_ALGORITHM,
+    secret_key=settings.JWT_SECRET_KEY,
+    refresh_interval=settings.JWT_KEYS_REFRESH_INTERVAL,
+    key_fetcher=auth_grpc_client.get_signing_keys,
+)
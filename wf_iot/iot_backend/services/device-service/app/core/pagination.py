@@ -0,0 +1,124 @@
+# 作用：游标(keyset)分页
+# 按排序键 (如 (timestamp, id) 或 (id)) 记录上一页最后一行的位置，下一页以 WHERE 条件从该位置继续，
+# 避免 OFFSET 深分页扫描并丢弃前面的所有行。游标对客户端不透明，为排序键值的 base64url 编码。
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Query, Session
+
+# 响应头：下一页游标、(近似)总数
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与当前排序键不匹配"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """将排序键值编码为不透明游标"""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """解析游标，size 为排序键个数"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(value) for value in values]
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Invalid cursor: key mismatch")
+    return values
+
+
+def keyset_filter(columns: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+    """
+    生成"位于游标之后"的过滤条件
+
+    columns 为 (列, 是否降序)，展开为
+    (a > x) OR (a = x AND b > y) ...，以便数据库使用复合索引做范围扫描
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(columns):
+        prefix = [columns[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+def keyset_paginate(
+    query: Query,
+    columns: Sequence[Tuple[Any, bool]],
+    cursor: Optional[str],
+    limit: int,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    对查询做游标分页，返回 (本页数据, 下一页游标)，没有更多数据时游标为 None
+
+    排序键最后一列必须唯一(通常为主键)，保证翻页不重不漏
+    """
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor, len(columns))))
+    query = query.order_by(*(column.desc() if descending else column.asc() for column, descending in columns))
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column, _ in columns])
+
+
+def approximate_count(db: Session, query: Query) -> int:
+    """
+    查询结果数的近似值
+
+    MySQL 上取 EXPLAIN 的优化器行数估计，不扫描数据；
+    其他数据库回退为精确 COUNT(*)
+    """
+    bind = db.get_bind()
+    if bind.dialect.name == "mysql":
+        try:
+            statement = query.order_by(None).statement.compile(bind, compile_kwargs={"literal_binds": True})
+            row = db.execute(text(f"EXPLAIN {statement}")).mappings().first()
+            if row is not None and row.get("rows") is not None:
+                return int(row["rows"])
+        except Exception:
+            pass
+    return query.order_by(None).count()
+
+
+def paginate_or_400(fetch, *args, **kwargs):
+    """调用游标分页函数，游标无效时返回400"""
+    try:
+        return fetch(*args, **kwargs)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="分页游标无效")
+
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: Optional[int] = None):
+    """通过响应头返回下一页游标及总数，响应体保持为列表"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
@@ -1,10 +1,12 @@
 # 设备CRUD操作
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, insert
 from datetime import datetime, timedelta
 
+from app.core.cache import device_id_cache
+from app.core.pagination import approximate_count, keyset_paginate
 from app.db.models.device import Device, DeviceData, DeviceCommand
 from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceDataCreate, DeviceCommandCreate
 
@@ -20,6 +22,28 @@ class CRUDDevice:
         """根据设备唯一标识获取设备"""
         return db.query(Device).filter(Device.device_id == device_id).first()
 
+    def resolve_id(self, db: Session, device_id: str) -> Optional[int]:
+        """将设备唯一标识解析为数据库主键，优先走缓存"""
+        pk = device_id_cache.get(device_id)
+        if pk is None:
+            row = db.query(Device.id).filter(Device.device_id == device_id).first()
+            if row is None:
+                return None
+            pk = row[0]
+            device_id_cache.set(device_id, pk)
+        return pk
+
+    def resolve_ids(self, db: Session, device_ids: Iterable[str]) -> Dict[str, int]:
+        """批量解析设备主键，缓存未命中的部分合并为一次查询"""
+        device_ids = set(device_ids)
+        id_map = device_id_cache.get_many(device_ids)
+        missing = device_ids - id_map.keys()
+        if missing:
+            found = dict(db.query(Device.device_id, Device.id).filter(Device.device_id.in_(missing)).all())
+            device_id_cache.set_many(found)
+            id_map.update(found)
+        return id_map
+
     def get_multi(
         self,
         db: Session,
@@ -42,12 +66,36 @@ class CRUDDevice:
         devices = query.offset(skip).limit(limit).all()
         return devices, total
 
+    def get_page(
+        self,
+        db: Session,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        owner_id: Optional[int] = None,
+        status: Optional[str] = None,
+        product_id: Optional[str] = None,
+        with_total: bool = False
+    ) -> Tuple[List[Device], Optional[str], Optional[int]]:
+        """按主键游标分页获取设备列表，返回 (设备列表, 下一页游标, 近似总数)，总数仅在 with_total 时计算"""
+        query = db.query(Device)
+        if owner_id:
+            query = query.filter(Device.owner_id == owner_id)
+        if status:
+            query = query.filter(Device.status == status)
+        if product_id:
+            query = query.filter(Device.product_id == product_id)
+
+        total = approximate_count(db, query) if with_total else None
+        devices, next_cursor = keyset_paginate(query, [(Device.id, False)], cursor, limit)
+        return devices, next_cursor, total
+
     def create(self, db: Session, obj_in: DeviceCreate) -> Device:
         """创建设备"""
         db_obj = Device(**obj_in.model_dump())
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        device_id_cache.invalidate(db_obj.device_id)
         return db_obj
 
     def update(self, db: Session, db_obj: Device, obj_in: DeviceUpdate) -> Device:
@@ -67,6 +115,7 @@ class CRUDDevice:
         if obj:
             db.delete(obj)
             db.commit()
+            device_id_cache.invalidate(obj.device_id)
         return obj
 
     def update_status(self, db: Session, device_id: str, status: str) -> Optional[Device]:
@@ -81,18 +130,30 @@ class CRUDDevice:
             db.refresh(device)
         return device
 
-    def batch_update_status(self, db: Session, device_ids: List[str], status: str) -> int:
-        """批量更新设备状态"""
+    def batch_update_status(
+        self,
+        db: Session,
+        device_ids: List[str],
+        status: str,
+        last_online_at: Optional[datetime] = None,
+        commit: bool = True
+    ) -> int:
+        """批量更新设备状态，commit=False 时由调用方在同一事务中提交"""
         update_data = {"status": status}
         if status == "online":
-            update_data["last_online_at"] = datetime.utcnow()
+            update_data["last_online_at"] = last_online_at or datetime.utcnow()
 
         result = db.query(Device).filter(Device.device_id.in_(device_ids)).update(
             update_data, synchronize_session=False
         )
-        db.commit()
+        if commit:
+            db.commit()
         return result
 
+    def get_online_device_ids(self, db: Session) -> List[tuple]:
+        """获取在线设备的 (device_id, last_online_at)，只查询所需列"""
+        return db.query(Device.device_id, Device.last_online_at).filter(Device.status == "online").all()
+
     def get_online_devices(self, db: Session) -> List[Device]:
         """获取在线设备"""
         return db.query(Device).filter(Device.status == "online").all()
@@ -103,11 +164,11 @@ class CRUDDeviceData:
 
     def create(self, db: Session, obj_in: DeviceDataCreate) -> Optional[DeviceData]:
         """创建设备数据"""
-        device = device_crud.get_by_device_id(db, obj_in.device_id)
-        if not device:
+        device_pk = device_crud.resolve_id(db, obj_in.device_id)
+        if device_pk is None:
             return None
         db_obj = DeviceData(
-            device_id=device.id,
+            device_id=device_pk,
             data_type=obj_in.data_type,
             data=obj_in.data,
             quality=obj_in.quality
@@ -117,6 +178,30 @@ class CRUDDeviceData:
         db.refresh(db_obj)
         return db_obj
 
+    def create_many(self, db: Session, objs_in: List[DeviceDataCreate], commit: bool = True) -> int:
+        """批量创建设备数据（批量解析设备主键 + 单条多行INSERT），返回写入条数；commit=False 时由调用方提交"""
+        if not objs_in:
+            return 0
+        id_map = device_crud.resolve_ids(db, (obj.device_id for obj in objs_in))
+        now = datetime.now()
+        rows = [
+            {
+                "device_id": id_map[obj.device_id],
+                "timestamp": now,
+                "data_type": obj.data_type,
+                "data": obj.data,
+                "quality": obj.quality,
+                "created_at": now,
+            }
+            for obj in objs_in
+            if obj.device_id in id_map
+        ]
+        if rows:
+            db.execute(insert(DeviceData).values(rows))
+            if commit:
+                db.commit()
+        return len(rows)
+
     def get_device_data(
         self,
         db: Session,
@@ -136,6 +221,20 @@ class CRUDDeviceData:
             query = query.filter(DeviceData.timestamp <= end_time)
         return query.order_by(desc(DeviceData.timestamp)).limit(limit).all()
 
+    def get_data_page(
+        self,
+        db: Session,
+        device_id: int,
+        data_type: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[DeviceData], Optional[str]]:
+        """按 (timestamp, id) 倒序游标分页获取设备数据，返回 (数据列表, 下一页游标)"""
+        query = db.query(DeviceData).filter(DeviceData.device_id == device_id)
+        if data_type:
+            query = query.filter(DeviceData.data_type == data_type)
+        return keyset_paginate(query, [(DeviceData.timestamp, True), (DeviceData.id, True)], cursor, limit)
+
     def get_latest_data(self, db: Session, device_id: int, data_type: Optional[str] = None) -> Optional[DeviceData]:
         """获取最新设备数据"""
         query = db.query(DeviceData).filter(DeviceData.device_id == device_id)
@@ -149,11 +248,11 @@ class CRUDDeviceCommand:
 
     def create(self, db: Session, obj_in: DeviceCommandCreate, created_by: Optional[int] = None) -> Optional[DeviceCommand]:
         """创建设备命令"""
-        device = device_crud.get_by_device_id(db, obj_in.device_id)
-        if not device:
+        device_pk = device_crud.resolve_id(db, obj_in.device_id)
+        if device_pk is None:
             return None
         db_obj = DeviceCommand(
-            device_id=device.id,
+            device_id=device_pk,
             command_type=obj_in.command_type,
             command_data=obj_in.command_data,
             created_by=created_by
@@ -193,14 +292,31 @@ class CRUDDeviceCommand:
         limit: int = 100
     ) -> List[DeviceCommand]:
         """获取设备命令列表"""
-        device = device_crud.get_by_device_id(db, device_id)
-        if not device:
+        device_pk = device_crud.resolve_id(db, device_id)
+        if device_pk is None:
             return []
-        query = db.query(DeviceCommand).filter(DeviceCommand.device_id == device.id)
+        query = db.query(DeviceCommand).filter(DeviceCommand.device_id == device_pk)
         if status:
             query = query.filter(DeviceCommand.status == status)
         return query.order_by(desc(DeviceCommand.created_at)).limit(limit).all()
 
+    def get_commands_page(
+        self,
+        db: Session,
+        device_id: str,
+        status: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[DeviceCommand], Optional[str]]:
+        """按 (created_at, id) 倒序游标分页获取设备命令，返回 (命令列表, 下一页游标)"""
+        device_pk = device_crud.resolve_id(db, device_id)
+        if device_pk is None:
+            return [], None
+        query = db.query(DeviceCommand).filter(DeviceCommand.device_id == device_pk)
+        if status:
+            query = query.filter(DeviceCommand.status == status)
+        return keyset_paginate(query, [(DeviceCommand.created_at, True), (DeviceCommand.id, True)], cursor, limit)
+
 
 # 实例化CRUD对象
 device_crud = CRUDDevice()
@@ -1,6 +1,6 @@
 # 设备相关模型
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Float, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Float, BigInteger, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -34,6 +34,10 @@ class Device(Base):
 class DeviceData(Base):
     """设备数据表"""
     __tablename__ = "device_data"
+    # 按设备的时间倒序游标分页
+    __table_args__ = (
+        Index("ix_device_data_device_id_timestamp", "device_id", "timestamp", "id"),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
@@ -50,6 +54,10 @@ class DeviceData(Base):
 class DeviceCommand(Base):
     """设备命令表"""
     __tablename__ = "device_commands"
+    # 按设备的创建时间倒序游标分页
+    __table_args__ = (
+        Index("ix_device_commands_device_id_created_at", "device_id", "created_at", "id"),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
@@ -1,2 +1,3 @@
 # 事件模块
 from app.events.subscriber import event_subscriber, EventSubscriber
+from app.events.presence import presence_tracker, PresenceTracker
@@ -0,0 +1,260 @@
+# 设备在线状态跟踪器 - 合并心跳，只在状态变化或粗粒度周期刷新时写库
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.crud.device import device_crud
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryPresenceStore:
+    """进程内最后心跳时间存储"""
+
+    def __init__(self):
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, device_id: str, seen_at: float) -> bool:
+        """记录心跳，返回设备是否为新上线"""
+        with self._lock:
+            is_new = device_id not in self._last_seen
+            self._last_seen[device_id] = seen_at
+            return is_new
+
+    def expire(self, cutoff: float) -> List[str]:
+        """移除并返回最后心跳早于 cutoff 的设备"""
+        with self._lock:
+            expired = [device_id for device_id, seen_at in self._last_seen.items() if seen_at < cutoff]
+            for device_id in expired:
+                del self._last_seen[device_id]
+            return expired
+
+    def discard(self, device_id: str):
+        with self._lock:
+            self._last_seen.pop(device_id, None)
+
+    def size(self) -> int:
+        return len(self._last_seen)
+
+
+class RedisPresenceStore:
+    """基于Redis有序集合的最后心跳时间存储，score为心跳时间戳，多实例共享"""
+
+    def __init__(self, redis_url: str, key: str = "device_presence:last_seen"):
+        self.key = key
+        self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+
+    def touch(self, device_id: str, seen_at: float) -> bool:
+        # ZADD 返回新增成员数，为1表示设备此前不在线
+        return self._redis.zadd(self.key, {device_id: seen_at}) == 1
+
+    def expire(self, cutoff: float) -> List[str]:
+        candidates = self._redis.zrangebyscore(self.key, "-inf", f"({cutoff}")
+        if not candidates:
+            return []
+        pipe = self._redis.pipeline()
+        for device_id in candidates:
+            pipe.zrem(self.key, device_id)
+        # 多实例并发扫描时，只有成功移除成员的实例负责该设备的离线写库
+        return [device_id for device_id, removed in zip(candidates, pipe.execute()) if removed]
+
+    def discard(self, device_id: str):
+        self._redis.zrem(self.key, device_id)
+
+    def size(self) -> int:
+        return self._redis.zcard(self.key)
+
+
+class PresenceTracker:
+    """
+    设备在线状态跟踪器
+
+    - touch(): 心跳只更新存储中的最后心跳时间，不访问数据库
+    - 后台线程每 sweep_interval 秒：
+        1. 将新上线的设备以一条 UPDATE 写为 online
+        2. 将超过 offline_timeout 未心跳的设备以一条 UPDATE 写为 offline
+        3. 每 flush_interval 秒将期间有心跳的设备 last_online_at 刷新一次
+    """
+
+    def __init__(
+        self,
+        offline_timeout: Optional[float] = None,
+        sweep_interval: Optional[float] = None,
+        flush_interval: Optional[float] = None,
+        store=None,
+        session_factory: Callable = SessionLocal,
+    ):
+        self.offline_timeout = offline_timeout or settings.PRESENCE_OFFLINE_TIMEOUT
+        self.sweep_interval = sweep_interval or settings.PRESENCE_SWEEP_INTERVAL
+        self.flush_interval = flush_interval or settings.PRESENCE_FLUSH_INTERVAL
+        self.store = store or self._create_store()
+        self.session_factory = session_factory
+
+        self._lock = threading.Lock()
+        self._went_online: Set[str] = set()   # 待写库的上线设备
+        self._seen: Set[str] = set()          # 本刷新周期内有心跳的设备
+        self._last_flush = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {
+            "heartbeats": 0,
+            "online_transitions": 0,
+            "offline_transitions": 0,
+            "db_writes": 0,
+        }
+
+    @staticmethod
+    def _create_store():
+        if settings.PRESENCE_REDIS_ENABLED and REDIS_AVAILABLE:
+            try:
+                return RedisPresenceStore(settings.REDIS_URL)
+            except Exception as e:
+                logger.warning(f"Redis presence store unavailable, falling back to memory: {e}")
+        return MemoryPresenceStore()
+
+    def touch(self, device_id: str, seen_at: Optional[float] = None):
+        """记录设备心跳"""
+        is_new = self.store.touch(device_id, seen_at or time.time())
+        with self._lock:
+            self.stats["heartbeats"] += 1
+            self._seen.add(device_id)
+            if is_new:
+                self._went_online.add(device_id)
+
+    def observe_status(self, device_id: str, status: str):
+        """同步设备主动上报的状态，状态已由调用方写库"""
+        if status == "online":
+            self.store.touch(device_id, time.time())
+        else:
+            self.store.discard(device_id)
+            with self._lock:
+                self._went_online.discard(device_id)
+                self._seen.discard(device_id)
+
+    def load_online_devices(self):
+        """启动时从数据库加载在线设备，保证重启后仍能扫描出离线设备"""
+        db = self.session_factory()
+        try:
+            now = time.time()
+            for device_id, last_online_at in device_crud.get_online_device_ids(db):
+                # last_online_at 以 utcnow() 写入，为 naive UTC 时间
+                seen_at = last_online_at.replace(tzinfo=timezone.utc).timestamp() if last_online_at else now
+                self.store.touch(device_id, seen_at)
+        except Exception as e:
+            logger.error(f"Failed to load online devices: {e}")
+        finally:
+            db.close()
+
+    def start(self):
+        """启动后台扫描线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.load_online_devices()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="presence-tracker", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Presence tracker started (offline_timeout={self.offline_timeout}s, "
+            f"sweep_interval={self.sweep_interval}s, flush_interval={self.flush_interval}s)"
+        )
+
+    def stop(self):
+        """停止扫描线程，并写入尚未落库的状态"""
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+        self.flush(force=True)
+        logger.info("Presence tracker stopped")
+
+    def _run(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.flush()
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Presence tracker tick failed: {e}")
+
+    def flush(self, force: bool = False):
+        """写入上线状态变化；到达刷新周期(或force)时刷新 last_online_at"""
+        refresh = force or time.monotonic() - self._last_flush >= self.flush_interval
+        with self._lock:
+            if refresh:
+                device_ids = self._went_online | self._seen
+                self._seen = set()
+                self._last_flush = time.monotonic()
+            else:
+                device_ids = set(self._went_online)
+            went_online = len(self._went_online)
+            self._went_online = set()
+        if not device_ids:
+            return
+
+        db = self.session_factory()
+        try:
+            device_crud.batch_update_status(db, list(device_ids), "online", last_online_at=datetime.utcnow())
+            with self._lock:
+                self.stats["online_transitions"] += went_online
+                self.stats["db_writes"] += 1
+        except Exception as e:
+            db.rollback()
+            # 写库失败时保留，下次重试
+            with self._lock:
+                self._went_online |= device_ids
+            logger.error(f"Failed to persist online devices: {e}")
+        finally:
+            db.close()
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """将超时未心跳的设备标记为离线，返回本次离线的设备"""
+        cutoff = (now or time.time()) - self.offline_timeout
+        expired = self.store.expire(cutoff)
+        if not expired:
+            return []
+
+        with self._lock:
+            self._went_online.difference_update(expired)
+            self._seen.difference_update(expired)
+
+        db = self.session_factory()
+        try:
+            device_crud.batch_update_status(db, expired, "offline")
+            with self._lock:
+                self.stats["offline_transitions"] += len(expired)
+                self.stats["db_writes"] += 1
+            logger.info(f"Marked {len(expired)} devices offline")
+        except Exception as e:
+            db.rollback()
+            # 写库失败时以过期时间放回存储，下次扫描重试
+            for device_id in expired:
+                self.store.touch(device_id, cutoff - 1)
+            logger.error(f"Failed to persist offline devices: {e}")
+            return []
+        finally:
+            db.close()
+        return expired
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取跟踪器指标"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending_online"] = len(self._went_online)
+        stats["tracked_devices"] = self.store.size()
+        return stats
+
+
+# 全局在线状态跟踪器实例
+presence_tracker = PresenceTracker()
@@ -1,27 +1,67 @@
 # Redis事件订阅器
 
-import json
 import logging
+import os
+import socket
 import threading
+import time
 import redis
-from typing import Optional
+from collections import defaultdict
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.core.codec import PayloadDecodeError, json_codec
 from app.core.config import settings
 from app.db.session import SessionLocal
 from app.crud.device import device_crud, device_data_crud, device_command_crud
 from app.schemas.device import DeviceDataCreate
+from app.events.presence import presence_tracker
 
 logger = logging.getLogger(__name__)
 
+# 死信流保留的近似最大条数
+DEAD_LETTER_MAXLEN = 10000
+
+# (事件ID, 字段)，事件已被裁剪时字段为空
+StreamEntry = Tuple[str, Optional[Dict[str, str]]]
+
+
+class InvalidEventError(ValueError):
+    """事件格式错误（非法JSON、字段类型不符等），重试不会成功"""
+
 
 class EventSubscriber:
-    """Redis事件订阅器 - 监听MQTT Gateway发布的设备事件"""
+    """
+    Redis事件订阅器 - 监听MQTT Gateway发布的设备事件
+
+    streams 模式（Redis Streams 消费组）:
+    - 多个实例使用同一消费组，XREADGROUP 将事件分配给其中一个实例，处理成功后 XACK
+    - 按事件逐条确认：处理失败的事件不确认，留在待处理列表(PEL)中，超过 EVENT_BUS_CLAIM_IDLE_MS 后由 XAUTOCLAIM 重新接管；
+      批量写库失败时逐条重试，同一批次中处理成功的事件照常确认
+    - 格式错误的事件直接转入死信流并确认
+    - 启动时先读取本消费者名下未确认的事件，消费者名固定时可在崩溃重启后继续处理；
+      崩溃且不再启动的实例的事件由其他实例接管
+    - 投递次数超过 EVENT_BUS_MAX_DELIVERIES 的事件转入死信流，避免无法处理的事件反复重试
+    pubsub 模式保持原有的发布订阅行为（不持久化，实例重启期间的事件丢失）
+    """
 
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
         self.pubsub: Optional[redis.client.PubSub] = None
         self.running = False
         self.thread: Optional[threading.Thread] = None
+        self.heartbeat_thread: Optional[threading.Thread] = None
+        self.mode = settings.EVENT_BUS_MODE
+        self.group = settings.EVENT_BUS_GROUP
+        self.consumer = settings.EVENT_BUS_CONSUMER or f"{socket.gethostname()}-{os.getpid()}"
+        self.stats: Dict[str, int] = {
+            "received": 0,
+            "acked": 0,
+            "failed": 0,          # 处理失败、留待重新投递的事件数
+            "invalid": 0,         # 格式错误被丢弃（streams 模式转入死信流）的事件数
+            "claimed": 0,
+            "dead_lettered": 0,
+        }
 
     def connect(self):
         """连接到Redis"""
@@ -46,27 +86,62 @@ class EventSubscriber:
             self.pubsub.close()
         if self.redis_client:
             self.redis_client.close()
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=5)
+        for thread in (self.thread, self.heartbeat_thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=5)
         logger.info("Disconnected from Redis")
 
+    @staticmethod
+    def _channels() -> List[str]:
+        """事件通道（streams 模式下为流的键名）"""
+        return [
+            settings.EVENT_CHANNEL_DEVICE_DATA,
+            settings.EVENT_CHANNEL_DEVICE_STATUS,
+            settings.EVENT_CHANNEL_DEVICE_HEARTBEAT,
+            settings.EVENT_CHANNEL_COMMAND_RESPONSE
+        ]
+
+    def _group_streams(self) -> List[str]:
+        """经消费组分摊消费的流；在线状态保存在本地时心跳流由每个实例独立读取"""
+        if settings.PRESENCE_REDIS_ENABLED:
+            return self._channels()
+        return [stream for stream in self._channels() if stream != settings.EVENT_CHANNEL_DEVICE_HEARTBEAT]
+
     def start(self):
         """开始订阅事件"""
         if not self.pubsub:
             logger.error("Redis not connected")
             return
 
+        channels = self._channels()
+        if self.mode == "streams":
+            streams = self._group_streams()
+            try:
+                self._create_groups(streams)
+            except Exception as e:
+                logger.error(f"Failed to create consumer group {self.group}: {e}")
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._listen_streams, daemon=True)
+            self.thread.start()
+            logger.info(f"Started consuming streams {streams} as {self.group}/{self.consumer}")
+            if len(streams) < len(channels):
+                self.heartbeat_thread = threading.Thread(target=self._listen_heartbeats, daemon=True)
+                self.heartbeat_thread.start()
+                logger.info(f"Started reading {settings.EVENT_CHANNEL_DEVICE_HEARTBEAT} on every instance")
+            return
+
         # 订阅事件通道
-        channels = [
-            settings.EVENT_CHANNEL_DEVICE_DATA,
-            settings.EVENT_CHANNEL_DEVICE_STATUS,
-            settings.EVENT_CHANNEL_DEVICE_HEARTBEAT,
-            settings.EVENT_CHANNEL_COMMAND_RESPONSE
-        ]
-        self.pubsub.subscribe(**{channel: self._handle_message for channel in channels})
+        if settings.EVENT_BATCH_ENABLED:
+            # 批量模式下不注册回调，由监听线程通过 get_message 自行拉取并聚合
+            self.pubsub.subscribe(*channels)
+            target = self._listen_batched
+        else:
+            self.pubsub.subscribe(**{channel: self._handle_message for channel in channels})
+            target = self._listen
 
         self.running = True
-        self.thread = threading.Thread(target=self._listen, daemon=True)
+        self.thread = threading.Thread(target=target, daemon=True)
         self.thread.start()
         logger.info(f"Started listening on channels: {channels}")
 
@@ -80,59 +155,360 @@ class EventSubscriber:
             except Exception as e:
                 logger.error(f"Error in event listener: {e}")
 
-    def _handle_message(self, message):
-        """处理接收到的消息"""
-        if message is None or message.get('type') != 'message':
-            return
+    def _listen_batched(self):
+        """批量监听循环：阻塞等待首条消息，随后在窗口内尽量排空已到达的消息"""
+        while self.running:
+            try:
+                message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                batch = [message]
+                deadline = time.monotonic() + settings.EVENT_BATCH_WINDOW
+                while len(batch) < settings.EVENT_BATCH_MAX_SIZE and time.monotonic() < deadline:
+                    message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+                    if not message:
+                        break
+                    batch.append(message)
+                failed, _ = self._handle_batch(batch)
+                if failed:
+                    # 发布订阅模式无法重新投递
+                    logger.error(f"Dropped {len(failed)} events that failed to process")
+            except Exception as e:
+                logger.error(f"Error in batched event listener: {e}")
+
+    def _create_groups(self, streams: List[str]):
+        """创建消费组（流不存在时一并创建），新建的消费组从当前最新事件开始消费"""
+        for stream in streams:
+            try:
+                self.redis_client.xgroup_create(stream, self.group, id="$", mkstream=True)
+                logger.info(f"Created consumer group {self.group} on {stream}")
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def _listen_streams(self):
+        """
+        消费组读取循环
+
+        先按ID分页读取本消费者名下未确认的事件，读完后改为读取新事件 (">")；
+        每隔 EVENT_BUS_CLAIM_INTERVAL 接管超时未确认的事件
+        """
+        channels = self._group_streams()
+        backlog = {stream: "0" for stream in channels}
+        next_claim = time.monotonic()
+        while self.running:
+            try:
+                if backlog:
+                    response = self.redis_client.xreadgroup(
+                        self.group, self.consumer, backlog, count=settings.EVENT_BATCH_MAX_SIZE
+                    )
+                    pending = {stream: entries for stream, entries in response or []}
+                    for stream in list(backlog):
+                        entries = pending.get(stream)
+                        if entries:
+                            backlog[stream] = entries[-1][0]
+                        else:
+                            del backlog[stream]
+                else:
+                    response = self.redis_client.xreadgroup(
+                        self.group, self.consumer, {stream: ">" for stream in channels},
+                        count=settings.EVENT_BATCH_MAX_SIZE, block=settings.EVENT_BUS_BLOCK_MS
+                    )
+                if response:
+                    self._process_entries(response)
+                if time.monotonic() >= next_claim:
+                    self._claim_stale(channels)
+                    next_claim = time.monotonic() + settings.EVENT_BUS_CLAIM_INTERVAL
+            except Exception as e:
+                logger.error(f"Error in stream event listener: {e}")
+                time.sleep(1.0)
+
+    def _listen_heartbeats(self):
+        """不经消费组读取心跳流（从启动时的最新事件开始，无需确认），交给在线状态跟踪器"""
+        stream = settings.EVENT_CHANNEL_DEVICE_HEARTBEAT
+        last_id = "$"
+        while self.running:
+            try:
+                response = self.redis_client.xread(
+                    {stream: last_id}, count=settings.EVENT_BATCH_MAX_SIZE, block=settings.EVENT_BUS_BLOCK_MS
+                )
+                for _, entries in response or []:
+                    for entry_id, fields in entries:
+                        last_id = entry_id
+                        if fields and "data" in fields:
+                            self._handle_message({"type": "message", "channel": stream, "data": fields["data"]})
+            except Exception as e:
+                logger.error(f"Error in heartbeat stream listener: {e}")
+                time.sleep(1.0)
+
+    def _process_entries(self, response: List[Tuple[str, List[StreamEntry]]]):
+        """
+        处理一次读取的事件并逐条确认
+
+        处理成功的事件确认；格式错误的事件转入死信流；处理失败的事件不确认，等待超时后重新投递
+        """
+        messages = []
+        ids: Dict[str, List[str]] = defaultdict(list)
+        for stream, entries in response:
+            for entry_id, fields in entries:
+                if entry_id is None:
+                    continue
+                # 已被 MAXLEN 裁剪的事件只剩ID，直接确认
+                if fields and "data" in fields:
+                    messages.append({
+                        "type": "message", "channel": stream, "data": fields["data"],
+                        "id": entry_id, "fields": fields,
+                    })
+                else:
+                    ids[stream].append(entry_id)
+        self.stats["received"] += len(messages)
+
+        if settings.EVENT_BATCH_ENABLED:
+            failed, invalid = self._handle_batch(messages)
+        else:
+            failed, invalid = [], []
+            for message in messages:
+                self._handle_single(self._process_event, message, message, failed, invalid)
+
+        self.stats["failed"] += len(failed)
+        self.stats["invalid"] += len(invalid)
+        for message in invalid:
+            self._move_to_dead_letter(message["channel"], message["id"], message["fields"], "invalid event")
+        unacked = {(message["channel"], message["id"]) for message in failed + invalid}
+        for message in messages:
+            if (message["channel"], message["id"]) not in unacked:
+                ids[message["channel"]].append(message["id"])
+        for stream, entry_ids in ids.items():
+            if entry_ids:
+                self.stats["acked"] += self.redis_client.xack(stream, self.group, *entry_ids)
+
+    def _claim_stale(self, streams: List[str]):
+        """接管各流中超过 EVENT_BUS_CLAIM_IDLE_MS 未确认的事件（含本消费者处理失败的事件）并重新处理"""
+        for stream in streams:
+            start_id = "0-0"
+            while self.running:
+                result = self.redis_client.xautoclaim(
+                    stream, self.group, self.consumer,
+                    min_idle_time=settings.EVENT_BUS_CLAIM_IDLE_MS,
+                    start_id=start_id, count=settings.EVENT_BATCH_MAX_SIZE
+                )
+                start_id, entries = result[0], result[1]
+                if entries:
+                    self.stats["claimed"] += len(entries)
+                    logger.warning(f"Claimed {len(entries)} stale events from {stream}")
+                    entries = self._dead_letter(stream, entries)
+                    if entries:
+                        self._process_entries([(stream, entries)])
+                if start_id == "0-0":
+                    break
+
+    def _dead_letter(self, stream: str, entries: List[StreamEntry]) -> List[StreamEntry]:
+        """投递次数超过上限的事件写入死信流并确认，返回其余事件"""
+        pending = self.redis_client.xpending_range(
+            stream, self.group, min=entries[0][0], max=entries[-1][0],
+            count=len(entries), consumername=self.consumer
+        )
+        deliveries = {item["message_id"]: item["times_delivered"] for item in pending}
+        remaining = []
+        for entry_id, fields in entries:
+            if deliveries.get(entry_id, 0) <= settings.EVENT_BUS_MAX_DELIVERIES:
+                remaining.append((entry_id, fields))
+                continue
+            self._move_to_dead_letter(
+                stream, entry_id, fields, f"exceeded {settings.EVENT_BUS_MAX_DELIVERIES} deliveries"
+            )
+        return remaining
+
+    def _move_to_dead_letter(self, stream: str, entry_id: str, fields: Optional[Dict[str, str]], reason: str):
+        """将事件写入死信流 <流名>.dead 并确认"""
+        if fields:
+            self.redis_client.xadd(
+                f"{stream}.dead", {**fields, "source_id": entry_id, "reason": reason},
+                maxlen=DEAD_LETTER_MAXLEN, approximate=True
+            )
+        self.redis_client.xack(stream, self.group, entry_id)
+        self.stats["dead_lettered"] += 1
+        logger.error(f"Event {entry_id} on {stream} moved to dead letter stream: {reason}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """事件消费统计"""
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["mode"] = self.mode
+        if self.mode == "streams":
+            stats["group"] = self.group
+            stats["consumer"] = self.consumer
+        return stats
+
+    def _handle_batch(self, messages: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """
+        按事件类型分组处理一个窗口的消息，返回 (处理失败的消息, 格式错误的消息)
+
+        - device_data: 一次批量INSERT
+        - device_status: 按设备取窗口内最后状态，每种状态一次批量UPDATE，与数据写入在同一事务中提交
+        - device_heartbeat: 交给在线状态跟踪器合并，不直接写库
+        - command_response: 数量少且需逐条定位命令，仍逐条处理
+        批量写库失败时逐条重试，只有仍然失败的消息计入处理失败
+        """
+        failed: List[dict] = []
+        invalid: List[dict] = []
+        data_events: List[Tuple[dict, dict, DeviceDataCreate]] = []
+        # device_id -> (消息, 事件)，同一设备被覆盖的旧状态随最后状态一并确认
+        status_events: Dict[str, Tuple[dict, dict]] = {}
+        command_events: List[Tuple[dict, dict]] = []
+
+        for message in messages:
+            if message.get('type') != 'message':
+                continue
+            try:
+                data = self._parse_event(message)
+                event_type = data.get('event_type', '')
+                device_id = data.get('device_id')
+                if event_type == 'device_data':
+                    if device_id:
+                        # 逐条校验，格式错误的事件只影响自身，不影响同一窗口的其他事件
+                        data_events.append((message, data, self._device_data_event(data)))
+                elif event_type == 'device_status':
+                    if device_id and data.get('status'):
+                        status_events[device_id] = (message, data)
+                elif event_type == 'device_heartbeat':
+                    if device_id:
+                        presence_tracker.touch(device_id)
+                elif event_type == 'command_response':
+                    command_events.append((message, data))
+                else:
+                    logger.warning(f"Unknown event type: {event_type}")
+            except InvalidEventError as e:
+                logger.error(f"Invalid event message: {e}")
+                invalid.append(message)
+
+        if data_events or status_events:
+            try:
+                self._write_batch(
+                    [event for _, _, event in data_events],
+                    {device_id: data['status'] for device_id, (_, data) in status_events.items()},
+                )
+            except Exception as e:
+                logger.error(f"Error writing event batch, retrying {len(data_events) + len(status_events)} events individually: {e}")
+                for message, data, _ in data_events:
+                    self._handle_single(self._handle_device_data, message, data, failed, invalid)
+                for message, data in status_events.values():
+                    self._handle_single(self._handle_device_status, message, data, failed, invalid)
 
+        for message, data in command_events:
+            self._handle_single(self._handle_command_response, message, data, failed, invalid)
+        return failed, invalid
+
+    @staticmethod
+    def _handle_single(handler, message: dict, data: dict, failed: List[dict], invalid: List[dict]):
+        """逐条处理一个事件，按失败原因计入 failed 或 invalid"""
         try:
-            channel = message.get('channel', '')
-            data = json.loads(message.get('data', '{}'))
-            event_type = data.get('event_type', '')
-
-            logger.debug(f"Received event on {channel}: {event_type}")
-
-            if event_type == 'device_data':
-                self._handle_device_data(data)
-            elif event_type == 'device_status':
-                self._handle_device_status(data)
-            elif event_type == 'device_heartbeat':
-                self._handle_device_heartbeat(data)
-            elif event_type == 'command_response':
-                self._handle_command_response(data)
-            else:
-                logger.warning(f"Unknown event type: {event_type}")
+            handler(data)
+        except InvalidEventError as e:
+            logger.error(f"Invalid event message: {e}")
+            invalid.append(message)
+        except Exception as e:
+            logger.error(f"Error handling event {message.get('id', '')} on {message.get('channel', '')}: {e}")
+            failed.append(message)
+
+    def _write_batch(self, data_events: List[DeviceDataCreate], status_by_device: Dict[str, str]):
+        """在同一事务中写入设备数据并更新设备状态，失败时整体回滚后抛出异常，重新投递不会产生重复数据"""
+        db = SessionLocal()
+        try:
+            saved = device_data_crud.create_many(db, data_events, commit=False)
+
+            devices_by_status: Dict[str, List[str]] = defaultdict(list)
+            for device_id, status in status_by_device.items():
+                devices_by_status[status].append(device_id)
+            for status, device_ids in devices_by_status.items():
+                updated = device_crud.batch_update_status(db, device_ids, status, commit=False)
+                logger.debug(f"Updated {updated} devices to status {status}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if data_events:
+            logger.info(f"Saved {saved}/{len(data_events)} device data events")
+        for device_id, status in status_by_device.items():
+            presence_tracker.observe_status(device_id, status)
+
+    @staticmethod
+    def _parse_event(message: dict) -> dict:
+        """解码事件消息，格式错误时抛出 InvalidEventError"""
+        try:
+            data = json_codec.loads(message.get('data', '{}'))
+        except PayloadDecodeError as e:
+            raise InvalidEventError(f"invalid JSON: {e}") from e
+        if not isinstance(data, dict):
+            raise InvalidEventError("event is not a JSON object")
+        return data
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in event message")
+    @staticmethod
+    def _device_data_event(data: dict) -> DeviceDataCreate:
+        try:
+            return DeviceDataCreate(
+                device_id=data['device_id'],
+                data_type=data.get('data_type', 'telemetry'),
+                data=data.get('data', {}),
+                quality=data.get('quality', 'good')
+            )
+        except ValidationError as e:
+            raise InvalidEventError(f"invalid device data event from {data.get('device_id')}: {e}") from e
+
+    def _handle_message(self, message) -> bool:
+        """处理接收到的消息（发布订阅模式），处理失败返回 False"""
+        if message is None or message.get('type') != 'message':
+            return True
+
+        try:
+            self._process_event(message)
+        except InvalidEventError as e:
+            logger.error(f"Invalid event message: {e}")
         except Exception as e:
             logger.error(f"Error handling event: {e}")
+            return False
+        return True
+
+    def _process_event(self, message: dict):
+        """
+        处理一条事件
+
+        Raises:
+            InvalidEventError: 事件格式错误
+            Exception: 写库等处理失败，由调用方决定是否重新投递
+        """
+        channel = message.get('channel', '')
+        data = self._parse_event(message)
+        event_type = data.get('event_type', '')
+
+        logger.debug(f"Received event on {channel}: {event_type}")
+
+        if event_type == 'device_data':
+            self._handle_device_data(data)
+        elif event_type == 'device_status':
+            self._handle_device_status(data)
+        elif event_type == 'device_heartbeat':
+            self._handle_device_heartbeat(data)
+        elif event_type == 'command_response':
+            self._handle_command_response(data)
+        else:
+            logger.warning(f"Unknown event type: {event_type}")
 
     def _handle_device_data(self, data: dict):
         """处理设备数据事件"""
         device_id = data.get('device_id')
-        data_type = data.get('data_type', 'telemetry')
-        sensor_data = data.get('data', {})
-        quality = data.get('quality', 'good')
-
         if not device_id:
             return
 
+        device_data = self._device_data_event(data)
         db = SessionLocal()
         try:
-            device_data = DeviceDataCreate(
-                device_id=device_id,
-                data_type=data_type,
-                data=sensor_data,
-                quality=quality
-            )
             result = device_data_crud.create(db, device_data)
             if result:
                 logger.info(f"Saved device data for {device_id}")
             else:
                 logger.warning(f"Device not found: {device_id}")
-        except Exception as e:
-            logger.error(f"Error saving device data: {e}")
         finally:
             db.close()
 
@@ -148,30 +524,22 @@ class EventSubscriber:
         try:
             device = device_crud.update_status(db, device_id, status)
             if device:
+                presence_tracker.observe_status(device_id, status)
                 logger.info(f"Updated status for {device_id}: {status}")
             else:
                 logger.warning(f"Device not found: {device_id}")
-        except Exception as e:
-            logger.error(f"Error updating device status: {e}")
         finally:
             db.close()
 
     def _handle_device_heartbeat(self, data: dict):
-        """处理设备心跳事件"""
+        """处理设备心跳事件，由在线状态跟踪器合并写库"""
         device_id = data.get('device_id')
 
         if not device_id:
             return
 
-        db = SessionLocal()
-        try:
-            device = device_crud.update_status(db, device_id, "online")
-            if device:
-                logger.debug(f"Heartbeat from {device_id}")
-        except Exception as e:
-            logger.error(f"Error handling heartbeat: {e}")
-        finally:
-            db.close()
+        presence_tracker.touch(device_id)
+        logger.debug(f"Heartbeat from {device_id}")
 
     def _handle_command_response(self, data: dict):
         """处理命令响应事件"""
@@ -181,14 +549,16 @@ class EventSubscriber:
 
         if not command_id:
             return
+        try:
+            command_id = int(command_id)
+        except (TypeError, ValueError) as e:
+            raise InvalidEventError(f"invalid command_id: {command_id!r}") from e
 
         db = SessionLocal()
         try:
-            command = device_command_crud.update_status(db, int(command_id), status, result)
+            command = device_command_crud.update_status(db, command_id, status, result)
             if command:
                 logger.info(f"Updated command {command_id} status: {status}")
-        except Exception as e:
-            logger.error(f"Error updating command status: {e}")
         finally:
             db.close()
 
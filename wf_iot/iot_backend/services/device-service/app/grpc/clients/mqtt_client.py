@@ -5,18 +5,20 @@ import json
 import logging
 import sys
 import os
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 # 添加proto生成代码路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../../../proto/generated'))
 
 from google.protobuf import struct_pb2
 from mqtt_gateway_pb2 import (
-    PublishMessageRequest, SendDeviceCommandRequest, SendFirmwareUpgradeRequest,
-    GetConnectionStatusRequest, GetDeviceOnlineStatusRequest
+    PublishMessageRequest, StreamPublishRequest, SendDeviceCommandRequest, SendFirmwareUpgradeRequest,
+    GetConnectionStatusRequest, GetDeviceOnlineStatusRequest, SubscribeDeviceEventsRequest
 )
 import mqtt_gateway_pb2_grpc
 
 from app.core.config import settings
+from app.grpc.channels import channel_manager
 
 logger = logging.getLogger(__name__)
 
@@ -32,22 +34,21 @@ class MqttGrpcClient:
     """MQTT Gateway gRPC客户端"""
 
     def __init__(self):
-        self.channel = None
         self.stub = None
 
     def connect(self):
-        """建立gRPC连接"""
+        """建立gRPC连接（使用共享通道，多个网关副本间轮询）"""
         try:
-            self.channel = grpc.insecure_channel(settings.MQTT_GATEWAY_GRPC)
-            self.stub = mqtt_gateway_pb2_grpc.MqttGatewayServiceStub(self.channel)
+            self.stub = channel_manager.stub(settings.MQTT_GATEWAY_GRPC, mqtt_gateway_pb2_grpc.MqttGatewayServiceStub)
             logger.info(f"Connected to MQTT Gateway at {settings.MQTT_GATEWAY_GRPC}")
         except Exception as e:
             logger.error(f"Failed to connect to MQTT Gateway: {e}")
 
     def close(self):
         """关闭gRPC连接"""
-        if self.channel:
-            self.channel.close()
+        if self.stub:
+            channel_manager.close(settings.MQTT_GATEWAY_GRPC)
+            self.stub = None
             logger.info("Disconnected from MQTT Gateway")
 
     def publish_message(self, topic: str, payload: str, qos: int = 1, retain: bool = False) -> tuple[bool, str]:
@@ -74,6 +75,58 @@ class MqttGrpcClient:
             logger.error(f"gRPC error publishing message: {e}")
             return False, str(e)
 
+    def stream_publish(
+        self,
+        messages: Iterable[Tuple[str, str, int, bool]],
+        timeout: Optional[float] = None
+    ) -> Iterator[Tuple[int, bool, str]]:
+        """
+        流式发布MQTT消息（StreamPublish）
+        messages 为 (topic, payload, qos, retain) 的可迭代对象，随发送进度按需读取，不会整体载入内存；
+        网关未确认的消息达到窗口上限时发送阻塞
+        逐条产出: (序号, 是否成功, 消息ID或错误信息)，序号为消息在 messages 中的下标，顺序不保证
+        流中断时抛出 grpc.RpcError，已产出确认的消息之外的均视为未发布
+        """
+        if not self.stub:
+            raise ConnectionError("MQTT Gateway not connected")
+
+        def requests():
+            for sequence, (topic, payload, qos, retain) in enumerate(messages):
+                yield StreamPublishRequest(
+                    sequence=sequence,
+                    message=PublishMessageRequest(
+                        topic=topic,
+                        payload=payload.encode('utf-8'),
+                        qos=qos,
+                        retain=retain
+                    )
+                )
+
+        try:
+            for ack in self.stub.StreamPublish(requests(), timeout=timeout or settings.GRPC_STREAM_TIMEOUT):
+                yield ack.sequence, ack.success, ack.message_id if ack.success else ack.error_message
+        except grpc.RpcError as e:
+            logger.error(f"gRPC error in stream publish: {e}")
+            raise
+
+    def publish_many(
+        self,
+        messages: Iterable[Tuple[str, str, int, bool]],
+        timeout: Optional[float] = None
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        流式发布并汇总结果
+        返回: (成功数, [(失败消息序号, 错误信息)])
+        """
+        published = 0
+        failed: List[Tuple[int, str]] = []
+        for sequence, success, detail in self.stream_publish(messages, timeout):
+            if success:
+                published += 1
+            else:
+                failed.append((sequence, detail))
+        return published, failed
+
     def send_device_command(
         self,
         device_id: str,
@@ -160,6 +213,30 @@ class MqttGrpcClient:
             logger.error(f"gRPC error getting connection status: {e}")
             return {"connected": False, "error": str(e)}
 
+    def subscribe_device_events(
+        self,
+        device_ids: Iterable[str] = (),
+        topic_patterns: Iterable[str] = (),
+        event_types: Iterable[str] = (),
+        buffer_size: int = 0,
+        timeout: Optional[float] = None
+    ) -> Iterator:
+        """
+        订阅设备事件（SubscribeDeviceEvents），逐条产出 DeviceEvent
+        过滤条件为空表示不限；消费过慢导致网关缓冲区溢出时抛出 RESOURCE_EXHAUSTED 的 grpc.RpcError，
+        调用方应重新订阅
+        """
+        if not self.stub:
+            raise ConnectionError("MQTT Gateway not connected")
+
+        request = SubscribeDeviceEventsRequest(
+            device_ids=list(device_ids),
+            topic_patterns=list(topic_patterns),
+            event_types=list(event_types),
+            buffer_size=buffer_size
+        )
+        return self.stub.SubscribeDeviceEvents(request, timeout=timeout or settings.GRPC_STREAM_TIMEOUT)
+
     def get_device_online_status(self, device_ids: list[str]) -> dict:
         """获取设备在线状态"""
         if not self.stub:
@@ -7,9 +7,14 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.grpc.channels import channel_manager
 from app.grpc.clients.auth_client import auth_grpc_client
 from app.grpc.clients.mqtt_client import mqtt_grpc_client
 from app.events.subscriber import event_subscriber
+from app.core.cache import device_id_cache
+from app.core.jwt_verifier import local_jwt_verifier
+from app.events.presence import presence_tracker
+from app.db.pool import get_pool_stats
 
 # 配置日志
 logging.basicConfig(
@@ -33,6 +38,9 @@ async def lifespan(app: FastAPI):
     event_subscriber.connect()
     event_subscriber.start()
 
+    # 启动设备在线状态跟踪器（心跳合并写库、离线扫描）
+    presence_tracker.start()
+
     logger.info(f"Device Service started - HTTP port: {settings.HTTP_PORT}")
 
     yield
@@ -40,8 +48,10 @@ async def lifespan(app: FastAPI):
     # 关闭时
     logger.info("Shutting down Device Service...")
     event_subscriber.disconnect()
+    presence_tracker.stop()
     mqtt_grpc_client.close()
     auth_grpc_client.close()
+    channel_manager.close_all()
     logger.info("Device Service stopped")
 
 
@@ -75,7 +85,13 @@ def health_check():
         "status": "healthy",
         "service": settings.SERVICE_NAME,
         "http_port": settings.HTTP_PORT,
-        "grpc_port": settings.GRPC_PORT
+        "grpc_port": settings.GRPC_PORT,
+        "device_id_cache": device_id_cache.get_stats(),
+        "presence": presence_tracker.get_stats(),
+        "event_bus": event_subscriber.get_stats(),
+        "auth_cache": auth_grpc_client.get_stats(),
+        "jwt_local_verify": local_jwt_verifier.get_stats(),
+        "db_pool": get_pool_stats()
     }
 
 
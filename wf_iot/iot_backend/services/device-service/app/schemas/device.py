@@ -102,6 +102,7 @@ class DeviceCommand(BaseModel):
 class DeviceListResponse(BaseModel):
     """设备列表响应"""
     devices: List[Device]
-    total: int
+    total: Optional[int] = None  # 近似总数，仅在 with_total=true 时返回
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为空
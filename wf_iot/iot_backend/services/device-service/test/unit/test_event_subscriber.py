@@ -0,0 +1,270 @@
+"""
+事件订阅器单元测试
+测试 app/events/subscriber.py 中的 EventSubscriber 类
+"""
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.events.subscriber import EventSubscriber
+
+
+def make_message(event: dict, channel: str = "device.data.received") -> dict:
+    return {"type": "message", "channel": channel, "data": json.dumps(event)}
+
+
+def data_event(device_id: str, data=None) -> dict:
+    return {"event_type": "device_data", "device_id": device_id, "data": data if data is not None else {"t": 1}}
+
+
+class TestHandleBatch:
+    """批量处理一个窗口的事件"""
+
+    @pytest.fixture
+    def mocks(self):
+        """模拟数据库会话、CRUD 及在线状态跟踪器"""
+        with patch("app.events.subscriber.SessionLocal") as session_local, \
+                patch("app.events.subscriber.device_data_crud") as data_crud, \
+                patch("app.events.subscriber.device_crud") as crud, \
+                patch("app.events.subscriber.presence_tracker") as tracker:
+            data_crud.create_many.side_effect = lambda db, events, commit=True: len(events)
+            yield {"db": session_local.return_value, "data_crud": data_crud, "crud": crud, "tracker": tracker}
+
+    def test_invalid_event_skipped(self, mocks):
+        """测试格式错误的事件 - 只丢弃该事件，同一窗口的其他事件正常写入"""
+        # 配置模拟
+        subscriber = EventSubscriber()
+        messages = [
+            make_message(data_event("device001")),
+            make_message(data_event("device002", data="not a dict")),
+            {"type": "message", "channel": "device.data.received", "data": "[1, 2]"},
+            {"type": "message", "channel": "device.data.received", "data": "{bad"},
+            make_message(data_event("device003")),
+        ]
+
+        # 执行测试
+        failed, invalid = subscriber._handle_batch(messages)
+
+        # 验证结果
+        assert failed == []
+        assert invalid == messages[1:4]
+        events = mocks["data_crud"].create_many.call_args.args[1]
+        assert [event.device_id for event in events] == ["device001", "device003"]
+
+    def test_single_transaction(self, mocks):
+        """测试数据写入与状态更新 - 在同一事务中提交一次"""
+        # 配置模拟
+        subscriber = EventSubscriber()
+        messages = [
+            make_message(data_event("device001")),
+            make_message({"event_type": "device_status", "device_id": "device001", "status": "online"}),
+        ]
+
+        # 执行测试
+        failed, invalid = subscriber._handle_batch(messages)
+
+        # 验证结果
+        assert failed == [] and invalid == []
+        assert mocks["data_crud"].create_many.call_args.kwargs["commit"] is False
+        mocks["crud"].batch_update_status.assert_called_once_with(mocks["db"], ["device001"], "online", commit=False)
+        mocks["db"].commit.assert_called_once()
+        mocks["tracker"].observe_status.assert_called_once_with("device001", "online")
+
+    def test_status_failure_rolls_back_data(self, mocks):
+        """测试状态更新失败 - 数据写入一并回滚，逐条重试后只有仍失败的事件计入失败"""
+        # 配置模拟
+        subscriber = EventSubscriber()
+        mocks["crud"].batch_update_status.side_effect = Exception("db down")
+        mocks["crud"].update_status.side_effect = Exception("db down")
+        messages = [
+            make_message(data_event("device001")),
+            make_message({"event_type": "device_status", "device_id": "device001", "status": "online"}),
+        ]
+
+        # 执行测试
+        failed, invalid = subscriber._handle_batch(messages)
+
+        # 验证结果
+        assert failed == [messages[1]] and invalid == []
+        mocks["db"].rollback.assert_called_once()
+        mocks["data_crud"].create.assert_called_once()
+        mocks["tracker"].observe_status.assert_not_called()
+
+
+def stream_entry(entry_id: str, event: dict) -> tuple:
+    return entry_id, {"data": json.dumps(event)}
+
+
+class TestStreamAcknowledgement:
+    """streams 模式按事件确认、重新投递及死信"""
+
+    STREAM = "device.data.received"
+
+    @pytest.fixture
+    def subscriber(self):
+        """创建连接模拟 Redis 的订阅器"""
+        subscriber = EventSubscriber()
+        subscriber.redis_client = MagicMock()
+        subscriber.redis_client.xack.side_effect = lambda stream, group, *ids: len(ids)
+        subscriber.running = True
+        return subscriber
+
+    @pytest.fixture
+    def data_crud(self):
+        with patch("app.events.subscriber.SessionLocal"), \
+                patch("app.events.subscriber.device_crud"), \
+                patch("app.events.subscriber.presence_tracker"), \
+                patch("app.events.subscriber.device_data_crud") as data_crud:
+            yield data_crud
+
+    @pytest.mark.parametrize("batched", [True, False])
+    def test_failed_entry_stays_pending(self, subscriber, data_crud, batched):
+        """测试写库失败 - 只有失败的事件不确认，同批其余事件确认"""
+        # 配置模拟
+        data_crud.create_many.side_effect = Exception("db down")
+
+        def create(db, event):
+            if event.device_id == "device002":
+                raise Exception("db down")
+            return MagicMock()
+
+        data_crud.create.side_effect = create
+        response = [(self.STREAM, [
+            stream_entry("1-0", data_event("device001")),
+            stream_entry("2-0", data_event("device002")),
+            stream_entry("3-0", data_event("device003")),
+        ])]
+
+        # 执行测试
+        with patch("app.events.subscriber.settings.EVENT_BATCH_ENABLED", batched):
+            subscriber._process_entries(response)
+
+        # 验证结果
+        subscriber.redis_client.xack.assert_called_once_with(self.STREAM, subscriber.group, "1-0", "3-0")
+        assert subscriber.stats["failed"] == 1
+        assert subscriber.stats["acked"] == 2
+
+    @pytest.mark.parametrize("batched", [True, False])
+    def test_invalid_entry_dead_lettered(self, subscriber, data_crud, batched):
+        """测试格式错误的事件 - 直接转入死信流并确认，不等待重新投递"""
+        # 配置模拟
+        data_crud.create_many.side_effect = lambda db, events, commit=True: len(events)
+        response = [(self.STREAM, [
+            stream_entry("1-0", data_event("device001")),
+            ("2-0", {"data": "{bad"}),
+        ])]
+
+        # 执行测试
+        with patch("app.events.subscriber.settings.EVENT_BATCH_ENABLED", batched):
+            subscriber._process_entries(response)
+
+        # 验证结果
+        xadd = subscriber.redis_client.xadd.call_args
+        assert xadd.args[0] == f"{self.STREAM}.dead"
+        assert xadd.args[1]["source_id"] == "2-0"
+        acked = [call.args[2:] for call in subscriber.redis_client.xack.call_args_list]
+        assert ("2-0",) in acked and ("1-0",) in acked
+        assert subscriber.stats["dead_lettered"] == 1
+        assert subscriber.stats["invalid"] == 1
+
+    def test_claim_redelivers_pending(self, subscriber, data_crud):
+        """测试接管超时事件 - 重新处理成功后确认"""
+        # 配置模拟
+        data_crud.create_many.side_effect = lambda db, events, commit=True: len(events)
+        subscriber.redis_client.xautoclaim.return_value = ["0-0", [stream_entry("1-0", data_event("device001"))], []]
+        subscriber.redis_client.xpending_range.return_value = [{"message_id": "1-0", "times_delivered": 2}]
+
+        # 执行测试
+        subscriber._claim_stale([self.STREAM])
+
+        # 验证结果
+        data_crud.create_many.assert_called_once()
+        subscriber.redis_client.xack.assert_called_once_with(self.STREAM, subscriber.group, "1-0")
+        assert subscriber.stats["claimed"] == 1
+        subscriber.redis_client.xadd.assert_not_called()
+
+    def test_claim_dead_letters_after_max_deliveries(self, subscriber, data_crud):
+        """测试投递次数超过上限 - 转入死信流并确认，不再处理"""
+        # 配置模拟
+        subscriber.redis_client.xautoclaim.return_value = ["0-0", [stream_entry("1-0", data_event("device001"))], []]
+        subscriber.redis_client.xpending_range.return_value = [{"message_id": "1-0", "times_delivered": 100}]
+
+        # 执行测试
+        subscriber._claim_stale([self.STREAM])
+
+        # 验证结果
+        data_crud.create_many.assert_not_called()
+        assert subscriber.redis_client.xadd.call_args.args[0] == f"{self.STREAM}.dead"
+        subscriber.redis_client.xack.assert_called_once_with(self.STREAM, subscriber.group, "1-0")
+        assert subscriber.stats["dead_lettered"] == 1
+
+
+class TestHandleMessage:
+    """发布订阅模式逐条处理"""
+
+    def test_failure_reported(self):
+        """测试写库失败 - 返回 False 而不是吞掉异常"""
+        # 配置模拟
+        subscriber = EventSubscriber()
+
+        # 执行测试
+        with patch("app.events.subscriber.SessionLocal"), \
+                patch("app.events.subscriber.device_data_crud") as data_crud:
+            data_crud.create.side_effect = Exception("db down")
+            result = subscriber._handle_message(make_message(data_event("device001")))
+
+        # 验证结果
+        assert result is False
+
+    def test_invalid_message_not_retried(self):
+        """测试格式错误的消息 - 丢弃，不视为处理失败"""
+        subscriber = EventSubscriber()
+
+        assert subscriber._handle_message({"type": "message", "data": "{bad"}) is True
+
+
+class TestHeartbeatStream:
+    """在线状态保存在本地时心跳流不经消费组"""
+
+    def test_heartbeat_excluded_from_group(self):
+        """测试本地在线状态 - 心跳流不参与消费组分摊，启用 Redis 在线状态时参与"""
+        # 配置模拟
+        subscriber = EventSubscriber()
+        heartbeat = "device.heartbeat"
+
+        # 执行测试
+        with patch("app.events.subscriber.settings.EVENT_CHANNEL_DEVICE_HEARTBEAT", heartbeat), \
+                patch.object(subscriber, "_channels", return_value=["device.data.received", heartbeat]):
+            with patch("app.events.subscriber.settings.PRESENCE_REDIS_ENABLED", False):
+                local = subscriber._group_streams()
+            with patch("app.events.subscriber.settings.PRESENCE_REDIS_ENABLED", True):
+                shared = subscriber._group_streams()
+
+        # 验证结果
+        assert local == ["device.data.received"]
+        assert shared == ["device.data.received", heartbeat]
+
+    def test_every_instance_reads_heartbeats(self):
+        """测试心跳读取 - 以 XREAD 从最新事件开始读取，交给在线状态跟踪器且不确认"""
+        # 配置模拟
+        subscriber = EventSubscriber()
+        subscriber.redis_client = MagicMock()
+        subscriber.running = True
+        heartbeat = "device.heartbeat"
+
+        def xread(streams, count, block):
+            subscriber.running = False
+            return [(heartbeat, [stream_entry("5-0", {"event_type": "device_heartbeat", "device_id": "device001"})])]
+
+        subscriber.redis_client.xread.side_effect = xread
+
+        # 执行测试
+        with patch("app.events.subscriber.settings.EVENT_CHANNEL_DEVICE_HEARTBEAT", heartbeat), \
+                patch("app.events.subscriber.presence_tracker") as tracker:
+            subscriber._listen_heartbeats()
+
+        # 验证结果
+        assert subscriber.redis_client.xread.call_args.args[0] == {heartbeat: "$"}
+        tracker.touch.assert_called_once()
+        assert tracker.touch.call_args.args[0] == "device001"
+        subscriber.redis_client.xack.assert_not_called()
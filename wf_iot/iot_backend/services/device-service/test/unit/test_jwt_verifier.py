@@ -0,0 +1,230 @@
+"""
+JWT本地验证单元测试
+测试 app/core/jwt_verifier.py 中的 LocalJwtVerifier 类及设备端点的本地鉴权
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwt
+
+from app.api.v1.endpoints.devices import check_permission, verify_token
+from app.core import jwt_verifier as jwt_verifier_module
+from app.core.jwt_verifier import LocalJwtVerifier
+from app.grpc.clients.auth_client import AuthResult
+
+SECRET = "test-secret"
+
+
+def rsa_key_pair() -> tuple:
+    """生成 (私钥PEM, 公钥PEM)"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+
+def claims(**extra) -> dict:
+    return {"sub": "alice", "uid": 7, "exp": int(time.time()) + 600, **extra}
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class TestLocalJwtVerifier:
+    """LocalJwtVerifier 类的单元测试"""
+
+    @pytest.fixture(scope="class")
+    def keys(self):
+        return {"k1": rsa_key_pair(), "k2": rsa_key_pair()}
+
+    def test_hs256_with_permission_claims(self):
+        """测试 HS256 - 验证通过并返回Token内的权限声明"""
+        # 配置模拟
+        verifier = LocalJwtVerifier(enabled=True, algorithm="HS256", secret_key=SECRET)
+        token = jwt.encode(claims(perms=["device:read"], su=False), SECRET, algorithm="HS256")
+
+        # 执行测试
+        result = verifier.verify(token)
+
+        # 验证结果
+        assert result.valid and result.user_id == 7 and result.username == "alice"
+        assert result.permissions == frozenset({"device:read"})
+        assert result.is_superuser is False
+
+    def test_token_without_permission_claims(self):
+        """测试旧Token - 不含权限声明时 permissions 为 None，由调用方经 auth-service 鉴权"""
+        verifier = LocalJwtVerifier(enabled=True, algorithm="HS256", secret_key=SECRET)
+
+        result = verifier.verify(jwt.encode(claims(), SECRET, algorithm="HS256"))
+
+        assert result.valid and result.permissions is None
+
+    def test_expired_token_rejected(self):
+        """测试过期Token - 确定无效，不回退到 auth-service"""
+        # 配置模拟
+        verifier = LocalJwtVerifier(enabled=True, algorithm="HS256", secret_key=SECRET)
+        token = jwt.encode(claims(exp=int(time.time()) - 10), SECRET, algorithm="HS256")
+
+        # 执行测试
+        result = verifier.verify(token)
+
+        # 验证结果
+        assert result is not None and result.valid is False
+        assert result.error == "Token已过期"
+        assert verifier.stats["rejected"] == 1
+
+    def test_algorithm_confusion_rejected(self, keys):
+        """测试算法混淆 - 以公钥作为 HMAC 密钥签名的 HS256 Token 被拒绝"""
+        # 配置模拟
+        public_pem = keys["k1"][1]
+        verifier = LocalJwtVerifier(enabled=True, algorithm="RS256", key_fetcher=lambda: ({"k1": public_pem}, 300))
+        header = b64url(json.dumps({"alg": "HS256", "typ": "JWT", "kid": "k1"}).encode())
+        payload = b64url(json.dumps(claims(su=True)).encode())
+        signature = hmac.new(public_pem.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        forged = f"{header}.{payload}.{b64url(signature)}"
+
+        # 执行测试
+        result = verifier.verify(forged)
+
+        # 验证结果
+        assert result is not None and result.valid is False
+        assert verifier.stats["verified"] == 0
+
+    def test_rs256_unknown_kid_refresh(self, keys):
+        """测试密钥轮换 - 遇到未知 kid 时提前刷新公钥，短时间内不重复强制刷新"""
+        # 配置模拟
+        fetched = [{"k1": keys["k1"][1]}, {"k1": keys["k1"][1], "k2": keys["k2"][1]}]
+        key_fetcher = MagicMock(side_effect=lambda: (fetched.pop(0) if fetched else {"k1": keys["k1"][1]}, 300))
+        verifier = LocalJwtVerifier(enabled=True, algorithm="RS256", key_fetcher=key_fetcher)
+        old_token = jwt.encode(claims(), keys["k1"][0], algorithm="RS256", headers={"kid": "k1"})
+        new_token = jwt.encode(claims(), keys["k2"][0], algorithm="RS256", headers={"kid": "k2"})
+        unknown_token = jwt.encode(claims(), keys["k2"][0], algorithm="RS256", headers={"kid": "k3"})
+
+        # 执行测试
+        with patch.object(jwt_verifier_module, "MIN_FORCED_REFRESH_INTERVAL", 0.0):
+            assert verifier.verify(old_token).valid is True
+            assert verifier.verify(new_token).valid is True
+        unknown = verifier.verify(unknown_token)
+
+        # 验证结果
+        assert key_fetcher.call_count == 2
+        assert unknown is None
+        assert verifier.stats["fallbacks"] == 1
+        assert verifier.get_stats()["keys"] == ["k1", "k2"]
+
+
+class TestCheckPermission:
+    """设备端点的权限检查"""
+
+    @patch("app.api.v1.endpoints.devices.auth_grpc_client")
+    def test_local_claims_no_rpc(self, mock_client):
+        """测试Token含权限声明 - 本地鉴权，不调用 auth-service"""
+        # 配置模拟
+        current_user = {"user_id": 7, "username": "alice", "token": "t",
+                        "permissions": frozenset({"device:read"}), "is_superuser": False}
+
+        # 执行测试
+        check_permission(current_user, "device", "read")
+        with pytest.raises(HTTPException) as exc_info:
+            check_permission(current_user, "device", "delete")
+
+        # 验证结果
+        assert exc_info.value.status_code == 403
+        mock_client.authorize.assert_not_called()
+
+    @patch("app.api.v1.endpoints.devices.auth_grpc_client")
+    def test_superuser_claim(self, mock_client):
+        """测试超级管理员声明 - 允许所有操作"""
+        current_user = {"token": "t", "permissions": frozenset(), "is_superuser": True}
+
+        check_permission(current_user, "device", "delete")
+
+        mock_client.authorize.assert_not_called()
+
+    @patch("app.api.v1.endpoints.devices.auth_grpc_client")
+    def test_fallback_to_auth_service(self, mock_client):
+        """测试Token不含权限声明 - 经 auth-service 鉴权，不可达时返回 503"""
+        # 配置模拟
+        mock_client.authorize.return_value = MagicMock(unavailable=True)
+
+        # 执行测试
+        with pytest.raises(HTTPException) as exc_info:
+            check_permission({"token": "t", "permissions": None}, "device", "read")
+
+        # 验证结果
+        assert exc_info.value.status_code == 503
+        mock_client.authorize.assert_called_once_with("t", "device", "read")
+
+
+class TestRevocationCheck:
+    """本地验证通过后经 auth-service 确认用户未被禁用"""
+
+    LOCAL = AuthResult(True, True, 7, "alice", "", permissions=frozenset({"device:read"}))
+
+    @pytest.fixture
+    def mocks(self):
+        with patch("app.api.v1.endpoints.devices.local_jwt_verifier") as verifier, \
+                patch("app.api.v1.endpoints.devices.auth_grpc_client") as client:
+            verifier.verify.return_value = self.LOCAL
+            yield verifier, client
+
+    def test_revoked_user_rejected(self, mocks):
+        """测试用户已被禁用 - 本地签名有效仍返回 401"""
+        # 配置模拟
+        _, client = mocks
+        client.authorize.return_value = AuthResult(False, False, 0, "", "用户已禁用")
+
+        # 执行测试
+        with pytest.raises(HTTPException) as exc_info:
+            verify_token("Bearer t")
+
+        # 验证结果
+        assert exc_info.value.status_code == 401
+        client.authorize.assert_called_once_with("t")
+
+    def test_checked_result_used_for_permissions(self, mocks):
+        """测试吊销检查通过 - 权限检查交给 auth-service 的缓存结果，不使用Token内的声明"""
+        # 配置模拟
+        _, client = mocks
+        client.authorize.return_value = AuthResult(True, True, 7, "alice", "")
+
+        # 执行测试
+        current_user = verify_token("Bearer t")
+
+        # 验证结果
+        assert current_user["user_id"] == 7
+        assert current_user["permissions"] is None
+
+    def test_auth_service_unavailable_keeps_local_claims(self, mocks):
+        """测试 auth-service 不可用 - 以本地验证结果及权限声明为准"""
+        # 配置模拟
+        _, client = mocks
+        client.authorize.return_value = AuthResult(False, False, 0, "", "down", True)
+
+        # 执行测试
+        current_user = verify_token("Bearer t")
+
+        # 验证结果
+        assert current_user["permissions"] == frozenset({"device:read"})
+
+    def test_check_disabled(self, mocks):
+        """测试关闭吊销检查 - 不调用 auth-service"""
+        _, client = mocks
+
+        with patch("app.api.v1.endpoints.devices.settings.JWT_REVOCATION_CHECK", False):
+            current_user = verify_token("Bearer t")
+
+        assert current_user["permissions"] == frozenset({"device:read"})
+        client.authorize.assert_not_called()
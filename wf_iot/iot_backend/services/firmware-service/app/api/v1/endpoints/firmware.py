@@ -13,18 +13,33 @@ from app.schemas.firmware import (
     FirmwareUpgradeTask, FirmwareUpgradeTaskCreate
 )
 from app.core.config import settings
+from app.core.jwt_verifier import local_jwt_verifier
+from app.grpc.clients.auth_client import auth_grpc_client
 from app.tasks.firmware_tasks import execute_firmware_upgrade
 
 router = APIRouter()
 
 
-# 简化的token验证（实际应通过gRPC调用auth-service）
 def verify_token(authorization: str = Header(None)) -> dict:
-    """验证JWT Token"""
+    """验证JWT Token（本地验证签名，需要时经auth-service确认）"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="缺少认证信息")
-    # 实际应通过gRPC调用auth-service验证
-    return {"user_id": 1, "username": "admin"}
+
+    token = authorization.split(" ")[1]
+    # 优先本地验证签名，无法判断时回退到 auth-service
+    result = local_jwt_verifier.verify(token)
+    if result is None:
+        result = auth_grpc_client.authorize(token)
+    elif result.valid and settings.JWT_REVOCATION_CHECK:
+        # 吊销检查（用户被禁用或删除），结果按Token缓存；auth-service 不可用时以本地验证结果为准
+        checked = auth_grpc_client.authorize(token)
+        if not checked.unavailable:
+            result = checked
+
+    if not result.valid:
+        raise HTTPException(status_code=401, detail=result.error or "Token无效")
+
+    return {"user_id": result.user_id, "username": result.username, "token": token}
 
 
 @router.get("/", response_model=FirmwareListResponse)
@@ -25,6 +25,15 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
 
+    # 数据库连接池配置，环境变量为 FIRMWARE_DB_POOL_* / FIRMWARE_DB_MAX_OVERFLOW
+    DB_POOL_SIZE: int = 10  # 常驻连接数
+    DB_MAX_OVERFLOW: int = 20  # 超出常驻连接数后允许临时创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 连接耗尽时等待签出的最长秒数
+    DB_POOL_RECYCLE: int = 300  # 连接最长使用秒数，应小于 MySQL wait_timeout
+    DB_POOL_PRE_PING: str = "idle"  # 签出时的连接检测: always / idle(只检测空闲过久的连接) / never
+    DB_POOL_PRE_PING_IDLE: float = 30.0  # idle 策略下空闲超过该秒数的连接签出时才执行 ping
+    DB_POOL_USE_LIFO: bool = False  # 优先复用最近归还的连接
+
     # Redis配置（Celery broker）
     REDIS_HOST: str = "redis_cache"
     REDIS_PORT: int = 6379
@@ -43,11 +52,29 @@ class Settings(BaseSettings):
     def CELERY_RESULT_BACKEND(self) -> str:
         return self.REDIS_URL
 
-    # gRPC服务地址
+    # gRPC服务地址，多个副本以逗号分隔，调用在副本间轮询
     AUTH_SERVICE_GRPC: str = "auth-service:50051"
     DEVICE_SERVICE_GRPC: str = "device-service:50052"
     MQTT_GATEWAY_GRPC: str = "mqtt-gateway:50054"
 
+    # gRPC客户端通道配置，环境变量为 FIRMWARE_GRPC_*
+    GRPC_KEEPALIVE_TIME: float = 60.0  # 连接空闲时发送 keepalive ping 的间隔(秒)，不得小于服务端允许的最小间隔
+    GRPC_KEEPALIVE_TIMEOUT: float = 20.0  # ping 无响应超过该秒数判定连接失效
+    GRPC_DEFAULT_TIMEOUT: float = 5.0  # 未指定 timeout 的调用的默认 deadline(秒)
+    GRPC_RETRY_MAX_ATTEMPTS: int = 3  # 返回 UNAVAILABLE 时的最大尝试次数(含首次)，1表示不重试
+    GRPC_CHANNELS_PER_TARGET: int = 1  # 每个副本的通道(HTTP/2连接)数，单连接并发流不足时增加
+
+    # Token验证结果缓存配置，环境变量为 FIRMWARE_AUTH_CACHE_*
+    AUTH_CACHE_MAXSIZE: int = 10000
+    AUTH_CACHE_TTL: float = 60.0  # 缓存有效期(秒)，同时不超过Token本身的过期时间；权限变更最迟在该时间后生效
+
+    # JWT本地验证配置，环境变量为 FIRMWARE_JWT_*
+    JWT_LOCAL_VERIFY: bool = False  # 在本服务验证Token签名及有效期，不再为认证逐请求调用 auth-service
+    JWT_ALGORITHM: str = "HS256"  # 须与 auth-service 的 AUTH_ALGORITHM 一致，RS256 / ES256 的公钥通过 GetSigningKeys 获取
+    JWT_SECRET_KEY: Optional[str] = None  # HS256 共享密钥，须与 AUTH_SECRET_KEY 一致
+    JWT_KEYS_REFRESH_INTERVAL: float = 300.0  # 公钥刷新周期(秒)，遇到未知 kid 时提前刷新
+    JWT_REVOCATION_CHECK: bool = True  # 本地验证通过后经 auth-service(带缓存)确认用户未被禁用，auth-service 不可用时以本地结果为准
+
     # 固件存储配置
     FIRMWARE_UPLOAD_DIR: str = "/app/firmware_storage"
     FIRMWARE_BASE_URL: str = "http://firmware-service:8103/files"
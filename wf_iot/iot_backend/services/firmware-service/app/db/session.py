@@ -3,15 +3,14 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import instrument_engine, pool_options
 
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **pool_options(settings)
 )
+instrument_engine(engine, "primary", settings.DB_POOL_PRE_PING, settings.DB_POOL_PRE_PING_IDLE)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
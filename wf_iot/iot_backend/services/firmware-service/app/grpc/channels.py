@@ -0,0 +1,169 @@
+# 作用：共享gRPC通道管理
+# - 每个目标地址按进程复用通道（Celery prefork 子进程中首次使用时重新创建，不继承父进程的通道）
+# - 地址可为逗号分隔的多个副本，调用在各副本的通道间轮询；单个主机名经 dns:/// 解析出的多个地址
+#   由 round_robin 负载均衡策略分摊
+# - keepalive 检测空闲连接，service config 配置 UNAVAILABLE 时的重试策略，未指定 timeout 的调用使用默认 deadline
+
+import itertools
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Type
+
+import grpc
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 已带解析方案的地址不再加 dns:/// 前缀
+_TARGET_SCHEMES = ("dns:", "ipv4:", "ipv6:", "unix:", "unix-abstract:")
+
+
+def normalize_target(target: str) -> str:
+    """host:port 转为 dns:///host:port，使DNS返回的全部地址参与负载均衡"""
+    target = target.strip()
+    if target.startswith(_TARGET_SCHEMES):
+        return target
+    return f"dns:///{target}"
+
+
+def service_config(max_attempts: int) -> str:
+    """负载均衡及重试策略 (gRPC service config)"""
+    config: Dict[str, Any] = {"loadBalancingConfig": [{"round_robin": {}}]}
+    if max_attempts > 1:
+        config["methodConfig"] = [{
+            "name": [{}],  # 适用于所有服务的所有方法
+            "retryPolicy": {
+                "maxAttempts": max_attempts,
+                "initialBackoff": "0.1s",
+                "maxBackoff": "1s",
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": ["UNAVAILABLE"],
+            },
+        }]
+    return json.dumps(config)
+
+
+class _DefaultTimeoutCallable:
+    """为未指定 timeout 的调用补充默认 deadline，并在多个副本的 multicallable 间轮询"""
+
+    def __init__(self, callables: List[Any], timeout: float):
+        self._callables = itertools.cycle(callables)
+        self._timeout = timeout
+
+    def _next(self):
+        return next(self._callables)
+
+    def __call__(self, request, timeout: Optional[float] = None, **kwargs):
+        return self._next()(request, timeout=timeout or self._timeout, **kwargs)
+
+    def with_call(self, request, timeout: Optional[float] = None, **kwargs):
+        return self._next().with_call(request, timeout=timeout or self._timeout, **kwargs)
+
+    def future(self, request, timeout: Optional[float] = None, **kwargs):
+        return self._next().future(request, timeout=timeout or self._timeout, **kwargs)
+
+
+class PooledStub:
+    """对各副本通道上的 stub 的代理，方法调用带默认 deadline 并轮询副本"""
+
+    def __init__(self, stubs: List[Any], timeout: float):
+        self._stubs = stubs
+        self._timeout = timeout
+        self._methods: Dict[str, _DefaultTimeoutCallable] = {}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = self._methods.get(name)
+        if method is None:
+            method = _DefaultTimeoutCallable([getattr(stub, name) for stub in self._stubs], self._timeout)
+            self._methods[name] = method
+        return method
+
+
+class ChannelManager:
+    """
+    gRPC通道管理器
+
+    get_channels 返回目标地址各副本的共享通道，stub 返回带默认 deadline 的 PooledStub。
+    通道在进程内复用，由 close_all 在进程退出时关闭
+    """
+
+    def __init__(
+        self,
+        keepalive_time: float = 60.0,
+        keepalive_timeout: float = 20.0,
+        default_timeout: float = 5.0,
+        max_attempts: int = 3,
+        channels_per_target: int = 1,
+    ):
+        self.default_timeout = default_timeout
+        self.channels_per_target = max(channels_per_target, 1)
+        self.options = [
+            ("grpc.keepalive_time_ms", int(keepalive_time * 1000)),
+            ("grpc.keepalive_timeout_ms", int(keepalive_timeout * 1000)),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            ("grpc.enable_retries", 1 if max_attempts > 1 else 0),
+            ("grpc.service_config", service_config(max_attempts)),
+        ]
+        self._channels: Dict[str, List[grpc.Channel]] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get_channels(self, target: str) -> List[grpc.Channel]:
+        """目标地址（逗号分隔的副本列表）对应的共享通道"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 后的子进程不能使用父进程的通道
+                self._channels = {}
+                self._pid = os.getpid()
+            channels = self._channels.get(target)
+            if channels is None:
+                replicas = [normalize_target(t) for t in target.split(",") if t.strip()]
+                channels = [
+                    grpc.insecure_channel(
+                        replica,
+                        # 不同的 channel 参数使同一副本的多个通道使用各自的HTTP/2连接
+                        options=self.options + [("grpc.channel_pool_index", index)]
+                    )
+                    for replica in replicas
+                    for index in range(self.channels_per_target)
+                ]
+                self._channels[target] = channels
+                logger.info(f"Created {len(channels)} gRPC channel(s) for {target}")
+            return channels
+
+    def stub(self, target: str, stub_class: Type, timeout: Optional[float] = None) -> PooledStub:
+        """创建目标地址的 stub，方法调用默认 deadline 为 timeout 或 default_timeout"""
+        stubs = [stub_class(channel) for channel in self.get_channels(target)]
+        return PooledStub(stubs, timeout or self.default_timeout)
+
+    def close(self, target: str):
+        """关闭目标地址的通道"""
+        with self._lock:
+            channels = self._channels.pop(target, []) if self._pid == os.getpid() else []
+        for channel in channels:
+            channel.close()
+
+    def close_all(self):
+        """关闭本进程创建的所有通道"""
+        with self._lock:
+            channels = self._channels if self._pid == os.getpid() else {}
+            self._channels = {}
+        for target_channels in channels.values():
+            for channel in target_channels:
+                channel.close()
+
+
+# 全局通道管理器实例
+channel_manager = ChannelManager(
+    keepalive_time=settings.GRPC_KEEPALIVE_TIME,
+    keepalive_timeout=settings.GRPC_KEEPALIVE_TIMEOUT,
+    default_timeout=settings.GRPC_DEFAULT_TIMEOUT,
+    max_attempts=settings.GRPC_RETRY_MAX_ATTEMPTS,
+    channels_per_target=settings.GRPC_CHANNELS_PER_TARGET,
+)
@@ -1,95 +1,278 @@
-# Auth服务gRPC客户端
+# Auth Service gRPC客户端
 
 import grpc
+import hashlib
 import logging
-from typing import Optional, List
+import sys
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
 
-from app.core.config import settings
+# 添加proto生成代码路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../../../proto/generated'))
 
-# 导入生成的gRPC代码
-import sys
-sys.path.insert(0, '/app/proto_generated')
-from proto_generated import auth_pb2, auth_pb2_grpc
+from auth_pb2 import (
+    ValidateTokenRequest, CheckPermissionRequest, GetUserByIdRequest,
+    AuthorizeRequest, BatchAuthorizeRequest, GetSigningKeysRequest
+)
+import auth_pb2_grpc
+
+from app.core.config import settings
+from app.grpc.channels import channel_manager
 
 logger = logging.getLogger(__name__)
 
 
+class AuthResult(NamedTuple):
+    """Token验证及权限检查结果"""
+    valid: bool
+    allowed: bool
+    user_id: int
+    username: str
+    error: str
+    unavailable: bool = False  # Auth Service 不可达，结果不代表Token无效
+
+
+class _Principal(NamedTuple):
+    """已验证Token对应的用户及有效权限，expires_at 为墙钟时间"""
+    user_id: int
+    username: str
+    is_superuser: bool
+    permissions: FrozenSet[str]
+    expires_at: float
+
+    def authorize(self, resource: str, action: str) -> AuthResult:
+        allowed = not resource or self.is_superuser or f"{resource}:{action}" in self.permissions
+        return AuthResult(True, allowed, self.user_id, self.username,
+                          "" if allowed else f"缺少权限: {resource}:{action}")
+
+
+class TokenCache:
+    """
+    Token验证结果缓存
+
+    - 键为 Token 的 SHA-256 摘要，不在内存中保留原始 Token
+    - 条目有效期取 min(Token的exp, 当前时间 + ttl)，Token 过期后不会再被接受
+    - 只缓存验证成功的结果；权限变更最迟 ttl 秒后生效
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Principal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[_Principal]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def set(self, key: str, response) -> Optional[_Principal]:
+        """由 AuthorizeResponse 写入缓存，Token无效时不缓存"""
+        if not response.valid:
+            return None
+        expires_at = time.time() + self.ttl
+        if response.expires_at:
+            expires_at = min(expires_at, float(response.expires_at))
+        principal = _Principal(
+            response.user_id, response.username, response.is_superuser,
+            frozenset(response.permissions), expires_at
+        )
+        with self._lock:
+            self._entries[key] = principal
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return principal
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        return stats
+
+
 class AuthGrpcClient:
-    """Auth服务gRPC客户端"""
+    """Auth Service gRPC客户端"""
 
     def __init__(self):
-        self.channel = None
         self.stub = None
-        self._connect()
+        self.token_cache = TokenCache(maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_CACHE_TTL)
+        self.rpc_count = 0
 
-    def _connect(self):
-        """建立gRPC连接"""
+    def connect(self):
+        """建立gRPC连接（使用共享通道）"""
         try:
-            self.channel = grpc.insecure_channel(settings.AUTH_SERVICE_GRPC_ADDRESS)
-            self.stub = auth_pb2_grpc.AuthServiceStub(self.channel)
-            logger.info(f"已连接到Auth服务: {settings.AUTH_SERVICE_GRPC_ADDRESS}")
+            self.stub = channel_manager.stub(settings.AUTH_SERVICE_GRPC, auth_pb2_grpc.AuthServiceStub)
+            logger.info(f"Connected to Auth Service at {settings.AUTH_SERVICE_GRPC}")
         except Exception as e:
-            logger.error(f"连接Auth服务失败: {e}")
-            raise
+            logger.error(f"Failed to connect to Auth Service: {e}")
+
+    def close(self):
+        """关闭gRPC连接"""
+        if self.stub:
+            channel_manager.close(settings.AUTH_SERVICE_GRPC)
+            self.stub = None
+            logger.info("Disconnected from Auth Service")
+
+    def authorize(self, token: str, resource: str = "", action: str = "") -> AuthResult:
+        """
+        验证Token并检查权限（resource 为空时只验证Token）
+        缓存命中时在本地判断，不发起RPC；未命中时一次 Authorize 调用同时完成验证和鉴权
+        """
+        key = self.token_cache.key(token)
+        principal = self.token_cache.get(key)
+        if principal is not None:
+            return principal.authorize(resource, action)
+
+        if not self.stub:
+            return AuthResult(False, False, 0, "", "Auth Service not connected", True)
 
-    def validate_token(self, token: str) -> Optional[dict]:
-        """验证JWT Token"""
         try:
-            request = auth_pb2.ValidateTokenRequest(token=token)
-            response = self.stub.ValidateToken(request, timeout=5.0)
-
-            if response.valid:
-                return {
-                    "user_id": response.user_id,
-                    "username": response.username,
-                    "roles": list(response.roles)
-                }
-            return None
+            self.rpc_count += 1
+            response = self.stub.Authorize(AuthorizeRequest(token=token, resource=resource, action=action))
         except grpc.RpcError as e:
-            logger.error(f"Token验证RPC错误: {e.code()} - {e.details()}")
-            return None
-        except Exception as e:
-            logger.error(f"Token验证异常: {e}")
-            return None
+            logger.error(f"gRPC error authorizing token: {e}")
+            return AuthResult(False, False, 0, "", str(e), True)
+
+        principal = self.token_cache.set(key, response)
+        if principal is None:
+            return AuthResult(False, False, 0, "", response.error_message)
+        return principal.authorize(resource, action)
+
+    def batch_authorize(self, items: Sequence[Tuple[str, str, str]]) -> List[AuthResult]:
+        """
+        批量验证 (token, resource, action)
+        缓存命中的条目在本地判断，其余条目合并为一次 BatchAuthorize 调用
+        """
+        results: List[Optional[AuthResult]] = [None] * len(items)
+        pending: List[int] = []
+        for index, (token, resource, action) in enumerate(items):
+            principal = self.token_cache.get(self.token_cache.key(token))
+            if principal is not None:
+                results[index] = principal.authorize(resource, action)
+            else:
+                pending.append(index)
+
+        if pending:
+            if not self.stub:
+                error = AuthResult(False, False, 0, "", "Auth Service not connected", True)
+                for index in pending:
+                    results[index] = error
+                return results
+            try:
+                self.rpc_count += 1
+                response = self.stub.BatchAuthorize(BatchAuthorizeRequest(requests=[
+                    AuthorizeRequest(token=items[i][0], resource=items[i][1], action=items[i][2])
+                    for i in pending
+                ]))
+            except grpc.RpcError as e:
+                logger.error(f"gRPC error batch authorizing: {e}")
+                error = AuthResult(False, False, 0, "", str(e), True)
+                for index in pending:
+                    results[index] = error
+                return results
+            for index, item in zip(pending, response.responses):
+                token, resource, action = items[index]
+                principal = self.token_cache.set(self.token_cache.key(token), item)
+                if principal is None:
+                    results[index] = AuthResult(False, False, 0, "", item.error_message)
+                else:
+                    results[index] = principal.authorize(resource, action)
+        return results
+
+    def validate_token(self, token: str) -> tuple[bool, int, str, str]:
+        """
+        验证JWT Token
+        返回: (是否有效, 用户ID, 用户名, 错误信息)
+        """
+        result = self.authorize(token)
+        return result.valid, result.user_id, result.username, result.error
+
+    def check_permission(self, user_id: int, resource: str, action: str) -> tuple[bool, str]:
+        """
+        检查用户权限（不经过缓存，已有Token时应使用 authorize）
+        返回: (是否允许, 原因)
+        """
+        if not self.stub:
+            return False, "Auth Service not connected"
 
-    def check_permission(self, user_id: int, permission_code: str) -> bool:
-        """检查用户权限"""
         try:
-            request = auth_pb2.CheckPermissionRequest(
+            request = CheckPermissionRequest(
                 user_id=user_id,
-                permission_code=permission_code
+                resource=resource,
+                action=action
             )
-            response = self.stub.CheckPermission(request, timeout=5.0)
-            return response.has_permission
+            self.rpc_count += 1
+            response = self.stub.CheckPermission(request)
+            return response.allowed, response.reason
         except grpc.RpcError as e:
-            logger.error(f"权限检查RPC错误: {e.code()} - {e.details()}")
-            return False
-        except Exception as e:
-            logger.error(f"权限检查异常: {e}")
-            return False
+            logger.error(f"gRPC error checking permission: {e}")
+            return False, str(e)
 
-    def close(self):
-        """关闭gRPC连接"""
-        if self.channel:
-            self.channel.close()
-            logger.info("Auth服务gRPC连接已关闭")
+    def get_user_by_id(self, user_id: int) -> dict:
+        """获取用户信息"""
+        if not self.stub:
+            return None
 
+        try:
+            request = GetUserByIdRequest(user_id=user_id)
+            response = self.stub.GetUserById(request)
+            return {
+                "id": response.id,
+                "username": response.username,
+                "email": response.email,
+                "full_name": response.full_name,
+                "is_active": response.is_active,
+                "is_superuser": response.is_superuser
+            }
+        except grpc.RpcError as e:
+            logger.error(f"gRPC error getting user: {e}")
+            return None
 
-# 全局客户端实例
-_auth_client: Optional[AuthGrpcClient] = None
+    def get_signing_keys(self) -> Optional[Tuple[Dict[str, str], int]]:
+        """
+        获取JWT验证公钥
+        返回: (kid -> PEM公钥, 建议缓存秒数)，调用失败时返回None
+        """
+        if not self.stub:
+            return None
 
+        try:
+            self.rpc_count += 1
+            response = self.stub.GetSigningKeys(GetSigningKeysRequest(), timeout=5.0)
+            return {key.kid: key.public_key for key in response.keys}, response.max_age
+        except grpc.RpcError as e:
+            logger.error(f"gRPC error fetching signing keys: {e}")
+            return None
 
-def get_auth_client() -> AuthGrpcClient:
-    """获取Auth gRPC客户端实例"""
-    global _auth_client
-    if _auth_client is None:
-        _auth_client = AuthGrpcClient()
-    return _auth_client
+    def get_stats(self) -> Dict[str, int]:
+        """Token缓存命中情况及RPC调用次数"""
+        stats = self.token_cache.get_stats()
+        stats["rpcs"] = self.rpc_count
+        return stats
 
 
-def close_auth_client():
-    """关闭Auth gRPC客户端"""
-    global _auth_client
-    if _auth_client:
-        _auth_client.close()
-        _auth_client = None
+# 全局客户端实例
+auth_grpc_client = AuthGrpcClient()
@@ -8,7 +8,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
+from app.db.pool import get_pool_stats
 from app.api.v1.api import api_router
+from app.grpc.channels import channel_manager
+from app.grpc.clients.auth_client import auth_grpc_client
+from app.core.jwt_verifier import local_jwt_verifier
 
 # 配置日志
 logging.basicConfig(
@@ -27,12 +31,17 @@ async def lifespan(app: FastAPI):
     # 确保固件存储目录存在
     os.makedirs(settings.FIRMWARE_UPLOAD_DIR, exist_ok=True)
 
+    # 连接Auth Service
+    auth_grpc_client.connect()
+
     logger.info(f"Firmware Service started - HTTP port: {settings.HTTP_PORT}")
 
     yield
 
     # 关闭时
     logger.info("Shutting down Firmware Service...")
+    auth_grpc_client.close()
+    channel_manager.close_all()
     logger.info("Firmware Service stopped")
 
 
@@ -69,7 +78,10 @@ def health_check():
         "status": "healthy",
         "service": settings.SERVICE_NAME,
         "http_port": settings.HTTP_PORT,
-        "grpc_port": settings.GRPC_PORT
+        "grpc_port": settings.GRPC_PORT,
+        "auth_cache": auth_grpc_client.get_stats(),
+        "jwt_local_verify": local_jwt_verifier.get_stats(),
+        "db_pool": get_pool_stats()
     }
 
 
@@ -1,14 +1,20 @@
 # 固件升级Celery任务
 
 import logging
+import grpc
 from celery import Celery
+from celery.signals import worker_process_shutdown
 import sys
 import os
 
 # 添加proto生成代码路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../../proto/generated'))
 
+from mqtt_gateway_pb2 import SendFirmwareUpgradeRequest
+import mqtt_gateway_pb2_grpc
+
 from app.core.config import settings
+from app.grpc.channels import channel_manager
 from app.db.session import SessionLocal
 from app.crud.firmware import firmware_crud, upgrade_task_crud
 from app.schemas.firmware import FirmwareUpgradeTaskUpdate
@@ -34,6 +40,12 @@ celery_app.conf.update(
 )
 
 
+@worker_process_shutdown.connect
+def close_grpc_channels(**kwargs):
+    """worker进程退出时关闭共享的gRPC通道"""
+    channel_manager.close_all()
+
+
 @celery_app.task(bind=True, max_retries=3)
 def execute_firmware_upgrade(self, task_id: int):
     """
@@ -63,14 +75,9 @@ def execute_firmware_upgrade(self, task_id: int):
             progress=10
         ))
 
-        # 通过gRPC调用mqtt-gateway发送升级命令
+        # 通过gRPC调用mqtt-gateway发送升级命令（worker进程内复用共享通道）
         try:
-            import grpc
-            from mqtt_gateway_pb2 import SendFirmwareUpgradeRequest
-            import mqtt_gateway_pb2_grpc
-
-            channel = grpc.insecure_channel(settings.MQTT_GATEWAY_GRPC)
-            stub = mqtt_gateway_pb2_grpc.MqttGatewayServiceStub(channel)
+            stub = channel_manager.stub(settings.MQTT_GATEWAY_GRPC, mqtt_gateway_pb2_grpc.MqttGatewayServiceStub)
 
             request = SendFirmwareUpgradeRequest(
                 device_id=task.device_identifier,
@@ -81,7 +88,6 @@ def execute_firmware_upgrade(self, task_id: int):
                 qos=1
             )
             response = stub.SendFirmwareUpgrade(request)
-            channel.close()
 
             if response.success:
                 upgrade_task_crud.update(db, task, FirmwareUpgradeTaskUpdate(
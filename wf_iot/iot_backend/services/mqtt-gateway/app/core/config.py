@@ -1,7 +1,7 @@
 # 配置管理（mqtt-gateway专用）
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -11,6 +11,14 @@ class Settings(BaseSettings):
     SERVICE_NAME: str = "mqtt-gateway"
     SERVICE_HOST: str = "0.0.0.0"
     GRPC_PORT: int = 50054
+    GRPC_MIN_PING_INTERVAL_MS: int = 30000  # 允许客户端 keepalive ping 的最小间隔(毫秒)
+    GRPC_SERVER_MODE: str = "aio"  # aio: grpc.aio 服务端(独立事件循环线程) / thread: 线程池服务端
+    GRPC_MAX_CONCURRENT_RPCS: int = 1000  # 同时处理的RPC上限，超出时立即返回 RESOURCE_EXHAUSTED
+    GRPC_BLOCKING_WORKERS: int = 32  # 执行MQTT发布等阻塞调用的线程数(thread 模式下为服务端线程数)
+    STREAM_PUBLISH_WINDOW: int = 256  # StreamPublish 每个流中已读取但未确认的消息上限(aio 模式)
+    EVENT_STREAM_BUFFER_SIZE: int = 1000  # SubscribeDeviceEvents 订阅者默认缓冲事件数，缓冲区满时断开该订阅者
+    EVENT_STREAM_MAX_BUFFER_SIZE: int = 10000  # 订阅者可申请的缓冲事件数上限
+    EVENT_STREAM_MAX_SUBSCRIBERS: int = 100  # 同时存在的事件订阅者上限
     DEBUG: bool = False
 
     # MQTT配置
@@ -18,7 +26,25 @@ class Settings(BaseSettings):
     MQTT_BROKER_PORT: int = 1883
     MQTT_USERNAME: Optional[str] = None
     MQTT_PASSWORD: Optional[str] = None
-    MQTT_CLIENT_ID: str = "mqtt_gateway_service"
+    MQTT_CLIENT_ID: str = "mqtt_gateway_service"  # client ID 前缀，实际 client ID 为 前缀-实例标识
+    MQTT_INSTANCE_ID: Optional[str] = None  # 实例标识(如Pod名称)，为空时使用 主机名-进程号-随机后缀，多副本不会因 client ID 相同互相踢下线
+    MQTT_PROTOCOL: str = "5"  # 协议版本: 5 / 3.1.1
+
+    # MQTT共享订阅配置 (多个副本以 $share/<group>/<topic> 订阅，同组副本分摊设备消息)，环境变量为 MQTT_SHARED_*
+    SHARED_SUBSCRIPTION: bool = True  # 关闭后每个副本都收到全部消息，只能单副本运行
+    SHARED_GROUP: str = "mqtt_gateway"  # 默认共享组名
+    # 主题 -> 组名，组名为空字符串表示该主题不共享；在线状态(GetDeviceOnlineStatus)保存在各副本内存中，
+    # 心跳默认不共享，每个副本都收到全部心跳，请求落到任一副本结果一致（心跳事件由每个副本各发布一次，在线状态跟踪按设备合并）
+    SHARED_GROUPS: Dict[str, str] = {"device/+/heartbeat": ""}
+
+    # 负载编解码配置，环境变量为 MQTT_JSON_CODEC
+    JSON_CODEC: str = "auto"  # JSON 后端: auto(orjson > msgspec > json，按已安装的选择) / orjson / msgspec / json
+
+    # MQTT消息分发配置 (网络线程只入队，处理在按设备ID分区的工作线程中执行)，环境变量为 MQTT_DISPATCH_*
+    DISPATCH_WORKERS: int = 8  # 工作线程数，同一设备的消息始终由同一线程按序处理
+    DISPATCH_QUEUE_SIZE: int = 10000  # 每个工作线程的队列容量
+    DISPATCH_OVERFLOW: str = "block"  # 队列满时: block 阻塞网络线程(最长 DISPATCH_BLOCK_TIMEOUT 秒后拒绝) / reject 拒绝新消息 / drop_oldest 丢弃最早消息
+    DISPATCH_BLOCK_TIMEOUT: float = 0.5  # block 策略的最长阻塞秒数，须远小于 keepalive 间隔
 
     # Redis配置（事件发布）
     REDIS_HOST: str = "redis_cache"
@@ -29,7 +55,20 @@ class Settings(BaseSettings):
     def REDIS_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
-    # 事件通道配置
+    # 事件总线配置，环境变量为 MQTT_EVENT_BUS_*
+    EVENT_BUS_MODE: str = "streams"  # streams: Redis Streams(持久化、消费组) / pubsub: Redis发布订阅 / both: 同时发布(迁移期间使用)
+    EVENT_BUS_MAXLEN: int = 100000  # 每个事件流保留的近似最大条数(XADD MAXLEN ~)，超出的旧事件被裁剪
+
+    # 事件批量发布配置，环境变量为 MQTT_EVENT_PUBLISH_*
+    EVENT_PUBLISH_BATCHED: bool = True  # 事件先入队，由后台线程以 pipeline 批量写入Redis；关闭则在MQTT回调中逐条同步写入
+    EVENT_PUBLISH_QUEUE_SIZE: int = 10000  # 发送队列容量(事件数)
+    EVENT_PUBLISH_BATCH_SIZE: int = 500  # 单个 pipeline 最多包含的事件数
+    EVENT_PUBLISH_FLUSH_INTERVAL: float = 0.05  # 未凑满一批时的最长等待(秒)
+    EVENT_PUBLISH_OVERFLOW: str = "drop_oldest"  # 队列满时: drop_oldest 丢弃最早事件 / block 阻塞MQTT接收 / spill 写入磁盘后回放
+    EVENT_PUBLISH_BLOCK_TIMEOUT: float = 1.0  # block 策略下最长阻塞秒数，超时丢弃新事件
+    EVENT_PUBLISH_SPILL_PATH: str = "/tmp/mqtt-gateway/events.spill"  # spill 策略的暂存文件
+
+    # 事件通道配置（streams 模式下同时为流的键名）
     EVENT_CHANNEL_DEVICE_DATA: str = "device.data.received"
     EVENT_CHANNEL_DEVICE_STATUS: str = "device.status.changed"
     EVENT_CHANNEL_DEVICE_HEARTBEAT: str = "device.heartbeat"
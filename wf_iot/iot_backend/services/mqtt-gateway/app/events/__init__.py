@@ -1,2 +1,3 @@
 # 事件模块
 from app.events.publisher import event_publisher, EventPublisher
+from app.events.broker import event_broker, EventBroker
@@ -0,0 +1,254 @@
+# 作用：进程内设备事件分发（SubscribeDeviceEvents 的数据源）
+# - MQTT 接收线程调用 dispatch，按设备ID/主题过滤/事件类型匹配订阅者，不阻塞
+# - 每个订阅者有独立的有界缓冲区，缓冲区满时断开该订阅者（慢消费者驱逐），不影响其他订阅者
+# - 事件为 protobuf DeviceEvent，只在有订阅者匹配时构造一次，所有订阅者共享
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import paho.mqtt.client as mqtt
+
+# 添加proto生成代码路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../../proto/generated'))
+
+from mqtt_gateway_pb2 import DeviceEvent
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberLimitError(RuntimeError):
+    """订阅者数量已达上限"""
+
+
+class Subscription:
+    """
+    单个订阅者
+
+    缓冲区为 deque + 条件变量，MQTT 线程写入；
+    绑定事件循环时，缓冲区由空变为非空才通过 call_soon_threadsafe 唤醒一次消费协程
+    """
+
+    def __init__(
+        self,
+        device_ids: Iterable[str],
+        topic_patterns: Iterable[str],
+        event_types: Iterable[str],
+        buffer_size: int,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.device_ids: Set[str] = set(device_ids)
+        self.topic_patterns: List[str] = list(topic_patterns)
+        self.event_types: Set[str] = set(event_types)
+        self.buffer_size = buffer_size
+        self.evicted = False
+        self.closed = False
+        self.delivered = 0
+        self._buffer: deque = deque()
+        self._condition = threading.Condition()
+        self._loop = loop
+        self._wakeup = asyncio.Event() if loop is not None else None
+
+    def matches(self, topic: str, event_type: str) -> bool:
+        if self.event_types and event_type not in self.event_types:
+            return False
+        if self.topic_patterns and not any(mqtt.topic_matches_sub(p, topic) for p in self.topic_patterns):
+            return False
+        return True
+
+    def offer(self, event: Any) -> bool:
+        """写入事件，缓冲区已满时标记为驱逐并返回 False"""
+        with self._condition:
+            if self.closed:
+                return True
+            if len(self._buffer) >= self.buffer_size:
+                # 已缓冲的事件不再发送，订阅流尽快结束
+                self.evicted = True
+                self.closed = True
+                self._buffer.clear()
+                self._condition.notify_all()
+                self._notify()
+                return False
+            was_empty = not self._buffer
+            self._buffer.append(event)
+            if was_empty:
+                self._condition.notify_all()
+                self._notify()
+        return True
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            self._notify()
+
+    def _notify(self):
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def _drain(self) -> List[Any]:
+        with self._condition:
+            events = list(self._buffer)
+            self._buffer.clear()
+            if self._wakeup is not None:
+                self._wakeup.clear()
+        self.delivered += len(events)
+        return events
+
+    def get(self, timeout: Optional[float] = None) -> Optional[List[Any]]:
+        """
+        取出缓冲区中全部事件（线程中调用）
+
+        超时返回空列表；订阅已关闭（驱逐或取消）且缓冲区为空时返回 None
+        """
+        with self._condition:
+            if not self._buffer and not self.closed:
+                self._condition.wait(timeout)
+            if not self._buffer and self.closed:
+                return None
+        return self._drain()
+
+    async def get_async(self) -> Optional[List[Any]]:
+        """取出缓冲区中全部事件（事件循环中调用），没有事件时等待；订阅已关闭时返回 None"""
+        while True:
+            with self._condition:
+                if self._buffer:
+                    break
+                if self.closed:
+                    return None
+            await self._wakeup.wait()
+            self._wakeup.clear()
+        return self._drain()
+
+
+class EventBroker:
+    """
+    设备事件分发器
+
+    订阅者按设备ID建立索引，未限定设备的订阅者单独存放，
+    每条消息只检查相关设备的订阅者及不限设备的订阅者
+    """
+
+    def __init__(self, buffer_size: int = 1000, max_buffer_size: int = 10000, max_subscribers: int = 100):
+        self.buffer_size = buffer_size
+        self.max_buffer_size = max_buffer_size
+        self.max_subscribers = max_subscribers
+        self._by_device: Dict[str, Set[Subscription]] = {}
+        self._any_device: Set[Subscription] = set()
+        self._count = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "dispatched": 0,
+            "matched": 0,
+            "evicted": 0,
+            "subscriptions": 0,
+        }
+
+    def subscribe(
+        self,
+        device_ids: Iterable[str] = (),
+        topic_patterns: Iterable[str] = (),
+        event_types: Iterable[str] = (),
+        buffer_size: int = 0,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Subscription:
+        """注册订阅者，buffer_size 为 0 时使用默认值，超过上限时截断为 max_buffer_size"""
+        size = min(buffer_size or self.buffer_size, self.max_buffer_size)
+        subscription = Subscription(device_ids, topic_patterns, event_types, size, loop)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise SubscriberLimitError(f"Too many event subscribers ({self.max_subscribers})")
+            if subscription.device_ids:
+                for device_id in subscription.device_ids:
+                    self._by_device.setdefault(device_id, set()).add(subscription)
+            else:
+                self._any_device.add(subscription)
+            self._count += 1
+            self.stats["subscriptions"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """移除订阅者（重复调用无副作用）"""
+        subscription.close()
+        with self._lock:
+            removed = False
+            if subscription.device_ids:
+                for device_id in subscription.device_ids:
+                    subscribers = self._by_device.get(device_id)
+                    if subscribers and subscription in subscribers:
+                        subscribers.discard(subscription)
+                        removed = True
+                        if not subscribers:
+                            del self._by_device[device_id]
+            elif subscription in self._any_device:
+                self._any_device.discard(subscription)
+                removed = True
+            if removed:
+                self._count -= 1
+
+    def dispatch(self, topic: str, device_id: str, event_type: str, payload: bytes) -> int:
+        """分发一条设备消息，返回匹配的订阅者数"""
+        with self._lock:
+            if not self._count:
+                return 0
+            candidates = list(self._any_device)
+            candidates.extend(self._by_device.get(device_id, ()))
+        self.stats["dispatched"] += 1
+
+        event = None
+        matched = 0
+        for subscription in candidates:
+            if not subscription.matches(topic, event_type):
+                continue
+            if event is None:
+                event = DeviceEvent(
+                    event_type=event_type,
+                    device_id=device_id,
+                    topic=topic,
+                    payload=payload,
+                    timestamp_ms=int(time.time() * 1000),
+                )
+            matched += 1
+            if not subscription.offer(event):
+                self.stats["evicted"] += 1
+                logger.warning(
+                    f"Evicted slow event subscriber (buffer {subscription.buffer_size}, "
+                    f"delivered {subscription.delivered})"
+                )
+                self.unsubscribe(subscription)
+        self.stats["matched"] += matched
+        return matched
+
+    def close_all(self):
+        """关闭所有订阅（服务停止时调用），各订阅流随之结束"""
+        with self._lock:
+            subscriptions = list(self._any_device)
+            for subscribers in self._by_device.values():
+                subscriptions.extend(subscribers)
+        for subscription in set(subscriptions):
+            self.unsubscribe(subscription)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.stats)
+            stats["active"] = self._count
+        return stats
+
+
+# 全局事件分发器实例
+event_broker = EventBroker(
+    buffer_size=settings.EVENT_STREAM_BUFFER_SIZE,
+    max_buffer_size=settings.EVENT_STREAM_MAX_BUFFER_SIZE,
+    max_subscribers=settings.EVENT_STREAM_MAX_SUBSCRIBERS,
+)
@@ -1,22 +1,140 @@
 # Redis事件发布器
 
-import json
+import itertools
 import logging
+import os
+import shutil
+import threading
+import time
 import redis
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
 from datetime import datetime
 
+from app.core.codec import json_codec
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+EVENT_BUS_MODES = ("streams", "pubsub", "both")
+OVERFLOW_POLICIES = ("drop_oldest", "block", "spill")
+
+# (通道, JSON消息)
+QueuedEvent = Tuple[str, str]
+
+
+class _SpillFile:
+    """
+    队列溢出时的磁盘暂存（JSON Lines 追加写）
+
+    回放时先将文件改名再读取，回放期间新溢出的事件写入新文件
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.pending = os.path.exists(path)
+
+    def append(self, events: List[QueuedEvent]):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for channel, message in events:
+                    f.write(json_codec.dumps_str([channel, message]))
+                    f.write("\n")
+            self.pending = True
+
+    def take(self) -> Optional[str]:
+        """取走当前暂存文件，返回改名后的路径，没有暂存时返回 None"""
+        with self._lock:
+            if not self.pending:
+                return None
+            self.pending = False
+            if not os.path.exists(self.path):
+                return None
+            replay_path = f"{self.path}.{int(time.time() * 1000)}.replay"
+            os.replace(self.path, replay_path)
+            return replay_path
+
+    def recover(self):
+        """上次进程退出时未回放完的文件并回暂存文件"""
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        if not os.path.isdir(directory):
+            return
+        with self._lock:
+            for name in sorted(os.listdir(directory)):
+                if name.startswith(prefix) and name.endswith(".replay"):
+                    replay_path = os.path.join(directory, name)
+                    with open(replay_path, "rb") as src, open(self.path, "ab") as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(replay_path)
+                    self.pending = True
+
+
 class EventPublisher:
-    """Redis事件发布器 - 用于发布设备事件到其他微服务"""
+    """
+    Redis事件发布器 - 用于发布设备事件到其他微服务
 
-    def __init__(self):
+    streams 模式下事件以 XADD 追加到与通道同名的 Redis Stream（字段 data 为JSON），
+    消费方通过消费组分担负载并在确认(XACK)前保留未处理事件，服务重启或消费过慢不会丢失；
+    流长度以 MAXLEN ~ 近似裁剪，避免无限增长
+
+    批量模式 (batched=True):
+    - publish_event 只把事件放入有界队列，MQTT 回调线程不再等待 Redis 往返
+    - 后台线程按 batch_size 条或 flush_interval 秒（先到者）取出事件，用一个 pipeline 发送
+    - 队列满时按 overflow 策略处理: drop_oldest 丢弃最早的事件 / block 阻塞调用方直到有空位
+      (最长 block_timeout 秒，超时丢弃新事件，反压到 MQTT 接收) / spill 写入磁盘文件，队列空闲后回放
+    - Redis 写入失败的批次放回队首重试（spill 策略下写入磁盘）
+    """
+
+    def __init__(
+        self,
+        mode: str = "streams",
+        maxlen: int = 100000,
+        batched: bool = False,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        overflow: str = "drop_oldest",
+        block_timeout: float = 1.0,
+        spill_path: Optional[str] = None,
+    ):
+        if mode not in EVENT_BUS_MODES:
+            raise ValueError(f"Unsupported EVENT_BUS_MODE: {mode}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported EVENT_PUBLISH_OVERFLOW: {overflow}")
         self.redis_client: Optional[redis.Redis] = None
         self.connected = False
+        self.mode = mode
+        self.maxlen = maxlen
+        self.batched = batched
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._queue: Deque[QueuedEvent] = deque()
+        self._condition = threading.Condition()
+        self._spill = _SpillFile(spill_path) if overflow == "spill" and spill_path else None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, float] = {
+            "enqueued": 0,
+            "published": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "blocked": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "flush_time_total": 0.0,
+            "flush_time_max": 0.0,
+            "queue_depth_max": 0,
+        }
 
     def connect(self):
         """连接到Redis"""
@@ -34,16 +152,51 @@ class EventPublisher:
         except Exception as e:
             self.connected = False
             logger.error(f"Failed to connect to Redis: {e}")
+        if self.batched and self.redis_client and not self._running:
+            if self._spill is not None:
+                try:
+                    self._spill.recover()
+                except OSError as e:
+                    logger.error(f"Failed to recover spilled events: {e}")
+            # 连接失败时也启动后台线程，事件先进入队列，Redis 恢复后发送
+            self._running = True
+            self._thread = threading.Thread(target=self._flush_loop, name="event-publisher", daemon=True)
+            self._thread.start()
 
-    def disconnect(self):
-        """断开Redis连接"""
+    def disconnect(self, timeout: float = 5.0):
+        """断开Redis连接，批量模式下先在 timeout 秒内发送队列中剩余的事件"""
+        if self._thread is not None:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+            if self._queue and self._spill is not None:
+                with self._condition:
+                    remaining = list(self._queue)
+                    self._queue.clear()
+                self._spill_events(remaining)
         if self.redis_client:
             self.redis_client.close()
             self.connected = False
             logger.info("Disconnected from Redis")
 
+    def _write(self, target, channel: str, message: str):
+        """按事件总线模式写入一条事件，target 为 Redis 客户端或 pipeline"""
+        if self.mode != "pubsub":
+            target.xadd(channel, {"data": message}, maxlen=self.maxlen, approximate=True)
+        if self.mode != "streams":
+            target.publish(channel, message)
+
     def publish_event(self, channel: str, event_data: Dict[str, Any]) -> bool:
-        """发布事件到指定通道"""
+        """发布事件到指定通道，批量模式下为放入发送队列，事件被丢弃时返回 False"""
+        if self.batched:
+            if not self._running:
+                logger.error("Event publisher not started, cannot publish event")
+                return False
+            event_data["timestamp"] = datetime.utcnow().isoformat()
+            return self._enqueue(channel, json_codec.dumps_str(event_data))
+
         if not self.connected or not self.redis_client:
             logger.error("Redis not connected, cannot publish event")
             return False
@@ -51,14 +204,147 @@ class EventPublisher:
         try:
             # 添加时间戳
             event_data["timestamp"] = datetime.utcnow().isoformat()
-            message = json.dumps(event_data, ensure_ascii=False)
-            self.redis_client.publish(channel, message)
+            message = json_codec.dumps_str(event_data)
+            self._write(self.redis_client, channel, message)
             logger.debug(f"Published event to {channel}: {message[:100]}...")
             return True
         except Exception as e:
             logger.error(f"Failed to publish event to {channel}: {e}")
             return False
 
+    def _enqueue(self, channel: str, message: str) -> bool:
+        with self._condition:
+            if len(self._queue) >= self.queue_size:
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.stats["dropped"] += 1
+                elif self.overflow == "block":
+                    self.stats["blocked"] += 1
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.queue_size and self._running:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats["dropped"] += 1
+                            return False
+                        self._condition.wait(remaining)
+                elif self._spill is not None:
+                    self._spill_events([(channel, message)])
+                    return True
+                else:
+                    self.stats["dropped"] += 1
+                    return False
+            self._queue.append((channel, message))
+            self.stats["enqueued"] += 1
+            depth = len(self._queue)
+            if depth > self.stats["queue_depth_max"]:
+                self.stats["queue_depth_max"] = depth
+            if depth >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def _spill_events(self, events: List[QueuedEvent]):
+        try:
+            self._spill.append(events)
+            self.stats["spilled"] += len(events)
+        except OSError as e:
+            self.stats["dropped"] += len(events)
+            logger.error(f"Failed to spill {len(events)} events to {self._spill.path}: {e}")
+
+    def _take_batch(self) -> List[QueuedEvent]:
+        """等待凑满一批或到达发送间隔，取出至多 batch_size 条事件"""
+        with self._condition:
+            if len(self._queue) < self.batch_size and self._running:
+                self._condition.wait(self.flush_interval)
+            count = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+            if batch:
+                # 唤醒 block 策略下等待空位的调用方
+                self._condition.notify_all()
+            return batch
+
+    def _flush(self, batch: List[QueuedEvent]):
+        started = time.perf_counter()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for channel, message in batch:
+            self._write(pipeline, channel, message)
+        pipeline.execute()
+        elapsed = time.perf_counter() - started
+        self.connected = True
+        self.stats["flushes"] += 1
+        self.stats["published"] += len(batch)
+        self.stats["flush_time_total"] += elapsed
+        self.stats["flush_time_max"] = max(self.stats["flush_time_max"], elapsed)
+
+    def _requeue(self, batch: List[QueuedEvent]):
+        """发送失败的批次放回队首，超出容量的部分按溢出策略处理"""
+        if self._spill is not None:
+            self._spill_events(batch)
+            return
+        with self._condition:
+            free = max(self.queue_size - len(self._queue), 0)
+            if free < len(batch):
+                # 保留较新的事件
+                self.stats["dropped"] += len(batch) - free
+                batch = batch[len(batch) - free:]
+            self._queue.extendleft(reversed(batch))
+
+    def _replay_spill(self):
+        """队列空闲时回放磁盘暂存的事件"""
+        path = self._spill.take() if self._spill is not None else None
+        if path is None:
+            return
+        with open(path, encoding="utf-8") as f:
+            events = (tuple(json_codec.loads(line)) for line in f if line.strip())
+            while True:
+                batch = list(itertools.islice(events, self.batch_size))
+                if not batch:
+                    break
+                try:
+                    self._flush(batch)
+                except Exception:
+                    # 未发送的部分写回暂存文件，稍后再回放
+                    self._spill.append(batch)
+                    while batch:
+                        batch = list(itertools.islice(events, self.batch_size))
+                        self._spill.append(batch)
+                    os.remove(path)
+                    raise
+                self.stats["replayed"] += len(batch)
+        os.remove(path)
+
+    def _flush_loop(self):
+        backoff = 0.1
+        while True:
+            batch = self._take_batch()
+            if not batch and not self._running:
+                break
+            try:
+                if batch:
+                    self._flush(batch)
+                elif self._spill is not None and self._spill.pending:
+                    self._replay_spill()
+                backoff = 0.1
+            except Exception as e:
+                self.connected = False
+                self.stats["flush_failures"] += 1
+                logger.error(f"Failed to flush {len(batch)} events to Redis: {e}")
+                if batch:
+                    self._requeue(batch)
+                if not self._running:
+                    break
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """批量发布统计：队列深度、发送批次及耗时、丢弃/暂存数"""
+        stats: Dict[str, Any] = {"batched": self.batched, "overflow": self.overflow}
+        stats.update({key: int(value) for key, value in self.stats.items() if not key.startswith("flush_time")})
+        flushes = self.stats["flushes"]
+        stats["queue_depth"] = len(self._queue)
+        stats["flush_ms_avg"] = round(self.stats["flush_time_total"] / flushes * 1000, 3) if flushes else 0.0
+        stats["flush_ms_max"] = round(self.stats["flush_time_max"] * 1000, 3)
+        return stats
+
     def publish_device_data(self, device_id: str, data_type: str, data: Dict[str, Any], quality: str = "good"):
         """发布设备数据事件"""
         event_data = {
@@ -115,4 +401,14 @@ class EventPublisher:
 
 
 # 全局事件发布器实例
-event_publisher = EventPublisher()
+event_publisher = EventPublisher(
+    mode=settings.EVENT_BUS_MODE,
+    maxlen=settings.EVENT_BUS_MAXLEN,
+    batched=settings.EVENT_PUBLISH_BATCHED,
+    queue_size=settings.EVENT_PUBLISH_QUEUE_SIZE,
+    batch_size=settings.EVENT_PUBLISH_BATCH_SIZE,
+    flush_interval=settings.EVENT_PUBLISH_FLUSH_INTERVAL,
+    overflow=settings.EVENT_PUBLISH_OVERFLOW,
+    block_timeout=settings.EVENT_PUBLISH_BLOCK_TIMEOUT,
+    spill_path=settings.EVENT_PUBLISH_SPILL_PATH,
+)
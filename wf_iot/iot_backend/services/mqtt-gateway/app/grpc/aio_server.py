@@ -0,0 +1,120 @@
+# 作用：grpc.aio 服务端运行支持
+# - AioServerThread 在独立线程的事件循环中运行 grpc.aio 服务端，不依赖 uvicorn 的事件循环实现(uvloop)，
+#   对外提供与 grpc.Server 相同的 stop(grace) 接口
+# - BlockingOffload 把同步 servicer 方法放到有界线程池执行，方法中的 context.abort 转换为 aio 的 abort
+
+import asyncio
+import logging
+import threading
+from concurrent import futures
+from typing import Any, Callable, Optional
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+
+class _Abort(Exception):
+    """线程池中调用 context.abort 时抛出，由事件循环一侧执行真正的 abort"""
+
+    def __init__(self, code: grpc.StatusCode, details: str):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+
+class _ThreadContext:
+    """传给线程池中同步方法的 context，abort 以异常返回事件循环，其余属性直接委托"""
+
+    def __init__(self, context: grpc.aio.ServicerContext):
+        self._context = context
+
+    def abort(self, code: grpc.StatusCode, details: str = ""):
+        raise _Abort(code, details)
+
+    def __getattr__(self, name: str):
+        return getattr(self._context, name)
+
+
+class BlockingOffload:
+    """在有界线程池中执行同步 servicer 方法（数据库、MQTT等阻塞调用）"""
+
+    def __init__(self, workers: int):
+        self.executor = futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grpc-blocking")
+
+    async def __call__(self, method: Callable, request: Any, context: grpc.aio.ServicerContext):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, method, request, _ThreadContext(context))
+        except _Abort as e:
+            await context.abort(e.code, e.details)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class AioServerThread:
+    """
+    在独立线程中运行的 grpc.aio 服务端
+
+    build 为协程函数，接收空的 grpc.aio.Server 注册 servicer 并绑定端口
+    """
+
+    def __init__(self, build: Callable, options: list, maximum_concurrent_rpcs: Optional[int] = None,
+                 offload: Optional[BlockingOffload] = None):
+        self._build = build
+        self._options = options
+        self._maximum_concurrent_rpcs = maximum_concurrent_rpcs
+        self._offload = offload
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[grpc.aio.Server] = None
+        self._started = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="grpc-aio-server", daemon=True)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._start())
+        except BaseException as e:
+            self._error = e
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _start(self):
+        self._server = grpc.aio.server(
+            options=self._options,
+            maximum_concurrent_rpcs=self._maximum_concurrent_rpcs,
+        )
+        await self._build(self._server)
+        await self._server.start()
+
+    async def _stop(self, grace: Optional[float]):
+        await self._server.stop(grace)
+
+    def start(self) -> "AioServerThread":
+        """启动服务端线程，等待端口绑定完成"""
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self, grace: Optional[float] = None):
+        """停止服务端，grace 秒内等待进行中的RPC完成"""
+        if self._loop is not None and self._server is not None and self._loop.is_running():
+            stopped = asyncio.run_coroutine_threadsafe(self._stop(grace), self._loop)
+            try:
+                stopped.result(timeout=(grace or 0) + 5)
+            except Exception as e:
+                logger.warning(f"gRPC aio server stop did not complete cleanly: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if self._offload is not None:
+            self._offload.shutdown()
@@ -1,24 +1,32 @@
 # MQTT Gateway gRPC服务端实现
 
+import asyncio
+import functools
 import grpc
-import json
 import uuid
 from concurrent import futures
 import sys
 import os
+from typing import Dict, Optional
 
 # 添加proto生成代码路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../../proto/generated'))
 
 from mqtt_gateway_pb2 import (
-    PublishResponse, BatchPublishResponse, SubscribeResponse, UnsubscribeResponse,
+    PublishResponse, BatchPublishResponse, PublishAck, SubscribeResponse, UnsubscribeResponse,
     SendCommandResponse, SendUpgradeResponse, ConnectionStatusResponse,
     DeviceOnlineStatusResponse, DeviceOnlineStatus
 )
 import mqtt_gateway_pb2_grpc
+from google.protobuf import json_format
 
 from app.mqtt.client import mqtt_client
+from app.events.broker import SubscriberLimitError, event_broker
+from app.core.codec import json_codec
 from app.core.config import settings
+from app.grpc.aio_server import AioServerThread, BlockingOffload
+
+SLOW_SUBSCRIBER_MESSAGE = "Event subscriber evicted: buffer overflowed"
 
 
 class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
@@ -27,7 +35,7 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
     def PublishMessage(self, request, context):
         """发布消息到MQTT主题"""
         topic = request.topic
-        payload = request.payload.decode('utf-8') if isinstance(request.payload, bytes) else str(request.payload)
+        payload = request.payload
         qos = request.qos
         retain = request.retain
 
@@ -47,7 +55,7 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
 
         for msg in request.messages:
             topic = msg.topic
-            payload = msg.payload.decode('utf-8') if isinstance(msg.payload, bytes) else str(msg.payload)
+            payload = msg.payload
             qos = msg.qos
             retain = msg.retain
 
@@ -66,6 +74,23 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
             error_message="" if failed_count == 0 else f"{failed_count} messages failed to publish"
         )
 
+    def publish_ack(self, request):
+        """发布流式请求中的一条消息，返回对应序号的确认"""
+        msg = request.message
+        payload = msg.payload
+        success, message_id = mqtt_client.publish(msg.topic, payload, msg.qos, msg.retain)
+        return PublishAck(
+            sequence=request.sequence,
+            success=success,
+            message_id=message_id if success else "",
+            error_message="" if success else message_id
+        )
+
+    def StreamPublish(self, request_iterator, context):
+        """流式发布，逐条发布并返回确认（线程池服务端，同一流内串行）"""
+        for request in request_iterator:
+            yield self.publish_ack(request)
+
     def SubscribeTopic(self, request, context):
         """订阅主题"""
         topic = request.topic
@@ -93,7 +118,8 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
         """发送设备命令"""
         device_id = request.device_id
         command_type = request.command_type
-        command_data = dict(request.command_data.fields) if request.command_data else {}
+        # Struct 的 fields 为 protobuf Value，需转换为普通 dict 才能编码
+        command_data = json_format.MessageToDict(request.command_data) if request.HasField("command_data") else {}
         timeout_seconds = request.timeout_seconds
         qos = request.qos if request.qos else 1
 
@@ -101,12 +127,12 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
         topic = f"device/{device_id}/command"
         command_id = str(uuid.uuid4())
 
-        payload = json.dumps({
+        payload = json_codec.dumps({
             "command_id": command_id,
             "command_type": command_type,
             "data": command_data,
             "timeout": timeout_seconds
-        }, ensure_ascii=False)
+        })
 
         success, error_msg = mqtt_client.publish(topic, payload, qos)
 
@@ -129,13 +155,13 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
         topic = f"device/{device_id}/firmware/upgrade"
         upgrade_id = str(uuid.uuid4())
 
-        payload = json.dumps({
+        payload = json_codec.dumps({
             "upgrade_id": upgrade_id,
             "version": firmware_version,
             "url": firmware_url,
             "hash": file_hash,
             "size": file_size
-        }, ensure_ascii=False)
+        })
 
         success, error_msg = mqtt_client.publish(topic, payload, qos)
 
@@ -154,7 +180,7 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
         return ConnectionStatusResponse(
             connected=mqtt_client.connected,
             broker_address=f"{settings.MQTT_BROKER_HOST}:{settings.MQTT_BROKER_PORT}",
-            client_id=settings.MQTT_CLIENT_ID,
+            client_id=mqtt_client.client_id,
             connected_since=connected_since,
             messages_published=mqtt_client.messages_published,
             messages_received=mqtt_client.messages_received,
@@ -180,12 +206,173 @@ class MqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
             error_message=""
         )
 
+    def SubscribeDeviceEvents(self, request, context):
+        """订阅设备事件（线程池服务端，每个订阅在流结束前占用一个服务端线程）"""
+        try:
+            subscription = event_broker.subscribe(
+                request.device_ids, request.topic_patterns, request.event_types, request.buffer_size
+            )
+        except SubscriberLimitError as e:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        try:
+            while context.is_active():
+                events = subscription.get(timeout=1.0)
+                if events is None:
+                    break
+                yield from events
+            if subscription.evicted:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, SLOW_SUBSCRIBER_MESSAGE)
+        finally:
+            event_broker.unsubscribe(subscription)
+
+
+class AsyncMqttGatewayServicer(mqtt_gateway_pb2_grpc.MqttGatewayServiceServicer):
+    """MqttGatewayServicer 的 grpc.aio 版本，MQTT发布/订阅在线程池执行，状态查询直接在事件循环中执行"""
+
+    def __init__(self, offload: BlockingOffload):
+        self._servicer = MqttGatewayServicer()
+        self._offload = offload
+
+    async def PublishMessage(self, request, context):
+        return await self._offload(self._servicer.PublishMessage, request, context)
+
+    async def BatchPublishMessage(self, request, context):
+        return await self._offload(self._servicer.BatchPublishMessage, request, context)
+
+    async def StreamPublish(self, request_iterator, context):
+        """
+        流式发布
+
+        读取请求并在线程池中并行发布，已读取但确认尚未写回客户端的消息不超过 STREAM_PUBLISH_WINDOW 条；
+        窗口占满时停止读取，客户端的写入由HTTP/2流控阻塞，消息不会在网关内堆积。
+        同一主题的消息按读取顺序依次发布（等待前一条发布完成），不同主题之间并行，
+        顺序下发的配置等不会在 broker 端乱序
+        """
+        window = asyncio.Semaphore(settings.STREAM_PUBLISH_WINDOW)
+        acks: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        pending = set()
+        # 主题 -> 该主题最后一条发布任务
+        tails: Dict[str, asyncio.Task] = {}
+
+        async def publish(request, previous: Optional[asyncio.Task]):
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                ack = await loop.run_in_executor(self._offload.executor, self._servicer.publish_ack, request)
+            except Exception as e:
+                ack = PublishAck(sequence=request.sequence, success=False, error_message=str(e))
+            await acks.put(ack)
+
+        def done(topic: str, task: asyncio.Task):
+            pending.discard(task)
+            if tails.get(topic) is task:
+                del tails[topic]
+
+        async def read():
+            try:
+                async for request in request_iterator:
+                    await window.acquire()
+                    topic = request.message.topic
+                    task = asyncio.create_task(publish(request, tails.get(topic)))
+                    tails[topic] = task
+                    pending.add(task)
+                    task.add_done_callback(functools.partial(done, topic))
+                if pending:
+                    await asyncio.wait(list(pending))
+                await acks.put(None)
+            except Exception as e:
+                # 读取请求失败（客户端取消等）时结束响应流
+                await acks.put(e)
+
+        reader = asyncio.create_task(read())
+        try:
+            while True:
+                ack = await acks.get()
+                if ack is None:
+                    break
+                if isinstance(ack, Exception):
+                    raise ack
+                yield ack
+                window.release()
+        finally:
+            reader.cancel()
+            for task in list(pending):
+                task.cancel()
+
+    async def SubscribeTopic(self, request, context):
+        return await self._offload(self._servicer.SubscribeTopic, request, context)
+
+    async def UnsubscribeTopic(self, request, context):
+        return await self._offload(self._servicer.UnsubscribeTopic, request, context)
+
+    async def SendDeviceCommand(self, request, context):
+        return await self._offload(self._servicer.SendDeviceCommand, request, context)
+
+    async def SendFirmwareUpgrade(self, request, context):
+        return await self._offload(self._servicer.SendFirmwareUpgrade, request, context)
+
+    async def GetConnectionStatus(self, request, context):
+        return self._servicer.GetConnectionStatus(request, context)
+
+    async def GetDeviceOnlineStatus(self, request, context):
+        return self._servicer.GetDeviceOnlineStatus(request, context)
+
+    async def SubscribeDeviceEvents(self, request, context):
+        """订阅设备事件，事件写出慢于产生时缓冲区被占满，订阅者被断开"""
+        try:
+            subscription = event_broker.subscribe(
+                request.device_ids, request.topic_patterns, request.event_types, request.buffer_size,
+                loop=asyncio.get_running_loop()
+            )
+        except SubscriberLimitError as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        try:
+            while True:
+                events = await subscription.get_async()
+                if events is None:
+                    break
+                for event in events:
+                    yield event
+            if subscription.evicted:
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, SLOW_SUBSCRIBER_MESSAGE)
+        finally:
+            event_broker.unsubscribe(subscription)
+
+
+# 允许客户端在空闲连接上按 keepalive 周期发送 ping（默认最小间隔为5分钟，更频繁会被断开）
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_recv_ping_interval_without_data_ms", settings.GRPC_MIN_PING_INTERVAL_MS),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
 
 def serve_grpc():
-    """启动gRPC服务"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    """启动gRPC服务，GRPC_SERVER_MODE 为 aio 时使用 grpc.aio 服务端"""
+    if settings.GRPC_SERVER_MODE == "aio":
+        return serve_grpc_aio()
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=settings.GRPC_BLOCKING_WORKERS),
+        options=SERVER_OPTIONS,
+        maximum_concurrent_rpcs=settings.GRPC_MAX_CONCURRENT_RPCS
+    )
     mqtt_gateway_pb2_grpc.add_MqttGatewayServiceServicer_to_server(MqttGatewayServicer(), server)
     server.add_insecure_port(f'[::]:{settings.GRPC_PORT}')
     server.start()
     print(f"MQTT Gateway gRPC服务启动在端口 {settings.GRPC_PORT}")
     return server
+
+
+def serve_grpc_aio(port: int = None) -> AioServerThread:
+    """在独立事件循环线程中启动 grpc.aio 服务，超过 GRPC_MAX_CONCURRENT_RPCS 的请求返回 RESOURCE_EXHAUSTED"""
+    offload = BlockingOffload(settings.GRPC_BLOCKING_WORKERS)
+    address = f'[::]:{settings.GRPC_PORT if port is None else port}'
+
+    async def build(server):
+        mqtt_gateway_pb2_grpc.add_MqttGatewayServiceServicer_to_server(AsyncMqttGatewayServicer(offload), server)
+        server.add_insecure_port(address)
+
+    runner = AioServerThread(build, SERVER_OPTIONS, settings.GRPC_MAX_CONCURRENT_RPCS, offload).start()
+    print(f"MQTT Gateway gRPC(aio)服务启动在 {address}")
+    return runner
@@ -7,6 +7,8 @@ from fastapi import FastAPI
 from app.core.config import settings
 from app.mqtt.client import mqtt_client
 from app.events.publisher import event_publisher
+from app.events.broker import event_broker
+from app.mqtt.dispatcher import mqtt_dispatcher
 from app.grpc.server import serve_grpc
 
 # 配置日志
@@ -38,6 +40,8 @@ async def lifespan(app: FastAPI):
 
     # 关闭时
     logger.info("Shutting down MQTT Gateway...")
+    # 先结束事件订阅流，避免 grace 期间一直等待长连接
+    event_broker.close_all()
     grpc_server.stop(grace=5)
     mqtt_client.stop()
     event_publisher.disconnect()
@@ -61,8 +65,11 @@ def health_check():
         "grpc_port": settings.GRPC_PORT,
         "mqtt_connected": mqtt_client.connected,
         "redis_connected": event_publisher.connected,
+        "event_publisher": event_publisher.get_stats(),
         "messages_published": mqtt_client.messages_published,
-        "messages_received": mqtt_client.messages_received
+        "messages_received": mqtt_client.messages_received,
+        "dispatcher": mqtt_dispatcher.get_stats(),
+        "event_stream": event_broker.get_stats()
     }
 
 
@@ -87,13 +94,15 @@ def get_status():
         "mqtt": {
             "connected": mqtt_client.connected,
             "broker": f"{settings.MQTT_BROKER_HOST}:{settings.MQTT_BROKER_PORT}",
-            "client_id": settings.MQTT_CLIENT_ID,
+            "client_id": mqtt_client.client_id,
+            "shared_group": settings.SHARED_GROUP if settings.SHARED_SUBSCRIPTION else None,
             "connected_since": connected_since,
             "messages_published": mqtt_client.messages_published,
             "messages_received": mqtt_client.messages_received
         },
         "redis": {
             "connected": event_publisher.connected,
-            "host": f"{settings.REDIS_HOST}:{settings.REDIS_PORT}"
+            "host": f"{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+            "event_bus_mode": event_publisher.mode
         }
     }
@@ -1,17 +1,31 @@
 # MQTT客户端服务
 
-import json
 import logging
 import uuid
 import paho.mqtt.client as mqtt
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 from datetime import datetime
 
+from app.core.codec import PayloadDecodeError, json_codec
 from app.core.config import settings
 from app.events.publisher import event_publisher
+from app.events.broker import event_broker
+from app.mqtt.dispatcher import mqtt_dispatcher
+from app.mqtt.payloads import CommandResponsePayload, FirmwareStatusPayload, StatusPayload, TelemetryPayload
+from app.mqtt.router import Route, TopicRouter
+from app.mqtt.subscriptions import build_client_id, create_client, subscription_plan
 
 logger = logging.getLogger(__name__)
 
+# 订阅的设备相关主题及 QoS
+DEVICE_TOPICS = [
+    ("device/+/data", 1),           # 设备数据上报
+    ("device/+/status", 1),         # 设备状态上报
+    ("device/+/command/response", 1),  # 命令响应
+    ("device/+/heartbeat", 0),      # 设备心跳
+    ("device/+/firmware/status", 1)  # 固件升级状态
+]
+
 
 class MQTTClient:
     """MQTT客户端 - 负责与MQTT Broker通信"""
@@ -20,54 +34,69 @@ class MQTTClient:
         self.client: Optional[mqtt.Client] = None
         self.connected = False
         self.connected_since: Optional[datetime] = None
+        self.client_id = build_client_id(settings.MQTT_CLIENT_ID, settings.MQTT_INSTANCE_ID)
         self.messages_published = 0
         self.messages_received = 0
         # 设备在线状态缓存
         self.device_online_status: Dict[str, Dict[str, Any]] = {}
-
-    def on_connect(self, client, userdata, flags, rc):
+        # 设备主题路由，路由名称为事件类型，处理函数调用方式为 handler(device_id, payload)，payload 为原始 bytes
+        self.router = TopicRouter()
+        self.router.add("device/{device_id}/data", self._handle_device_data, "device_data")
+        self.router.add("device/{device_id}/status", self._handle_device_status, "device_status")
+        self.router.add("device/{device_id}/heartbeat", self._handle_device_heartbeat, "device_heartbeat")
+        self.router.add("device/{device_id}/command/response", self._handle_command_response, "command_response")
+        self.router.add("device/{device_id}/firmware/status", self._handle_firmware_status, "firmware_status")
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         """连接回调"""
         if rc == 0:
             self.connected = True
             self.connected_since = datetime.utcnow()
-            logger.info("Connected to MQTT broker")
-
-            # 订阅设备相关主题
-            topics = [
-                ("device/+/data", 1),           # 设备数据上报
-                ("device/+/status", 1),         # 设备状态上报
-                ("device/+/command/response", 1),  # 命令响应
-                ("device/+/heartbeat", 0),      # 设备心跳
-                ("device/+/firmware/status", 1)  # 固件升级状态
-            ]
-            for topic, qos in topics:
+            logger.info(f"Connected to MQTT broker as {self.client_id}")
+
+            # 订阅设备相关主题（启用共享订阅时同组副本分摊消息）
+            for topic, qos in subscription_plan(
+                DEVICE_TOPICS,
+                settings.SHARED_SUBSCRIPTION,
+                settings.SHARED_GROUP,
+                settings.SHARED_GROUPS,
+            ):
                 client.subscribe(topic, qos)
                 logger.info(f"Subscribed to topic: {topic}")
         else:
             self.connected = False
             logger.error(f"Failed to connect to MQTT broker, return code: {rc}")
 
-    def on_disconnect(self, client, userdata, rc):
+    def on_disconnect(self, client, userdata, rc, properties=None):
         """断开连接回调"""
         self.connected = False
         logger.warning(f"Disconnected from MQTT broker, return code: {rc}")
 
+    def register_handler(self, pattern: str, handler, name: Optional[str] = None) -> Route:
+        """
+        注册设备消息处理函数（插件扩展入口），已有模式的处理函数会被替换
+
+        handler 的调用方式为 handler(device_id, *其余通配符参数, payload)，payload 为原始 bytes，模式需以 device/{device_id}/ 开头；
+        name 为推送给 SubscribeDeviceEvents 订阅者的事件类型，为空时不推送
+        """
+        return self.router.add(pattern, handler, name)
+
     def on_message(self, client, userdata, msg):
-        """消息接收回调"""
+        """消息接收回调，网络线程中只查找路由并按设备ID分发，处理在分发器的工作线程中执行"""
+        self.messages_received += 1
+        result = self.router.match(msg.topic)
+        if result is None:
+            logger.warning(f"No handler for topic: {msg.topic}")
+            return
+        route, params = result
+        mqtt_dispatcher.submit(params[0], self._process_message, msg.topic, route, params, msg.payload)
+
+    def _process_message(self, topic: str, route: Route, params: tuple, payload: bytes):
+        """处理一条设备消息（分发器工作线程）"""
         try:
-            self.messages_received += 1
-            topic = msg.topic
-            payload = msg.payload.decode("utf-8")
             logger.debug(f"Received message on topic: {topic}")
 
-            # 解析主题
-            topic_parts = topic.split("/")
-            if len(topic_parts) < 3:
-                logger.warning(f"Invalid topic format: {topic}")
-                return
-
-            device_id = topic_parts[1]
-            message_type = topic_parts[2]
+            device_id = params[0]
 
             # 更新设备在线状态
             self.device_online_status[device_id] = {
@@ -75,56 +104,48 @@ class MQTTClient:
                 "last_seen": datetime.utcnow().isoformat()
             }
 
-            # 处理不同类型的消息
-            if message_type == "data":
-                self._handle_device_data(device_id, payload)
-            elif message_type == "status":
-                self._handle_device_status(device_id, payload)
-            elif message_type == "heartbeat":
-                self._handle_device_heartbeat(device_id, payload)
-            elif message_type == "command" and len(topic_parts) > 3 and topic_parts[3] == "response":
-                self._handle_command_response(device_id, payload)
-            elif message_type == "firmware" and len(topic_parts) > 3 and topic_parts[3] == "status":
-                self._handle_firmware_status(device_id, payload)
-            else:
-                logger.warning(f"Unknown message type: {message_type}")
+            # 推送给 SubscribeDeviceEvents 订阅者（无订阅者时立即返回）
+            if route.name:
+                event_broker.dispatch(topic, device_id, route.name, payload)
+
+            route.handler(*params, payload)
 
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
 
-    def _handle_device_data(self, device_id: str, payload: str):
+    def _handle_device_data(self, device_id: str, payload: bytes):
         """处理设备数据上报 - 发布事件到Redis"""
         try:
-            data = json.loads(payload)
+            data = json_codec.decode(payload, TelemetryPayload)
             event_publisher.publish_device_data(
                 device_id=device_id,
-                data_type=data.get("type", "telemetry"),
-                data=data.get("data", {}),
-                quality=data.get("quality", "good")
+                data_type=data.type,
+                data=data.data,
+                quality=data.quality
             )
             logger.info(f"Published device data event for {device_id}")
-        except json.JSONDecodeError:
+        except PayloadDecodeError:
             logger.error(f"Invalid JSON in device data: {payload}")
         except Exception as e:
             logger.error(f"Error handling device data: {e}")
 
-    def _handle_device_status(self, device_id: str, payload: str):
+    def _handle_device_status(self, device_id: str, payload: bytes):
         """处理设备状态上报 - 发布事件到Redis"""
         try:
-            status_data = json.loads(payload)
-            status = status_data.get("status", "unknown")
+            status_data = json_codec.decode(payload, StatusPayload)
+            status = status_data.status
             event_publisher.publish_device_status(
                 device_id=device_id,
                 status=status,
-                extra_data=status_data
+                extra_data=status_data.model_dump()
             )
             logger.info(f"Published device status event for {device_id}: {status}")
-        except json.JSONDecodeError:
+        except PayloadDecodeError:
             logger.error(f"Invalid JSON in device status: {payload}")
         except Exception as e:
             logger.error(f"Error handling device status: {e}")
 
-    def _handle_device_heartbeat(self, device_id: str, payload: str):
+    def _handle_device_heartbeat(self, device_id: str, payload: bytes):
         """处理设备心跳 - 发布事件到Redis"""
         try:
             event_publisher.publish_device_heartbeat(device_id=device_id)
@@ -132,13 +153,13 @@ class MQTTClient:
         except Exception as e:
             logger.error(f"Error handling device heartbeat: {e}")
 
-    def _handle_command_response(self, device_id: str, payload: str):
+    def _handle_command_response(self, device_id: str, payload: bytes):
         """处理命令响应 - 发布事件到Redis"""
         try:
-            response_data = json.loads(payload)
-            command_id = response_data.get("command_id")
-            status = response_data.get("status", "acknowledged")
-            result = response_data.get("result")
+            response_data = json_codec.decode(payload, CommandResponsePayload)
+            command_id = response_data.command_id
+            status = response_data.status
+            result = response_data.result
 
             if command_id:
                 event_publisher.publish_command_response(
@@ -148,19 +169,19 @@ class MQTTClient:
                     result=result
                 )
                 logger.info(f"Published command response event for {device_id}, command: {command_id}")
-        except json.JSONDecodeError:
+        except PayloadDecodeError:
             logger.error(f"Invalid JSON in command response: {payload}")
         except Exception as e:
             logger.error(f"Error handling command response: {e}")
 
-    def _handle_firmware_status(self, device_id: str, payload: str):
+    def _handle_firmware_status(self, device_id: str, payload: bytes):
         """处理固件升级状态 - 发布事件到Redis"""
         try:
-            status_data = json.loads(payload)
-            task_id = status_data.get("task_id", "")
-            status = status_data.get("status", "unknown")
-            progress = status_data.get("progress", 0)
-            error = status_data.get("error")
+            status_data = json_codec.decode(payload, FirmwareStatusPayload)
+            task_id = status_data.task_id
+            status = status_data.status
+            progress = status_data.progress
+            error = status_data.error
 
             event_publisher.publish_firmware_status(
                 device_id=device_id,
@@ -170,7 +191,7 @@ class MQTTClient:
                 error=error
             )
             logger.info(f"Published firmware status event for {device_id}: {status}")
-        except json.JSONDecodeError:
+        except PayloadDecodeError:
             logger.error(f"Invalid JSON in firmware status: {payload}")
         except Exception as e:
             logger.error(f"Error handling firmware status: {e}")
@@ -178,10 +199,11 @@ class MQTTClient:
     def start(self):
         """启动MQTT客户端"""
         try:
-            self.client = mqtt.Client(client_id=settings.MQTT_CLIENT_ID)
+            self.client = create_client(self.client_id, settings.MQTT_PROTOCOL)
             self.client.on_connect = self.on_connect
             self.client.on_disconnect = self.on_disconnect
             self.client.on_message = self.on_message
+            mqtt_dispatcher.start()
 
             # 设置认证信息
             if settings.MQTT_USERNAME and settings.MQTT_PASSWORD:
@@ -202,10 +224,12 @@ class MQTTClient:
             self.client.loop_stop()
             self.client.disconnect()
             self.connected = False
+            # 网络循环停止后处理完已入队的消息
+            mqtt_dispatcher.stop(timeout=10)
             logger.info("MQTT client stopped")
 
-    def publish(self, topic: str, payload: str, qos: int = 1, retain: bool = False) -> tuple[bool, str]:
-        """发布消息"""
+    def publish(self, topic: str, payload: Union[str, bytes], qos: int = 1, retain: bool = False) -> tuple[bool, str]:
+        """发布消息，payload 为 bytes 时原样发送"""
         if not self.client or not self.connected:
             return False, "MQTT client not connected"
 
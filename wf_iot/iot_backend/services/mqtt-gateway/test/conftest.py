@@ -0,0 +1,16 @@
+"""
+mqtt-gateway 测试配置
+
+本服务与单体应用共用 app 包名，测试只在服务目录下运行时收集:
+    cd services/mqtt-gateway && python -m pytest test/ -v
+"""
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if os.path.abspath(os.getcwd()) == SERVICE_DIR:
+    sys.path.insert(0, SERVICE_DIR)
+else:
+    # 在其他目录（如 iot_backend 根目录）运行 pytest 时跳过，避免导入到单体应用的 app 包
+    collect_ignore_glob = ["unit/*"]
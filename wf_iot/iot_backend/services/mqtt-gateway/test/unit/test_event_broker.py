@@ -0,0 +1,155 @@
+"""
+设备事件分发单元测试
+测试 app/events/broker.py 中的 EventBroker 及 Subscription
+"""
+import asyncio
+import threading
+import pytest
+
+from app.events.broker import EventBroker, SubscriberLimitError
+
+
+class TestDispatchFiltering:
+    """按设备ID、主题过滤及事件类型匹配订阅者"""
+
+    @pytest.fixture
+    def broker(self):
+        return EventBroker(buffer_size=10)
+
+    def test_filters(self, broker):
+        """测试过滤 - 设备ID、主题通配符、事件类型均满足才投递"""
+        # 配置模拟
+        by_device = broker.subscribe(device_ids=["d1"])
+        by_topic = broker.subscribe(topic_patterns=["device/+/status"])
+        by_type = broker.subscribe(event_types=["device_heartbeat"])
+        everything = broker.subscribe()
+
+        # 执行测试
+        matched_data = broker.dispatch("device/d1/data", "d1", "device_data", b"1")
+        matched_status = broker.dispatch("device/d2/status", "d2", "device_status", b"2")
+        matched_heartbeat = broker.dispatch("device/d2/heartbeat", "d2", "device_heartbeat", b"3")
+
+        # 验证结果
+        assert (matched_data, matched_status, matched_heartbeat) == (2, 2, 2)
+        assert [event.payload for event in by_device.get(0)] == [b"1"]
+        assert [event.topic for event in by_topic.get(0)] == ["device/d2/status"]
+        assert [event.event_type for event in by_type.get(0)] == ["device_heartbeat"]
+        assert [event.device_id for event in everything.get(0)] == ["d1", "d2", "d2"]
+
+    def test_event_shared_between_subscribers(self, broker):
+        """测试事件只构造一次 - 所有匹配的订阅者收到同一个对象"""
+        first = broker.subscribe()
+        second = broker.subscribe(device_ids=["d1"])
+
+        broker.dispatch("device/d1/data", "d1", "device_data", b"{}")
+
+        assert first.get(0)[0] is second.get(0)[0]
+
+    def test_no_subscribers(self, broker):
+        """测试没有订阅者 - 直接返回，不计入分发统计"""
+        assert broker.dispatch("device/d1/data", "d1", "device_data", b"{}") == 0
+        assert broker.get_stats()["dispatched"] == 0
+
+
+class TestSlowConsumerEviction:
+    """缓冲区满的订阅者被驱逐，不影响其他订阅者"""
+
+    def test_evict_slow_subscriber(self):
+        """测试慢消费者驱逐 - 缓冲区满时断开并丢弃已缓冲事件，其他订阅者照常接收"""
+        # 配置模拟
+        broker = EventBroker(buffer_size=2)
+        slow = broker.subscribe()
+        fast = broker.subscribe(buffer_size=10)
+
+        # 执行测试
+        for i in range(3):
+            broker.dispatch("device/d1/data", "d1", "device_data", str(i).encode())
+
+        # 验证结果
+        assert slow.evicted and slow.closed
+        assert slow.get(0) is None
+        assert len(fast.get(0)) == 3
+        stats = broker.get_stats()
+        assert stats["evicted"] == 1
+        assert stats["active"] == 1
+
+    def test_buffer_size_capped(self):
+        """测试请求的缓冲区大小超过上限时截断"""
+        broker = EventBroker(buffer_size=10, max_buffer_size=50)
+
+        assert broker.subscribe(buffer_size=1000).buffer_size == 50
+        assert broker.subscribe().buffer_size == 10
+
+
+class TestUnsubscribeAccounting:
+    """订阅者计数与上限"""
+
+    def test_unsubscribe_multi_device_counted_once(self):
+        """测试多设备订阅 - 取消时只减少一次计数，重复取消无副作用"""
+        # 配置模拟
+        broker = EventBroker(max_subscribers=2)
+        subscription = broker.subscribe(device_ids=["d1", "d2"])
+        broker.subscribe()
+
+        # 执行测试
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(subscription)
+
+        # 验证结果
+        assert broker.get_stats()["active"] == 1
+        assert broker._by_device == {}
+        assert subscription.get(0) is None
+        broker.subscribe()
+        with pytest.raises(SubscriberLimitError):
+            broker.subscribe()
+
+    def test_close_all(self):
+        """测试关闭所有订阅 - 各订阅结束，计数归零"""
+        broker = EventBroker()
+        subscriptions = [broker.subscribe(device_ids=["d1"]), broker.subscribe()]
+
+        broker.close_all()
+
+        assert broker.get_stats()["active"] == 0
+        assert all(subscription.get(0) is None for subscription in subscriptions)
+
+
+class TestAsyncWakeup:
+    """绑定事件循环的订阅者由其他线程的写入唤醒"""
+
+    def test_get_async_woken_by_dispatch_thread(self):
+        """测试 get_async - 在等待时由 MQTT 线程写入唤醒，按写入顺序取出事件"""
+        broker = EventBroker()
+
+        async def scenario():
+            subscription = broker.subscribe(loop=asyncio.get_running_loop())
+            dispatcher = threading.Timer(0.05, lambda: [
+                broker.dispatch("device/d1/data", "d1", "device_data", payload) for payload in (b"1", b"2")
+            ])
+            dispatcher.start()
+            events = []
+            while len(events) < 2:
+                events.extend(await asyncio.wait_for(subscription.get_async(), timeout=2))
+            dispatcher.join()
+            return events, subscription
+
+        # 执行测试
+        events, subscription = asyncio.run(scenario())
+
+        # 验证结果
+        assert [event.payload for event in events] == [b"1", b"2"]
+        assert subscription.delivered == 2
+
+    def test_get_async_returns_none_when_closed(self):
+        """测试 get_async - 订阅在等待期间被取消时返回 None"""
+        broker = EventBroker()
+
+        async def scenario():
+            subscription = broker.subscribe(loop=asyncio.get_running_loop())
+            closer = threading.Timer(0.05, broker.unsubscribe, args=(subscription,))
+            closer.start()
+            result = await asyncio.wait_for(subscription.get_async(), timeout=2)
+            closer.join()
+            return result
+
+        assert asyncio.run(scenario()) is None
@@ -0,0 +1,237 @@
+"""
+事件发布器单元测试
+测试 app/events/publisher.py 中 EventPublisher 批量模式的溢出策略、失败重试及磁盘暂存回放
+"""
+import json
+import os
+import threading
+import pytest
+
+from app.events.publisher import EventPublisher, _SpillFile
+
+
+class FakePipeline:
+    """Redis pipeline 替身，execute 时把命令提交给 FakeRedis"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def xadd(self, channel, fields, maxlen=None, approximate=False):
+        self.commands.append((channel, fields["data"]))
+
+    def publish(self, channel, message):
+        self.commands.append((channel, message))
+
+    def execute(self):
+        self.redis.execute(self.commands)
+
+
+class FakeRedis:
+    """Redis 替身，fail_after 次提交成功后的提交均抛出异常（None 表示始终成功）"""
+
+    def __init__(self):
+        self.published = []
+        self.executions = 0
+        self.fail_after = None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def execute(self, commands):
+        if self.fail_after is not None and self.executions >= self.fail_after:
+            raise ConnectionError("redis down")
+        self.executions += 1
+        self.published.extend(commands)
+
+
+def make_publisher(overflow="drop_oldest", spill_path=None, **kwargs) -> EventPublisher:
+    """创建未启动后台线程的批量发布器，直接调用内部方法测试"""
+    options = {"queue_size": 2, "batch_size": 2, "flush_interval": 0.01, "block_timeout": 0.05, **kwargs}
+    publisher = EventPublisher(batched=True, overflow=overflow, spill_path=spill_path, **options)
+    publisher.redis_client = FakeRedis()
+    publisher._running = True
+    return publisher
+
+
+def spilled_messages(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)[1] for line in f if line.strip()]
+
+
+class TestOverflowPolicies:
+    """队列满时的三种溢出策略"""
+
+    def test_drop_oldest(self):
+        """测试 drop_oldest - 丢弃最早的事件，新事件入队"""
+        # 配置模拟
+        publisher = make_publisher("drop_oldest")
+
+        # 执行测试
+        results = [publisher._enqueue("c", message) for message in ("m1", "m2", "m3")]
+
+        # 验证结果
+        assert results == [True, True, True]
+        assert list(publisher._queue) == [("c", "m2"), ("c", "m3")]
+        assert publisher.stats["dropped"] == 1
+
+    def test_block_timeout_drops_new_event(self):
+        """测试 block - 超时仍无空位时丢弃新事件并返回 False"""
+        # 配置模拟
+        publisher = make_publisher("block")
+        publisher._enqueue("c", "m1")
+        publisher._enqueue("c", "m2")
+
+        # 执行测试
+        result = publisher._enqueue("c", "m3")
+
+        # 验证结果
+        assert result is False
+        assert list(publisher._queue) == [("c", "m1"), ("c", "m2")]
+        assert publisher.stats["blocked"] == 1
+        assert publisher.stats["dropped"] == 1
+
+    def test_block_waits_for_space(self):
+        """测试 block - 后台线程取走一批后被唤醒，新事件入队"""
+        # 配置模拟
+        publisher = make_publisher("block", block_timeout=5.0)
+        publisher._enqueue("c", "m1")
+        publisher._enqueue("c", "m2")
+        taker = threading.Timer(0.05, publisher._take_batch)
+
+        # 执行测试
+        taker.start()
+        result = publisher._enqueue("c", "m3")
+        taker.join()
+
+        # 验证结果
+        assert result is True
+        assert list(publisher._queue) == [("c", "m3")]
+        assert publisher.stats["dropped"] == 0
+
+    def test_spill(self, tmp_path):
+        """测试 spill - 溢出的事件写入磁盘暂存文件"""
+        # 配置模拟
+        path = str(tmp_path / "spill" / "events.jsonl")
+        publisher = make_publisher("spill", spill_path=path)
+
+        # 执行测试
+        results = [publisher._enqueue("c", message) for message in ("m1", "m2", "m3")]
+
+        # 验证结果
+        assert results == [True, True, True]
+        assert list(publisher._queue) == [("c", "m1"), ("c", "m2")]
+        assert spilled_messages(path) == ["m3"]
+        assert publisher.stats["spilled"] == 1
+        assert publisher._spill.pending is True
+
+
+class TestRequeue:
+    """发送失败的批次重试"""
+
+    def test_failed_flush_requeued_in_order(self):
+        """测试发送失败 - 批次放回队首，顺序不变，下一次发送成功"""
+        # 配置模拟
+        publisher = make_publisher(queue_size=10, batch_size=2)
+        for message in ("m1", "m2", "m3"):
+            publisher._enqueue("c", message)
+        publisher.redis_client.fail_after = 0
+        batch = publisher._take_batch()
+
+        # 执行测试
+        with pytest.raises(ConnectionError):
+            publisher._flush(batch)
+        publisher._requeue(batch)
+        publisher.redis_client.fail_after = None
+        publisher._flush(publisher._take_batch())
+
+        # 验证结果
+        assert list(publisher._queue) == [("c", "m3")]
+        assert publisher.redis_client.published == [("c", "m1"), ("c", "m2")]
+
+    def test_requeue_keeps_newest_when_full(self):
+        """测试放回时队列已满 - 保留较新的事件，超出部分计入丢弃"""
+        # 配置模拟
+        publisher = make_publisher(queue_size=3)
+        publisher._enqueue("c", "m3")
+        publisher._enqueue("c", "m4")
+
+        # 执行测试
+        publisher._requeue([("c", "m1"), ("c", "m2")])
+
+        # 验证结果
+        assert list(publisher._queue) == [("c", "m2"), ("c", "m3"), ("c", "m4")]
+        assert publisher.stats["dropped"] == 1
+
+    def test_requeue_spills_when_spill_enabled(self, tmp_path):
+        """测试 spill 策略下发送失败 - 批次写入磁盘暂存，不占用队列"""
+        path = str(tmp_path / "events.jsonl")
+        publisher = make_publisher("spill", spill_path=path)
+
+        publisher._requeue([("c", "m1"), ("c", "m2")])
+
+        assert spilled_messages(path) == ["m1", "m2"]
+        assert not publisher._queue
+
+
+class TestSpillReplay:
+    """磁盘暂存的回放与恢复"""
+
+    def test_spill_then_replay(self, tmp_path):
+        """测试回放 - 按写入顺序分批发送，完成后删除回放文件"""
+        # 配置模拟
+        path = str(tmp_path / "events.jsonl")
+        publisher = make_publisher("spill", spill_path=path)
+        publisher._spill_events([("c", f"m{i}") for i in range(5)])
+
+        # 执行测试
+        publisher._replay_spill()
+
+        # 验证结果
+        assert [message for _, message in publisher.redis_client.published] == [f"m{i}" for i in range(5)]
+        assert publisher.redis_client.executions == 3
+        assert publisher.stats["replayed"] == 5
+        assert os.listdir(tmp_path) == []
+        assert publisher._spill.pending is False
+
+    def test_partial_replay_failure(self, tmp_path):
+        """测试回放中途失败 - 已发送的批次不重复，未发送的部分写回暂存文件"""
+        # 配置模拟
+        path = str(tmp_path / "events.jsonl")
+        publisher = make_publisher("spill", spill_path=path)
+        publisher._spill_events([("c", f"m{i}") for i in range(5)])
+        publisher.redis_client.fail_after = 1
+
+        # 执行测试
+        with pytest.raises(ConnectionError):
+            publisher._replay_spill()
+
+        # 验证结果
+        assert [message for _, message in publisher.redis_client.published] == ["m0", "m1"]
+        assert os.listdir(tmp_path) == ["events.jsonl"]
+        assert spilled_messages(path) == ["m2", "m3", "m4"]
+        assert publisher._spill.pending is True
+
+        publisher.redis_client.fail_after = None
+        publisher._replay_spill()
+        assert [message for _, message in publisher.redis_client.published] == [f"m{i}" for i in range(5)]
+
+    def test_recover_leftover_replay_files(self, tmp_path):
+        """测试重启恢复 - 上次未回放完的 .replay 文件按取走顺序追加到暂存文件，下次空闲时回放"""
+        # 配置模拟
+        path = str(tmp_path / "events.jsonl")
+        spill = _SpillFile(path)
+        spill.append([("c", "m1"), ("c", "m2")])
+        first = spill.take()
+        spill.append([("c", "m3")])
+        os.replace(path, first.replace(".replay", "1.replay"))
+        spill.append([("c", "m4")])
+
+        # 执行测试
+        publisher = make_publisher("spill", spill_path=path)
+        publisher._spill.recover()
+        publisher._replay_spill()
+
+        # 验证结果
+        assert os.listdir(tmp_path) == []
+        assert [message for _, message in publisher.redis_client.published] == ["m4", "m1", "m2", "m3"]
@@ -0,0 +1,86 @@
+"""
+流式发布单元测试
+测试 app/grpc/server.py 中 AsyncMqttGatewayServicer.StreamPublish 的按主题顺序发布
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from app.grpc.aio_server import BlockingOffload
+from app.grpc.server import AsyncMqttGatewayServicer
+from mqtt_gateway_pb2 import PublishAck, PublishMessageRequest, StreamPublishRequest
+
+
+def stream_request(sequence: int, topic: str) -> StreamPublishRequest:
+    return StreamPublishRequest(sequence=sequence, message=PublishMessageRequest(topic=topic, payload=b"{}", qos=1))
+
+
+async def requests(items):
+    for item in items:
+        yield item
+
+
+class TestStreamPublishOrdering:
+    """同一主题串行、不同主题并行"""
+
+    @pytest.fixture
+    def servicer(self):
+        offload = BlockingOffload(8)
+        yield AsyncMqttGatewayServicer(offload)
+        offload.shutdown()
+
+    def test_same_topic_published_in_order(self, servicer):
+        """测试同一主题 - 先读到的消息即使发布更慢也先完成，不同主题的消息不必等待"""
+        # 配置模拟
+        published = []
+        lock = threading.Lock()
+        # 第一条配置发布最慢，若并行发布会被后两条超过
+        delays = {1: 0.2, 2: 0.05, 3: 0.0, 4: 0.0}
+
+        def publish_ack(request):
+            time.sleep(delays[request.sequence])
+            with lock:
+                published.append((request.message.topic, request.sequence))
+            return PublishAck(sequence=request.sequence, success=True)
+
+        items = [
+            stream_request(1, "device/d1/config"),
+            stream_request(2, "device/d1/config"),
+            stream_request(3, "device/d1/config"),
+            stream_request(4, "device/d2/config"),
+        ]
+
+        async def scenario():
+            return [ack.sequence async for ack in servicer.StreamPublish(requests(items), None)]
+
+        # 执行测试
+        with patch.object(servicer._servicer, "publish_ack", side_effect=publish_ack):
+            acks = asyncio.run(scenario())
+
+        # 验证结果
+        assert sorted(acks) == [1, 2, 3, 4]
+        assert [seq for topic, seq in published if topic == "device/d1/config"] == [1, 2, 3]
+        assert published[0] == ("device/d2/config", 4)
+
+    def test_failed_publish_does_not_block_topic(self, servicer):
+        """测试发布异常 - 返回失败确认，同一主题的后续消息继续发布"""
+        # 配置模拟
+        def publish_ack(request):
+            if request.sequence == 1:
+                raise RuntimeError("broker down")
+            return PublishAck(sequence=request.sequence, success=True)
+
+        items = [stream_request(1, "device/d1/config"), stream_request(2, "device/d1/config")]
+
+        async def scenario():
+            return [ack async for ack in servicer.StreamPublish(requests(items), None)]
+
+        # 执行测试
+        with patch.object(servicer._servicer, "publish_ack", side_effect=publish_ack):
+            acks = asyncio.run(scenario())
+
+        # 验证结果
+        assert [(ack.sequence, ack.success) for ack in acks] == [(1, False), (2, True)]
+        assert acks[0].error_message == "broker down"
@@ -4,10 +4,12 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.main import app
 from app.core.config import settings
-from app.db.session import SessionLocal, get_db
+from app.db.session import SessionLocal, get_db, get_read_db
+from app.db.async_session import get_async_db
 from app.db.base import Base
 from app.crud.user import user_crud
 from app.schemas.user import UserCreate
@@ -24,6 +26,18 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+class FixtureBoundSession(Session):
+    """绑定到测试连接的同步会话，供 async 端点的 AsyncSession 使用
+
+    AsyncSession 在 greenlet 中调用同步会话，sqlite 驱动本身是同步的，
+    因此可以直接复用 db fixture 的连接：async 端点能看到 fixture 写入但未提交的数据，
+    提交只结束保存点，测试结束时随外层事务一起回滚。
+    """
+
+    def __init__(self, bind=None, binds=None, connection=None, **kw):
+        super().__init__(bind=connection, **kw)
+
+
 @pytest.fixture(scope="session")
 def db_engine():
     """创建测试数据库引擎"""
@@ -57,7 +71,19 @@ def client(db: Session) -> TestClient:
         finally:
             pass
     
+    async def override_get_async_db():
+        # 与同步会话共用同一个连接及事务
+        async with AsyncSession(
+            sync_session_class=FixtureBoundSession,
+            connection=db.get_bind(),
+            autoflush=False,
+            expire_on_commit=False,
+        ) as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -0,0 +1,197 @@
+"""
+负载编解码单元测试
+测试 app/core/codec.py 中的 JSON 编解码后端及 MQTTService 直接处理 bytes 负载
+"""
+import sys
+import pytest
+from unittest.mock import patch
+
+from app.core import codec
+from app.core.config import Settings
+from app.core.codec import JsonCodec, PayloadDecodeError, available_codecs, get_codec, register_codec
+from app.schemas.payload import CommandResponsePayload, StatusPayload, TelemetryPayload
+from app.services.mqtt_service import MQTTService
+
+
+@pytest.fixture(params=available_codecs())
+def json_codec(request):
+    """逐个测试已安装的后端"""
+    return get_codec(request.param)
+
+
+@pytest.fixture
+def stdlib_json_codec(monkeypatch):
+    """固定 PAYLOAD_JSON_CODEC=json，与未安装 orjson/msgspec 的部署环境一致"""
+    monkeypatch.setenv("PAYLOAD_JSON_CODEC", "json")
+    json_codec = get_codec(Settings().PAYLOAD_JSON_CODEC)
+    monkeypatch.setattr(sys.modules[MQTTService.__module__], "json_codec", json_codec)
+    return json_codec
+
+
+class TestJsonCodec:
+    """各 JSON 后端的行为一致"""
+
+    def test_loads_bytes_and_str(self, json_codec):
+        """测试解码 - bytes/str/memoryview 结果一致"""
+        raw = '{"temperature": 21.5, "名称": "传感器"}'.encode("utf-8")
+
+        assert json_codec.loads(raw) == {"temperature": 21.5, "名称": "传感器"}
+        assert json_codec.loads(raw.decode("utf-8")) == json_codec.loads(raw)
+        assert json_codec.loads(memoryview(raw)) == json_codec.loads(raw)
+
+    def test_dumps_compact_utf8(self, json_codec):
+        """测试编码 - 紧凑格式，非 ASCII 字符不转义"""
+        # 执行测试
+        encoded = json_codec.dumps({"command": "重启", "delay": 5})
+
+        # 验证结果
+        assert isinstance(encoded, bytes)
+        assert encoded == '{"command":"重启","delay":5}'.encode("utf-8")
+        assert json_codec.dumps_str({"a": [1, None]}) == '{"a":[1,null]}'
+
+    def test_loads_invalid(self, json_codec):
+        """测试解码失败 - 统一抛出 PayloadDecodeError"""
+        with pytest.raises(PayloadDecodeError):
+            json_codec.loads(b"{bad")
+        with pytest.raises(ValueError):
+            json_codec.loads(b"")
+
+    def test_decode_typed(self, json_codec):
+        """测试带类型解码 - 缺省字段使用模型默认值"""
+        # 执行测试
+        telemetry = json_codec.decode(b'{"data": {"temperature": 21.5}}', TelemetryPayload)
+        response = json_codec.decode(b'{"command_id": "c1", "result": [1, 2]}', CommandResponsePayload)
+
+        # 验证结果
+        assert telemetry.type == "telemetry"
+        assert telemetry.data == {"temperature": 21.5}
+        assert telemetry.quality == "good"
+        assert response.command_id == "c1"
+        assert response.status == "acknowledged"
+        assert response.result == [1, 2]
+
+    def test_decode_int_command_id(self, json_codec):
+        """测试带类型解码 - 命令ID为整数或字符串均可"""
+        assert json_codec.decode(b'{"command_id": 42}', CommandResponsePayload).command_id == 42
+        assert json_codec.decode(b'{"command_id": "c1"}', CommandResponsePayload).command_id == "c1"
+
+    def test_decode_keeps_extra_fields(self, json_codec):
+        """测试带类型解码 - 状态负载保留设备附带的其他字段"""
+        status = json_codec.decode(b'{"status": "online", "rssi": -40}', StatusPayload)
+
+        assert status.status == "online"
+        assert status.model_dump() == {"status": "online", "rssi": -40}
+
+    def test_decode_invalid(self, json_codec):
+        """测试带类型解码失败 - 非法 JSON 及类型不符均抛出 PayloadDecodeError"""
+        with pytest.raises(PayloadDecodeError):
+            json_codec.decode(b"not json", TelemetryPayload)
+        with pytest.raises(PayloadDecodeError):
+            json_codec.decode(b'{"data": [1, 2]}', TelemetryPayload)
+
+
+class TestCodecRegistry:
+    """后端选择与注册"""
+
+    def test_get_codec_auto(self):
+        """测试自动选择 - 使用第一个已安装的后端"""
+        assert get_codec("auto").name == available_codecs()[0]
+        assert available_codecs()[-1] == "json"
+
+    def test_get_codec_json(self, stdlib_json_codec):
+        """测试指定标准库后端"""
+        assert type(stdlib_json_codec) is JsonCodec
+        assert type(get_codec("json")) is JsonCodec
+
+    def test_get_codec_auto_fallback(self):
+        """测试自动选择 - 未安装 orjson/msgspec 时回退到标准库后端"""
+        with patch.dict(codec._codecs, clear=True):
+            codec._codecs["json"] = JsonCodec
+
+            assert available_codecs() == ["json"]
+            assert type(get_codec("auto")) is JsonCodec
+
+    def test_get_codec_unknown(self):
+        """测试未知后端 - 抛出 ValueError"""
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+    def test_register_codec(self):
+        """测试注册自定义后端"""
+        # 配置模拟
+        class CustomCodec(JsonCodec):
+            name = "custom"
+
+        # 执行测试
+        with patch.dict(codec._codecs):
+            register_codec("custom", CustomCodec)
+
+            # 验证结果
+            assert "custom" in available_codecs()
+            assert get_codec("custom").loads(b"[1]") == [1]
+        assert "custom" not in available_codecs()
+
+
+@pytest.mark.usefixtures("stdlib_json_codec")
+class TestMQTTPayloadHandling:
+    """MQTTService 处理函数直接解码 bytes 负载（标准库后端）"""
+
+    @pytest.fixture
+    def pipeline(self):
+        with patch("app.services.mqtt_service.telemetry_pipeline") as pipeline:
+            yield pipeline
+
+    def test_device_data_bytes(self, pipeline):
+        """测试数据上报 - bytes 负载解码后提交到写入管道"""
+        # 配置模拟
+        service = MQTTService()
+
+        # 执行测试
+        service._handle_device_data("device001", b'{"type": "sensor", "data": {"temperature": 21.5}}')
+
+        # 验证结果
+        pipeline.submit.assert_called_once_with(
+            device_id="device001",
+            data_type="sensor",
+            data={"temperature": 21.5},
+            quality="good",
+        )
+
+    def test_device_data_invalid(self, pipeline):
+        """测试数据上报 - 非法负载被丢弃"""
+        service = MQTTService()
+
+        service._handle_device_data("device001", b"\xff\xfe")
+        service._handle_device_data("device001", b'{"data": "text"}')
+
+        pipeline.submit.assert_not_called()
+
+    def test_command_response_bytes(self):
+        """测试命令响应 - 按模型字段更新命令状态"""
+        # 配置模拟
+        service = MQTTService()
+
+        # 执行测试
+        with patch("app.services.mqtt_service.SessionLocal") as session_local, \
+                patch("app.services.mqtt_service.device_command_crud") as command_crud:
+            service._handle_command_response("device001", b'{"command_id": "c1", "status": "completed", "result": {"ok": true}}')
+
+        # 验证结果
+        command_crud.update_status.assert_called_once_with(
+            session_local.return_value, "c1", "completed", {"result": {"ok": True}}
+        )
+
+    def test_command_response_int_command_id(self):
+        """测试命令响应 - 设备回传整数命令ID"""
+        # 配置模拟
+        service = MQTTService()
+
+        # 执行测试
+        with patch("app.services.mqtt_service.SessionLocal") as session_local, \
+                patch("app.services.mqtt_service.device_command_crud") as command_crud:
+            service._handle_command_response("device001", b'{"command_id": 42, "status": "completed"}')
+
+        # 验证结果
+        command_crud.update_status.assert_called_once_with(
+            session_local.return_value, 42, "completed", {"result": None}
+        )
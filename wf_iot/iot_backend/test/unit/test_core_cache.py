@@ -0,0 +1,161 @@
+"""
+设备标识缓存模块单元测试
+测试 app/core/cache.py 中的 DeviceIdCache 及 LocalTTLCache 类
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.cache import DeviceIdCache, LocalTTLCache
+from app.core.config import settings
+from app.core.payload_formats import payload_format_cache
+
+
+class TestDeviceIdCache:
+    """DeviceIdCache 类的单元测试"""
+
+    @pytest.fixture
+    def cache(self):
+        """创建小容量的本地缓存"""
+        return DeviceIdCache(maxsize=2, ttl=60)
+
+    def test_get_miss(self, cache):
+        """测试未命中"""
+        assert cache.get("device001") is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_set_and_get_hit(self, cache):
+        """测试写入后命中"""
+        cache.set("device001", 1)
+
+        assert cache.get("device001") == 1
+        assert cache.get_stats()["hits"] == 1
+
+    def test_lru_eviction(self, cache):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache.set("device001", 1)
+        cache.set("device002", 2)
+        cache.get("device001")  # device001 变为最近使用
+        cache.set("device003", 3)
+
+        assert cache.get("device002") is None
+        assert cache.get("device001") == 1
+        assert cache.get("device003") == 3
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiration(self, cache):
+        """测试条目过期"""
+        with patch("app.core.cache.time.monotonic", return_value=1000.0):
+            cache.set("device001", 1)
+        with patch("app.core.cache.time.monotonic", return_value=1061.0):
+            assert cache.get("device001") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_invalidate(self, cache):
+        """测试主动失效"""
+        cache.set("device001", 1)
+        cache.invalidate("device001")
+
+        assert cache.get("device001") is None
+        assert cache.get_stats()["invalidations"] == 1
+
+    def test_get_many_returns_hits_only(self, cache):
+        """测试批量查询只返回命中条目"""
+        cache.set("device001", 1)
+
+        assert cache.get_many(["device001", "device002"]) == {"device001": 1}
+
+    def test_redis_disabled_by_default(self, cache):
+        """测试默认不启用Redis二级缓存"""
+        assert cache.get_stats()["redis_enabled"] is False
+
+
+class TestDeviceIdCacheRedisTier:
+    """Redis 二级缓存的批量访问"""
+
+    @pytest.fixture
+    def cache(self):
+        """创建带模拟 Redis 二级缓存的缓存"""
+        cache = DeviceIdCache(maxsize=100, ttl=60)
+        cache._redis = MagicMock()
+        return cache
+
+    def test_get_many_single_mget(self, cache):
+        """测试批量查询 - 一级缓存未命中的部分以一次 MGET 查询"""
+        # 配置模拟
+        cache._set_local("device001", 1)
+        cache._redis.mget.return_value = ["2", None]
+
+        # 执行测试
+        result = cache.get_many(["device001", "device002", "device003"])
+
+        # 验证结果
+        assert result == {"device001": 1, "device002": 2}
+        cache._redis.mget.assert_called_once_with(["device_pk:device002", "device_pk:device003"])
+        cache._redis.get.assert_not_called()
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["redis_hits"], stats["misses"]) == (1, 1, 1)
+        assert cache.get("device002") == 2
+
+    def test_get_many_redis_failure(self, cache):
+        """测试 Redis 不可用 - 只返回一级缓存命中的条目"""
+        cache._set_local("device001", 1)
+        cache._redis.mget.side_effect = Exception("redis down")
+
+        assert cache.get_many(["device001", "device002"]) == {"device001": 1}
+
+    def test_set_many_pipelined(self, cache):
+        """测试批量写入 - 以一次 pipeline 写入并设置过期时间"""
+        # 配置模拟
+        pipe = cache._redis.pipeline.return_value
+
+        # 执行测试
+        cache.set_many({"device001": 1, "device002": 2})
+
+        # 验证结果
+        cache._redis.pipeline.assert_called_once_with(transaction=False)
+        assert pipe.set.call_count == 2
+        pipe.set.assert_any_call("device_pk:device002", 2, ex=60)
+        pipe.execute.assert_called_once()
+        cache._redis.set.assert_not_called()
+        assert cache.get_many(["device001", "device002"]) == {"device001": 1, "device002": 2}
+
+
+class TestLocalTTLCache:
+    """LocalTTLCache 类的单元测试"""
+
+    @pytest.fixture
+    def cache(self):
+        """创建小容量的进程内缓存"""
+        return LocalTTLCache(maxsize=2, ttl=60)
+
+    def test_string_values_and_lru_eviction(self, cache):
+        """测试保存任意类型的值 - 超出容量时淘汰最久未使用的条目"""
+        # 执行测试
+        cache.set("device001", "cbor")
+        cache.set("device002", "protobuf")
+        cache.get("device001")
+        cache.set("device003", "msgpack")
+
+        # 验证结果
+        assert cache.get("device001") == "cbor"
+        assert cache.get("device002") is None
+        assert cache.get("device003") == "msgpack"
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiration_and_invalidate(self, cache):
+        """测试过期及失效"""
+        with patch("app.core.cache.time.monotonic", return_value=1000.0):
+            cache.set("device001", "cbor")
+            cache.set("device002", "cbor")
+        with patch("app.core.cache.time.monotonic", return_value=1061.0):
+            assert cache.get("device001") is None
+        cache.invalidate("device002")
+
+        assert cache.get("device002") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_payload_format_cache_uses_own_settings(self):
+        """测试设备负载格式缓存 - 使用独立的容量配置"""
+        assert isinstance(payload_format_cache, LocalTTLCache)
+        assert payload_format_cache.maxsize == settings.PAYLOAD_FORMAT_CACHE_MAXSIZE
+        assert payload_format_cache.ttl == settings.PAYLOAD_FORMAT_CACHE_TTL
@@ -0,0 +1,108 @@
+"""
+游标分页模块单元测试
+测试 app/core/pagination.py 中的游标编解码及 keyset 分页
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app.core.pagination import (
+    InvalidCursorError,
+    approximate_count,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+)
+from app.db.models.device import DeviceData
+
+
+class TestCursorCodec:
+    """游标编解码的单元测试"""
+
+    def test_round_trip(self):
+        """测试包含时间的排序键编解码"""
+        values = [datetime(2024, 1, 1, 12, 30, 15, 500), 12345]
+
+        assert decode_cursor(encode_cursor(values), 2) == values
+
+    def test_cursor_is_url_safe(self):
+        """测试游标可直接作为查询参数"""
+        cursor = encode_cursor(["a/b+c", 1])
+
+        assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "", "e30"])
+    def test_invalid_cursor(self, cursor):
+        """测试无法解析的游标"""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, 2)
+
+    def test_key_size_mismatch(self):
+        """测试排序键个数不匹配"""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(encode_cursor([1]), 2)
+
+
+class TestKeysetPaginate:
+    """keyset 分页的单元测试"""
+
+    @pytest.fixture
+    def columns(self):
+        return [(DeviceData.timestamp, True), (DeviceData.id, True)]
+
+    def _rows(self, count):
+        return [MagicMock(timestamp=datetime(2024, 1, 1, 0, i), id=i) for i in range(count, 0, -1)]
+
+    def test_has_next_page(self, columns):
+        """测试多取一行判断是否有下一页，游标指向本页最后一行"""
+        # 配置模拟
+        query = MagicMock()
+        query.order_by.return_value.limit.return_value.all.return_value = self._rows(4)
+
+        # 执行测试
+        rows, next_cursor = keyset_paginate(query, columns, None, 3)
+
+        # 验证结果
+        query.order_by.return_value.limit.assert_called_once_with(4)
+        assert len(rows) == 3
+        assert decode_cursor(next_cursor, 2) == [rows[-1].timestamp, rows[-1].id]
+        query.filter.assert_not_called()
+
+    def test_last_page(self, columns):
+        """测试最后一页不返回游标"""
+        query = MagicMock()
+        query.order_by.return_value.limit.return_value.all.return_value = self._rows(2)
+
+        rows, next_cursor = keyset_paginate(query, columns, None, 3)
+
+        assert len(rows) == 2
+        assert next_cursor is None
+
+    def test_cursor_applies_filter(self, columns):
+        """测试传入游标时追加 keyset 条件"""
+        query = MagicMock()
+        query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = []
+        cursor = encode_cursor([datetime(2024, 1, 1), 10])
+
+        rows, next_cursor = keyset_paginate(query, columns, cursor, 3)
+
+        condition = str(query.filter.call_args.args[0])
+        assert "device_data.timestamp <" in condition
+        assert "device_data.id <" in condition
+        assert rows == [] and next_cursor is None
+
+
+class TestApproximateCount:
+    """近似计数的单元测试"""
+
+    def test_fallback_to_exact_count(self):
+        """测试非MySQL数据库回退为精确计数"""
+        # 配置模拟
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "sqlite"
+        query = MagicMock()
+        query.order_by.return_value.count.return_value = 42
+
+        # 执行测试与验证结果
+        assert approximate_count(db, query) == 42
+        db.execute.assert_not_called()
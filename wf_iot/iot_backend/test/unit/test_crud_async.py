@@ -0,0 +1,247 @@
+"""
+异步CRUD单元测试
+测试 app/crud/async_device.py、async_firmware.py、async_user.py，使用内存 aiosqlite 数据库
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import device_id_cache
+from app.crud.async_device import async_device_crud, async_device_data_crud, async_device_command_crud
+from app.crud.async_firmware import async_firmware_crud, async_firmware_upgrade_task_crud
+from app.crud.async_user import async_user_crud
+from app.crud.device import device_crud, device_data_crud
+from app.db.async_session import get_async_db
+from app.db.models.device import DeviceData
+from app.main import app
+from app.db.base import Base
+from app.schemas.device import DeviceCreate, DeviceDataCreate, DeviceCommandCreate
+from app.schemas.firmware import FirmwareCreate, FirmwareUpgradeTaskCreate
+from app.schemas.user import UserCreate
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncCRUD:
+    """异步CRUD的单元测试"""
+
+    @pytest.fixture
+    def session_factory(self):
+        """创建内存 aiosqlite 数据库及会话工厂"""
+        device_id_cache.clear()
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+        async def setup():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        run(setup())
+        yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        run(engine.dispose())
+        device_id_cache.clear()
+
+    def test_device_create_and_resolve(self, session_factory):
+        """测试创建设备并按设备标识解析主键"""
+        async def scenario():
+            async with session_factory() as db:
+                device = await async_device_crud.create(db, DeviceCreate(
+                    device_id="device001", device_name="Test Device", product_id="product001"
+                ))
+                pk = await async_device_crud.resolve_id(db, "device001")
+                missing = await async_device_crud.resolve_id(db, "unknown")
+                return device, pk, missing
+
+        # 执行测试
+        device, pk, missing = run(scenario())
+
+        # 验证结果
+        assert device.id == pk
+        assert missing is None
+        assert device_id_cache.get("device001") == pk
+
+    @patch("app.crud.async_device.settings")
+    def test_device_data_create_many(self, mock_settings, session_factory):
+        """测试批量写入设备数据并按时间倒序读取"""
+        # 配置模拟
+        mock_settings.ROLLUP_ENABLED = False
+
+        async def scenario():
+            async with session_factory() as db:
+                device = await async_device_crud.create(db, DeviceCreate(
+                    device_id="device001", device_name="Test Device", product_id="product001"
+                ))
+                count = await async_device_data_crud.create_many(db, [
+                    {"device_id": "device001", "data": {"temperature": 20}},
+                    {"device_id": "device001", "data": {"temperature": 21}},
+                    {"device_id": "unknown", "data": {"temperature": 22}},
+                ])
+                single = await async_device_data_crud.create(db, DeviceDataCreate(
+                    device_id="device001", data={"temperature": 23}
+                ))
+                rows = await async_device_data_crud.get_device_data(db, device.id)
+                return count, single, rows
+
+        # 执行测试
+        count, single, rows = run(scenario())
+
+        # 验证结果
+        assert count == 2
+        assert single is not None
+        assert len(rows) == 3
+
+    def test_device_data_reads_archive(self, session_factory):
+        """测试读取设备数据 - 原始数据不足一页时从归档中接续，与同步CRUD一致"""
+        async def scenario():
+            async with session_factory() as db:
+                device = await async_device_crud.create(db, DeviceCreate(
+                    device_id="device001", device_name="Test Device", product_id="product001"
+                ))
+                start = datetime(2024, 1, 1)
+                db.add_all([
+                    DeviceData(device_id=device.id, timestamp=start + timedelta(hours=hour), data={"seq": hour})
+                    for hour in range(0, 48, 12)
+                ])
+                await db.commit()
+                await db.run_sync(lambda session: device_data_crud.archive_before(session, datetime(2024, 1, 2)))
+                rows = await async_device_data_crud.get_device_data(db, device.id)
+                latest = await async_device_data_crud.get_latest_data(db, device.id)
+                return rows, latest
+
+        # 执行测试
+        rows, latest = run(scenario())
+
+        # 验证结果
+        assert [row.data["seq"] for row in rows] == [36, 24, 12, 0]
+        assert latest.data["seq"] == 36
+
+    def test_redis_cache_offloaded(self, session_factory):
+        """测试设备缓存带 Redis 二级缓存 - 缓存访问在线程池中执行"""
+        # 配置模拟
+        calls = []
+
+        async def offload(func, *args):
+            calls.append(func.__name__)
+            return func(*args)
+
+        async def scenario():
+            async with session_factory() as db:
+                await async_device_crud.create(db, DeviceCreate(
+                    device_id="device001", device_name="Test Device", product_id="product001"
+                ))
+                pk = await async_device_crud.resolve_id(db, "device001")
+                id_map = await async_device_crud.resolve_ids(db, ["device001"])
+                return pk, id_map
+
+        # 执行测试
+        with patch("app.crud.async_device.run_in_threadpool", side_effect=offload), \
+                patch.object(type(device_id_cache), "redis_enabled", True):
+            pk, id_map = run(scenario())
+
+        # 验证结果
+        assert id_map == {"device001": pk}
+        assert calls == ["invalidate", "get", "set", "get_many"]
+
+    def test_command_status_and_batch_status(self, session_factory):
+        """测试命令状态更新与批量设备状态更新"""
+        async def scenario():
+            async with session_factory() as db:
+                device = await async_device_crud.create(db, DeviceCreate(
+                    device_id="device001", device_name="Test Device", product_id="product001"
+                ))
+                command = await async_device_command_crud.create(db, DeviceCommandCreate(
+                    device_id=device.id, command_type="control", command_data={"switch": "on"}
+                ))
+                pending = await async_device_command_crud.get_pending_commands(db, "device001")
+                sent = await async_device_command_crud.update_status(db, command.id, "sent")
+                updated = await async_device_crud.batch_update_status(db, ["device001"], "online")
+                refreshed = await async_device_crud.get_by_device_id(db, "device001")
+                await db.refresh(refreshed)
+                return pending, sent, updated, refreshed
+
+        # 执行测试
+        pending, sent, updated, device = run(scenario())
+
+        # 验证结果
+        assert len(pending) == 1
+        assert sent.status == "sent" and sent.sent_at is not None
+        assert updated == 1
+        assert device.status == "online" and device.last_online_at is not None
+
+    def test_firmware_upgrade_task(self, session_factory):
+        """测试创建固件及升级任务并更新状态"""
+        async def scenario():
+            async with session_factory() as db:
+                device = await async_device_crud.create(db, DeviceCreate(
+                    device_id="device001", device_name="Test Device", product_id="product001"
+                ))
+                firmware = await async_firmware_crud.create(db, FirmwareCreate(
+                    version="1.0.0", product_id="product001", file_url="http://example.com/fw.bin"
+                ), file_name="fw.bin", file_size=10)
+                found = await async_firmware_crud.get_by_version_and_product(db, "1.0.0", "product001")
+                task = await async_firmware_upgrade_task_crud.create(db, FirmwareUpgradeTaskCreate(
+                    device_id=device.id, firmware_id=firmware.id
+                ))
+                await async_firmware_upgrade_task_crud.update_celery_task_id(db, task.id, "celery-1")
+                failed = await async_firmware_upgrade_task_crud.update_status(db, task.id, "failed", error_message="boom")
+                return firmware, found, failed
+
+        # 执行测试
+        firmware, found, task = run(scenario())
+
+        # 验证结果
+        assert found.id == firmware.id
+        assert task.celery_task_id == "celery-1"
+        assert task.status == "failed"
+        assert task.error_message == "boom"
+        assert task.end_time is not None
+
+    def test_user_create_and_authenticate(self, session_factory):
+        """测试创建用户并验证密码"""
+        async def scenario():
+            async with session_factory() as db:
+                await async_user_crud.create(db, UserCreate(
+                    username="testuser", email="test@example.com", password="testpassword123"
+                ))
+                ok = await async_user_crud.authenticate(db, "testuser", "testpassword123")
+                wrong = await async_user_crud.authenticate(db, "testuser", "wrongpassword")
+                return ok, wrong
+
+        # 执行测试
+        ok, wrong = run(scenario())
+
+        # 验证结果
+        assert ok is not None and ok.username == "testuser"
+        assert wrong is None
+
+
+class TestAsyncDbOverride:
+    """conftest 中 async 端点的数据库依赖覆盖"""
+
+    def test_async_session_sees_fixture_data(self, client, db):
+        """测试 async 会话与同步 fixture 共用连接 - 能读到未提交的 fixture 数据，写入随测试回滚"""
+        # 配置模拟
+        device_id_cache.clear()
+        device = device_crud.create(db, obj_in=DeviceCreate(
+            device_id="device001", device_name="Test Device", product_id="product001"
+        ))
+        override = app.dependency_overrides[get_async_db]
+
+        async def scenario():
+            async for async_db in override():
+                found = await async_device_crud.get_by_device_id(async_db, device_id="device001")
+                created = await async_device_crud.create(async_db, DeviceCreate(
+                    device_id="device002", device_name="Async Device", product_id="product001"
+                ))
+                return found, created
+
+        # 执行测试
+        found, created = run(scenario())
+
+        # 验证结果
+        assert found is not None and found.id == device.id
+        assert device_crud.get_by_device_id(db, device_id="device002").id == created.id
+        device_id_cache.clear()
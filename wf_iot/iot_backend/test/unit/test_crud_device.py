@@ -7,11 +7,19 @@ from unittest.mock import MagicMock, patch
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
+from app.core.cache import device_id_cache
 from app.crud.device import CRUDDevice, CRUDDeviceData, CRUDDeviceCommand
 from app.db.models.device import Device, DeviceData, DeviceCommand
 from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceDataCreate, DeviceCommandCreate
 
 
+@pytest.fixture(autouse=True)
+def clear_device_id_cache():
+    """每个测试前清空设备标识缓存，避免测试间相互影响"""
+    device_id_cache.clear()
+    yield
+
+
 class TestCRUDDevice:
     """CRUDDevice 类的单元测试"""
 
@@ -83,6 +91,44 @@ class TestCRUDDevice:
         assert result == mock_device
         assert result.device_id == "device001"
 
+    def test_resolve_id_uses_cache(self, crud_device, mock_db):
+        """测试解析设备主键 - 第二次命中缓存不再查询数据库"""
+        # 配置模拟
+        mock_db.query.return_value.filter.return_value.first.return_value = (1,)
+
+        # 执行测试
+        first = crud_device.resolve_id(mock_db, "device001")
+        second = crud_device.resolve_id(mock_db, "device001")
+
+        # 验证结果
+        assert first == second == 1
+        mock_db.query.assert_called_once()
+
+    def test_resolve_id_not_found(self, crud_device, mock_db):
+        """测试解析设备主键 - 设备不存在时不缓存"""
+        # 配置模拟
+        mock_db.query.return_value.filter.return_value.first.return_value = None
+
+        # 执行测试
+        result = crud_device.resolve_id(mock_db, "missing")
+
+        # 验证结果
+        assert result is None
+        assert device_id_cache.get("missing") is None
+
+    def test_resolve_ids_queries_only_misses(self, crud_device, mock_db):
+        """测试批量解析设备主键 - 只查询缓存未命中的设备"""
+        # 配置模拟
+        device_id_cache.set("device001", 1)
+        mock_db.query.return_value.filter.return_value.all.return_value = [("device002", 2)]
+
+        # 执行测试
+        result = crud_device.resolve_ids(mock_db, ["device001", "device002", "missing"])
+
+        # 验证结果
+        assert result == {"device001": 1, "device002": 2}
+        mock_db.query.assert_called_once()
+
     def test_get_multi_devices_no_owner(self, crud_device, mock_db, mock_device):
         """测试获取设备列表 - 无所有者过滤"""
         # 配置模拟
@@ -162,6 +208,18 @@ class TestCRUDDevice:
         mock_db.delete.assert_called_once_with(mock_device)
         mock_db.commit.assert_called_once()
 
+    def test_delete_device_invalidates_cache(self, crud_device, mock_db, mock_device):
+        """测试删除设备 - 同时使设备标识缓存失效"""
+        # 配置模拟
+        device_id_cache.set("device001", 1)
+        mock_db.query.return_value.get.return_value = mock_device
+
+        # 执行测试
+        crud_device.delete(mock_db, id=1)
+
+        # 验证结果
+        assert device_id_cache.get("device001") is None
+
     def test_delete_device_not_found(self, crud_device, mock_db):
         """测试删除设备 - 未找到"""
         # 配置模拟
@@ -283,7 +341,7 @@ class TestCRUDDeviceData:
     def test_create_device_data_success(self, mock_device_crud, crud_device_data, mock_db, mock_device, device_data_create):
         """测试创建设备数据 - 成功"""
         # 配置模拟
-        mock_device_crud.get_by_device_id.return_value = mock_device
+        mock_device_crud.resolve_id.return_value = mock_device.id
         mock_db.add = MagicMock()
         mock_db.commit = MagicMock()
         mock_db.refresh = MagicMock()
@@ -299,7 +357,7 @@ class TestCRUDDeviceData:
     def test_create_device_data_device_not_found(self, mock_device_crud, crud_device_data, mock_db, device_data_create):
         """测试创建设备数据 - 设备未找到"""
         # 配置模拟
-        mock_device_crud.get_by_device_id.return_value = None
+        mock_device_crud.resolve_id.return_value = None
 
         # 执行测试
         result = crud_device_data.create(mock_db, obj_in=device_data_create)
@@ -346,6 +404,36 @@ class TestCRUDDeviceData:
         assert len(result) == 1
 
 
+    @patch('app.crud.device.device_rollup_crud')
+    def test_create_many_bulk_insert(self, mock_rollup_crud, crud_device_data, mock_db):
+        """测试批量写入设备数据 - 单条INSERT且跳过未注册设备"""
+        # 配置模拟
+        mock_db.query.return_value.filter.return_value.all.return_value = [("device001", 1)]
+        records = [
+            {"device_id": "device001", "data": {"temperature": 25.5}},
+            {"device_id": "device001", "data": {"temperature": 26.0}, "data_type": "event"},
+            {"device_id": "unknown", "data": {"temperature": 10.0}},
+        ]
+
+        # 执行测试
+        result = crud_device_data.create_many(mock_db, records)
+
+        # 验证结果
+        assert result == 2
+        mock_db.execute.assert_called_once()
+        mock_db.commit.assert_called_once()
+        # 同一事务内增量更新聚合
+        rows = mock_rollup_crud.accumulate.call_args.args[1]
+        assert [row["device_id"] for row in rows] == [1, 1]
+
+    def test_create_many_empty(self, crud_device_data, mock_db):
+        """测试批量写入设备数据 - 空批次"""
+        result = crud_device_data.create_many(mock_db, [])
+
+        assert result == 0
+        mock_db.query.assert_not_called()
+        mock_db.execute.assert_not_called()
+
 class TestCRUDDeviceCommand:
     """CRUDDeviceCommand 类的单元测试"""
 
@@ -391,7 +479,7 @@ class TestCRUDDeviceCommand:
     def test_create_command_success(self, mock_device_crud, crud_device_command, mock_db, mock_device, command_create_data):
         """测试创建设备命令 - 成功"""
         # 配置模拟
-        mock_device_crud.get_by_device_id.return_value = mock_device
+        mock_device_crud.resolve_id.return_value = mock_device.id
         mock_db.add = MagicMock()
         mock_db.commit = MagicMock()
         mock_db.refresh = MagicMock()
@@ -407,7 +495,7 @@ class TestCRUDDeviceCommand:
     def test_create_command_device_not_found(self, mock_device_crud, crud_device_command, mock_db, command_create_data):
         """测试创建设备命令 - 设备未找到"""
         # 配置模拟
-        mock_device_crud.get_by_device_id.return_value = None
+        mock_device_crud.resolve_id.return_value = None
 
         # 执行测试
         result = crud_device_command.create(mock_db, obj_in=command_create_data, created_by=1)
@@ -466,7 +554,7 @@ class TestCRUDDeviceCommand:
     def test_get_pending_commands(self, mock_device_crud, crud_device_command, mock_db, mock_device, mock_command):
         """测试获取待处理命令列表"""
         # 配置模拟
-        mock_device_crud.get_by_device_id.return_value = mock_device
+        mock_device_crud.resolve_id.return_value = mock_device.id
         mock_commands = [mock_command, mock_command]
         mock_db.query.return_value.filter.return_value.all.return_value = mock_commands
 
@@ -480,7 +568,7 @@ class TestCRUDDeviceCommand:
     def test_get_pending_commands_device_not_found(self, mock_device_crud, crud_device_command, mock_db):
         """测试获取待处理命令列表 - 设备未找到"""
         # 配置模拟
-        mock_device_crud.get_by_device_id.return_value = None
+        mock_device_crud.resolve_id.return_value = None
 
         # 执行测试
         result = crud_device_command.get_pending_commands(mock_db, device_id="nonexistent")
@@ -0,0 +1,154 @@
+"""
+设备数据聚合CRUD模块单元测试
+测试 app/crud/rollup.py 中的 CRUDDeviceRollup 类及分辨率选择
+"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import device_id_cache
+from app.crud.device import device_crud, device_data_crud
+from app.crud.rollup import CRUDDeviceRollup, bucket_start, choose_resolution
+from app.db.base import Base, import_models
+from app.db.models.device import Device, DeviceData, DeviceDataRollup
+from app.schemas.device import DeviceCreate
+
+
+class TestRollupHelpers:
+    """分桶与分辨率选择的单元测试"""
+
+    def test_bucket_start(self):
+        """测试各分辨率的桶起始时间"""
+        ts = datetime(2024, 1, 1, 12, 34, 56, 789)
+
+        assert bucket_start(ts, "1m") == datetime(2024, 1, 1, 12, 34)
+        assert bucket_start(ts, "1h") == datetime(2024, 1, 1, 12)
+        assert bucket_start(ts, "1d") == datetime(2024, 1, 1)
+
+    def test_bucket_start_invalid(self):
+        """测试不支持的分辨率"""
+        with pytest.raises(ValueError):
+            bucket_start(datetime(2024, 1, 1), "5m")
+
+    @patch("app.crud.rollup.settings")
+    def test_choose_finest_within_budget(self, mock_settings):
+        """测试选择桶数不超过预算的最细分辨率"""
+        mock_settings.ROLLUP_1M_RETENTION_DAYS = 0
+        mock_settings.ROLLUP_1H_RETENTION_DAYS = 0
+        now = datetime(2024, 2, 1)
+
+        assert choose_resolution(now - timedelta(hours=6), now, 1000, now) == "1m"
+        assert choose_resolution(now - timedelta(days=30), now, 1000, now) == "1h"
+        assert choose_resolution(now - timedelta(days=365), now, 1000, now) == "1d"
+
+    @patch("app.crud.rollup.settings")
+    def test_choose_respects_retention(self, mock_settings):
+        """测试查询起点超出保留期时跳过该分辨率"""
+        mock_settings.ROLLUP_1M_RETENTION_DAYS = 7
+        mock_settings.ROLLUP_1H_RETENTION_DAYS = 0
+        now = datetime(2024, 2, 1)
+        start = now - timedelta(days=10)
+
+        assert choose_resolution(start, start + timedelta(hours=1), 1000, now) == "1h"
+
+
+class TestCRUDDeviceRollup:
+    """CRUDDeviceRollup 类的单元测试"""
+
+    @pytest.fixture
+    def crud_rollup(self):
+        """创建 CRUDDeviceRollup 实例"""
+        return CRUDDeviceRollup()
+
+    def test_aggregate(self, crud_rollup):
+        """测试批次内预聚合 count/sum/min/max/last"""
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        rows = [
+            {"device_id": 1, "timestamp": start + timedelta(seconds=30), "data": {"temperature": 20}},
+            {"device_id": 1, "timestamp": start, "data": {"temperature": 25.5, "door": True, "mode": "auto"}},
+            {"device_id": 1, "timestamp": start + timedelta(seconds=10), "data": {"temperature": 22.0}},
+        ]
+
+        # 执行测试
+        deltas = crud_rollup.aggregate(rows)
+
+        # 验证结果：仅数值指标，每个分辨率一个桶
+        assert len(deltas) == 3
+        minute = next(delta for delta in deltas if delta["resolution"] == "1m")
+        assert minute["metric"] == "temperature"
+        assert minute["bucket_start"] == start
+        assert minute["sample_count"] == 3
+        assert minute["value_sum"] == 67.5
+        assert minute["value_min"] == 20.0
+        assert minute["value_max"] == 25.5
+        assert minute["value_last"] == 20.0
+
+    def test_accumulate_upsert_single_statement(self, crud_rollup):
+        """测试支持原生 upsert 的数据库以单条语句合并且不提交事务"""
+        # 配置模拟
+        mock_db = MagicMock()
+        mock_db.get_bind.return_value.dialect.name = "mysql"
+        rows = [{"device_id": 1, "timestamp": datetime(2024, 1, 1), "data": {"a": 1, "b": 2}}]
+
+        # 执行测试
+        result = crud_rollup.accumulate(mock_db, rows)
+
+        # 验证结果
+        assert result == 6
+        mock_db.execute.assert_called_once()
+        mock_db.commit.assert_not_called()
+
+    def test_accumulate_empty(self, crud_rollup):
+        """测试没有数值指标时不访问数据库"""
+        mock_db = MagicMock()
+
+        assert crud_rollup.accumulate(mock_db, [{"device_id": 1, "timestamp": datetime(2024, 1, 1), "data": {"s": "x"}}]) == 0
+        mock_db.execute.assert_not_called()
+
+    def test_get_series_invalid_resolution(self, crud_rollup):
+        """测试查询不支持的分辨率"""
+        with pytest.raises(ValueError):
+            crud_rollup.get_series(MagicMock(), 1, datetime(2024, 1, 1), datetime(2024, 1, 2), resolution="5m")
+
+
+class TestRollupDeviceDelete:
+    """设备删除时聚合数据随之删除，使用开启外键约束的内存 SQLite 数据库"""
+
+    @pytest.fixture
+    def db(self):
+        """创建开启外键约束的内存数据库"""
+        import_models()
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        event.listen(engine, "connect", lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        device_id_cache.clear()
+        yield session
+        session.close()
+        engine.dispose()
+        device_id_cache.clear()
+
+    @patch("app.crud.device.settings")
+    def test_delete_device_with_rollups(self, mock_settings, db):
+        """测试删除已上报数据的设备 - 原始数据与聚合数据一并删除，不违反外键约束"""
+        # 配置模拟
+        mock_settings.ROLLUP_ENABLED = True
+        device = device_crud.create(db, DeviceCreate(
+            device_id="device001", device_name="Test Device", product_id="product001"
+        ))
+        device_data_crud.create_many(db, [
+            {"device_id": "device001", "data": {"temperature": 20}},
+            {"device_id": "device001", "data": {"temperature": 21}},
+        ])
+        assert db.query(DeviceDataRollup).count() == 3
+
+        # 执行测试
+        device_crud.delete(db, device.id)
+
+        # 验证结果
+        assert db.query(Device).count() == 0
+        assert db.query(DeviceData).count() == 0
+        assert db.query(DeviceDataRollup).count() == 0
@@ -0,0 +1,125 @@
+"""
+数据库连接池监控单元测试
+测试 app/db/pool.py 中的 InstrumentedQueuePool、instrument_engine 及 pool_options
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine, exc, text
+
+from app.db.pool import InstrumentedQueuePool, instrument_engine, pool_options
+
+
+class TestDatabasePool:
+    """连接池配置及统计的单元测试"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        """创建单连接、不允许溢出的 SQLite 文件库 engine"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        yield engine
+        engine.dispose()
+
+    def test_pool_options(self):
+        """测试根据配置生成连接池参数"""
+        # 配置模拟
+        settings = MagicMock(
+            DB_POOL_SIZE=5, DB_MAX_OVERFLOW=2, DB_POOL_TIMEOUT=3.0,
+            DB_POOL_RECYCLE=100, DB_POOL_PRE_PING="always", DB_POOL_USE_LIFO=True
+        )
+
+        # 执行测试
+        options = pool_options(settings)
+
+        # 验证结果
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["pool_size"] == 5
+        assert options["max_overflow"] == 2
+        assert options["pool_pre_ping"] is True
+        assert options["pool_use_lifo"] is True
+
+    def test_pool_options_invalid_strategy(self):
+        """测试不支持的连接检测策略"""
+        settings = MagicMock(DB_POOL_PRE_PING="sometimes")
+
+        with pytest.raises(ValueError):
+            pool_options(settings)
+
+    def test_checkout_metrics(self, engine):
+        """测试签出次数及使用中连接数统计"""
+        metrics = instrument_engine(engine, "test_checkout")
+
+        # 执行测试
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            in_use = metrics.get_stats()["in_use"]
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        # 验证结果
+        stats = metrics.get_stats()
+        assert in_use == 1
+        assert stats["in_use"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["connects"] == 1
+        assert stats["pool_size"] == 1
+
+    def test_timeout_counted(self, engine):
+        """测试连接耗尽时的签出超时统计"""
+        metrics = instrument_engine(engine, "test_timeout")
+
+        # 执行测试
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        # 验证结果
+        stats = metrics.get_stats()
+        assert stats["timeouts"] == 1
+        assert stats["wait_ms_max"] >= 40
+
+    def test_metrics_survive_dispose(self, engine):
+        """测试 dispose 重建连接池后统计对象保留"""
+        metrics = instrument_engine(engine, "test_dispose")
+
+        # 执行测试
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        # 验证结果
+        assert engine.pool.metrics is metrics
+        assert metrics.get_stats()["checkouts"] == 1
+
+    @patch("app.db.pool.time.monotonic")
+    def test_idle_ping(self, mock_monotonic, engine):
+        """测试 idle 策略只对空闲过久的连接执行 ping，ping 失败时重建连接"""
+        # 配置模拟
+        mock_monotonic.return_value = 1000.0
+        metrics = instrument_engine(engine, "test_idle", pre_ping="idle", idle_threshold=30.0)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        # 执行测试：空闲时间未超过阈值，不执行 ping
+        mock_monotonic.return_value = 1010.0
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        pings_before = metrics.get_stats()["pings"]
+
+        # 空闲超过阈值且 ping 失败，连接被丢弃并重新建立
+        mock_monotonic.return_value = 2000.0
+        with patch.object(engine.dialect, "do_ping", side_effect=Exception("gone away")):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        # 验证结果
+        stats = metrics.get_stats()
+        assert pings_before == 0
+        assert stats["pings"] == 1
+        assert stats["ping_failures"] == 1
+        assert stats["connects"] == 2
@@ -0,0 +1,143 @@
+"""
+分区消息分发器单元测试
+测试 app/services/message_dispatcher.py 中的 PartitionedDispatcher 类
+"""
+import threading
+
+import pytest
+from unittest.mock import MagicMock
+
+from app.services.message_dispatcher import PartitionedDispatcher
+
+
+class TestPartitionedDispatcher:
+    """PartitionedDispatcher 类的单元测试"""
+
+    @pytest.fixture
+    def dispatcher(self):
+        """创建4个工作线程的分发器"""
+        dispatcher = PartitionedDispatcher(name="test", workers=4, queue_size=1000, overflow="reject")
+        yield dispatcher
+        dispatcher.stop(timeout=5)
+
+    def test_partition_is_stable(self, dispatcher):
+        """测试分区 - 同一分区键始终对应同一工作线程"""
+        assert dispatcher.partition("device001") == dispatcher.partition("device001")
+        assert all(0 <= dispatcher.partition(f"device{i}") < 4 for i in range(50))
+
+    def test_preserves_per_key_order(self, dispatcher):
+        """测试分发 - 同一设备的消息按提交顺序处理"""
+        # 配置模拟
+        received = {}
+        lock = threading.Lock()
+
+        def handler(device_id, seq):
+            with lock:
+                received.setdefault(device_id, []).append(seq)
+
+        # 执行测试
+        dispatcher.start()
+        for seq in range(200):
+            for device_id in ("device001", "device002", "device003"):
+                assert dispatcher.submit(device_id, handler, device_id, seq) is True
+        dispatcher.stop(timeout=5)
+
+        # 验证结果
+        for device_id in ("device001", "device002", "device003"):
+            assert received[device_id] == list(range(200))
+        stats = dispatcher.get_stats()
+        assert stats["submitted"] == 600
+        assert stats["completed"] == 600
+        assert stats["queue_depth"] == 0
+
+    def test_reject_when_full(self):
+        """测试溢出 - reject 策略下队列满时拒绝并计数"""
+        dispatcher = PartitionedDispatcher(name="test", workers=1, queue_size=2, overflow="reject")
+
+        assert dispatcher.submit("device001", MagicMock()) is True
+        assert dispatcher.submit("device001", MagicMock()) is True
+        assert dispatcher.submit("device001", MagicMock()) is False
+
+        stats = dispatcher.get_stats()
+        assert stats["rejected"] == 1
+        assert stats["queue_depth"] == 2
+
+    def test_block_times_out(self):
+        """测试溢出 - block 策略下等待超时后拒绝"""
+        dispatcher = PartitionedDispatcher(name="test", workers=1, queue_size=1, overflow="block", block_timeout=0.01)
+
+        assert dispatcher.submit("device001", MagicMock()) is True
+        assert dispatcher.submit("device001", MagicMock()) is False
+        assert dispatcher.get_stats()["rejected"] == 1
+
+    def test_drop_oldest_keeps_newest(self):
+        """测试溢出 - drop_oldest 策略下丢弃最早消息，保留最新消息"""
+        # 配置模拟
+        dispatcher = PartitionedDispatcher(name="test", workers=1, queue_size=2, overflow="drop_oldest")
+        handler = MagicMock()
+
+        # 执行测试
+        for seq in range(5):
+            assert dispatcher.submit("device001", handler, seq) is True
+        dispatcher.start()
+        dispatcher.stop(timeout=5)
+
+        # 验证结果
+        assert [call.args[0] for call in handler.call_args_list] == [3, 4]
+        assert dispatcher.get_stats()["dropped"] == 3
+
+    def test_handler_error_is_counted(self, dispatcher):
+        """测试异常处理 - 处理函数异常不影响后续消息"""
+        # 配置模拟
+        failing = MagicMock(side_effect=ValueError("bad payload"))
+        handler = MagicMock()
+
+        # 执行测试
+        dispatcher.start()
+        dispatcher.submit("device001", failing)
+        dispatcher.submit("device001", handler)
+        dispatcher.stop(timeout=5)
+
+        # 验证结果
+        handler.assert_called_once()
+        stats = dispatcher.get_stats()
+        assert stats["errors"] == 1
+        assert stats["completed"] == 2
+
+    def test_restart_after_stop_timeout(self):
+        """测试 stop 超时后重新启动 - 旧工作线程退出前不启动新线程，同一设备的消息仍按顺序处理"""
+        # 配置模拟
+        dispatcher = PartitionedDispatcher(name="test", workers=1, queue_size=100, overflow="reject")
+        release = threading.Event()
+        received = []
+
+        def handler(seq):
+            if seq == 0:
+                release.wait(5)
+            received.append(seq)
+
+        dispatcher.start()
+        dispatcher.submit("device001", handler, 0)
+        dispatcher.submit("device001", handler, 1)
+
+        # 执行测试
+        dispatcher.stop(timeout=0.1)
+        assert dispatcher.running
+        restarter = threading.Thread(target=dispatcher.start)
+        restarter.start()
+        restarter.join(0.1)
+        assert restarter.is_alive()
+        release.set()
+        restarter.join(5)
+        dispatcher.submit("device001", handler, 2)
+        dispatcher.stop(timeout=5)
+
+        # 验证结果
+        assert received == [0, 1, 2]
+        assert dispatcher.get_stats()["completed"] == 3
+        assert dispatcher.running is False
+
+    def test_invalid_overflow_policy(self):
+        """测试配置 - 不支持的溢出策略"""
+        with pytest.raises(ValueError):
+            PartitionedDispatcher(name="test", workers=1, queue_size=1, overflow="spill")
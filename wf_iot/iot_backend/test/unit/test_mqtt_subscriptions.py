@@ -0,0 +1,271 @@
+"""
+MQTT 共享订阅单元测试
+测试 app/services/mqtt_subscriptions.py 及 MQTTService 在多实例下的订阅行为，
+使用进程内的 broker 替身（LocalBroker）代替真实 MQTT broker
+"""
+import itertools
+from collections import Counter
+
+import paho.mqtt.client as mqtt
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.config import Settings
+from app.services.mqtt_service import DEVICE_TOPICS, MQTTService
+from app.services.mqtt_subscriptions import (
+    build_client_id,
+    create_client,
+    shared_topic,
+    strip_share,
+    subscription_plan,
+)
+
+
+class LocalBroker:
+    """
+    broker 替身
+
+    - 按 MQTT 主题过滤规则路由消息，同一客户端有多个订阅匹配时只投递一次
+    - $share/<group>/<topic> 订阅在组内轮询投递，每条消息只投递给组内一个客户端
+    - client ID 重复时断开旧连接（与真实 broker 的行为一致）
+    """
+
+    def __init__(self):
+        self.clients = {}
+        self.kicked = []
+        self._rr = itertools.count()
+
+    def connect(self, client):
+        previous = self.clients.get(client.client_id)
+        if previous is not None:
+            self.kicked.append(previous)
+            previous.subscriptions.clear()
+        self.clients[client.client_id] = client
+        client.on_connect(client, None, {}, 0, None)
+
+    def publish(self, topic, payload=b"{}"):
+        receivers = set()
+        groups = {}
+        for client in self.clients.values():
+            for topic_filter in client.subscriptions:
+                if not mqtt.topic_matches_sub(strip_share(topic_filter), topic):
+                    continue
+                if topic_filter.startswith("$share/"):
+                    group = topic_filter.split("/", 2)[1]
+                    groups.setdefault((group, strip_share(topic_filter)), []).append(client)
+                else:
+                    receivers.add(client)
+        for members in groups.values():
+            receivers.add(members[next(self._rr) % len(members)])
+        msg = MagicMock(topic=topic, payload=payload)
+        for client in receivers:
+            client.on_message(client, None, msg)
+
+
+class StandInClient:
+    """paho 客户端替身，连接到 LocalBroker"""
+
+    def __init__(self, broker, client_id):
+        self.broker = broker
+        self.client_id = client_id
+        self.subscriptions = []
+        self.on_connect = self.on_disconnect = self.on_message = None
+
+    def connect(self, host, port, keepalive):
+        self.broker.connect(self)
+
+    def subscribe(self, topic, qos=0):
+        self.subscriptions.append(topic)
+        return mqtt.MQTT_ERR_SUCCESS, len(self.subscriptions)
+
+    def username_pw_set(self, username, password):
+        pass
+
+    def loop_start(self):
+        pass
+
+
+def start_instance(broker, **overrides):
+    """启动一个连接到 broker 替身的 MQTTService（连接时按 overrides 覆盖配置并订阅）"""
+    service = MQTTService()
+    settings_overrides = {
+        "MQTT_SHARED_SUBSCRIPTION": True,
+        "MQTT_SHARED_GROUP": "iot_backend",
+        "MQTT_SHARED_GROUPS": {"device/+/heartbeat": ""},
+        "MQTT_INSTANCE_ID": None,
+        **overrides,
+    }
+    with patch.multiple("app.services.mqtt_service.settings", **settings_overrides), \
+            patch("app.services.mqtt_service.create_client",
+                  side_effect=lambda client_id, protocol: StandInClient(broker, client_id)):
+        service.start()
+    return service
+
+
+def received_topics(dispatcher, service):
+    """分发器模拟中由 service 提交的消息对应的路由模式"""
+    return [
+        call.args[2].pattern for call in dispatcher.submit.call_args_list
+        if call.args[1].__self__ is service
+    ]
+
+
+class TestSubscriptionHelpers:
+    """客户端标识及订阅计划"""
+
+    def test_client_id_unique_per_instance(self):
+        """测试 client ID - 未指定实例标识时每次生成不同的 client ID"""
+        first = build_client_id("iot_backend_service")
+        second = build_client_id("iot_backend_service")
+
+        assert first != second
+        assert first.startswith("iot_backend_service-")
+
+    def test_client_id_with_instance_id(self):
+        """测试 client ID - 指定实例标识时结果固定"""
+        assert build_client_id("iot_backend_service", "pod-1") == "iot_backend_service-pod-1"
+
+    def test_plan_uses_default_group(self):
+        """测试订阅计划 - 未配置的主题使用默认组"""
+        plan = subscription_plan([("device/+/data", 1)], True, "iot_backend")
+
+        assert plan == [("$share/iot_backend/device/+/data", 1)]
+
+    def test_plan_group_mapping(self):
+        """测试订阅计划 - 按主题配置组名，空组名表示不共享"""
+        # 执行测试
+        plan = subscription_plan(
+            [("device/+/data", 1), ("device/+/heartbeat", 0), ("device/+/status", 1)],
+            True,
+            "iot_backend",
+            {"device/+/heartbeat": "iot_presence", "device/+/status": ""},
+        )
+
+        # 验证结果
+        assert plan == [
+            ("$share/iot_backend/device/+/data", 1),
+            ("$share/iot_presence/device/+/heartbeat", 0),
+            ("device/+/status", 1),
+        ]
+
+    def test_default_heartbeat_unshared(self):
+        """测试默认配置 - 心跳主题不共享，每个实例的在线状态跟踪器收到全部心跳"""
+        # 配置模拟
+        defaults = Settings(_env_file=None)
+
+        # 执行测试
+        plan = dict(subscription_plan(
+            DEVICE_TOPICS, defaults.MQTT_SHARED_SUBSCRIPTION, defaults.MQTT_SHARED_GROUP, defaults.MQTT_SHARED_GROUPS
+        ))
+
+        # 验证结果
+        assert "device/+/heartbeat" in plan
+        assert "$share/iot_backend/device/+/data" in plan
+
+    def test_plan_disabled(self):
+        """测试订阅计划 - 关闭共享订阅时原样返回"""
+        assert subscription_plan(DEVICE_TOPICS, False, "iot_backend") == DEVICE_TOPICS
+
+    def test_invalid_group(self):
+        """测试组名校验 - 组名不能包含 / + #"""
+        with pytest.raises(ValueError):
+            shared_topic("device/+/data", "iot/backend")
+
+    def test_strip_share(self):
+        """测试去除共享前缀"""
+        assert strip_share("$share/iot_backend/device/+/data") == "device/+/data"
+        assert strip_share("device/+/data") == "device/+/data"
+
+    def test_create_client_protocol(self):
+        """测试创建客户端 - 按配置选择协议版本"""
+        assert create_client("test-v5", "5")._protocol == mqtt.MQTTv5
+        assert create_client("test-v311", "3.1.1")._protocol == mqtt.MQTTv311
+        with pytest.raises(ValueError):
+            create_client("test", "3")
+
+
+class TestSharedSubscriptionIngestion:
+    """多个 MQTTService 实例连接同一 broker 替身"""
+
+    @pytest.fixture(autouse=True)
+    def dispatcher(self):
+        """模拟消息分发器及写入管道，记录各实例提交的消息"""
+        dispatcher = MagicMock()
+        with patch("app.services.mqtt_service.mqtt_dispatcher", dispatcher), \
+                patch("app.services.mqtt_service.telemetry_pipeline"), \
+                patch("app.services.mqtt_service.presence_tracker"):
+            yield dispatcher
+
+    def test_shared_subscription_splits_messages(self, dispatcher):
+        """测试共享订阅 - 每条消息只由一个实例处理，所有实例分摊负载"""
+        # 配置模拟
+        broker = LocalBroker()
+        instances = [start_instance(broker) for _ in range(3)]
+
+        # 执行测试
+        for i in range(300):
+            broker.publish(f"device/device{i % 30}/data")
+
+        # 验证结果
+        counts = [len(received_topics(dispatcher, service)) for service in instances]
+        assert sum(counts) == 300
+        assert all(count > 0 for count in counts)
+        assert not broker.kicked
+        assert len({service.client_id for service in instances}) == 3
+
+    def test_plain_subscription_duplicates_messages(self, dispatcher):
+        """测试普通订阅 - 关闭共享订阅时每个实例都处理全部消息"""
+        # 配置模拟
+        broker = LocalBroker()
+        instances = [start_instance(broker, MQTT_SHARED_SUBSCRIPTION=False) for _ in range(2)]
+
+        # 执行测试
+        for i in range(10):
+            broker.publish(f"device/device{i}/status")
+
+        # 验证结果
+        assert [len(received_topics(dispatcher, service)) for service in instances] == [10, 10]
+
+    def test_group_mapping_per_topic(self, dispatcher):
+        """测试主题分组 - 不共享的主题每个实例都收到，共享主题只投递一次"""
+        # 配置模拟
+        broker = LocalBroker()
+        groups = {"device/+/heartbeat": ""}
+        instances = [start_instance(broker, MQTT_SHARED_GROUPS=groups) for _ in range(2)]
+
+        # 执行测试
+        for i in range(10):
+            broker.publish(f"device/device{i}/heartbeat")
+            broker.publish(f"device/device{i}/data")
+
+        # 验证结果
+        topics = Counter()
+        for service in instances:
+            topics.update(topic.rsplit("/", 1)[1] for topic in received_topics(dispatcher, service))
+        assert topics == {"heartbeat": 20, "data": 10}
+
+    def test_shared_heartbeat_requires_redis_presence(self, dispatcher):
+        """测试心跳共享订阅 - 未启用Redis在线状态时拒绝启动，启用后允许共享"""
+        # 配置模拟
+        broker = LocalBroker()
+
+        # 执行测试
+        with pytest.raises(ValueError):
+            start_instance(broker, MQTT_SHARED_GROUPS={})
+        accepted = start_instance(broker, MQTT_SHARED_GROUPS={}, PRESENCE_REDIS_ENABLED=True)
+
+        # 验证结果
+        assert list(broker.clients.values()) == [accepted.client]
+        broker.publish("device/device1/heartbeat")
+        assert received_topics(dispatcher, accepted) == ["device/{device_id}/heartbeat"]
+
+    def test_same_instance_id_is_kicked(self):
+        """测试 client ID 冲突 - 两个实例配置相同实例标识时旧连接被断开"""
+        # 配置模拟
+        broker = LocalBroker()
+        first = start_instance(broker, MQTT_INSTANCE_ID="pod-1")
+        second = start_instance(broker, MQTT_INSTANCE_ID="pod-1")
+
+        # 验证结果
+        assert first.client_id == second.client_id == "iot_backend_service-pod-1"
+        assert broker.kicked == [first.client]
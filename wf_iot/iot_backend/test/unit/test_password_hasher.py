@@ -0,0 +1,139 @@
+"""
+密码哈希执行池单元测试
+测试 app/core/password_hasher.py 中的 PasswordHasher 类及登录时的透明重算
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusyError, context_options
+from app.crud.user import CRUDUser
+from app.db.models.user import User
+
+
+def make_options(rounds=4):
+    """生成使用 bcrypt 的 CryptContext 参数（低成本，加快测试）"""
+    return context_options(SimpleNamespace(
+        PASSWORD_HASH_SCHEME="bcrypt",
+        PASSWORD_BCRYPT_ROUNDS=rounds,
+        PASSWORD_ARGON2_TIME_COST=1,
+        PASSWORD_ARGON2_MEMORY_COST=1024,
+        PASSWORD_ARGON2_PARALLELISM=1,
+    ))
+
+
+class TestPasswordHasher:
+    """PasswordHasher 类的单元测试"""
+
+    @pytest.fixture
+    def hasher(self):
+        """创建低成本的线程池哈希器"""
+        hasher = PasswordHasher(make_options(), workers=2, max_queue=4)
+        yield hasher
+        hasher.shutdown()
+
+    def test_hash_and_verify(self, hasher):
+        """测试在执行池中计算及验证哈希"""
+        # 执行测试
+        hashed = hasher.hash("testpassword")
+
+        # 验证结果
+        assert hashed.startswith("$2b$04$")
+        assert hasher.verify("testpassword", hashed) is True
+        assert hasher.verify("wrongpassword", hashed) is False
+        stats = hasher.get_stats()
+        assert stats["submitted"] == 3
+        assert stats["completed"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["scheme"] == "bcrypt"
+
+    def test_async_hash_and_verify(self, hasher):
+        """测试异步等待执行池结果"""
+        # 执行测试
+        async def run():
+            hashed = await hasher.ahash("testpassword")
+            return await hasher.averify("testpassword", hashed)
+
+        # 验证结果
+        assert asyncio.run(run()) is True
+
+    def test_rejects_when_queue_full(self, hasher):
+        """测试排队已满时拒绝请求"""
+        # 配置模拟
+        hasher._in_flight = hasher.workers + hasher.max_queue
+
+        # 执行测试 & 验证结果
+        with pytest.raises(PasswordHasherBusyError):
+            hasher.hash("testpassword")
+        assert hasher.get_stats()["rejected"] == 1
+        assert hasher.get_stats()["submitted"] == 0
+
+    def test_needs_rehash_on_cost_change(self, hasher):
+        """测试成本参数变化后旧哈希需要重算"""
+        # 配置模拟
+        stronger = PasswordHasher(make_options(rounds=5))
+        hashed = hasher.hash("testpassword")
+
+        # 执行测试 & 验证结果
+        assert hasher.needs_rehash(hashed) is False
+        assert stronger.needs_rehash(hashed) is True
+        assert stronger.needs_rehash("not-a-hash") is False
+
+    def test_invalid_executor(self):
+        """测试不支持的执行池类型"""
+        # 执行测试 & 验证结果
+        with pytest.raises(ValueError):
+            PasswordHasher(make_options(), executor="fiber")
+
+
+class TestAuthenticateRehash:
+    """登录成功时的透明重算测试"""
+
+    @pytest.fixture
+    def mock_user(self):
+        user = MagicMock(spec=User)
+        user.username = "testuser"
+        user.hashed_password = "old_hash"
+        return user
+
+    @patch('app.crud.user.get_password_hash')
+    @patch('app.crud.user.password_needs_rehash')
+    @patch('app.crud.user.verify_password')
+    def test_outdated_hash_rehashed(self, mock_verify, mock_needs_rehash, mock_hash, mock_user):
+        """测试旧哈希在验证成功后重算并保存"""
+        # 配置模拟
+        mock_db = MagicMock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_user
+        mock_verify.return_value = True
+        mock_needs_rehash.return_value = True
+        mock_hash.return_value = "new_hash"
+
+        # 执行测试
+        result = CRUDUser().authenticate(mock_db, username="testuser", password="secret")
+
+        # 验证结果
+        assert result == mock_user
+        assert mock_user.hashed_password == "new_hash"
+        mock_hash.assert_called_once_with("secret")
+        mock_db.commit.assert_called_once()
+
+    @patch('app.crud.user.get_password_hash')
+    @patch('app.crud.user.password_needs_rehash')
+    @patch('app.crud.user.verify_password')
+    def test_wrong_password_not_rehashed(self, mock_verify, mock_needs_rehash, mock_hash, mock_user):
+        """测试验证失败时不重算"""
+        # 配置模拟
+        mock_db = MagicMock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_user
+        mock_verify.return_value = False
+        mock_needs_rehash.return_value = True
+
+        # 执行测试
+        result = CRUDUser().authenticate(mock_db, username="testuser", password="wrong")
+
+        # 验证结果
+        assert result is None
+        assert mock_user.hashed_password == "old_hash"
+        mock_hash.assert_not_called()
+        mock_db.commit.assert_not_called()
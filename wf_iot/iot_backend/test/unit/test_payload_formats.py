@@ -0,0 +1,222 @@
+"""
+负载格式协商单元测试
+测试 app/core/payload_formats.py 中的 JSON / CBOR / MessagePack / Protobuf 解码及按设备协商格式
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.codec import PayloadDecodeError
+from app.core.payload_formats import (
+    available_formats,
+    get_format,
+    get_format_by_content_type,
+    is_json,
+    payload_format_cache,
+    resolve_format_name,
+)
+from app.crud.device import device_crud
+from app.schemas.payload import CommandResponsePayload, FirmwareStatusPayload, StatusPayload, TelemetryPayload
+from app.services.coap_service import CoAPService
+from app.services.mqtt_service import MQTTService
+
+TELEMETRY = TelemetryPayload(type="sensor", data={"temperature": 21.5, "name": "车间A"}, quality="good")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """每个测试前清空设备负载格式缓存"""
+    payload_format_cache.clear()
+    yield
+    payload_format_cache.clear()
+
+
+class TestPayloadFormats:
+    """各格式解码为相同的负载模型"""
+
+    @pytest.mark.parametrize("name", available_formats())
+    def test_round_trip(self, name):
+        """测试编解码 - 各格式解码结果与原负载一致"""
+        # 配置模拟
+        payload_format = get_format(name)
+
+        # 执行测试
+        encoded = payload_format.encode(TELEMETRY)
+
+        # 验证结果
+        assert payload_format.decode(encoded, TelemetryPayload) == TELEMETRY
+        assert is_json(encoded) is (name == "json")
+
+    @pytest.mark.parametrize("name", [name for name in available_formats() if name != "json"])
+    def test_binary_smaller_than_json(self, name):
+        """测试负载大小 - 二进制格式小于 JSON"""
+        assert len(get_format(name).encode(TELEMETRY)) < len(get_format("json").encode(TELEMETRY))
+
+    @pytest.mark.parametrize("name", [name for name in available_formats() if name != "protobuf"])
+    def test_decode_invalid(self, name):
+        """测试解码失败 - 非映射或非法数据统一抛出 PayloadDecodeError"""
+        payload_format = get_format(name)
+
+        with pytest.raises(PayloadDecodeError):
+            payload_format.decode(b"\xff\x00", TelemetryPayload)
+        with pytest.raises(PayloadDecodeError):
+            payload_format.decode(payload_format.dumps([1, 2]), TelemetryPayload)
+
+    def test_cbor_and_msgpack_dicts(self):
+        """测试 CBOR / MessagePack - 任意对象编解码"""
+        for name in ("cbor", "msgpack"):
+            if name not in available_formats():
+                continue
+            payload_format = get_format(name)
+            assert payload_format.loads(payload_format.dumps({"a": [1, 2.5, None]})) == {"a": [1, 2.5, None]}
+
+    def test_unknown_format(self):
+        """测试未知格式 - 抛出 ValueError"""
+        with pytest.raises(ValueError):
+            get_format("xml")
+
+    def test_content_type(self):
+        """测试按媒体类型查找格式"""
+        assert get_format_by_content_type("application/json").name == "json"
+        assert get_format_by_content_type("text/plain") is None
+
+
+@pytest.mark.skipif("protobuf" not in available_formats(), reason="protobuf not installed")
+class TestProtobufFormat:
+    """proto/telemetry.proto 消息转换为内部负载模型"""
+
+    def test_telemetry_merges_metrics_and_attributes(self):
+        """测试数据上报 - metrics 与 attributes 合并为 data，空字段使用默认值"""
+        # 配置模拟
+        from proto.generated import telemetry_pb2
+        raw = telemetry_pb2.Telemetry(metrics={"temperature": 21.5}, attributes={"mode": "eco"}).SerializeToString()
+
+        # 执行测试
+        telemetry = get_format("protobuf").decode(raw, TelemetryPayload)
+
+        # 验证结果
+        assert telemetry.type == "telemetry"
+        assert telemetry.quality == "good"
+        assert telemetry.data == {"temperature": 21.5, "mode": "eco"}
+
+    def test_status_and_command_response(self):
+        """测试状态及命令响应 - 附加字段及 JSON 编码的结果"""
+        protobuf = get_format("protobuf")
+
+        status = protobuf.decode(protobuf.encode(StatusPayload(status="online", rssi="-40")), StatusPayload)
+        response = protobuf.decode(
+            protobuf.encode(CommandResponsePayload(command_id="c1", status="completed", result={"ok": True})),
+            CommandResponsePayload,
+        )
+
+        assert status.model_dump() == {"status": "online", "rssi": "-40"}
+        assert response.command_id == "c1"
+        assert response.result == {"ok": True}
+        assert protobuf.decode(b"", FirmwareStatusPayload).error is None
+
+    def test_requires_schema(self):
+        """测试无模型 - Protobuf 无法按任意对象解析"""
+        with pytest.raises(PayloadDecodeError):
+            get_format("protobuf").loads(b"\x08\x01")
+        with pytest.raises(PayloadDecodeError):
+            get_format("protobuf").decode(b"\xff", TelemetryPayload)
+
+
+class TestFormatNegotiation:
+    """按设备元数据 / 产品协商负载格式"""
+
+    def test_resolve_priority(self):
+        """测试协商优先级 - 设备元数据 > 产品默认 > 全局默认"""
+        with patch.multiple(
+            "app.core.payload_formats.settings",
+            PAYLOAD_FORMAT_BY_PRODUCT={"battery_sensor": "cbor"},
+            PAYLOAD_DEFAULT_FORMAT="json",
+        ):
+            assert resolve_format_name({"payload_format": "protobuf"}, "battery_sensor") == "protobuf"
+            assert resolve_format_name({"location": "A"}, "battery_sensor") == "cbor"
+            assert resolve_format_name(None, "other") == "json"
+
+    def test_crud_resolve_caches(self):
+        """测试设备格式解析 - 查询结果写入缓存，设备更新时失效"""
+        # 配置模拟
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = MagicMock(
+            product_id="p1", device_metadata={"payload_format": "protobuf"}
+        )
+
+        # 执行测试
+        first = device_crud.resolve_payload_format(db, "device001")
+        second = device_crud.resolve_payload_format(db, "device001")
+
+        # 验证结果
+        assert first == second == "protobuf"
+        assert db.query.call_count == 1
+        device_crud.update(db, MagicMock(device_id="device001"), MagicMock(model_dump=lambda exclude_unset: {}))
+        assert payload_format_cache.get("device001") is None
+
+    def test_crud_resolve_unknown_device(self):
+        """测试设备格式解析 - 设备不存在时使用默认格式且不缓存"""
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = None
+
+        assert device_crud.resolve_payload_format(db, "missing") == "json"
+        assert payload_format_cache.get("missing") is None
+
+    def test_coap_command_content_format(self):
+        """测试 CoAP 命令格式 - 按设备格式编码，Protobuf 设备的命令使用 JSON"""
+        service = CoAPService()
+
+        assert service._negotiate_content_format("device001", {}) == "application/json"
+        assert service._negotiate_content_format("device001", {"payload_format": "protobuf"}) == "application/json"
+        assert service._negotiate_content_format("device001", {"payload_format": "xml"}) == "application/json"
+
+
+@pytest.mark.skipif("protobuf" not in available_formats(), reason="protobuf not installed")
+class TestMQTTNegotiatedDecoding:
+    """MQTTService 按设备协商的格式解码上报负载"""
+
+    @pytest.fixture
+    def pipeline(self):
+        with patch("app.services.mqtt_service.telemetry_pipeline") as pipeline, \
+                patch("app.services.mqtt_service.SessionLocal"):
+            yield pipeline
+
+    def test_binary_payload_uses_device_format(self, pipeline):
+        """测试二进制负载 - 查询设备格式后解码，结果与 JSON 负载相同"""
+        # 配置模拟
+        service = MQTTService()
+        raw = get_format("protobuf").encode(TelemetryPayload(data={"temperature": 21.5}))
+
+        # 执行测试
+        with patch("app.services.mqtt_service.device_crud") as crud:
+            crud.resolve_payload_format.return_value = "protobuf"
+            service._handle_device_data("device001", raw)
+
+        # 验证结果
+        pipeline.submit.assert_called_once_with(
+            device_id="device001", data_type="telemetry", data={"temperature": 21.5}, quality="good"
+        )
+
+    def test_json_payload_skips_lookup(self, pipeline):
+        """测试 JSON 负载 - 不查询设备格式"""
+        service = MQTTService()
+
+        with patch("app.services.mqtt_service.device_crud") as crud:
+            service._handle_device_data("device001", b'{"data": {"temperature": 21.5}}')
+
+        crud.resolve_payload_format.assert_not_called()
+        pipeline.submit.assert_called_once()
+
+    def test_cached_format_skips_lookup(self, pipeline):
+        """测试格式缓存 - 缓存命中时不打开数据库会话"""
+        # 配置模拟
+        service = MQTTService()
+        payload_format_cache.set("device001", "protobuf")
+        raw = get_format("protobuf").encode(TelemetryPayload(data={"temperature": 21.5}))
+
+        # 执行测试
+        with patch("app.services.mqtt_service.device_crud") as crud:
+            service._handle_device_data("device001", raw)
+
+        # 验证结果
+        crud.resolve_payload_format.assert_not_called()
+        pipeline.submit.assert_called_once()
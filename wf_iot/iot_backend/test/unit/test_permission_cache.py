@@ -0,0 +1,232 @@
+"""
+用户权限缓存单元测试
+测试 app/core/permission_cache.py 中的 PermissionCache 类及 CRUD 变更时的失效
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from app.core.permission_cache import PermissionCache
+from app.crud.user import CRUDUser, CRUDRole
+from app.db.models.user import User
+
+
+def make_user(user_id=1, username="testuser", is_superuser=False):
+    return User(
+        id=user_id,
+        username=username,
+        email=f"{username}@example.com",
+        hashed_password="hashed",
+        full_name="Test User",
+        is_active=True,
+        is_superuser=is_superuser,
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+class TestPermissionCache:
+    """PermissionCache 类的单元测试"""
+
+    @pytest.fixture
+    def cache(self):
+        """创建不使用Redis的缓存"""
+        return PermissionCache(maxsize=2, ttl=60.0)
+
+    def test_snapshot_permission_checks(self, cache):
+        """测试用户快照的权限判断"""
+        # 执行测试
+        user = cache.set(make_user(), {"device:read"}, cache.version)
+        admin = cache.set(make_user(2, "admin", is_superuser=True), set(), cache.version)
+
+        # 验证结果
+        assert user.username == "testuser"
+        assert user.has_permission("device:read")
+        assert not user.has_permission("device:write")
+        assert user.has_any_permission(["device:write", "device:read"])
+        assert admin.has_permission("device:write")
+
+    def test_get_hit_and_miss(self, cache):
+        """测试命中与未命中统计"""
+        cache.set(make_user(), {"device:read"}, cache.version)
+
+        # 执行测试
+        hit = cache.get("testuser")
+        miss = cache.get("unknown")
+
+        # 验证结果
+        assert hit.permissions == frozenset({"device:read"})
+        assert miss is None
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @patch("app.core.permission_cache.time.monotonic")
+    def test_ttl_expiry(self, mock_monotonic, cache):
+        """测试条目过期"""
+        # 配置模拟
+        mock_monotonic.return_value = 1000.0
+        cache.set(make_user(), set(), cache.version)
+
+        # 执行测试
+        mock_monotonic.return_value = 1061.0
+
+        # 验证结果
+        assert cache.get("testuser") is None
+        assert cache.get_stats()["stale"] == 1
+
+    def test_bump_version_invalidates_all(self, cache):
+        """测试递增版本号使所有条目失效"""
+        cache.set(make_user(), set(), cache.version)
+
+        # 执行测试
+        cache.bump_version()
+
+        # 验证结果
+        assert cache.get("testuser") is None
+        assert cache.get_stats()["version"] == 1
+
+    def test_set_with_stale_version_not_cached(self, cache):
+        """测试加载期间版本变化时不缓存旧数据"""
+        version = cache.version
+        cache.bump_version()
+
+        # 执行测试
+        snapshot = cache.set(make_user(), {"device:read"}, version)
+
+        # 验证结果
+        assert snapshot.has_permission("device:read")
+        assert cache.get("testuser") is None
+
+    def test_invalidate_user(self, cache):
+        """测试按用户ID失效，不影响其他用户"""
+        cache.set(make_user(1, "user1"), set(), cache.version)
+        cache.set(make_user(2, "user2"), set(), cache.version)
+
+        # 执行测试
+        cache.invalidate_user(1)
+
+        # 验证结果
+        assert cache.get("user1") is None
+        assert cache.get("user2") is not None
+
+    def test_lru_eviction(self, cache):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache.set(make_user(1, "user1"), set(), cache.version)
+        cache.set(make_user(2, "user2"), set(), cache.version)
+        cache.get("user1")
+
+        # 执行测试
+        cache.set(make_user(3, "user3"), set(), cache.version)
+
+        # 验证结果
+        assert cache.get("user2") is None
+        assert cache.get("user1") is not None
+        assert cache.get_stats()["evictions"] == 1
+
+
+class TestPermissionCacheInvalidation:
+    """CRUD 变更触发缓存失效的单元测试"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """创建模拟的数据库 Session"""
+        return MagicMock()
+
+    @patch("app.crud.user.permission_cache")
+    def test_assign_role_invalidates_user(self, mock_cache, mock_db):
+        """测试分配角色使该用户的缓存失效"""
+        # 配置模拟
+        mock_db.query.return_value.filter.return_value.first.return_value = None
+
+        # 执行测试
+        CRUDUser().assign_role(mock_db, user_id=1, role_id=2)
+
+        # 验证结果
+        mock_cache.invalidate_user.assert_called_once_with(1)
+
+    @patch("app.crud.user.permission_cache")
+    def test_assign_permission_bumps_version(self, mock_cache, mock_db):
+        """测试角色授权使所有缓存失效"""
+        # 配置模拟
+        mock_db.query.return_value.filter.return_value.first.return_value = None
+
+        # 执行测试
+        CRUDRole().assign_permission(mock_db, role_id=1, permission_id=2)
+
+        # 验证结果
+        mock_cache.bump_version.assert_called_once()
+
+    @patch("app.crud.user.permission_cache")
+    def test_existing_assignment_does_not_invalidate(self, mock_cache, mock_db):
+        """测试重复授权不触发失效"""
+        # 配置模拟
+        mock_db.query.return_value.filter.return_value.first.return_value = MagicMock()
+
+        # 执行测试
+        CRUDRole().assign_permission(mock_db, role_id=1, permission_id=2)
+
+        # 验证结果
+        mock_cache.bump_version.assert_not_called()
+
+    def test_get_permission_codes(self, mock_db):
+        """测试有效权限代码集合查询"""
+        # 配置模拟
+        query = mock_db.query.return_value.join.return_value.join.return_value.filter.return_value
+        query.distinct.return_value.all.return_value = [("device:read",), ("device:write",)]
+
+        # 执行测试
+        codes = CRUDUser().get_permission_codes(mock_db, user_id=1)
+
+        # 验证结果
+        assert codes == {"device:read", "device:write"}
+
+
+class TestCachedUserEndpoints:
+    """端点使用缓存快照(CachedUser)作为当前用户"""
+
+    @patch("app.api.v1.endpoints.users.user_crud")
+    def test_read_own_user_by_id(self, mock_crud):
+        """测试非超级用户读取本人记录 - 按主键比较，不与 ORM 对象比较"""
+        # 配置模拟
+        from app.api.v1.endpoints.users import read_user_by_id
+        db_user = make_user(user_id=7)
+        mock_crud.get_user.return_value = db_user
+        mock_crud.is_superuser.return_value = False
+        current_user = PermissionCache().set(make_user(user_id=7), [], 0)
+
+        # 执行测试
+        result = read_user_by_id(user_id=7, db=MagicMock(), current_user=current_user)
+
+        # 验证结果
+        assert result is db_user
+
+    @patch("app.api.v1.endpoints.users.user_crud")
+    def test_read_other_user_by_id_forbidden(self, mock_crud):
+        """测试非超级用户读取他人记录 - 返回404"""
+        from fastapi import HTTPException
+        from app.api.v1.endpoints.users import read_user_by_id
+        mock_crud.get_user.return_value = make_user(user_id=8, username="other")
+        mock_crud.is_superuser.return_value = False
+        current_user = PermissionCache().set(make_user(user_id=7), [], 0)
+
+        with pytest.raises(HTTPException) as exc_info:
+            read_user_by_id(user_id=8, db=MagicMock(), current_user=current_user)
+
+        assert exc_info.value.status_code == 404
+
+    @patch("app.api.v1.endpoints.users.user_crud")
+    def test_update_me_from_snapshot(self, mock_crud):
+        """测试更新本人信息 - 从快照字段构造 UserUpdate"""
+        # 配置模拟
+        from app.api.v1.endpoints.users import update_user_me
+        current_user = PermissionCache().set(make_user(user_id=7), ["device:read"], 0)
+
+        # 执行测试
+        update_user_me(db=MagicMock(), password=None, full_name="New Name", email=None, current_user=current_user)
+
+        # 验证结果
+        user_in = mock_crud.update_user.call_args.kwargs["obj_in"]
+        assert user_in.username == "testuser"
+        assert user_in.full_name == "New Name"
+        assert user_in.is_active is True
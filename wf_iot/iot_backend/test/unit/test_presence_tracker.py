@@ -0,0 +1,102 @@
+"""
+设备在线状态跟踪器单元测试
+测试 app/services/presence_tracker.py 中的 PresenceTracker 类
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.services.presence_tracker import PresenceTracker, MemoryPresenceStore
+
+
+class TestPresenceTracker:
+    """PresenceTracker 类的单元测试"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """创建模拟的数据库 Session"""
+        return MagicMock()
+
+    @pytest.fixture
+    def tracker(self, mock_db):
+        """创建使用内存存储的跟踪器"""
+        return PresenceTracker(
+            offline_timeout=60,
+            sweep_interval=10,
+            flush_interval=30,
+            store=MemoryPresenceStore(),
+            session_factory=lambda: mock_db,
+        )
+
+    @patch("app.services.presence_tracker.device_crud")
+    def test_heartbeats_coalesced(self, mock_crud, tracker):
+        """测试多次心跳只产生一次上线写库"""
+        for _ in range(100):
+            tracker.touch("device001")
+
+        tracker.flush()
+
+        mock_crud.batch_update_status.assert_called_once()
+        args = mock_crud.batch_update_status.call_args.args
+        assert args[1] == ["device001"]
+        assert args[2] == "online"
+        stats = tracker.get_stats()
+        assert stats["heartbeats"] == 100
+        assert stats["online_transitions"] == 1
+
+    @patch("app.services.presence_tracker.device_crud")
+    def test_no_write_without_transition(self, mock_crud, tracker):
+        """测试已在线设备的心跳在刷新周期内不写库"""
+        tracker.touch("device001")
+        tracker.flush()
+        mock_crud.reset_mock()
+
+        tracker.touch("device001")
+        tracker.flush()
+
+        mock_crud.batch_update_status.assert_not_called()
+
+    @patch("app.services.presence_tracker.device_crud")
+    def test_periodic_refresh(self, mock_crud, tracker):
+        """测试到达刷新周期时刷新有心跳设备的 last_online_at"""
+        tracker.touch("device001")
+        tracker.flush()
+        mock_crud.reset_mock()
+
+        tracker.touch("device001")
+        tracker.flush(force=True)
+
+        mock_crud.batch_update_status.assert_called_once()
+        assert mock_crud.batch_update_status.call_args.args[1] == ["device001"]
+
+    @patch("app.services.presence_tracker.device_crud")
+    def test_sweep_marks_offline(self, mock_crud, tracker):
+        """测试超时未心跳的设备被扫描为离线"""
+        tracker.touch("device001", seen_at=1000.0)
+        tracker.touch("device002", seen_at=1050.0)
+
+        offline = tracker.sweep(now=1070.0)
+
+        assert offline == ["device001"]
+        mock_crud.batch_update_status.assert_called_once_with(tracker.session_factory(), ["device001"], "offline")
+        assert tracker.get_stats()["tracked_devices"] == 1
+
+    @patch("app.services.presence_tracker.device_crud")
+    def test_sweep_retries_on_failure(self, mock_crud, tracker, mock_db):
+        """测试离线写库失败时设备保留，下次扫描重试"""
+        mock_crud.batch_update_status.side_effect = [Exception("db down"), 1]
+        tracker.touch("device001", seen_at=1000.0)
+
+        assert tracker.sweep(now=1100.0) == []
+        assert tracker.sweep(now=1100.0) == ["device001"]
+        mock_db.rollback.assert_called_once()
+
+    @patch("app.services.presence_tracker.device_crud")
+    def test_observe_offline_status(self, mock_crud, tracker):
+        """测试设备主动上报离线后不再跟踪"""
+        tracker.touch("device001")
+        tracker.observe_status("device001", "offline")
+
+        tracker.flush(force=True)
+
+        mock_crud.batch_update_status.assert_not_called()
+        assert tracker.get_stats()["tracked_devices"] == 0
@@ -0,0 +1,137 @@
+"""
+遥测数据导出服务单元测试
+测试 app/services/telemetry_export.py 中的 TelemetryExporter 类
+"""
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.pagination import InvalidCursorError, encode_cursor
+from app.db.base import Base, import_models
+from app.db.models.device import Device, DeviceData
+from app.services.telemetry_export import TelemetryExporter, decode_export_cursor
+
+
+class TestTelemetryExporter:
+    """TelemetryExporter 类的单元测试"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """创建模拟的数据库 Session"""
+        return MagicMock()
+
+    @pytest.fixture
+    def exporter(self, mock_db):
+        """创建小分块的导出器"""
+        return TelemetryExporter(chunk_size=2, session_factory=lambda: mock_db)
+
+    @pytest.fixture
+    def rows(self):
+        """创建按时间排序的导出行"""
+        start = datetime(2024, 1, 1)
+        return [
+            (start + timedelta(minutes=i), i + 1, "device001", "telemetry", "good", {"temperature": 20 + i})
+            for i in range(5)
+        ]
+
+    def _stream(self, exporter, fmt, rows):
+        with patch.object(TelemetryExporter, "iter_rows", return_value=iter(rows)):
+            return list(exporter.stream(fmt, {1: "device001"}, datetime(2024, 1, 1), datetime(2024, 1, 2)))
+
+    def test_ndjson_chunked(self, exporter, rows, mock_db):
+        """测试 NDJSON 按块输出且会话在结束后关闭"""
+        chunks = self._stream(exporter, "ndjson", rows)
+
+        assert len(chunks) == 3
+        lines = b"".join(chunks).decode("utf-8").splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+        assert json.loads(lines[0])["data"] == {"temperature": 20}
+        mock_db.close.assert_called_once()
+
+    def test_csv_header_once(self, exporter, rows):
+        """测试 CSV 只在第一块输出表头"""
+        chunks = self._stream(exporter, "csv", rows)
+
+        records = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+        assert records[0][0] == "device_id"
+        assert len(records) == 6
+        assert json.loads(records[1][5]) == {"temperature": 20}
+
+    def test_csv_empty_export(self, exporter):
+        """测试没有数据时 CSV 仅输出表头"""
+        chunks = self._stream(exporter, "csv", [])
+
+        assert b"".join(chunks).decode("utf-8").strip() == "device_id,timestamp,id,data_type,quality,data,cursor"
+
+    def test_unsupported_format(self, exporter):
+        """测试不支持的导出格式"""
+        with pytest.raises(ValueError):
+            list(exporter.stream("xml", {1: "device001"}, datetime(2024, 1, 1), datetime(2024, 1, 2)))
+
+    def test_chunks_bounded(self, exporter, rows):
+        """测试分块大小不超过 chunk_size"""
+        assert [len(chunk) for chunk in exporter._chunks(iter(rows))] == [2, 2, 1]
+
+    def test_rows_carry_resume_cursor(self, exporter, rows):
+        """测试每行附带排序键 (timestamp, id) 的不透明游标"""
+        # 执行测试
+        lines = b"".join(self._stream(exporter, "ndjson", rows)).decode("utf-8").splitlines()
+        records = list(csv.reader(io.StringIO(b"".join(self._stream(exporter, "csv", rows)).decode("utf-8"))))
+
+        # 验证结果
+        last = json.loads(lines[-1])
+        assert decode_export_cursor(last["cursor"]) == (rows[-1][0], rows[-1][1])
+        assert records[-1][6] == last["cursor"]
+
+    def test_decode_export_cursor_invalid(self):
+        """测试续传游标无效 - 无法解析或排序键类型不符"""
+        with pytest.raises(InvalidCursorError):
+            decode_export_cursor("not-a-cursor")
+        with pytest.raises(InvalidCursorError):
+            decode_export_cursor(encode_cursor([1, 2]))
+        with pytest.raises(InvalidCursorError):
+            decode_export_cursor(encode_cursor([datetime(2024, 1, 1)]))
+
+
+class TestTelemetryExportResume:
+    """按游标续传导出（内存 SQLite）"""
+
+    @pytest.fixture
+    def db(self):
+        """创建内存数据库，写入同一时间戳的多行数据"""
+        import_models()
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        device = Device(device_id="device001", device_name="Test Device", product_id="product001")
+        session.add(device)
+        session.flush()
+        start = datetime(2024, 1, 1)
+        for timestamp in (start, start, start + timedelta(minutes=1), start + timedelta(minutes=2)):
+            session.add(DeviceData(device_id=device.id, timestamp=timestamp, data_type="telemetry", data={}))
+        session.commit()
+        yield session
+        session.close()
+        engine.dispose()
+
+    def test_resume_after_cursor(self, db):
+        """测试续传 - 只输出排序键大于游标的行，同一时间戳内按 id 继续"""
+        # 配置模拟
+        exporter = TelemetryExporter(chunk_size=2, session_factory=lambda: db)
+        devices = {db.query(Device.id).scalar(): "device001"}
+        window = (datetime(2024, 1, 1), datetime(2024, 1, 2))
+        first = list(exporter.iter_rows(db, devices, *window))
+
+        # 执行测试
+        after = decode_export_cursor(encode_cursor([first[0][0], first[0][1]]))
+        resumed = list(exporter.iter_rows(db, devices, *window, after=after))
+
+        # 验证结果
+        assert len(first) == 4
+        assert [row[1] for row in resumed] == [row[1] for row in first[1:]]
@@ -0,0 +1,210 @@
+"""
+遥测批量写入管道单元测试
+测试 app/services/telemetry_ingest.py 中的 TelemetryIngestPipeline 类
+"""
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from pydantic import ValidationError
+from sqlalchemy.exc import DataError, OperationalError
+
+from app.schemas.payload import TelemetryPayload
+from app.services.telemetry_ingest import TelemetryIngestPipeline
+
+
+class TestTelemetryIngestPipeline:
+    """TelemetryIngestPipeline 类的单元测试"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """创建模拟的数据库 Session"""
+        return MagicMock()
+
+    @pytest.fixture
+    def pipeline(self, mock_db):
+        """创建小批量、小队列的管道实例"""
+        return TelemetryIngestPipeline(
+            batch_size=3,
+            flush_interval=0.05,
+            max_queue_size=5,
+            enqueue_timeout=0,
+            retry_backoff=0.01,
+            max_retries=3,
+            drain_timeout=1.0,
+            session_factory=lambda: mock_db,
+        )
+
+    def test_submit_enqueues(self, pipeline):
+        """测试提交数据 - 入队成功"""
+        assert pipeline.submit("device001", {"temperature": 25.5}) is True
+
+        stats = pipeline.get_stats()
+        assert stats["enqueued"] == 1
+        assert stats["queue_depth"] == 1
+
+    def test_submit_drops_when_full(self, pipeline):
+        """测试提交数据 - 队列满时丢弃并计数"""
+        for i in range(5):
+            assert pipeline.submit("device001", {"seq": i}) is True
+
+        assert pipeline.submit("device001", {"seq": 5}) is False
+        assert pipeline.get_stats()["dropped"] == 1
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_flush_in_batches(self, mock_crud, pipeline):
+        """测试批量写入 - 按 batch_size 分批"""
+        mock_crud.create_many.side_effect = lambda db, batch: len(batch)
+        for i in range(5):
+            pipeline.submit("device001", {"seq": i})
+
+        pipeline.start()
+        pipeline.stop(timeout=5)
+
+        batch_sizes = [len(call.args[1]) for call in mock_crud.create_many.call_args_list]
+        assert sum(batch_sizes) == 5
+        assert max(batch_sizes) <= 3
+        assert pipeline.get_stats()["written"] == 5
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_stop_retries_failed_batch(self, mock_crud, pipeline, mock_db):
+        """测试关闭时写入失败的批次会重试，保证至少写入一次"""
+        mock_crud.create_many.side_effect = [Exception("db down"), 2]
+        pipeline.submit("device001", {"seq": 1})
+        pipeline.submit("device002", {"seq": 2})
+
+        pipeline.start()
+        pipeline.stop(timeout=5)
+
+        stats = pipeline.get_stats()
+        assert stats["flush_errors"] == 1
+        assert stats["written"] == 2
+        assert stats["pending_retry"] == 0
+        mock_db.rollback.assert_called_once()
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_skipped_unknown_devices(self, mock_crud, pipeline):
+        """测试未注册设备的数据计入 skipped"""
+        mock_crud.create_many.return_value = 1
+        pipeline.submit("device001", {"seq": 1})
+        pipeline.submit("unknown", {"seq": 2})
+
+        pipeline.start()
+        pipeline.stop(timeout=5)
+
+        stats = pipeline.get_stats()
+        assert stats["written"] == 1
+        assert stats["skipped"] == 1
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_isolates_bad_record(self, mock_crud, pipeline):
+        """测试记录本身导致写入失败 - 二分定位后只丢弃问题记录，其余记录写入"""
+        # 配置模拟
+        def create_many(db, batch):
+            if any(record["data"].get("bad") for record in batch):
+                raise DataError("INSERT", {}, Exception("Data too long"))
+            return len(batch)
+
+        mock_crud.create_many.side_effect = create_many
+        pipeline.submit("device001", {"seq": 1})
+        pipeline.submit("device002", {"bad": True})
+        pipeline.submit("device003", {"seq": 3})
+
+        # 执行测试
+        pipeline.start()
+        pipeline.stop(timeout=5)
+
+        # 验证结果
+        stats = pipeline.get_stats()
+        assert stats["written"] == 2
+        assert stats["rejected"] == 1
+        assert stats["pending_retry"] == 0
+        written = [r["device_id"] for call in mock_crud.create_many.call_args_list for r in call.args[1]]
+        assert "device001" in written and "device003" in written
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_drops_batch_after_max_retries(self, mock_crud, pipeline):
+        """测试数据库持续不可用 - 重试 max_retries 次后丢弃批次，不再无限重试"""
+        # 配置模拟
+        mock_crud.create_many.side_effect = OperationalError("INSERT", {}, Exception("db down"))
+        pipeline.submit("device001", {"seq": 1})
+        pipeline.submit("device002", {"seq": 2})
+
+        # 执行测试
+        assert pipeline._flush(pipeline._collect_batch()) is False
+        assert pipeline._flush(pipeline._collect_batch()) is False
+        assert pipeline._flush(pipeline._collect_batch()) is False
+
+        # 验证结果
+        stats = pipeline.get_stats()
+        assert mock_crud.create_many.call_count == 3
+        assert stats["flush_errors"] == 3
+        assert stats["failed"] == 2
+        assert stats["pending_retry"] == 0
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_stop_bounded_by_timeout(self, mock_crud, mock_db):
+        """测试关闭排空 - 数据库不可用时在超时后返回，剩余数据计入 failed"""
+        # 配置模拟
+        mock_crud.create_many.side_effect = OperationalError("INSERT", {}, Exception("db down"))
+        pipeline = TelemetryIngestPipeline(
+            batch_size=3,
+            flush_interval=0.05,
+            max_queue_size=10,
+            retry_backoff=0.05,
+            max_retries=1000,
+            session_factory=lambda: mock_db,
+        )
+        for i in range(5):
+            pipeline.submit("device001", {"seq": i})
+
+        # 执行测试
+        pipeline.start()
+        pipeline.stop(timeout=0.3)
+
+        # 验证结果
+        stats = pipeline.get_stats()
+        assert pipeline.running is False
+        assert stats["written"] == 0
+        assert stats["failed"] == 5
+        assert stats["pending_retry"] == 0
+
+    @patch("app.services.telemetry_ingest.device_data_crud")
+    def test_restart_after_stop_timeout(self, mock_crud, pipeline):
+        """测试 stop 超时后重新启动 - 保留仍在写入的旧线程，start 等其退出，不会同时存在两个写入线程"""
+        # 配置模拟
+        release = threading.Event()
+        writers = set()
+
+        def create_many(db, batch):
+            writers.add(threading.current_thread())
+            release.wait(5)
+            return len(batch)
+
+        mock_crud.create_many.side_effect = create_many
+        pipeline.submit("device001", {"seq": 0})
+        pipeline.start()
+        old_thread = pipeline._thread
+
+        # 执行测试
+        pipeline.stop(timeout=0.1)
+        assert pipeline._thread is old_thread and old_thread.is_alive()
+        restarter = threading.Thread(target=pipeline.start)
+        restarter.start()
+        restarter.join(0.1)
+        assert restarter.is_alive()
+        release.set()
+        restarter.join(5)
+        pipeline.submit("device001", {"seq": 1})
+        pipeline.stop(timeout=5)
+
+        # 验证结果
+        assert not old_thread.is_alive()
+        assert len(writers) == 2
+        assert pipeline.get_stats()["written"] == 2
+
+    def test_payload_rejects_overlong_columns(self):
+        """测试上报负载 - type/quality 超过 device_data 列长度时解码失败，不进入写入管道"""
+        with pytest.raises(ValidationError):
+            TelemetryPayload(type="x" * 51, data={})
+        with pytest.raises(ValidationError):
+            TelemetryPayload(quality="x" * 51, data={})
@@ -0,0 +1,250 @@
+"""
+遥测数据存储模块单元测试
+测试 app/db/telemetry_codec.py 的列式压缩编码、app/db/partitioning.py 的分区计算
+及 app/crud/device.py 中的归档与存储维护
+"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud.device import device_crud, device_data_crud
+from app.db.base import Base, import_models
+from app.db.models.device import Device, DeviceData, DeviceDataArchive
+
+from app.db.telemetry_codec import TelemetryRecord, encode_block, decode_block
+from app.db.partitioning import (
+    TelemetryPartitionManager,
+    floor_boundary,
+    next_boundary,
+    partition_name,
+    partition_range,
+)
+
+
+class TestTelemetryCodec:
+    """列式压缩编码的单元测试"""
+
+    @pytest.fixture
+    def records(self):
+        """创建一组按时间排序的遥测记录"""
+        start = datetime(2024, 1, 1, 0, 0, 0, 123456)
+        return [
+            TelemetryRecord(
+                id=1000 + i,
+                timestamp=start + timedelta(seconds=10 * i),
+                data={"temperature": 20.5 + i, "count": i, "status": "ok"},
+                quality="good",
+            )
+            for i in range(100)
+        ]
+
+    def test_round_trip(self, records):
+        """测试编码后解码得到相同的记录"""
+        decoded = decode_block(encode_block(records))
+
+        assert decoded == records
+
+    def test_int_and_float_types_preserved(self):
+        """测试整数与浮点指标解码后类型不变"""
+        records = [
+            TelemetryRecord(1, datetime(2024, 1, 1), {"a": 1, "b": 1.0}),
+            TelemetryRecord(2, datetime(2024, 1, 1, 0, 1), {"a": 2, "b": 2.5}),
+        ]
+
+        decoded = decode_block(encode_block(records))
+
+        assert isinstance(decoded[0].data["a"], int)
+        assert isinstance(decoded[0].data["b"], float)
+
+    def test_sparse_and_non_numeric_fields(self):
+        """测试缺失指标、布尔值、嵌套字段及逐行质量"""
+        records = [
+            TelemetryRecord(1, datetime(2024, 1, 1), {"temperature": 21.0, "door": True}, "good"),
+            TelemetryRecord(2, datetime(2024, 1, 1, 0, 1), {"location": {"lat": 1.5}}, "bad"),
+        ]
+
+        decoded = decode_block(encode_block(records))
+
+        assert decoded == records
+        assert decoded[0].data["door"] is True
+        assert "temperature" not in decoded[1].data
+
+    def test_compression(self, records):
+        """测试压缩块明显小于逐行JSON"""
+        import json
+        raw_size = sum(len(json.dumps(record.data)) for record in records)
+
+        assert len(encode_block(records)) < raw_size / 2
+
+    def test_empty_block(self):
+        """测试空记录列表"""
+        assert decode_block(encode_block([])) == []
+
+
+class TestPartitioning:
+    """分区计算及分区管理器的单元测试"""
+
+    def test_daily_boundaries(self):
+        """测试按天分区的起止时间和命名"""
+        ts = datetime(2024, 2, 29, 13, 45)
+
+        assert floor_boundary(ts, "day") == datetime(2024, 2, 29)
+        assert next_boundary(ts, "day") == datetime(2024, 3, 1)
+        assert partition_name(floor_boundary(ts, "day"), "day") == "p20240229"
+
+    def test_monthly_boundaries_across_year(self):
+        """测试按月分区跨年"""
+        ts = datetime(2024, 12, 15)
+
+        assert floor_boundary(ts, "month") == datetime(2024, 12, 1)
+        assert next_boundary(ts, "month") == datetime(2025, 1, 1)
+        assert partition_name(datetime(2024, 12, 1), "month") == "p202412"
+
+    def test_partition_range(self):
+        """测试生成覆盖时间段的分区列表"""
+        partitions = partition_range(datetime(2024, 1, 1, 6), datetime(2024, 1, 3), "day")
+
+        assert partitions == [
+            ("p20240101", datetime(2024, 1, 2)),
+            ("p20240102", datetime(2024, 1, 3)),
+        ]
+
+    def test_invalid_interval(self):
+        """测试不支持的分区粒度"""
+        with pytest.raises(ValueError):
+            TelemetryPartitionManager(interval="week")
+
+    def test_noop_on_unsupported_dialect(self):
+        """测试非MySQL数据库上分区操作为空操作"""
+        # 配置模拟
+        conn = MagicMock()
+        conn.dialect.name = "sqlite"
+        manager = TelemetryPartitionManager()
+
+        # 执行测试
+        created = manager.ensure_partitions(conn, datetime(2024, 1, 1), 7)
+        dropped = manager.drop_expired(conn, datetime(2024, 1, 1))
+
+        # 验证结果
+        assert created == [] and dropped == []
+        conn.execute.assert_not_called()
+
+    def test_expired_partitions(self):
+        """测试按上界筛选过期分区，不包含 pmax"""
+        # 配置模拟
+        manager = TelemetryPartitionManager()
+        manager.list_partitions = MagicMock(return_value=[
+            ("p20240101", "'2024-01-02 00:00:00'"),
+            ("p20240102", "'2024-01-03 00:00:00'"),
+            ("pmax", "MAXVALUE"),
+        ])
+
+        # 执行测试
+        expired = manager.expired_partitions(MagicMock(), datetime(2024, 1, 2))
+
+        # 验证结果
+        assert expired == ["p20240101"]
+
+
+class TestArchiveStorage:
+    """原始数据归档及存储维护的单元测试，使用内存 SQLite 数据库"""
+
+    @pytest.fixture
+    def db(self):
+        """创建内存数据库，写入两个设备跨三天的原始数据"""
+        import_models()
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        for pk in (1, 2):
+            session.add(Device(id=pk, device_id=f"device00{pk}", device_name="Test Device", product_id="product001"))
+        start = datetime(2024, 1, 1)
+        for pk in (1, 2):
+            for hour in range(0, 72, 6):
+                session.add(DeviceData(
+                    device_id=pk,
+                    timestamp=start + timedelta(hours=hour),
+                    data_type="telemetry" if hour % 12 else "event",
+                    data={"seq": hour},
+                ))
+        session.commit()
+        yield session
+        session.close()
+        engine.dispose()
+
+    def test_archive_before(self, db):
+        """测试归档 - 按 设备/数据类型/天 生成归档块，并删除已归档的原始数据"""
+        # 执行测试
+        archived = device_data_crud.archive_before(db, datetime(2024, 1, 3))
+
+        # 验证结果
+        assert archived == 16
+        assert db.query(DeviceData).filter(DeviceData.timestamp < datetime(2024, 1, 3)).count() == 0
+        assert db.query(DeviceData).count() == 8
+        blocks = db.query(DeviceDataArchive).all()
+        assert len(blocks) == 8
+        assert sum(block.count for block in blocks) == 16
+        assert all(block.start_time.date() == block.end_time.date() for block in blocks)
+
+    def test_delete_device_after_archive(self, db):
+        """测试删除已归档数据的设备 - 归档块随设备删除，不违反外键约束"""
+        # 配置模拟
+        db.execute(text("PRAGMA foreign_keys=ON"))
+        device_data_crud.archive_before(db, datetime(2024, 1, 3))
+
+        # 执行测试
+        device_crud.delete(db, 1)
+
+        # 验证结果
+        assert db.query(DeviceDataArchive).filter(DeviceDataArchive.device_id == 1).count() == 0
+        assert db.query(DeviceDataArchive).filter(DeviceDataArchive.device_id == 2).count() == 4
+
+    def test_archive_failure_leaves_no_duplicates(self, db):
+        """测试归档中途失败 - 已提交的时间段不重复归档，重新执行后数据完整"""
+        # 配置模拟
+        from app.crud import device as device_module
+        encode = device_module.encode_block
+        calls = []
+
+        def failing_encode(records):
+            calls.append(len(records))
+            if len(calls) == 3:
+                raise RuntimeError("crash")
+            return encode(records)
+
+        # 执行测试
+        with patch.object(device_module, "encode_block", side_effect=failing_encode):
+            with pytest.raises(RuntimeError):
+                device_data_crud.archive_before(db, datetime(2024, 1, 3))
+        partial_blocks = db.query(DeviceDataArchive).count()
+        device_data_crud.archive_before(db, datetime(2024, 1, 3))
+
+        # 验证结果
+        assert partial_blocks == 2
+        blocks = db.query(DeviceDataArchive).all()
+        assert len(blocks) == 8
+        assert sum(block.count for block in blocks) == 16
+        archived_ids = [record.id for block in blocks for record in device_data_crud.decode_archive(block)]
+        assert len(archived_ids) == len(set(archived_ids))
+
+    @patch("app.crud.device.device_rollup_crud")
+    @patch("app.crud.device.TelemetryPartitionManager")
+    def test_maintain_storage_does_not_partition(self, mock_manager_cls, mock_rollup):
+        """测试存储维护 - 只为已分区的表滚动创建分区，不转换未分区的表"""
+        # 配置模拟
+        db = MagicMock()
+        manager = mock_manager_cls.return_value
+        manager.is_supported.return_value = True
+        manager.ensure_partitions.return_value = []
+        mock_rollup.delete_expired.return_value = 0
+
+        # 执行测试
+        result = device_data_crud.maintain_storage(db, datetime(2024, 1, 1))
+
+        # 验证结果
+        manager.partition_table.assert_not_called()
+        manager.ensure_partitions.assert_called_once()
+        assert result["partitions_created"] == []
@@ -0,0 +1,170 @@
+"""
+主题路由器单元测试
+测试 app/services/topic_router.py 中的 TopicRouter 类及 ProtocolRegistry 的跨协议路由
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.protocol_registry import ProtocolRegistry
+from app.services.topic_router import TopicRouter
+
+
+class TestTopicRouter:
+    """TopicRouter 类的单元测试"""
+
+    @pytest.fixture
+    def router(self):
+        """注册设备主题路由"""
+        router = TopicRouter()
+        router.add("device/{device_id}/data", "data", "data")
+        router.add("device/{device_id}/command/response", "command_response", "command_response")
+        router.add("device/+/firmware/#", "firmware", "firmware")
+        return router
+
+    def test_match_extracts_params(self, router):
+        """测试匹配 - 返回路由及通配符参数"""
+        route, params = router.match("device/device001/data")
+
+        assert route.name == "data"
+        assert params == ("device001",)
+        assert route.params_dict(params) == {"device_id": "device001"}
+
+    def test_match_multi_level(self, router):
+        """测试匹配 - 多层通配符匹配剩余层级及父级"""
+        assert router.match("device/device001/firmware/status/progress")[1] == ("device001", "status/progress")
+        assert router.match("device/device001/firmware")[1] == ("device001", "")
+
+    def test_literal_takes_priority(self, router):
+        """测试优先级 - 字面量优先于通配符，与注册顺序无关"""
+        # 配置模拟
+        router.add("device/gateway/data", "gateway", "gateway")
+
+        # 执行测试
+        route, params = router.match("device/gateway/data")
+
+        # 验证结果
+        assert route.name == "gateway"
+        assert params == ()
+        assert router.match("device/device001/data")[0].name == "data"
+
+    def test_backtracks_to_wildcard(self):
+        """测试回溯 - 字面量分支无法匹配时回退到通配符分支"""
+        router = TopicRouter()
+        router.add("device/gateway/status", "gateway_status")
+        router.add("device/+/data", "data")
+
+        route, params = router.match("device/gateway/data")
+
+        assert route.handler == "data"
+        assert params == ("gateway",)
+
+    def test_unmatched(self, router):
+        """测试未匹配 - 返回 None 并计数"""
+        assert router.match("device/device001/unknown") is None
+        assert router.match("device") is None
+        assert router.unmatched == 2
+
+    def test_system_topic_skips_wildcards(self):
+        """测试系统主题 - $ 开头的主题不匹配首层通配符"""
+        router = TopicRouter()
+        router.add("#", "all")
+
+        assert router.match("$SYS/broker/uptime") is None
+        assert router.match("device/device001/data")[0].handler == "all"
+
+    def test_dispatch_calls_handler(self, router):
+        """测试分发 - 以参数及附加参数调用处理函数"""
+        # 配置模拟
+        handler = MagicMock()
+        router.add("device/{device_id}/status", handler)
+
+        # 执行测试
+        assert router.dispatch("device/device001/status", '{"status": "online"}') is True
+        assert router.dispatch("other/topic", "") is False
+
+        # 验证结果
+        handler.assert_called_once_with("device001", '{"status": "online"}')
+
+    def test_decorator_replace_and_remove(self):
+        """测试插件注册 - 装饰器注册、重复注册替换、注销"""
+        # 配置模拟
+        router = TopicRouter()
+
+        @router.route("device/{device_id}/alarm", name="alarm")
+        def on_alarm(device_id, payload):
+            return device_id
+
+        # 执行测试
+        router.add("device/{device_id}/alarm", "replaced", "alarm")
+
+        # 验证结果
+        assert len(router) == 1
+        assert router.match("device/device001/alarm")[0].handler == "replaced"
+        assert router.remove("device/{device_id}/alarm") is True
+        assert router.remove("device/{device_id}/alarm") is False
+        assert router.match("device/device001/alarm") is None
+
+    def test_custom_separator(self):
+        """测试AMQP路由键 - 自定义分隔符及通配符"""
+        router = TopicRouter(separator=".", single_wildcard="*", multi_wildcard="#")
+        router.add("device.{device_id}.*", "amqp")
+
+        assert router.match("device.device001.telemetry")[1] == ("device001", "telemetry")
+
+    @pytest.mark.parametrize("pattern", ["device/#/data", "device/dev+/data", "device/{device_id}#"])
+    def test_invalid_pattern(self, pattern):
+        """测试模式校验 - 多层通配符不在末尾或通配符未独占层级"""
+        router = TopicRouter()
+        with pytest.raises(ValueError):
+            router.add(pattern, "invalid")
+
+
+class TestProtocolRegistryRouting:
+    """ProtocolRegistry 跨协议路由"""
+
+    @pytest.fixture
+    def service(self):
+        """注册模拟的 coap 协议服务"""
+        service = MagicMock()
+        service.handle_message = AsyncMock(return_value={"normalized": True})
+        ProtocolRegistry.register("test_coap", service)
+        yield service
+        ProtocolRegistry.unregister("test_coap")
+
+    def test_default_route(self, service):
+        """测试默认路由 - <protocol>/<device_id>/... 路由到对应协议"""
+        assert ProtocolRegistry.resolve("test_coap/device001/sensors/temp") == ("test_coap", {"device_id": "device001"})
+
+    def test_route_message(self, service):
+        """测试路由消息 - 交给匹配协议的 handle_message 处理"""
+        # 配置模拟
+        ProtocolRegistry.add_route("sensors/{device_id}/temperature", "test_coap")
+
+        # 执行测试
+        result = asyncio.run(ProtocolRegistry.route_message("sensors/device002/temperature", {"value": 21.5}))
+
+        # 验证结果
+        assert result == {"normalized": True}
+        service.handle_message.assert_awaited_once_with("device002", {"value": 21.5})
+        assert ProtocolRegistry.remove_route("sensors/{device_id}/temperature") is True
+
+    def test_route_message_unmatched(self, service):
+        """测试路由消息 - 无匹配路由时返回None"""
+        assert asyncio.run(ProtocolRegistry.route_message("unknown/device001", {})) is None
+        service.handle_message.assert_not_awaited()
+
+    def test_unregister_removes_routes(self, service):
+        """测试注销协议 - 同时移除该协议的路由"""
+        ProtocolRegistry.add_route("legacy/{device_id}", "test_coap")
+
+        ProtocolRegistry.unregister("test_coap")
+
+        assert ProtocolRegistry.resolve("legacy/device001") is None
+        assert ProtocolRegistry.resolve("test_coap/device001/x") is None
+
+    def test_route_requires_device_id(self):
+        """测试路由校验 - 模式必须包含 {device_id}"""
+        with pytest.raises(ValueError):
+            ProtocolRegistry.add_route("sensors/+/temperature", "test_coap")